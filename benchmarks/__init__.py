@@ -0,0 +1,6 @@
+"""
+Benchmarks of the SDK hot paths, run against the local simulator (xarm.tools.simulator)
+Usage:
+    python -m benchmarks [--suites convert,report_parse,command,callback,wait_move] [--json out.json] [--compare base.json]
+Every benchmark module can also be run alone, e.g. python benchmarks/bench_convert.py
+"""
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Run the benchmark suites, print the percentile tables and optionally save the results as json
+Usage:
+    python -m benchmarks
+    python -m benchmarks --suites convert,command --json new.json --compare old.json
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks import bench_import, bench_convert, bench_report_decode, bench_commands, bench_callbacks, bench_wait_move, bench_fleet, bench_kinematics, bench_trajectory
+from benchmarks.common import print_table, print_compare, dump_json, load_json, SimContext
+
+SUITES = [bench_import, bench_convert, bench_report_decode, bench_commands, bench_callbacks, bench_wait_move, bench_fleet, bench_kinematics, bench_trajectory]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='xArm SDK benchmarks')
+    parser.add_argument('--suites', type=str, default=None,
+                        help='comma separated suites, default is all: {}'.format(','.join(s.SUITE for s in SUITES)))
+    parser.add_argument('--samples', type=int, default=200, help='samples of every case')
+    parser.add_argument('--inner', type=int, default=200, help='calls in every sample of the microbenchmarks')
+    parser.add_argument('--moves', type=int, default=30, help='motions of the wait_move suite')
+    parser.add_argument('--duration', type=float, default=3, help='duration(s) of the callback and the fleet suites')
+    parser.add_argument('--arms', type=int, default=16, help='arms of the fleet suite')
+    parser.add_argument('--latency', type=float, default=0.0, help='latency(s) injected by the simulator')
+    parser.add_argument('--jitter', type=float, default=0.0, help='jitter(s) injected by the simulator')
+    parser.add_argument('--json', type=str, default=None, help='save the results to the json file')
+    parser.add_argument('--compare', type=str, default=None, help='compare with the results of another revision')
+    args = parser.parse_args()
+
+    names = args.suites.split(',') if args.suites else [s.SUITE for s in SUITES]
+    suites = [s for s in SUITES if s.SUITE in names]
+    unknown = set(names) - set(s.SUITE for s in suites)
+    if unknown:
+        parser.error('unknown suites: {}'.format(','.join(sorted(unknown))))
+
+    results = []
+    for suite in suites:
+        if not suite.NEEDS_SIM:
+            results.extend(suite.run(args))
+    sim_suites = [s for s in suites if s.NEEDS_SIM]
+    if sim_suites:
+        with SimContext(latency=args.latency, jitter=args.jitter) as ctx:
+            for suite in sim_suites:
+                results.extend(suite.run(args, ctx))
+
+    print()
+    print_table(results)
+    if args.json:
+        dump_json(args.json, results)
+        print('results saved to {}'.format(args.json))
+    if args.compare:
+        print()
+        print_compare(results, load_json(args.compare))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: report callback dispatch latency, the time from the simulator building a report to the callback running
+Usage:
+    python benchmarks/bench_callbacks.py [--duration 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import summarize, print_table, SimContext
+
+SUITE = 'callback'
+NEEDS_SIM = True
+
+
+def run(args, ctx=None):
+    if ctx is None:
+        return []
+    arm, sim = ctx.arm, ctx.sim
+    latencies = []
+
+    def callback(item):
+        # count is the sequence number of the rich report
+        report_time = sim.report_time(item['count'])
+        if report_time is not None:
+            latencies.append(time.monotonic() - report_time)
+
+    arm.register_count_changed_callback(callback)
+    try:
+        time.sleep(args.duration)
+    finally:
+        arm.release_count_changed_callback(callback)
+    if not latencies:
+        return []
+    return [summarize(SUITE, 'latency[count_changed]', latencies)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='report callback dispatch latency benchmark')
+    parser.add_argument('--duration', type=float, default=3)
+    parser.add_argument('--latency', type=float, default=0.0, help='latency(s) injected by the simulator')
+    args = parser.parse_args()
+    with SimContext(latency=args.latency) as ctx:
+        print_table(run(args, ctx))
+
+
+if __name__ == '__main__':
+    main()
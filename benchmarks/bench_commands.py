@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: command round-trip against the local simulator, and the encoding of the set_position command
+The modbus cases read scattered holding registers of the standard Modbus TCP server (ModbusTcpClient)
+The tgpio_modbus cases read registers of the gripper on the tool modbus, getset_tgpio_modbus_batch vs one frame per call
+Usage:
+    python benchmarks/bench_commands.py [--samples 200] [--latency 0]
+"""
+
+import os
+import sys
+import random
+import argparse
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import measure, summarize, print_table, SimContext
+from xarm.core.config.x_config import XCONF
+from xarm.core.utils import convert
+from xarm.core.wrapper.uxbus_cmd_tcp import UxbusCmdTcp
+from xarm.tools.modbus_tcp import ModbusTcpClient, plan_reads, MAX_READ_REGISTERS
+from xarm.x3.servo_snapshot import resolve_registers
+
+SUITE = 'command'
+NEEDS_SIM = True
+
+
+class _NullPort(object):
+    """Port that drops the written frames, isolates the encoding from the socket"""
+    def write(self, data):
+        return 0
+
+    def flush(self, fromid=-1, toid=-1):
+        pass
+
+
+def _encode_move_line(cmd, pose, speed, acc):
+    # the encoding done by UxbusCmd.move_line_common/set_nfp32_with_bytes, without waiting for the response
+    txdata = [pose[i] for i in range(6)] + [speed, acc, 0, -1]
+    hexdata = convert.fp32s_to_bytes(txdata, 10) + bytes([0, 0, 0])
+    return cmd.send_modbus_request(XCONF.UxbusReg.MOVE_LINE, hexdata, len(hexdata))
+
+
+def run_encode(args):
+    cmd = UxbusCmdTcp(_NullPort())
+    pose = [300, 0, 200, 3.1415926, 0, 0]
+    return [summarize(SUITE, 'encode[set_position]', measure(
+        lambda: _encode_move_line(cmd, pose, 100, 2000), args.samples, args.inner), ops_per_sample=args.inner)]
+
+
+def run_concurrent(arm, samples, threads):
+    """Throughput of get_position called from several threads, shows the effect of the in-flight window"""
+    times = []
+
+    def worker():
+        times.extend(measure(arm.get_position, samples, warmup=2))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return times
+
+
+def servo_snapshot_serial(arm, registers):
+    """The reads of get_servo_snapshot one round trip at a time, as get_servo_addr_16/32 do"""
+    for servo_id in range(1, arm.axis + 1):
+        for _, addr, bits, _ in registers:
+            (arm.get_servo_addr_32 if bits == 32 else arm.get_servo_addr_16)(servo_id, addr)
+    arm.get_servo_debug_msg()
+
+
+def run_modbus(host, samples, count=100):
+    """count scattered holding registers, read_multiple vs one read_holding_registers per address"""
+    addrs = random.Random(0).sample(range(2000), count)
+    client = ModbusTcpClient(host)
+    try:
+        print('modbus: {} addresses in {} requests'.format(count, len(plan_reads(addrs, MAX_READ_REGISTERS, max_gap=8))))
+        return [
+            summarize(SUITE, 'modbus[read_multiple]x{}'.format(count), measure(
+                lambda: client.read_multiple(0x03, addrs, max_gap=8), samples, warmup=2), unit='ms'),
+            summarize(SUITE, 'modbus[serial]x{}'.format(count), measure(
+                lambda: [client.read_holding_registers(addr, 1) for addr in addrs], samples, warmup=2), unit='ms'),
+        ]
+    finally:
+        client.close()
+
+
+def run_tgpio_modbus(arm, samples, count=10):
+    """count register reads of the tool gripper, one batch vs one getset_tgpio_modbus_data per frame"""
+    frames = [[XCONF.GRIPPER_ID, 0x03] + list(convert.u16_to_bytes(addr)) + [0x00, 0x01] for addr in range(0x0800, 0x0800 + count)]
+    return [
+        summarize(SUITE, 'tgpio_modbus[batch]x{}'.format(count), measure(
+            lambda: arm.getset_tgpio_modbus_batch(frames, min_res_len=5), samples, warmup=2), unit='ms'),
+        summarize(SUITE, 'tgpio_modbus[serial]x{}'.format(count), measure(
+            lambda: [arm.getset_tgpio_modbus_data(frame, min_res_len=5) for frame in frames], samples, warmup=2), unit='ms'),
+    ]
+
+
+def run(args, ctx=None):
+    results = run_encode(args)
+    if ctx is None:
+        return results
+    arm = ctx.arm
+    position = arm.get_position()[1]
+    results.append(summarize(SUITE, 'rtt[get_state]', measure(arm.get_state, args.samples)))
+    results.append(summarize(SUITE, 'rtt[get_position]', measure(arm.get_position, args.samples)))
+    results.append(summarize(SUITE, 'rtt[get_servo_angle]', measure(arm.get_servo_angle, args.samples)))
+    # a motion to the current position, queued and finished at once by the simulator
+    results.append(summarize(SUITE, 'rtt[set_position]', measure(
+        lambda: arm.set_position(*position, speed=100, wait=False), args.samples)))
+    ret = summarize(SUITE, 'rtt[get_position]x4', run_concurrent(arm, args.samples, 4))
+    # the samples overlap in time, the throughput of the 4 threads is 4 times of one thread
+    ret['ops_per_sec'] *= 4
+    results.append(ret)
+    registers = resolve_registers(None)
+    samples = max(args.samples // 10, 5)
+    results.append(summarize(SUITE, 'servo_snapshot[health]', measure(arm.get_servo_snapshot, samples)))
+    results.append(summarize(SUITE, 'servo_snapshot[health]serial', measure(
+        lambda: servo_snapshot_serial(arm._arm, registers), samples)))
+    results.extend(run_modbus(ctx.sim.host, samples))
+    results.extend(run_tgpio_modbus(arm, samples))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='command round-trip benchmark')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--inner', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='latency(s) injected by the simulator')
+    args = parser.parse_args()
+    with SimContext(latency=args.latency) as ctx:
+        print_table(run(args, ctx))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark: xarm.core.utils.convert encode/decode with the sizes used by the commands and the reports,
+the precompiled codecs vs the per-element implementation they replaced (checked to be byte-identical by tests/test_convert.py)
+Usage:
+    python benchmarks/bench_convert.py [--samples 200] [--inner 200]
+"""
+
+import os
+import sys
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import measure, summarize, print_table
+from tests.legacy_reference import legacy_fp32s_to_bytes, legacy_bytes_to_fp32s, legacy_u16s_to_bytes, \
+    legacy_bytes_to_u16s, legacy_bytes_to_16s, legacy_int32s_to_bytes
+from xarm.core.utils import convert
+
+SUITE = 'convert'
+NEEDS_SIM = False
+
+
+def run(args, ctx=None):
+    rnd = random.Random(0)
+    results = []
+
+    def add(name, func):
+        results.append(summarize(SUITE, name, measure(func, args.samples, args.inner), ops_per_sample=args.inner))
+
+    for count in (6, 7, 10):
+        floats = [rnd.uniform(-1000, 1000) for _ in range(count)]
+        data = convert.fp32s_to_bytes(floats, count)
+        rx_data = list(data)
+        buf = bytearray(count * 4)
+        add('fp32s_to_bytes[{}]'.format(count), lambda floats=floats, count=count: convert.fp32s_to_bytes(floats, count))
+        add('fp32s_to_bytes[{}]legacy'.format(count), lambda floats=floats, count=count: legacy_fp32s_to_bytes(floats, count))
+        add('fp32s_pack_into[{}]'.format(count), lambda floats=floats, count=count, buf=buf: convert.fp32s_pack_into(buf, 0, floats, count))
+        add('bytes_to_fp32s[{}]'.format(count), lambda data=data, count=count: convert.bytes_to_fp32s(data, count))
+        add('bytes_to_fp32s[{}]legacy'.format(count), lambda data=data, count=count: legacy_bytes_to_fp32s(data, count))
+        # the commands pass the list of the received byte values
+        add('bytes_to_fp32s[{}]list'.format(count), lambda data=rx_data, count=count: convert.bytes_to_fp32s(data, count))
+        add('fp32s_unpack_from[{}]'.format(count), lambda data=data, count=count: convert.fp32s_unpack_from(data, 0, count))
+    u16s = [rnd.randint(0, 65535) for _ in range(8)]
+    data = convert.u16s_to_bytes(u16s, 8)
+    add('u16s_to_bytes[8]', lambda: convert.u16s_to_bytes(u16s, 8))
+    add('u16s_to_bytes[8]legacy', lambda: legacy_u16s_to_bytes(u16s, 8))
+    add('bytes_to_u16s[8]', lambda: convert.bytes_to_u16s(data, 8))
+    add('bytes_to_u16s[8]legacy', lambda: legacy_bytes_to_u16s(data, 8))
+    add('bytes_to_16s[6]', lambda: convert.bytes_to_16s(data, 6))
+    add('bytes_to_16s[6]legacy', lambda: legacy_bytes_to_16s(data, 6))
+    int32s = [rnd.randint(-100000, 100000) for _ in range(7)]
+    add('int32s_to_bytes[7]', lambda: convert.int32s_to_bytes(int32s, 7))
+    add('int32s_to_bytes[7]legacy', lambda: legacy_int32s_to_bytes(int32s, 7))
+    add('bytes_to_u32', lambda: convert.bytes_to_u32(data))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='convert encode/decode microbenchmark')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--inner', type=int, default=200)
+    print_table(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
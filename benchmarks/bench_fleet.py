@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: N arms in one process, XArmFleet (3 threads) vs XArmAPI instances (their own threads)
+Every arm has its own simulator on 127.0.0.<i>, the latency is the time from a simulator building a report
+to the count_changed callback of the arm, the rtt is get_position called from one thread per arm at the same time
+Usage:
+    python benchmarks/bench_fleet.py [--arms 16] [--duration 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import measure, summarize, print_table
+
+SUITE = 'fleet'
+NEEDS_SIM = False
+
+
+def _run_arms(arms, sims, duration, samples):
+    latencies = []
+    rtts = []
+
+    def make_callback(sim):
+        def callback(item):
+            report_time = sim.report_time(item['count'])
+            if report_time is not None:
+                latencies.append(time.monotonic() - report_time)
+        return callback
+
+    for arm, sim in zip(arms, sims):
+        arm.register_count_changed_callback(make_callback(sim))
+    time.sleep(duration)
+    # only the reports in the duration, the callbacks are still run until the arms are disconnected
+    ret = list(latencies)
+
+    def worker(arm):
+        rtts.extend(measure(arm.get_position, samples, warmup=2))
+
+    workers = [threading.Thread(target=worker, args=(arm, )) for arm in arms]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return ret, rtts
+
+
+def run(args, ctx=None):
+    from xarm.tools.simulator import XArmSimulator
+    from xarm.wrapper import XArmAPI, XArmFleet
+    count = args.arms
+    duration = args.duration
+    samples = max(args.samples // 4, 10)
+    sims = [XArmSimulator(host='127.0.0.{}'.format(i + 1)) for i in range(count)]
+    results = []
+    try:
+        for sim in sims:
+            sim.start()
+        for mode in ('threads', 'fleet'):
+            thread_count = threading.active_count()
+            fleet = XArmFleet() if mode == 'fleet' else None
+            if fleet is not None:
+                arms = [fleet.add(sim.host) for sim in sims]
+            else:
+                arms = [XArmAPI(sim.host) for sim in sims]
+            thread_count = threading.active_count() - thread_count
+            try:
+                latencies, rtts = _run_arms(arms, sims, duration, samples)
+            finally:
+                if fleet is not None:
+                    fleet.close()
+                else:
+                    for arm in arms:
+                        arm.disconnect()
+            print('{} arms, {}: {} threads'.format(count, mode, thread_count))
+            results.append(summarize(SUITE, 'latency[{}]x{}'.format(mode, count), latencies))
+            ret = summarize(SUITE, 'rtt[get_position][{}]x{}'.format(mode, count), rtts)
+            # the samples of the arms overlap in time
+            ret['ops_per_sec'] *= count
+            results.append(ret)
+    finally:
+        for sim in sims:
+            sim.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='multi-arm benchmark')
+    parser.add_argument('--arms', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=3)
+    parser.add_argument('--samples', type=int, default=200)
+    print_table(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: time of importing the sdk, every sample is a new interpreter (the imports are cached in a process)
+The optional subsystems are loaded on the first use, the case '+optional' imports them too,
+which is what every import cost when they were imported eagerly
+Usage:
+    python benchmarks/bench_import.py [--samples 200]
+    python -X importtime -c "from xarm.wrapper import XArmAPI"  # the profile of the modules
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+import importlib.util
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import summarize, print_table
+
+SUITE = 'import'
+NEEDS_SIM = False
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# loaded on the first use, the modules found loaded after the import are printed
+OPTIONAL_MODULES = (
+    'numpy', 'asyncio', 'multiprocessing.pool', 'urllib.request', 'xarm.core.config.x_code',
+    'xarm.x3.parse', 'xarm.tools.blockly', 'xarm.wrapper.async_xarm_api',
+)
+
+
+def _installed(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ImportError:
+        # the parent package of a dotted name is missing
+        return False
+
+
+# numpy is not a dependency, the case '+optional' imports only the modules which are installed
+INSTALLED_OPTIONAL_MODULES = tuple(m for m in OPTIONAL_MODULES if _installed(m))
+
+CASES = [
+    ('xarm.wrapper', 'from xarm.wrapper import XArmAPI'),
+    ('xarm', 'import xarm'),
+    ('xarm.wrapper+optional', 'from xarm.wrapper import XArmAPI\nimport {}'.format(', '.join(INSTALLED_OPTIONAL_MODULES))),
+]
+
+_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+exec({stmt!r})
+elapsed = time.perf_counter() - start
+print(elapsed, ','.join(m for m in {modules!r} if m in sys.modules))
+'''
+
+
+def _import_once(stmt):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in [ROOT_DIR, env.get('PYTHONPATH')] if p)
+    out = subprocess.check_output([sys.executable, '-c', _SCRIPT.format(stmt=stmt, modules=OPTIONAL_MODULES)],
+                                  cwd=ROOT_DIR, env=env, universal_newlines=True)
+    elapsed, _, loaded = out.strip().splitlines()[-1].partition(' ')
+    return float(elapsed), loaded
+
+
+def run(args, ctx=None):
+    samples = max(args.samples // 10, 5)
+    results = []
+    missing = [m for m in OPTIONAL_MODULES if m not in INSTALLED_OPTIONAL_MODULES]
+    if missing:
+        print('import: optional modules not installed, not imported by the case \'+optional\': {}'.format(', '.join(missing)))
+    for name, stmt in CASES:
+        # the first run writes the .pyc files
+        _, loaded = _import_once(stmt)
+        print('import {}: optional modules loaded: {}'.format(name, loaded or 'none'))
+        times = [_import_once(stmt)[0] for _ in range(samples)]
+        results.append(summarize(SUITE, 'import[{}]'.format(name), times, unit='ms'))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='import time benchmark')
+    parser.add_argument('--samples', type=int, default=200)
+    print_table(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: forward/inverse kinematics and the joint limit check of a batch of poses,
+the local model (get_kinematics_model, vectorized) vs one controller round trip per pose,
+the times are per pose. The simulator answers fk/ik without computing them, so only the times are compared
+The validate_path case checks a circle of 50 waypoints (radius 100 mm, sampled every 10 mm), the time is per path
+Usage:
+    python benchmarks/bench_kinematics.py [--samples 200] [--batch 1000] [--latency 0]
+"""
+
+import os
+import sys
+import math
+import random
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import measure, summarize, print_table, SimContext
+
+SUITE = 'kinematics'
+NEEDS_SIM = True
+
+
+def run(args, ctx):
+    import numpy as np
+    arm = ctx.arm
+    code, model = arm.get_kinematics_model(refresh=True)
+    if code != 0:
+        print('get_kinematics_model failed, code={}'.format(code))
+        return []
+    batch = getattr(args, 'batch', 1000)
+    rng = random.Random(0)
+    angles = np.array([[rng.uniform(-1.5, 1.5) for _ in range(model.dof)] for _ in range(batch)])
+    poses = model.forward(angles)
+    seeds = angles + np.array([[rng.gauss(0, 0.05) for _ in range(model.dof)] for _ in range(batch)])
+    _, ok = model.inverse(poses, seeds=seeds)
+    print('local ik: {}/{} poses solved'.format(int(ok.sum()), batch))
+    # the controller cases are limited to a few poses per sample, the round trips dominate
+    remote = max(min(batch, 20), 1)
+    remote_angles = angles[:remote].tolist()
+    remote_poses = poses[:remote].tolist()
+    samples = max(args.samples // 10, 5)
+
+    def remote_fk():
+        for sample in remote_angles:
+            arm.get_forward_kinematics(sample, input_is_radian=True, return_is_radian=True)
+
+    def remote_ik():
+        for pose in remote_poses:
+            arm.get_inverse_kinematics(pose, input_is_radian=True, return_is_radian=True)
+
+    def remote_joint_limit():
+        for sample in remote_angles:
+            arm.is_joint_limit(sample, is_radian=True)
+
+    # a circle of radius 100 mm in front of the arm, the tool pointing down
+    circle = [[300 + 100 * math.cos(a), 100 * math.sin(a), 250, 180, 0, 0, 5]
+              for a in (2 * math.pi * i / 50 for i in range(51))]
+    code, ret = arm.validate_path(circle, speed=100, mvacc=2000, is_radian=False, seed=arm.angles)
+    print('validate_path: code={}, ok={}, duration={:.2f}s'.format(code, ret and ret['ok'], ret and ret['duration']))
+
+    return [
+        summarize(SUITE, 'validate_path[50 waypoints]', measure(
+            lambda: arm.validate_path(circle, speed=100, mvacc=2000, is_radian=False), samples, warmup=1), unit='ms'),
+        summarize(SUITE, 'fk[controller]', measure(remote_fk, samples, warmup=1), ops_per_sample=remote),
+        summarize(SUITE, 'fk[local]x{}'.format(batch), measure(lambda: model.forward(angles), samples, warmup=1), ops_per_sample=batch),
+        summarize(SUITE, 'ik[controller]', measure(remote_ik, samples, warmup=1), ops_per_sample=remote),
+        summarize(SUITE, 'ik[local]x{}'.format(batch), measure(lambda: model.inverse(poses, seeds=seeds), samples, warmup=1), ops_per_sample=batch),
+        summarize(SUITE, 'joint_limit[controller]', measure(remote_joint_limit, samples, warmup=1), ops_per_sample=remote),
+        summarize(SUITE, 'joint_limit[local]x{}'.format(batch), measure(lambda: model.is_joint_limit(angles), samples, warmup=1), ops_per_sample=batch),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='kinematics benchmark')
+    parser.add_argument('--samples', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    args = parser.parse_args()
+    with SimContext(latency=args.latency) as ctx:
+        print_table(run(args, ctx))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2020, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Microbenchmark: report frame decoding, convert.bytes_to_xxx (legacy) vs precompiled struct layouts
+(the same fields are checked by tests/test_report_decoder.py)
+Usage:
+    python benchmarks/bench_report_decode.py [--number 20000]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import measure, summarize
+from tests.legacy_reference import make_frame, legacy_decode, NullCmd
+from xarm.core.utils.report_decoder import REPORT_DECODERS
+
+SUITE = 'report_parse'
+NEEDS_SIM = False
+
+
+def timeit(func, frame, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func(frame)
+    return (time.perf_counter() - start) / number * 1e6
+
+
+def run(args, ctx=None):
+    """
+    Decode time of every report type, and the time of Base._handle_report_data (decode + update the state + callbacks)
+    for the frames built by the simulator
+    """
+    from xarm.wrapper import XArmAPI
+    from xarm.tools.simulator import XArmSimulator
+    results = []
+    for report_type in ('normal', 'rich', 'real'):
+        frame = make_frame(report_type)
+        decoder = REPORT_DECODERS[report_type]
+        results.append(summarize(SUITE, 'decode[{}]'.format(report_type),
+                                 measure(lambda: decoder.decode(frame), args.samples, args.inner), ops_per_sample=args.inner))
+
+    def view_access(decoder, frame):
+        # the fields most of the processes need: state, error code and pose
+        view = decoder.view(frame)
+        return view['state_mode'], view['error_code'], view['pose']
+
+    for report_type in ('normal', 'rich'):
+        frame = make_frame(report_type)
+        decoder = REPORT_DECODERS[report_type]
+        results.append(summarize(SUITE, 'view[{}]'.format(report_type),
+                                 measure(lambda: view_access(decoder, frame), args.samples, args.inner), ops_per_sample=args.inner))
+    sim = XArmSimulator()
+    sim.motion_enabled, sim.state = True, 2
+    for report_type in ('normal', 'rich', 'real'):
+        frame = sim.build_report(report_type)
+        arm = XArmAPI(do_not_open=True, report_type=report_type)
+        arm._arm.arm_cmd = NullCmd()
+        handle = arm._arm._handle_report_data
+        results.append(summarize(SUITE, 'handle[{}]'.format(report_type),
+                                 measure(lambda: handle(frame), args.samples, args.inner), ops_per_sample=args.inner))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='report frame decode microbenchmark')
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = [('normal', None), ('rich', 245), ('rich', None), ('real', None), ('normal_old', None), ('rich_old', None)]
+    print('{:<12}{:>8}{:>14}{:>14}{:>10}'.format('type', 'length', 'legacy(us)', 'struct(us)', 'speedup'))
+    for report_type, length in cases:
+        frame = make_frame(report_type, length)
+        decoder = REPORT_DECODERS[report_type]
+        legacy_us = timeit(lambda data: legacy_decode(report_type, data), frame, args.number)
+        struct_us = timeit(decoder.decode, frame, args.number)
+        print('{:<12}{:>8}{:>14.2f}{:>14.2f}{:>9.1f}x'.format(
+            report_type, len(frame), legacy_us, struct_us, legacy_us / struct_us))
+
+
+if __name__ == '__main__':
+    main()
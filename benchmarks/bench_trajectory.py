@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: the trajectory files of start_capture_trajectory/stop_capture_trajectory,
+a 10 minutes trajectory at 250Hz (pose, angles, joint_speeds) opened memory-mapped vs read into memory (np.fromfile)
+Usage:
+    python benchmarks/bench_trajectory.py [--samples 200]
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import measure, summarize, print_table
+
+SUITE = 'trajectory'
+NEEDS_SIM = False
+
+RATE = 250
+DURATION = 600
+
+
+def run(args, ctx=None):
+    import numpy as np
+    from xarm.core.utils.trajectory_file import TrajectoryFile, TrajectoryCapture, write_trajectory
+    count = RATE * DURATION
+    rng = np.random.default_rng(0)
+    fd, filename = tempfile.mkstemp(suffix='.xtrj')
+    os.close(fd)
+    samples = max(args.samples // 4, 10)
+    try:
+        write_trajectory(filename, {
+            'time': np.arange(count) / float(RATE),
+            'pose': rng.random((count, 6)),
+            'angles': rng.random((count, 7)),
+            'joint_speeds': rng.random((count, 7)),
+        }, {'rate': RATE})
+        print('trajectory file: {} rows, {:.1f} MB'.format(count, os.path.getsize(filename) / 1e6))
+
+        def open_seek():
+            traj = TrajectoryFile(filename)
+            return traj['angles'][traj.index_at(DURATION / 2)]
+
+        def read_seek():
+            data = np.fromfile(filename, dtype=np.uint8)
+            return data[len(data) // 2]
+
+        traj = TrajectoryFile(filename)
+        capture = TrajectoryCapture(fields=('pose', 'angles', 'joint_speeds'))
+        pose, angles = [0.0] * 6, [0.0] * 7
+        results = [
+            summarize(SUITE, 'open+seek[mmap]', measure(open_seek, samples, warmup=2)),
+            summarize(SUITE, 'open+seek[read]', measure(read_seek, samples, warmup=2)),
+            summarize(SUITE, 'resample[10s@250Hz]', measure(
+                lambda: traj.resample('angles', rate=RATE, start=DURATION / 2, end=DURATION / 2 + 10), samples, warmup=2)),
+            summarize(SUITE, 'capture.append', measure(
+                lambda: capture.append(0, pose, angles, 0, angles), args.samples, 100), ops_per_sample=100),
+        ]
+        traj.close()
+    finally:
+        os.remove(filename)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='trajectory file benchmark')
+    parser.add_argument('--samples', type=int, default=200)
+    print_table(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Benchmark: motion-completion latency, the time from the simulator finishing a motion to the wait returning
+The gripper cases are the same for the gripper on the tool modbus, the wait polls the gripper by itself
+or uses the states of the gripper monitor (start_gripper_monitor)
+Usage:
+    python benchmarks/bench_wait_move.py [--moves 30]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.common import summarize, print_table, SimContext
+
+SUITE = 'wait_move'
+NEEDS_SIM = True
+
+
+def _short_moves(ctx, moves, wait_func):
+    """Alternate between two poses 5mm apart, return the completion latency(s) of every move"""
+    arm, sim = ctx.arm, ctx.sim
+    x, y, z, roll, pitch, yaw = arm.get_position()[1]
+    latencies = []
+    for i in range(moves):
+        wait_func(x + (5 if i % 2 == 0 else 0), y, z, roll, pitch, yaw)
+        done_time = time.monotonic()
+        if sim.idle_time > 0:
+            latencies.append(max(done_time - sim.idle_time, 0))
+    return latencies
+
+
+def _gripper_moves(ctx, moves):
+    """
+    Alternate the gripper between two positions, return the completion latency(s) of every move,
+    the gripper starts at 200, so the first move is a real one and every phase runs the same moves
+    """
+    arm, sim = ctx.arm, ctx.sim
+    arm.set_gripper_position(200, wait=True)
+    latencies = []
+    for i in range(moves):
+        arm.set_gripper_position(300 if i % 2 == 0 else 200, wait=True)
+        done_time = time.monotonic()
+        if sim.gripper_idle_time > 0:
+            latencies.append(max(done_time - sim.gripper_idle_time, 0))
+    return latencies
+
+
+def run(args, ctx=None):
+    if ctx is None:
+        return []
+    arm = ctx.arm
+    results = []
+
+    def wait_feedback(*pose):
+        # firmware >= 2.0.102, waits for the motion-finish feedback of the command
+        arm.set_position(*pose, speed=100, wait=True)
+
+    def wait_report(*pose):
+        # waits for the reported state/cmd_num
+        arm.set_position(*pose, speed=100, wait=False)
+        arm._arm.wait_move()
+
+    results.append(summarize(SUITE, 'latency[feedback]', _short_moves(ctx, args.moves, wait_feedback), unit='ms'))
+    results.append(summarize(SUITE, 'latency[report]', _short_moves(ctx, args.moves, wait_report), unit='ms'))
+
+    arm.set_gripper_enable(True)
+    arm.set_gripper_speed(5000)
+    gripper_moves = max(args.moves // 3, 5)
+    results.append(summarize(SUITE, 'latency[gripper_poll]', _gripper_moves(ctx, gripper_moves), unit='ms'))
+    arm.start_gripper_monitor(interval=0.02)
+    try:
+        results.append(summarize(SUITE, 'latency[gripper_monitor]', _gripper_moves(ctx, gripper_moves), unit='ms'))
+    finally:
+        arm.stop_gripper_monitor()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='motion-completion latency benchmark')
+    parser.add_argument('--moves', type=int, default=30)
+    parser.add_argument('--latency', type=float, default=0.0, help='latency(s) injected by the simulator')
+    args = parser.parse_args()
+    with SimContext(latency=args.latency) as ctx:
+        print_table(run(args, ctx))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Helpers shared by the benchmarks: timing, percentile summaries, tables and the simulator context
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from xarm.core.utils.stats import percentiles
+
+
+def summarize(suite, name, samples, unit='us', ops_per_sample=1):
+    """
+    Summary of the samples
+    :param samples: time(s) of every sample
+    :param unit: 'us' or 'ms', unit of the times in the summary
+    :param ops_per_sample: number of the operations in every sample, the times are per operation
+    :return: dict, {suite, name, unit, count, mean, min, p50, p90, p99, max, ops_per_sec}
+    """
+    scale = (1e6 if unit == 'us' else 1e3) / ops_per_sample
+    # the same (nearest-rank) percentiles as the statistics of the servo streamer and the fleet
+    stats = percentiles(samples, scale=scale)
+    total = sum(samples)
+    ret = {
+        'suite': suite,
+        'name': name,
+        'unit': unit,
+        'count': len(samples) * ops_per_sample,
+        'mean': stats['mean'],
+        'min': min(samples) * scale if samples else 0,
+        'p50': stats['p50'],
+        'p90': stats['p90'],
+        'p99': stats['p99'],
+        'max': stats['max'],
+    }
+    ret['ops_per_sec'] = len(samples) * ops_per_sample / total if total > 0 else 0
+    return ret
+
+
+def measure(func, samples=200, inner=1, warmup=10):
+    """
+    Time func()
+    :param samples: number of the samples
+    :param inner: number of the calls in every sample, use > 1 for the calls shorter than a few microseconds
+    :param warmup: number of the calls before timing
+    :return: time(s) of every sample
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    perf_counter = time.perf_counter
+    for _ in range(samples):
+        start = perf_counter()
+        for _ in range(inner):
+            func()
+        times.append(perf_counter() - start)
+    return times
+
+
+def print_table(results, file=None):
+    header = '{:<16}{:<28}{:>8}{:>11}{:>11}{:>11}{:>11}{:>11}{:>13}'.format(
+        'suite', 'name', 'count', 'mean', 'p50', 'p90', 'p99', 'max', 'ops/s')
+    print(header, file=file)
+    print('-' * len(header), file=file)
+    for ret in results:
+        print('{:<16}{:<28}{:>8}{:>11}{:>11}{:>11}{:>11}{:>11}{:>13.0f}'.format(
+            ret['suite'], ret['name'], ret['count'],
+            *['{:.2f}{}'.format(ret[key], ret['unit']) for key in ('mean', 'p50', 'p90', 'p99', 'max')],
+            ret['ops_per_sec']), file=file)
+
+
+def print_compare(results, baseline, file=None):
+    """Print the change of p50 and ops/s against the results of another revision"""
+    base = {(ret['suite'], ret['name']): ret for ret in baseline.get('results', [])}
+    print('{:<16}{:<28}{:>14}{:>14}{:>10}'.format('suite', 'name', 'base p50', 'p50', 'ops/s'), file=file)
+    for ret in results:
+        old = base.get((ret['suite'], ret['name']))
+        if old is None:
+            continue
+        ratio = ret['ops_per_sec'] / old['ops_per_sec'] if old['ops_per_sec'] > 0 else 0
+        print('{:<16}{:<28}{:>14}{:>14}{:>9.2f}x'.format(
+            ret['suite'], ret['name'], '{:.2f}{}'.format(old['p50'], old['unit']),
+            '{:.2f}{}'.format(ret['p50'], ret['unit']), ratio), file=file)
+
+
+def metadata():
+    from xarm.version import __version__
+    revision = None
+    try:
+        import subprocess
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        pass
+    return {
+        'sdk_version': __version__,
+        'revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def dump_json(path, results, meta=None):
+    with open(path, 'w') as f:
+        json.dump({'meta': meta or metadata(), 'results': results}, f, indent=2)
+
+
+def load_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class SimContext(object):
+    """
+    A simulator and an XArmAPI connected to it, shared by the suites which need a controller
+    The arm is created with an in-flight window of max_inflight (the pipelining is opt-in in the sdk)
+    """
+    def __init__(self, latency=0.0, jitter=0.0, fragment=0, tick_hz=250, report_hz=100, max_inflight=4):
+        from xarm.tools.simulator import XArmSimulator
+        self.sim = XArmSimulator(latency=latency, jitter=jitter, fragment=fragment, tick_hz=tick_hz, report_hz=report_hz)
+        self.max_inflight = max_inflight
+        self.arm = None
+
+    def __enter__(self):
+        from xarm.wrapper import XArmAPI
+        self.sim.start()
+        self.arm = XArmAPI('127.0.0.1', is_radian=False, max_inflight=self.max_inflight)
+        self.arm.motion_enable(True)
+        self.arm.set_mode(0)
+        self.arm.set_state(0)
+        time.sleep(0.2)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.arm is not None:
+            self.arm.disconnect()
+            self.arm = None
+        self.sim.stop()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+The tests run against the simulated controller (xarm.tools.simulator), no physical controller is needed
+Note: the simulator listens on the ports of the controller (502, 504, 30001 ~ 30003) of 127.0.0.1
+"""
+
+import time
+import pytest
+from xarm.tools.simulator import XArmSimulator
+from xarm.wrapper import XArmAPI
+
+
+@pytest.fixture(scope='module')
+def sim():
+    with XArmSimulator(tick_hz=250, report_hz=100) as sim:
+        yield sim
+
+
+@pytest.fixture(scope='module')
+def arm(sim):
+    arm = XArmAPI('127.0.0.1', is_radian=False)
+    arm.motion_enable(True)
+    arm.set_mode(0)
+    arm.set_state(0)
+    time.sleep(0.2)
+    yield arm
+    arm.disconnect()
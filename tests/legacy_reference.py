@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Reference implementations the precompiled codecs and report decoders replaced, and synthetic report frames,
+the tests compare against them (the benchmarks time them)
+"""
+
+import random
+import struct
+from xarm.core.utils import convert
+
+
+def legacy_fp32s_to_bytes(data, n):
+    ret = bytes(struct.pack('<f', data[0]))
+    for i in range(1, n):
+        ret += bytes(struct.pack('<f', data[i]))
+    return ret
+
+
+def legacy_bytes_to_fp32s(data, n):
+    ret = [0] * n
+    for i in range(n):
+        byte = bytes([data[i * 4]])
+        byte += bytes([data[i * 4 + 1]])
+        byte += bytes([data[i * 4 + 2]])
+        byte += bytes([data[i * 4 + 3]])
+        ret[i] = struct.unpack('<f', byte)[0]
+    return ret
+
+
+def legacy_u16s_to_bytes(data, num):
+    bts = b''
+    for i in range(num):
+        bts += bytes([data[i] // 256 % 256])
+        bts += bytes([data[i] % 256])
+    return bts
+
+
+def legacy_bytes_to_u16s(data, n):
+    return [data[i * 2] << 8 | data[i * 2 + 1] for i in range(n)]
+
+
+def legacy_bytes_to_16s(data, n):
+    return [struct.unpack('>h', bytes(data[i * 2: i * 2 + 2]))[0] for i in range(n)]
+
+
+def legacy_int32s_to_bytes(data, n):
+    ret = bytes(struct.pack('<i', data[0]))
+    for i in range(1, n):
+        ret += bytes(struct.pack('<i', data[i]))
+    return ret
+
+
+def make_frame(report_type, length=None):
+    """Build a synthetic report frame with random content"""
+    rnd = random.Random(report_type)
+    if report_type in ('normal_old', 'rich_old'):
+        length = length or (87 if report_type == 'normal_old' else 187)
+        data = bytearray(rnd.getrandbits(8) for _ in range(length))
+        data[0:4] = struct.pack('>I', length)
+        data[9:61] = struct.pack('<13f', *[rnd.uniform(-3, 3) for _ in range(13)])
+        data[63:87] = struct.pack('<6f', *[rnd.uniform(-3, 3) for _ in range(6)])
+        if length >= 171:
+            data[123:171] = struct.pack('<12f', *[rnd.uniform(0, 100) for _ in range(12)])
+        return bytes(data)
+    length = length or {'normal': 145, 'rich': 508, 'real': 135}[report_type]
+    data = bytearray(rnd.getrandbits(8) for _ in range(length))
+    data[0:4] = struct.pack('>I', length)
+    data[4] = 0x02
+    data[7:87] = struct.pack('<20f', *[rnd.uniform(-3, 3) for _ in range(20)])
+    if report_type == 'real':
+        if length >= 135:
+            data[87:135] = struct.pack('<12f', *[rnd.uniform(-10, 10) for _ in range(12)])
+        return bytes(data)
+    data[91:131] = struct.pack('<10f', *[rnd.uniform(-3, 3) for _ in range(10)])
+    data[133:145] = struct.pack('<3f', 0, 0, -1)
+    if report_type == 'rich':
+        for start, count in [(181, 12), (252, 8), (288, 6), (317, 6), (355, 7), (433, 12), (482, 3)]:
+            if start + count * 4 > length:
+                break
+            data[start:start + count * 4] = struct.pack('<{}f'.format(count), *[rnd.uniform(-100, 100) for _ in range(count)])
+    return bytes(data)
+
+
+def legacy_decode(report_type, rx_data):
+    """The field extraction used by Base._handle_report_data before the precompiled decoders"""
+    ret = {}
+    length = len(rx_data)
+    if report_type in ('normal_old', 'rich_old'):
+        ret['length'] = convert.bytes_to_u32(rx_data[0:4])
+        ret['state'], ret['mtbrake'], ret['mtable'], ret['error_code'], ret['warn_code'] = rx_data[4:9]
+        ret['angles'] = convert.bytes_to_fp32s(rx_data[9:7 * 4 + 9], 7)
+        ret['pose'] = convert.bytes_to_fp32s(rx_data[37:6 * 4 + 37], 6)
+        ret['cmd_num'] = convert.bytes_to_u16(rx_data[61:63])
+        ret['pose_offset'] = convert.bytes_to_fp32s(rx_data[63:6 * 4 + 63], 6)
+        if report_type == 'rich_old':
+            (ret['arm_type'], ret['arm_axis'], ret['master_id'], ret['slave_id'],
+             ret['motor_tid'], ret['motor_fid']) = rx_data[87:93]
+            ret['version'] = rx_data[93:122]
+            ret['trs_msg'] = convert.bytes_to_fp32s(rx_data[123:143], 5)
+            ret['p2p_msg'] = convert.bytes_to_fp32s(rx_data[143:163], 5)
+            ret['rot_msg'] = convert.bytes_to_fp32s(rx_data[163:171], 2)
+            ret['sv3_msg'] = convert.bytes_to_u16s(rx_data[171:187], 8)
+        return ret
+    ret['length'] = convert.bytes_to_u32(rx_data[0:4])
+    ret['state_mode'] = rx_data[4]
+    ret['cmd_num'] = convert.bytes_to_u16(rx_data[5:7])
+    ret['angles'] = convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7)
+    ret['pose'] = convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6)
+    ret['torque'] = convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7)
+    if report_type == 'real':
+        if length >= 135:
+            ret['ft_ext_force'] = convert.bytes_to_fp32s(rx_data[87:111], 6)
+            ret['ft_raw_force'] = convert.bytes_to_fp32s(rx_data[111:135], 6)
+        return ret
+    ret['mtbrake'], ret['mtable'], ret['error_code'], ret['warn_code'] = rx_data[87:91]
+    ret['pose_offset'] = convert.bytes_to_fp32s(rx_data[91:6 * 4 + 91], 6)
+    ret['tcp_load'] = convert.bytes_to_fp32s(rx_data[115:4 * 4 + 115], 4)
+    ret['collis_sens'], ret['teach_sens'] = rx_data[131:133]
+    ret['gravity_direction'] = convert.bytes_to_fp32s(rx_data[133:3 * 4 + 133], 3)
+    if report_type == 'normal':
+        return ret
+    (ret['arm_type'], ret['arm_axis'], ret['master_id'], ret['slave_id'],
+     ret['motor_tid'], ret['motor_fid']) = rx_data[145:151]
+    ret['version'] = rx_data[151:180]
+    ret['trs_msg'] = convert.bytes_to_fp32s(rx_data[181:201], 5)
+    ret['p2p_msg'] = convert.bytes_to_fp32s(rx_data[201:221], 5)
+    ret['rot_msg'] = convert.bytes_to_fp32s(rx_data[221:229], 2)
+    ret['servo_codes'] = [val for val in rx_data[229:245]]
+    if length >= 252:
+        ret['temperatures'] = list(struct.unpack('>7b', struct.pack('>7B', *rx_data[245:252])))
+    if length >= 284:
+        ret['speeds'] = convert.bytes_to_fp32s(rx_data[252:8 * 4 + 252], 8)
+    if length >= 288:
+        ret['count'] = convert.bytes_to_u32(rx_data[284:288])
+    if length >= 312:
+        ret['world_offset'] = convert.bytes_to_fp32s(rx_data[288:6 * 4 + 288], 6)
+    if length >= 314:
+        ret['cgpio_reset_enable'], ret['tgpio_reset_enable'] = rx_data[312:314]
+    if length >= 417:
+        ret['is_simulation_robot'] = rx_data[314]
+        ret['is_collision_detection'], ret['collision_tool_type'] = rx_data[315:317]
+        ret['collision_tool_params'] = convert.bytes_to_fp32s(rx_data[317:341], 6)
+        ret['voltages'] = convert.bytes_to_u16s(rx_data[341:355], 7)
+        ret['currents'] = convert.bytes_to_fp32s(rx_data[355:383], 7)
+        ret['cgpio_head'] = list(rx_data[383:385])
+        ret['cgpio_values'] = convert.bytes_to_u16s(rx_data[385:401], 8)
+        ret['cgpio_input_conf'] = list(map(int, rx_data[401:409]))
+        ret['cgpio_output_conf'] = list(map(int, rx_data[409:417]))
+    if length >= 433:
+        ret['cgpio_input_conf2'] = list(map(int, rx_data[417:425]))
+        ret['cgpio_output_conf2'] = list(map(int, rx_data[425:433]))
+    if length >= 481:
+        ret['ft_ext_force'] = convert.bytes_to_fp32s(rx_data[433:457], 6)
+        ret['ft_raw_force'] = convert.bytes_to_fp32s(rx_data[457:481], 6)
+    if length >= 482:
+        ret['iden_progress'] = rx_data[481]
+    if length >= 494:
+        ret['pose_aa'] = convert.bytes_to_fp32s(rx_data[482:494], 3)
+    if length >= 495:
+        ret['mode_flags'] = rx_data[494]
+    if length >= 496:
+        ret['reduced_mode_is_on'] = rx_data[495]
+    if length >= 508:
+        ret['reduced_tcp_boundary'] = convert.bytes_to_16s(rx_data[496:508], 6)
+    return ret
+
+
+class NullCmd(object):
+    """arm_cmd of the offline XArmAPI, so the handler runs to the end instead of failing on arm_cmd.has_err_warn"""
+    has_err_warn = False
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import asyncio
+from xarm.wrapper import AsyncXArmAPI
+from xarm.x3.code import APIState
+
+
+async def _wait_move(sim, state, restore_after, timeout=3):
+    async with AsyncXArmAPI('127.0.0.1') as arm:
+        await asyncio.sleep(0.2)
+        sim.state = state
+        asyncio.get_running_loop().call_later(restore_after, setattr, sim, 'state', 2)
+        await asyncio.sleep(0.05)
+        start = time.monotonic()
+        code = await arm.wait_move(timeout=timeout)
+        return code, time.monotonic() - start
+
+
+def test_state5_is_debounced_like_the_sync_wait(sim):
+    # a short state 5 (e.g. just after a command is accepted) does not stop the wait
+    code, elapsed = asyncio.run(_wait_move(sim, 5, 0.3))
+    assert code == 0 and elapsed > 0.2
+
+
+def test_state4_stops_the_wait_at_once(sim):
+    code, elapsed = asyncio.run(_wait_move(sim, 4, 1))
+    assert code == APIState.EMERGENCY_STOP and elapsed < 0.2
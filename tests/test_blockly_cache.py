@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import os
+import pytest
+from xarm.tools.blockly import BlocklyTool, BlocklyCodeCache
+from xarm.tools.blockly import _blockly_cache
+
+APP = '''<xml xmlns="http://www.w3.org/1999/xhtml">
+<block type="set_speed" id="a" x="0" y="0"><field name="speed">{speed}</field>
+<next><block type="tool_console" id="b"><field name="color">white</field><field name="msg">{msg}</field></block></next>
+</block></xml>
+'''
+
+
+@pytest.fixture
+def app(tmp_path):
+    path = tmp_path / 'app.xml'
+    path.write_text(APP.format(speed=100, msg='hello'))
+    return str(path)
+
+
+def _rewrite(path, **kwargs):
+    stat = os.stat(path)
+    with open(path, 'w') as f:
+        f.write(APP.format(**kwargs))
+    # a new mtime even on the file systems with a coarse timestamp
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_same_source_as_the_converter(app):
+    program = BlocklyCodeCache().get(app)
+    blockly_tool = BlocklyTool(app)
+    assert blockly_tool.to_python()
+    assert program.succeed
+    assert program.source == blockly_tool.codes
+    assert program.code.co_filename == '<blockly:{}>'.format(os.path.abspath(app))
+
+
+def test_hit_on_the_same_content_and_options(app):
+    cache = BlocklyCodeCache()
+    program = cache.get(app, axis_type=[6, 6])
+    assert cache.get(app, axis_type=[6, 6]) is program
+    assert (cache.hits, cache.misses) == (1, 1)
+    # the options which change the generated codes
+    assert cache.get(app, axis_type=[7, 7]) is not program
+    assert cache.get(app, axis_type=[6, 6], init=False) is not program
+    assert cache.get(app, axis_type=[6, 6], highlight_callback=print) is not program
+    assert cache.misses == 4
+
+
+def test_miss_on_a_changed_content(app):
+    cache = BlocklyCodeCache()
+    program = cache.get(app)
+    _rewrite(app, speed=200, msg='hello')
+    changed = cache.get(app)
+    assert changed is not program
+    assert 'self._tcp_speed = 200' in changed.source
+    # the content is hashed, an app rewritten with the same content is still a hit
+    _rewrite(app, speed=200, msg='hello')
+    assert cache.get(app) is changed
+
+
+def test_lru_eviction(tmp_path):
+    cache = BlocklyCodeCache(maxsize=2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / 'app{}.xml'.format(i)
+        path.write_text(APP.format(speed=100 + i, msg='hello'))
+        paths.append(str(path))
+    first = cache.get(paths[0])
+    cache.get(paths[1])
+    assert cache.get(paths[0]) is first
+    cache.get(paths[2])
+    # the least recently used app is paths[1]
+    assert cache.get(paths[0]) is first
+    misses = cache.misses
+    cache.get(paths[1])
+    assert cache.misses == misses + 1
+    cache.clear()
+    assert cache.get(paths[0]) is not first
+
+
+def test_disk_cache(app, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    program = BlocklyCodeCache(cache_dir=cache_dir).get(app)
+    assert sorted(os.path.splitext(name)[1] for name in os.listdir(cache_dir)) == ['.bin', '.py']
+
+    def fail_to_convert(*args, **kwargs):
+        raise AssertionError('the app is converted again')
+    monkeypatch.setattr(_blockly_cache, 'BlocklyTool', fail_to_convert)
+    loaded = BlocklyCodeCache(cache_dir=cache_dir).get(app)
+    assert loaded.succeed and loaded.key == program.key
+    assert loaded.source == program.source
+    assert loaded.code == program.code
+
+
+def test_run_blockly_app(sim, arm, app):
+    cache = BlocklyCodeCache()
+    outputs = []
+    for _ in range(2):
+        assert arm.run_blockly_app(app, cache=cache, blockly_print=outputs.append) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert outputs.count('hello') == 2
+    outputs.clear()
+    assert arm.run_blockly_app(app, cache=False, blockly_print=outputs.append) == 0
+    assert outputs.count('hello') == 1
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+The precompiled codecs of xarm.core.utils.convert against the per-element implementation they replaced
+"""
+
+import random
+import struct
+import pytest
+from xarm.core.utils import convert
+from legacy_reference import legacy_fp32s_to_bytes, legacy_bytes_to_fp32s, legacy_u16s_to_bytes, \
+    legacy_bytes_to_u16s, legacy_bytes_to_16s, legacy_int32s_to_bytes
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_codecs_same_as_legacy(seed):
+    rnd = random.Random(seed)
+    for _ in range(200):
+        n = rnd.randint(1, 16)
+        floats = [rnd.choice([rnd.uniform(-1e6, 1e6), rnd.uniform(-1, 1), 0.0, float('inf'), -float('inf')]) for _ in range(n)]
+        data = legacy_fp32s_to_bytes(floats, n)
+        assert convert.fp32s_to_bytes(floats, n) == data
+        assert convert.fp32s_to_bytes(tuple(floats) + (1.0,), n) == data
+        buf = bytearray(n * 4 + 3)
+        convert.fp32s_pack_into(buf, 3, floats, n)
+        assert bytes(buf[3:]) == data
+        assert convert.bytes_to_fp32s(data, n) == legacy_bytes_to_fp32s(data, n)
+        assert convert.bytes_to_fp32s(list(data), n) == legacy_bytes_to_fp32s(list(data), n)
+        assert convert.fp32s_unpack_from(buf, 3, n) == legacy_bytes_to_fp32s(data, n)
+        u16s = [rnd.randint(-70000, 140000) for _ in range(n)]
+        data = legacy_u16s_to_bytes(u16s, n)
+        assert convert.u16s_to_bytes(u16s, n) == data
+        assert b''.join(convert.u16_to_bytes(val) for val in u16s) == data
+        convert.u16s_pack_into(buf, 1, u16s, n)
+        assert bytes(buf[1:1 + n * 2]) == data
+        assert convert.bytes_to_u16s(data, n) == legacy_bytes_to_u16s(data, n)
+        assert convert.bytes_to_u16s(list(data), n) == legacy_bytes_to_u16s(data, n)
+        assert convert.u16s_unpack_from(buf, 1, n) == legacy_bytes_to_u16s(data, n)
+        assert convert.bytes_to_16s(data, n) == legacy_bytes_to_16s(data, n)
+        int32s = [rnd.randint(-2 ** 31, 2 ** 31 - 1) for _ in range(n)]
+        assert convert.int32s_to_bytes(int32s, n) == legacy_int32s_to_bytes(int32s, n)
+    assert convert.u16s_to_bytes([], 0) == b''
+
+
+@pytest.mark.parametrize('n', [1, 6, 7, 10])
+def test_legacy_encoders_with_longer_input(n):
+    # the commands pass the whole list and the count of the values to encode
+    floats = [i * 1.5 - 3 for i in range(n + 4)]
+    assert convert.fp32s_to_bytes(floats, n) == legacy_fp32s_to_bytes(floats, n)
+    int32s = [i * 1000 - 5000 for i in range(n + 4)]
+    assert convert.int32s_to_bytes(int32s, n) == legacy_int32s_to_bytes(int32s, n)
+    u16s = [i * 300 for i in range(n + 4)]
+    assert convert.u16s_to_bytes(u16s, n) == legacy_u16s_to_bytes(u16s, n)
+
+
+def test_decoders_accept_bytes_list_and_memoryview():
+    data = struct.pack('<3f', 1.5, -2.25, 1e6)
+    for value in (data, bytearray(data), memoryview(data), list(data)):
+        assert convert.bytes_to_fp32s(value, 3) == [1.5, -2.25, 1e6]
+        assert convert.bytes_to_fp32(value) == 1.5
+    data = struct.pack('>2H', 1, 65535)
+    for value in (data, bytearray(data), memoryview(data), list(data)):
+        assert convert.bytes_to_u16s(value, 2) == [1, 65535]
+        assert convert.bytes_to_16s(value, 2) == [1, -1]
+        assert convert.bytes_to_u16(value) == 1
+
+
+def test_scalar_codecs():
+    assert convert.fp32_to_bytes(1.5) == struct.pack('<f', 1.5)
+    assert convert.fp32_to_bytes(1.5, is_big_endian=True) == struct.pack('>f', 1.5)
+    assert convert.int32_to_bytes(-2) == struct.pack('<i', -2)
+    assert convert.int32_to_bytes(-2, is_big_endian=True) == struct.pack('>i', -2)
+    assert convert.u16_to_bytes(-1) == b'\xff\xff'
+    assert convert.bytes_to_u32(struct.pack('>I', 0x12345678)) == 0x12345678
+    assert convert.bytes_to_long_big(list(struct.pack('>l', -123456))) == -123456
+    assert convert.bytes_to_num32(struct.pack('<l', -7), '<l') == -7
+    assert convert.get_struct('<f', 6) is convert.get_struct('<f', 6)
+    assert convert.get_struct('<f', 6).format == '<6f'
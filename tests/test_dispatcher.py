@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+import pytest
+from xarm.x3.dispatcher import CallbackDispatcher
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = CallbackDispatcher(maxsize=4)
+    yield dispatcher
+    dispatcher.stop()
+
+
+def _wait(cond, timeout=2):
+    expired = time.monotonic() + timeout
+    while not cond() and time.monotonic() < expired:
+        time.sleep(0.005)
+    return cond()
+
+
+def test_fifo_events_are_never_dropped(dispatcher):
+    release = threading.Event()
+    received = []
+
+    def callback(msg):
+        release.wait(2)
+        received.append(msg)
+
+    for i in range(20):
+        dispatcher.dispatch(callback, {'error_code': i}, name='error_warn_changed')
+    release.set()
+    assert _wait(lambda: len(received) == 20)
+    assert [msg['error_code'] for msg in received] == list(range(20))
+    stats = dispatcher.stats()[0]
+    assert stats['policy'] == 'fifo'
+    assert stats['dropped'] == 0
+    # the first event is taken by the worker, 4 are pending when the others are queued
+    assert stats['overflow'] >= 20 - 1 - 4
+
+
+def test_coalesced_events_keep_the_latest(dispatcher):
+    release = threading.Event()
+    received = []
+
+    def callback(msg):
+        release.wait(2)
+        received.append(msg)
+
+    for i in range(20):
+        dispatcher.dispatch(callback, i, name='location')
+    release.set()
+    assert _wait(lambda: received and received[-1] == 19)
+    time.sleep(0.05)
+    assert len(received) <= 2
+    stats = dispatcher.stats()[0]
+    assert stats['policy'] == 'coalesce'
+    assert stats['overflow'] == 0
+    assert stats['dropped'] + stats['delivered'] == 20
+
+
+def test_slow_callback_does_not_block_the_others(dispatcher):
+    release = threading.Event()
+    fast = []
+    dispatcher.dispatch(lambda msg: release.wait(2), 0, name='feedback')
+    start = time.monotonic()
+    for i in range(10):
+        dispatcher.dispatch(fast.append, i, name='feedback')
+    assert _wait(lambda: len(fast) == 10)
+    assert time.monotonic() - start < 1
+    release.set()
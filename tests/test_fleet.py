@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+import pytest
+from xarm.wrapper import XArmFleet
+from xarm.tools.simulator import XArmSimulator
+
+HOSTS = ['127.0.0.{}'.format(i) for i in range(2, 6)]
+
+
+@pytest.fixture(scope='module')
+def sims():
+    # every arm has its own simulator, the shared one of the other tests is on 127.0.0.1
+    sims = [XArmSimulator(host=host, tick_hz=250, report_hz=100) for host in HOSTS]
+    for sim in sims:
+        sim.start()
+    yield sims
+    for sim in sims:
+        sim.stop()
+
+
+def _wait(predicate, timeout=3):
+    expired = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < expired:
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_fleet_threads_do_not_grow_with_the_arms(sims):
+    thread_count = threading.active_count()
+    with XArmFleet() as fleet:
+        arms = [fleet.add(host) for host in HOSTS]
+        assert len(fleet) == len(HOSTS) and fleet.names == HOSTS
+        assert _wait(lambda: all(arm.connected and arm._arm.reported for arm in fleet))
+        # the selector loop, the worker and the housekeeper (and its small pool)
+        assert threading.active_count() - thread_count <= 3 + 4
+    assert not fleet.alive
+    assert all(not arm.connected for arm in arms)
+    assert _wait(lambda: threading.active_count() <= thread_count)
+
+
+def test_fleet_arms_work_like_xarm_api(sims):
+    with XArmFleet() as fleet:
+        left = fleet.add(HOSTS[0], name='left', is_radian=False)
+        right = fleet.add(HOSTS[1], name='right', is_radian=False, report_type='normal')
+        assert 'left' in fleet and fleet['right'] is right
+        with pytest.raises(AssertionError):
+            fleet.add(HOSTS[2], name='left')
+        assert _wait(lambda: left._arm.reported and right._arm.reported)
+        counts = []
+        left.register_count_changed_callback(lambda item: counts.append(item['count']))
+        for arm in (left, right):
+            arm.motion_enable(True)
+            arm.set_mode(0)
+            arm.set_state(0)
+        time.sleep(0.2)
+        # the waits of the arms are woken by the reports handled by the worker of the fleet
+        assert left.set_position(250, 0, 112, 180, 0, 0, speed=1000, wait=True) == 0
+        assert right.set_position(230, 10, 112, 180, 0, 0, speed=1000, wait=True) == 0
+        assert sims[0].pose[:3] == pytest.approx([250, 0, 112], abs=0.01)
+        assert sims[1].pose[:3] == pytest.approx([230, 10, 112], abs=0.01)
+        assert right.get_position()[1][:3] == pytest.approx([230, 10, 112], abs=0.01)
+        assert _wait(lambda: len(counts) > 5)
+        assert counts == sorted(counts)
+
+        stats = fleet.stats()
+        assert list(stats.keys()) == ['left', 'right']
+        for name in ('left', 'right'):
+            assert stats[name]['connected'] and stats[name]['reported']
+            assert stats[name]['reports'] > 10
+            assert 50 < stats[name]['report_rate'] < 200
+            assert stats[name]['interval']['p50'] > 0
+        assert fleet.remove('right') is right
+        assert not right.connected and 'right' not in fleet
+    assert not left.connected
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import pytest
+from xarm.tools.gcode import GcodeClient
+
+PROGRAM = '''
+; comment
+G90
+G1 X300 Y0 Z150 F1000
+G1 X310 (inline comment)
+G1 X320
+G1 X330
+G1 X340
+G1 X350
+G1 X360
+G1 X370
+M2
+G1 X380
+'''
+
+
+@pytest.fixture
+def client(sim):
+    sim.gcode_codes.clear()
+    del sim.gcode_lines[:]
+    client = GcodeClient('127.0.0.1')
+    yield client
+    client.close()
+    sim.gcode_codes.clear()
+
+
+@pytest.fixture
+def program(tmp_path):
+    filepath = tmp_path / 'program.gcode'
+    filepath.write_text(PROGRAM)
+    return GcodeClient.load_file(str(filepath))
+
+
+def _wait_lines(sim, count, timeout=2):
+    expired = time.monotonic() + timeout
+    while len(sim.gcode_lines) < count and time.monotonic() < expired:
+        time.sleep(0.01)
+    return list(sim.gcode_lines)
+
+
+def test_load_file(program):
+    # the comments are removed, the lines after the program end are ignored
+    assert [line.data for line in program] == [b'G90\n', b'G1X300Y0Z150F1000\n', b'G1X310\n', b'G1X320\n', b'G1X330\n',
+                                               b'G1X340\n', b'G1X350\n', b'G1X360\n', b'G1X370\n', b'M2\n']
+    assert [line.lineno for line in program] == list(range(3, 13))
+    assert program[-1].is_end
+
+
+@pytest.mark.parametrize('window', [1, 4, 16])
+def test_execute_program(sim, client, program, window):
+    assert client.execute_program(program, window=window) == 0
+    assert sim.gcode_lines == [line.data.decode().strip() for line in program]
+
+
+def test_execute_program_stops_at_error(sim, client, program):
+    # the replies of the lines in flight after the failed line are drained, the next command gets its own reply
+    sim.gcode_codes['G1X310'] = 3
+    assert client.execute_program(program, window=4) == 3
+    sent = _wait_lines(sim, 3)
+    assert sent[:3] == ['G90', 'G1X300Y0Z150F1000', 'G1X310']
+    # at most window - 1 lines after the failed line
+    assert len(sent) <= 3 + 4 - 1
+    sim.gcode_codes['G1X400'] = 5
+    code, _ = client.execute('G1 X400')
+    assert code == 5
+    assert sim.gcode_lines[-1] == 'G1X400'
+
+
+def test_execute_program_window_1_sends_nothing_after_error(sim, client, program):
+    sim.gcode_codes['G1X310'] = 3
+    assert client.execute_program(program, window=1) == 3
+    assert sim.gcode_lines == ['G90', 'G1X300Y0Z150F1000', 'G1X310']
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import re
+import time
+import random
+import pytest
+from xarm.x3.parse import GcodeParser, GcodeCommand, scan_params
+
+
+def _legacy_value(string, ch, return_type, default=None):
+    # the per-param lookup replaced by the single scan
+    data = re.findall(r'{}(\-?\d+\.?\d*)'.format(ch), string)
+    return return_type(data[0]) if data else default
+
+
+def _legacy_hex_value(string, ch, default=None):
+    data = re.findall(r'{}(-?\w{{3,4}})'.format(ch), string)
+    return int(data[0], base=16) if data else default
+
+
+def _call(func, *args, **kwargs):
+    # the getters raise the same exceptions as the legacy lookups, e.g. int('1.5')
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        return type(e)
+
+
+def _random_line(rnd):
+    words = []
+    for _ in range(rnd.randint(1, 10)):
+        letter = rnd.choice('GMXYZABCRIJKLMNOFQTVDgx ;(')
+        number = rnd.choice(['', '-', '']) + rnd.choice(['0', '12', '3.5', '100.', '7.25', '0x1A', 'FF0', '-'])
+        words.append(letter + (number if rnd.random() > 0.1 else ''))
+    return rnd.choice(['', ' ']).join(words)
+
+
+def test_getters_same_as_legacy():
+    rnd = random.Random(0)
+    parser = GcodeParser()
+    for _ in range(2000):
+        line = _random_line(rnd).upper()
+        command = GcodeCommand(line)
+        for value in (line, command):
+            for ch in 'GMXYZABCRIJKLNOFQTVD':
+                assert _call(parser._get_float_value, value, ch) == _call(_legacy_value, line, ch, float), (line, ch)
+                assert _call(parser._get_int_value, value, ch, 7) == _call(_legacy_value, line, ch, int, 7), (line, ch)
+            assert _call(parser.get_addr, value) == _call(_legacy_hex_value, line, 'D', 0), line
+            assert _call(parser.get_poses, value, 0) == [_call(_legacy_value, line[2:], ch, float, 0) for ch in 'XYZABC'], line
+            assert _call(parser.get_joints, value) == [_call(_legacy_value, line[2:], ch, float) for ch in 'IJKLMNO'], line
+
+
+def test_command_scanned_once():
+    command = GcodeCommand('g1 x300 y-20.5 z150 x10 f1000')
+    assert command.line == 'G1 X300 Y-20.5 Z150 X10 F1000'
+    # the first occurrence of every letter
+    assert command.values == {'G': '1', 'X': '300', 'Y': '-20.5', 'Z': '150', 'F': '1000'}
+    assert 'G' not in command.tail_values
+    assert scan_params(command.line, skip=2) == command.tail_values
+    parser = GcodeParser()
+    assert parser.get_gcode_cmd_num(command, 'G') == 1
+    assert parser.get_gcode_cmd_num(command, 'M') == -1
+    assert parser.get_poses(command) == [300.0, -20.5, 150.0, None, None, None]
+    assert parser.get_mvvelo(command) == 1000.0
+
+
+def test_get_int_value_keeps_the_last_value():
+    parser = GcodeParser()
+    assert parser.get_int_value(GcodeCommand('M116 V5')) == 5
+    assert parser.get_int_value(GcodeCommand('M116')) == 5
+    assert parser.get_int_value(GcodeCommand('M116'), default=1) == 1
+
+
+def test_parse_file(tmp_path):
+    path = tmp_path / 'program.gcode'
+    path.write_text('g1 x300 y0 z150\n\n   \nG4 T0.5\n')
+    commands = GcodeParser.parse_file(str(path))
+    assert [command.line for command in commands] == ['G1 X300 Y0 Z150', 'G4 T0.5']
+    assert all(isinstance(command, GcodeCommand) for command in commands)
+
+
+def test_run_gcode_file(sim, arm, tmp_path):
+    path = tmp_path / 'program.gcode'
+    path.write_text('G1 X250 Y0 Z112 A180 B0 C0 F1000\nG1 X260 Y10 Z112 A180 B0 C0 F1000\n')
+    try:
+        assert arm.run_gcode_file(str(path)) == 0
+        expired = time.monotonic() + 5
+        while sim.pose[:3] != pytest.approx([260, 10, 112], abs=0.01) and time.monotonic() < expired:
+            time.sleep(0.05)
+        assert sim.pose[:3] == pytest.approx([260, 10, 112], abs=0.01)
+    finally:
+        arm.set_position(207, 0, 112, 180, 0, 0, speed=1000, wait=True)
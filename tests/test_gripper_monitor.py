@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import pytest
+from xarm.core.config.x_config import XCONF
+
+
+@pytest.fixture
+def gripper(sim, arm):
+    assert arm.set_gripper_enable(True) == 0
+    assert arm.set_gripper_speed(5000) == 0
+    yield arm
+    arm.stop_gripper_monitor()
+    sim.gripper_registers.pop(XCONF.ServoConf.ERR_CODE, None)
+
+
+def _move(sim, arm, pos):
+    assert arm.set_gripper_position(pos, wait=True) == 0
+    latency = time.monotonic() - sim.gripper_idle_time
+    assert sim.gripper_position == pos
+    return latency
+
+
+def test_wait_without_monitor_polls(sim, gripper):
+    assert gripper.gripper_monitor is None
+    _move(sim, gripper, 300)
+    _move(sim, gripper, 100)
+
+
+def test_wait_on_the_monitor(sim, gripper):
+    states = []
+    assert gripper.start_gripper_monitor(interval=0.02, callback=states.append) == 0
+    monitor = gripper.gripper_monitor
+    assert monitor.running and monitor.gripper_type == 'gripper'
+    assert set(monitor.fields) == {'status', 'position', 'error_code'}
+    _move(sim, gripper, 300)
+    latencies = [_move(sim, gripper, pos) for pos in (100, 300, 100)]
+    # the wait ends with one of the next polls of the monitor, not with the next poll every 0.1s
+    assert min(latencies) < 0.06
+    state = monitor.wait_update(monitor.latest['seq'], timeout=1)
+    assert state['code'] == 0 and state['position'] == 100
+    assert states[-1]['seq'] >= state['seq'] and [s['seq'] for s in states] == sorted(s['seq'] for s in states)
+    assert monitor.error_count == 0
+
+    gripper.stop_gripper_monitor()
+    assert gripper.gripper_monitor is None and not monitor.running
+    # a stopped monitor does not block its waiters
+    start = time.monotonic()
+    assert monitor.wait_update(monitor.latest['seq'], timeout=1) is None
+    assert time.monotonic() - start < 0.5
+    # the waits poll again
+    _move(sim, gripper, 300)
+
+
+def test_monitor_updates_the_error_code(sim, gripper):
+    assert gripper.start_gripper_monitor(interval=0.02) == 0
+    monitor = gripper.gripper_monitor
+    sim.gripper_registers[XCONF.ServoConf.ERR_CODE] = 5
+    seq = monitor.latest['seq'] if monitor.latest else 0
+    # the state of a poll started before the error register changed may still read 0
+    monitor.wait_update(seq, timeout=1)
+    state = monitor.wait_update(monitor.latest['seq'], timeout=1)
+    assert state['error_code'] == 5
+    assert gripper._arm.gripper_error_code == 5
+    assert not gripper._arm.gripper_is_enabled
+    sim.gripper_registers[XCONF.ServoConf.ERR_CODE] = 0
+    monitor.wait_update(monitor.latest['seq'], timeout=1)
+    state = monitor.wait_update(monitor.latest['seq'], timeout=1)
+    assert state['error_code'] == 0 and gripper._arm.gripper_error_code == 0
+
+
+def test_bio_gripper_on_the_monitor(sim, arm):
+    try:
+        assert arm.set_bio_gripper_enable(True) == 0
+        assert arm.start_gripper_monitor('bio', interval=0.02) == 0
+        monitor = arm.gripper_monitor
+        assert set(monitor.fields) == {'status', 'error_code'}
+        assert arm.open_bio_gripper(wait=True) == 0
+        assert not sim.gripper_moving
+        opened = sim.gripper_position
+        assert arm.close_bio_gripper(wait=True) == 0
+        assert not sim.gripper_moving and sim.gripper_position != opened
+        state = monitor.wait_update(monitor.latest['seq'], timeout=1)
+        assert state['position'] is None
+        assert (state['status'] >> 2) & 0x03 == XCONF.BioGripperState.IS_ENABLED
+        assert arm._arm.bio_gripper_is_enabled and arm._arm.bio_gripper_error_code == 0
+    finally:
+        arm.stop_gripper_monitor()
+
+
+def test_start_gripper_monitor_rejects_an_unknown_type(arm):
+    with pytest.raises(AssertionError):
+        arm.start_gripper_monitor('unknown')
+    assert arm.gripper_monitor is None
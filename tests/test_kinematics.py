@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import math
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from xarm.core.utils import kinematics
+from xarm.core.utils.kinematics import KinematicsModel, pose_to_matrix, matrix_to_pose, rotation_vector, rotation_matrix
+from xarm.tools.simulator import DH_PARAMS, HOME_POSE
+
+
+def _dh_matrix(theta, d, alpha, a, modified):
+    # one joint, written out as in the text books
+    ct, st, ca, sa = math.cos(theta), math.sin(theta), math.cos(alpha), math.sin(alpha)
+    if modified:
+        return np.array([[ct, -st, 0, a], [st * ca, ct * ca, -sa, -sa * d], [st * sa, ct * sa, ca, ca * d], [0, 0, 0, 1]])
+    return np.array([[ct, -st * ca, st * sa, a * ct], [st, ct * ca, -ct * sa, a * st], [0, sa, ca, d], [0, 0, 0, 1]])
+
+
+def _forward_reference(dh_params, angles, modified=True):
+    mat = np.eye(4)
+    for i, angle in enumerate(angles):
+        theta, d, alpha, a = dh_params[i * 4:i * 4 + 4]
+        mat = mat.dot(_dh_matrix(theta + angle, d, alpha, a, modified))
+    return mat
+
+
+def _random_angles(rng, count, dof=6, scale=1.5):
+    return rng.uniform(-scale, scale, size=(count, dof))
+
+
+@pytest.fixture
+def model():
+    return KinematicsModel(DH_PARAMS, dof=6)
+
+
+def test_home_pose(model):
+    pose = model.forward([0] * 6)
+    assert pose[:3] == pytest.approx(HOME_POSE[:3], abs=0.01)
+    assert np.allclose(pose_to_matrix(pose)[0, :3, :3], pose_to_matrix(HOME_POSE)[0, :3, :3], atol=1e-6)
+
+
+@pytest.mark.parametrize('convention', ['modified', 'standard'])
+def test_forward_same_as_the_reference(convention):
+    model = KinematicsModel(DH_PARAMS, convention=convention)
+    rng = np.random.RandomState(0)
+    angles = _random_angles(rng, 50)
+    mats = model.forward_matrix(angles)
+    for sample, mat in zip(angles, mats):
+        assert np.allclose(mat, _forward_reference(DH_PARAMS, sample, convention == 'modified'), atol=1e-9)
+    # the batch is the same as one vector at a time
+    poses = model.forward(angles)
+    assert poses.shape == (50, 6)
+    assert np.allclose(poses[7], model.forward(angles[7]))
+
+
+def test_pose_conversions():
+    rng = np.random.RandomState(1)
+    poses = np.concatenate([rng.uniform(-500, 500, (100, 3)), rng.uniform(-3, 3, (100, 1)),
+                            rng.uniform(-1.5, 1.5, (100, 1)), rng.uniform(-3, 3, (100, 1))], axis=1)
+    assert np.allclose(matrix_to_pose(pose_to_matrix(poses)), poses)
+    # the singularity of pitch = pi/2 keeps the rotation
+    mat = pose_to_matrix([0, 0, 0, 0.3, math.pi / 2, 0.2])
+    assert np.allclose(pose_to_matrix(matrix_to_pose(mat)), mat, atol=1e-9)
+    rot = pose_to_matrix(poses)[:, :3, :3]
+    vec = rng.uniform(-1, 1, (100, 3))
+    assert np.allclose(rotation_vector(np.matmul(rotation_matrix(vec), rot), rot), vec)
+    # a rotation of pi
+    assert np.allclose(np.linalg.norm(rotation_vector(rotation_matrix([[0, 0, math.pi]]), np.eye(3)[None]), axis=1), math.pi)
+
+
+def test_offsets(model):
+    tcp_offset = [0, 0, 100, 0, 0, 0]
+    world_offset = [100, 50, 0, 0, 0, math.pi / 2]
+    offset_model = KinematicsModel(DH_PARAMS, dof=6, tcp_offset=tcp_offset, world_offset=world_offset)
+    angles = _random_angles(np.random.RandomState(2), 20)
+    flange = model.forward_matrix(angles)
+    expected = np.matmul(np.linalg.inv(pose_to_matrix(world_offset)[0]), np.matmul(flange, pose_to_matrix(tcp_offset)[0]))
+    assert np.allclose(offset_model.forward_matrix(angles), expected)
+    assert np.allclose(offset_model.forward_matrix(angles, base=True), np.matmul(flange, pose_to_matrix(tcp_offset)[0]))
+    assert np.allclose(offset_model.to_base(offset_model.forward(angles)), offset_model.forward_matrix(angles, base=True))
+
+
+def test_jacobian_same_as_the_finite_differences(model):
+    angles = _random_angles(np.random.RandomState(3), 5)
+    jac = model.jacobian(angles)
+    eps = 1e-6
+    for n, sample in enumerate(angles):
+        mat = model.forward_matrix(sample)[0]
+        for i in range(6):
+            moved = sample.copy()
+            moved[i] += eps
+            moved_mat = model.forward_matrix(moved)[0]
+            assert jac[n, :3, i] == pytest.approx((moved_mat[:3, 3] - mat[:3, 3]) / eps, abs=1e-3)
+            assert jac[n, 3:, i] == pytest.approx(rotation_vector(moved_mat[None, :3, :3], mat[None, :3, :3])[0] / eps, abs=1e-4)
+
+
+def test_inverse_reaches_the_poses(model):
+    rng = np.random.RandomState(4)
+    angles = _random_angles(rng, 200)
+    poses = model.forward(angles)
+    seeds = angles + rng.normal(0, 0.05, angles.shape)
+    solved, ok = model.inverse(poses, seeds=seeds)
+    assert ok.mean() > 0.95
+    reached = model.forward_matrix(solved[ok])
+    target = pose_to_matrix(poses[ok])
+    assert np.abs(reached[:, :3, 3] - target[:, :3, 3]).max() < 1e-2
+    assert np.linalg.norm(rotation_vector(target[:, :3, :3], reached[:, :3, :3]), axis=1).max() < 1e-4
+    # the solution near the seed, another one may be reached near a singularity
+    assert (np.abs(solved[ok] - angles[ok]).max(axis=1) < 1e-2).mean() > 0.95
+    single, single_ok = model.inverse(poses[0], seeds=seeds[0])
+    assert single.shape == (6, ) and single_ok == bool(ok[0])
+
+
+def test_inverse_path_is_continuous(model):
+    start = np.array([0.1, -0.3, -0.5, 0.2, 0.6, -0.1])
+    path = model.forward(start + np.linspace(0, 0.5, 50)[:, None] * np.array([1, 0.5, -0.5, 1, -1, 1]))
+    angles, ok = model.inverse_path(path, seed=start)
+    assert ok.all()
+    assert np.abs(np.diff(angles, axis=0)).max() < 0.05
+    assert np.allclose(model.forward(angles)[:, :3], path[:, :3], atol=1e-2)
+
+
+def test_limits():
+    model = KinematicsModel(DH_PARAMS, dof=6, joint_limits=[(-1, 1)] * 6,
+                            tcp_limits=[(0, 0)] * 3 + [(-math.pi, math.pi), (-1, 1), (0, 0)])
+    angles = np.zeros((3, 6))
+    angles[1, 2] = 1 + kinematics.LIMIT_TOLERANCE / 2
+    angles[2, 5] = -1.1
+    assert model.is_joint_limit(angles).tolist() == [False, False, True]
+    assert model.is_joint_limit(angles[2]) is True
+    assert model.joint_limits == [[-1, 1]] * 6
+    poses = np.array([[1e4, -1e4, 0, 0, 0, 3], [0, 0, 0, 0, 1.1, 0]])
+    # x, y, z and yaw are not limited
+    assert model.is_tcp_limit(poses).tolist() == [False, True]
+    assert not KinematicsModel(DH_PARAMS).is_joint_limit(angles).any()
+
+
+def test_get_kinematics_model(sim, arm):
+    code, model = arm.get_kinematics_model(refresh=True)
+    assert code == 0
+    assert model.dof == arm.axis
+    assert model.forward(np.zeros(model.dof))[:3] == pytest.approx(HOME_POSE[:3], abs=0.01)
+    # cached until refresh
+    sim.dh_params = [0] * 24
+    assert arm.get_kinematics_model()[1].forward(np.zeros(model.dof))[:3] == pytest.approx(HOME_POSE[:3], abs=0.01)
+    sim.dh_params = list(DH_PARAMS)
+    assert model.joint_limits is not None
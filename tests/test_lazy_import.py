@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import sys
+import subprocess
+
+
+def _run(script):
+    # the last line, the import of the sdk prints its version first
+    return subprocess.check_output([sys.executable, '-c', script], universal_newlines=True).splitlines()[-1].split()
+
+
+def test_code_maps_not_loaded_by_the_import():
+    assert _run('import sys, xarm.core; print("xarm.core.config.x_code" in sys.modules)') == ['False']
+
+
+def test_star_import_exports_the_lazy_names():
+    names = _run('from xarm.core import *; print(XCONF.__name__, ControllerWarn.__name__, '
+                 'ControllerError.__name__, ServoError.__name__)')
+    assert names == ['XCONF', 'ControllerWarn', 'ControllerError', 'ServoError']
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Lazy decoding of the report frames: ReportView and the fields of the rich report decoded on access
+"""
+
+import pytest
+from xarm.wrapper import XArmAPI
+from xarm.tools.simulator import XArmSimulator
+from xarm.core.utils.report_decoder import REPORT_DECODERS
+from legacy_reference import make_frame, legacy_decode, NullCmd
+
+
+@pytest.mark.parametrize('report_type,length', [('normal', None), ('real', None), ('rich', 252), ('rich', 433), ('rich', None)])
+def test_view_same_as_legacy(report_type, length):
+    frame = make_frame(report_type, length)
+    legacy = legacy_decode(report_type, frame)
+    view = REPORT_DECODERS[report_type].view(frame)
+    for key, value in legacy.items():
+        assert key in view and view[key] == value, key
+    assert view.to_dict() == REPORT_DECODERS[report_type].decode(frame)
+
+
+def test_view_decodes_only_the_accessed_segments():
+    frame = make_frame('rich')
+    decoder = REPORT_DECODERS['rich']
+    view = decoder.view(frame)
+    assert len(view) == 0
+    view['pose']
+    assert 'pose' in dict(view) and 'temperatures' not in dict(view)
+    assert set(dict(view)) == set(field[0] for field in decoder.segment_of['pose'].fields)
+    view['temperatures']
+    assert 'temperatures' in dict(view)
+    assert view.get('unknown', 1) == 1
+    with pytest.raises(KeyError):
+        view['unknown']
+
+
+def test_view_fields_beyond_the_length():
+    view = REPORT_DECODERS['rich'].view(make_frame('rich', 252), 245)
+    assert 'servo_codes' in view
+    assert 'temperatures' not in view
+    assert view.get('temperatures') is None
+    with pytest.raises(KeyError):
+        view['temperatures']
+
+
+def _rich_frame(sim, temperature, voltage):
+    fields = sim._report_fields(508)
+    fields['temperatures'] = [temperature] * 7
+    fields['voltages'] = [voltage] * 7
+    fields['currents'] = [voltage / 1000.0] * 7
+    return bytes(REPORT_DECODERS['rich'].encode_into(bytearray(508), fields))
+
+
+def test_lazy_fields_follow_the_latest_report():
+    sim = XArmSimulator()
+    sim.motion_enabled, sim.state = True, 2
+    arm = XArmAPI(do_not_open=True, report_type='rich')
+    arm._arm.arm_cmd = NullCmd()
+    arm._arm._handle_report_data(_rich_frame(sim, 30, 4800))
+    _, pending = arm._arm._lazy_report
+    assert {'temperatures', 'voltages', 'currents', 'cgpio_states'} <= pending
+    assert arm.temperatures == [30] * 7
+    assert 'temperatures' not in pending and 'voltages' in pending
+    # a report not accessed is replaced by the next one, the properties are of the latest report
+    arm._arm._handle_report_data(_rich_frame(sim, 35, 4900))
+    arm._arm._handle_report_data(_rich_frame(sim, 40, 5000))
+    assert arm.temperatures == [40] * 7
+    assert arm.voltages == [50.0] * 7
+    assert arm.currents == pytest.approx([5.0] * 7)
+    assert len(arm.cgpio_states) == 12
+    assert arm.gravity_direction == [0.0, 0.0, -1.0]
+    assert arm.self_collision_params[0] == 1
+
+
+def test_temperatures_decoded_eagerly_with_a_listener():
+    sim = XArmSimulator()
+    sim.motion_enabled, sim.state = True, 2
+    arm = XArmAPI(do_not_open=True, report_type='rich')
+    arm._arm.arm_cmd = NullCmd()
+    temperatures = []
+    arm.register_temperature_changed_callback(lambda data: temperatures.append(data['temperatures']))
+    arm._arm._handle_report_data(_rich_frame(sim, 30, 4800))
+    arm._arm._handle_report_data(_rich_frame(sim, 40, 4800))
+    assert 'temperatures' not in arm._arm._lazy_report[1]
+    assert temperatures == [[30] * 7, [40] * 7]
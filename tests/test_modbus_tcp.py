@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import struct
+import pytest
+from xarm.tools.modbus_tcp import ModbusTcpClient, plan_reads, MAX_READ_REGISTERS
+
+
+@pytest.fixture
+def client(sim):
+    sim.modbus_registers.clear()
+    sim.modbus_registers.update({addr: addr + 100 for addr in range(0, 300)})
+    sim.modbus_unmapped.clear()
+    client = ModbusTcpClient('127.0.0.1')
+    yield client
+    client.close()
+    sim.modbus_unmapped.clear()
+
+
+def test_plan_reads():
+    assert plan_reads([0, 1, 2, 10, (100, 4)], MAX_READ_REGISTERS) == [(0, 3), (10, 1), (100, 4)]
+    assert plan_reads([0, 1, 2, 10, (100, 4)], MAX_READ_REGISTERS, max_gap=8) == [(0, 11), (100, 4)]
+    assert plan_reads([(0, 200)], MAX_READ_REGISTERS) == [(0, 125), (125, 75)]
+
+
+def test_read_multiple(client):
+    addrs = [0, 1, 2, 10, (100, 4), 250]
+    code, values = client.read_multiple(0x03, addrs, max_gap=8)
+    assert code == 0
+    assert values == {addr: addr + 100 for addr in [0, 1, 2, 10, 100, 101, 102, 103, 250]}
+
+
+def test_read_multiple_gap_fallback(sim, client):
+    # an address in the gap of a merged request is not mapped, the requested ranges are read again one by one
+    sim.modbus_unmapped.add(5)
+    code, values = client.read_multiple(0x03, [0, 1, 2, 10, (100, 4)], max_gap=8)
+    assert code == 0
+    assert values == {addr: addr + 100 for addr in [0, 1, 2, 10, 100, 101, 102, 103]}
+
+
+def test_read_multiple_unmapped_requested(sim, client):
+    # a requested address is not mapped, only its range fails
+    sim.modbus_unmapped.add(10)
+    code, values = client.read_multiple(0x03, [0, 1, 2, 10, (100, 4)], max_gap=8)
+    assert code != 0
+    assert values == {addr: addr + 100 for addr in [0, 1, 2, 100, 101, 102, 103]}
+
+
+def test_read_multiple_malformed_reply(sim, client, monkeypatch):
+    # the reply of one request has a mismatched func code, only its range fails and the others are not stalled
+    handle_modbus_request = sim._handle_modbus_request
+
+    class _Conn(object):
+        def __init__(self, conn, frame):
+            self.conn, self.frame = conn, frame
+
+        def send(self, data):
+            if struct.unpack_from('>H', self.frame, 8)[0] == 10:
+                data = data[:7] + bytes([0x04]) + data[8:]
+            return self.conn.send(data)
+
+    monkeypatch.setattr(sim, '_handle_modbus_request', lambda conn, frame: handle_modbus_request(_Conn(conn, frame), frame))
+    start = time.monotonic()
+    code, values = client.read_multiple(0x03, [0, 1, 2, 10, (100, 4)], timeout=3)
+    assert time.monotonic() - start < 1
+    assert code == -1
+    assert values == {addr: addr + 100 for addr in [0, 1, 2, 100, 101, 102, 103]}
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import pytest
+from xarm.wrapper import XArmAPI
+from xarm.x3.code import APIState
+
+
+def _line(count, step=1.0):
+    return [[207 + step * (i + 1), 0, 112, 180, 0, 0] for i in range(count)]
+
+
+def _reset(arm):
+    # stop the motions left by a test and go back to the start pose
+    arm.set_state(4)
+    arm.set_state(0)
+    time.sleep(0.1)
+    arm.set_position(207, 0, 112, 180, 0, 0, speed=1000, wait=True)
+
+
+def test_batch_acked_and_executed(sim, arm):
+    commands = _line(20)
+    code, batch = arm.submit_motion_batch(commands, speed=1000, wait=True, timeout=20)
+    try:
+        assert code == 0
+        assert batch.done
+        assert batch.codes == [0] * len(commands)
+        assert sim.pose[:3] == pytest.approx(commands[-1][:3], abs=0.01)
+    finally:
+        _reset(arm)
+
+
+def test_batch_flow_control_and_cancel(sim, arm):
+    # the command buffer allows 4 commands, the batch waits for the controller instead of overflowing it
+    arm2 = XArmAPI('127.0.0.1', is_radian=False, max_cmdnum=4)
+    try:
+        commands = _line(20, step=10.0)
+        code, batch = arm2.submit_motion_batch(commands, speed=50)
+        assert code == 0
+        max_cmdnum = 0
+        expired = time.monotonic() + 0.5
+        while time.monotonic() < expired:
+            max_cmdnum = max(max_cmdnum, sim.cmd_num)
+            time.sleep(0.005)
+        batch.cancel()
+        assert batch.wait(10) == APIState.NOT_READY
+        sent = batch.codes.count(0)
+        assert 0 < sent < len(commands)
+        assert max_cmdnum <= 4
+        assert batch.codes == [0] * sent + [APIState.NOT_READY] * (len(commands) - sent)
+    finally:
+        arm2.disconnect()
+        _reset(arm)
+
+
+def test_batch_not_submitted_if_not_connected(sim):
+    arm2 = XArmAPI('127.0.0.1', do_not_open=True)
+    code, batch = arm2.submit_motion_batch(_line(2))
+    assert code != 0
+    assert batch is None
+
+
+def test_batch_acks_waited_without_the_lock(sim, arm, monkeypatch):
+    # the getters are not pipelined (max_inflight=1), the batch is sent in one write all the same,
+    # only the write holds the command lock
+    arm_cmd = arm._arm.arm_cmd
+    assert arm_cmd.max_inflight == 1
+    chunks = []
+    locked = []
+    send_batch, recv_batch = arm_cmd.send_batch, arm_cmd.recv_batch
+
+    def _send_batch(requests, **kwargs):
+        chunks.append(len(requests))
+        return send_batch(requests, **kwargs)
+
+    def _recv_batch(*args):
+        locked.append(arm_cmd.lock.locked())
+        return recv_batch(*args)
+
+    monkeypatch.setattr(arm_cmd, 'send_batch', _send_batch)
+    monkeypatch.setattr(arm_cmd, 'recv_batch', _recv_batch)
+    try:
+        commands = _line(20)
+        code, batch = arm.submit_motion_batch(commands, speed=1000, wait=True, timeout=20)
+        assert code == 0
+        assert batch.codes == [0] * len(commands)
+        assert chunks == [len(commands)]
+        assert locked and not any(locked)
+    finally:
+        monkeypatch.undo()
+        _reset(arm)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import math
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from xarm.core.utils import path_validation
+from xarm.core.utils.kinematics import KinematicsModel
+from xarm.tools.simulator import DH_PARAMS
+
+# a joint vector away from the singularities, and the waypoints of a path starting at its pose
+SEED = [0, -0.3, -0.5, 0, 0.8, 0]
+OFFSETS = [[0, 0, 0, 0, 0, 0], [50, 0, 0, 0, 0, 0], [50, 50, -30, 0, 0, 0], [0, 0, 0, 0, 0, 0.3]]
+
+
+@pytest.fixture
+def model():
+    return KinematicsModel(DH_PARAMS, dof=6)
+
+
+@pytest.fixture
+def poses(model):
+    start = model.forward(SEED)
+    return [start + offset for offset in np.array(OFFSETS)]
+
+
+def test_trapezoid_time():
+    # a triangle profile, and a full one: 100mm at 100mm/s, 1000mm/s^2 reaches the speed after 0.1s
+    assert path_validation.trapezoid_time([1, 100], 100, 1000).tolist() == pytest.approx([2 * math.sqrt(1 / 1000), 1.1])
+    assert path_validation.trapezoid_time([0, 1], 0, 1000).tolist() == [0, math.inf]
+    times = path_validation.trapezoid_time_at(np.linspace(0, 100, 21), 100, 100, 1000)
+    assert times[0] == 0 and times[-1] == pytest.approx(1.1)
+    assert (np.diff(times) > 0).all()
+    # the constant speed part
+    assert times[10] == pytest.approx(0.55)
+
+
+def test_interpolate_line():
+    start, end = [200, 0, 100, math.pi, 0, 0], [300, 50, 100, math.pi, 0, 0.5]
+    samples = path_validation.interpolate_line(start, end, step=10)
+    steps = np.linalg.norm(np.diff(samples[:, :3, 3], axis=0), axis=1)
+    assert len(samples) == max(math.ceil(math.hypot(100, 50) / 10), math.ceil(0.5 / math.radians(2)))
+    assert steps.max() <= 10
+    assert np.allclose(samples[-1], path_validation.kinematics.pose_to_matrix(end)[0])
+
+
+def test_estimate_times(poses):
+    times, duration = path_validation.estimate_times(poses, speed=100, acc=1000)
+    assert times[0] == 0 and duration == times[-1]
+    assert (np.diff(times) > 0).all()
+    # 50mm stopping at both ends
+    assert times[1] == pytest.approx(0.6)
+    # the blended waypoints do not stop
+    blended, blended_duration = path_validation.estimate_times(poses, radii=[-1, 10, 10, -1], speed=100, acc=1000)
+    assert blended_duration < duration
+    assert path_validation.estimate_times(poses[:1]) == (pytest.approx([0]), 0.0)
+
+
+def test_valid_path(model, poses):
+    result = path_validation.validate_path(model, poses, SEED)
+    assert result['ok'].all()
+    for name in path_validation.VERDICTS:
+        assert not result[name].any()
+    # roll is +-pi at the waypoints, the transforms are compared
+    pose_to_matrix = path_validation.kinematics.pose_to_matrix
+    assert np.allclose(pose_to_matrix(model.forward(result['angles'])), pose_to_matrix(poses), atol=1e-2)
+    assert np.allclose(result['angles'][0], SEED, atol=1e-3)
+
+
+def test_unreachable_waypoint_breaks_the_path(model, poses):
+    far = [2000, 0, 0, math.pi, 0, 0]
+    result = path_validation.validate_path(model, poses + [far, poses[0]], SEED)
+    assert result['unreachable'].tolist() == [False] * 4 + [True, True]
+    assert result['ok'].tolist() == [True] * 4 + [False, False]
+
+
+def test_limits_and_boundary(model, poses):
+    # only the first joint is limited, the line to the 3rd waypoint turns it
+    result = path_validation.validate_path(model, poses, SEED, joint_ranges=[(-0.1, 0.1)])
+    assert result['joint_limit'].tolist() == [False, False, True, True]
+    # x of the base coordinate is limited to 20mm after the start, the line to the 2nd waypoint crosses it
+    boundary = [poses[0][0] + 20, -1000, 1000, -1000, 1000, -1000]
+    result = path_validation.validate_path(model, poses, SEED, boundary=boundary)
+    assert result['out_of_boundary'].tolist() == [False, True, True, True]
+    # the z is not limited by a range whose max == min
+    result = path_validation.validate_path(model, poses, SEED, boundary=[1000, -1000, 1000, -1000, 0, 0])
+    assert not result['out_of_boundary'].any()
+
+
+def test_self_collision(model):
+    angles = np.array([SEED])
+    assert not path_validation.self_collision(model, angles).any()
+    # links thicker than the arm always intersect
+    assert path_validation.self_collision(model, angles, link_radius=1000).all()
+    assert not path_validation.self_collision(model, angles, link_radius=0).any()
+
+
+def test_validate_path_of_the_arm(sim, arm):
+    code, model = arm.get_kinematics_model(refresh=True)
+    assert code == 0
+    start = model.forward(SEED)
+    paths = []
+    for offset in OFFSETS:
+        pose = (start + offset).tolist()
+        paths.append(pose[:3] + [math.degrees(value) for value in pose[3:]])
+    code, result = arm.validate_path(paths, speed=100, mvacc=1000, seed=[math.degrees(value) for value in SEED])
+    assert code == 0
+    assert result['ok'] and len(result['waypoints']) == len(paths)
+    assert result['waypoints'][0]['angles'] == pytest.approx([math.degrees(value) for value in SEED], abs=0.1)
+    assert result['waypoints'][1]['time'] == pytest.approx(0.6)
+    assert result['duration'] == result['waypoints'][-1]['time']
+    code, result = arm.validate_path(paths + [[2000, 0, 0, 180, 0, 0]], speed=100, mvacc=1000,
+                                     seed=[math.degrees(value) for value in SEED])
+    assert code == 0
+    assert not result['ok'] and result['waypoints'][-1]['unreachable']
+
+
+def test_validate_path_of_the_arm_rotation_time(sim, arm):
+    code, model = arm.get_kinematics_model()
+    assert code == 0
+    start = model.forward(SEED)
+    paths = []
+    for offset in ([0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0.5]):
+        pose = (start + offset).tolist()
+        paths.append(pose[:3] + [math.degrees(value) for value in pose[3:]])
+    seed = [math.degrees(value) for value in SEED]
+    # only the orientation changes, the time follows the rotation limits, not the last joint speed
+    code, result = arm.validate_path(paths, seed=seed)
+    assert code == 0
+    assert result['duration'] == pytest.approx(
+        path_validation.trapezoid_time([0.5], path_validation.ROT_SPEED, path_validation.ROT_ACC)[0])
+    code, faster = arm.validate_path(paths, seed=seed, rot_speed=90, rot_acc=720)
+    assert code == 0
+    assert faster['duration'] == pytest.approx(path_validation.trapezoid_time([0.5], math.pi / 2, 4 * math.pi)[0])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+The precompiled report decoders against the per-field extraction they replaced
+"""
+
+import pytest
+from xarm.core.utils.report_decoder import REPORT_DECODERS, get_report_decoder
+from legacy_reference import make_frame, legacy_decode, NullCmd
+
+# every optional block of the rich report starts at one of the lengths
+RICH_LENGTHS = [245, 252, 284, 288, 312, 314, 417, 433, 481, 482, 494, 495, 496, 508]
+
+CASES = [('normal', None), ('real', None), ('real', 87), ('normal_old', None), ('rich_old', None)] + \
+        [('rich', length) for length in RICH_LENGTHS]
+
+
+@pytest.mark.parametrize('report_type,length', CASES)
+def test_decode_same_as_legacy(report_type, length):
+    frame = make_frame(report_type, length)
+    legacy = legacy_decode(report_type, frame)
+    fields = REPORT_DECODERS[report_type].decode(frame)
+    assert set(fields.keys()) == set(legacy.keys())
+    for key, value in legacy.items():
+        assert fields[key] == value, key
+
+
+@pytest.mark.parametrize('report_type,length', CASES)
+def test_decode_valid_length_of_a_larger_buffer(report_type, length):
+    # the frame is decoded from the receive buffer, the bytes after the valid length are not part of it
+    frame = make_frame(report_type, length)
+    buf = bytearray(frame) + bytearray(b'\xff' * 64)
+    decoder = REPORT_DECODERS[report_type]
+    assert decoder.decode(memoryview(buf), len(frame)) == decoder.decode(frame)
+
+
+@pytest.mark.parametrize('report_type', ['normal', 'rich', 'real'])
+def test_encode_into_is_the_inverse(report_type):
+    frame = make_frame(report_type)
+    decoder = REPORT_DECODERS[report_type]
+    fields = decoder.decode(frame)
+    buf = decoder.encode_into(bytearray(len(frame)), fields)
+    assert decoder.decode(buf) == fields
+
+
+def test_get_report_decoder():
+    assert get_report_decoder('rich') is REPORT_DECODERS['rich']
+    assert get_report_decoder('real') is REPORT_DECODERS['real']
+    assert get_report_decoder('rich', is_old_protocol=True) is REPORT_DECODERS['rich_old']
+    assert get_report_decoder('normal', is_old_protocol=True) is REPORT_DECODERS['normal_old']
+    assert get_report_decoder('unknown') is REPORT_DECODERS['normal']
+
+
+def test_rich_old_report_decoded_once(monkeypatch):
+    # the layout of rich_old contains the one of normal_old, the handler decodes the frame once
+    from xarm.wrapper import XArmAPI
+    from xarm.x3 import base
+    decoded = []
+
+    class _Counting(object):
+        def __init__(self, name):
+            self.name = name
+
+        def decode(self, *args):
+            decoded.append(self.name)
+            return REPORT_DECODERS[self.name].decode(*args)
+
+    decoders = dict(REPORT_DECODERS, normal_old=_Counting('normal_old'), rich_old=_Counting('rich_old'))
+    monkeypatch.setattr(base, 'REPORT_DECODERS', decoders)
+    arm = XArmAPI(do_not_open=True, report_type='rich')
+    arm._arm.arm_cmd = NullCmd()
+    arm._arm._is_old_protocol = True
+    frame = make_frame('rich_old')
+    arm._arm._handle_report_data(frame)
+    assert decoded == ['rich_old']
+    fields = REPORT_DECODERS['rich_old'].decode(frame)
+    assert arm._arm._cmd_num == fields['cmd_num']
+    assert arm._arm._arm_type == fields['arm_type']
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+import pytest
+from xarm.wrapper import XArmAPI
+from xarm.core.utils.periodic import PeriodicThread
+from xarm.x3.servo_snapshot import resolve_registers, SERVO_REGISTERS, SERVO_REGISTER_GROUPS, SNAPSHOT_CHUNK_SIZE
+
+
+@pytest.fixture(scope='module')
+def pipelined_arm(sim):
+    arm = XArmAPI('127.0.0.1', is_radian=False, max_inflight=4)
+    yield arm
+    arm.disconnect()
+
+
+@pytest.fixture
+def registers(sim):
+    sim.servo_registers.clear()
+    for servo_id in range(1, 8):
+        sim.servo_registers[(servo_id, SERVO_REGISTERS['temperature'][0])] = 30 + servo_id
+        sim.servo_registers[(servo_id, SERVO_REGISTERS['bus_voltage'][0])] = 4800 + servo_id
+        sim.servo_registers[(servo_id, SERVO_REGISTERS['position'][0])] = -1000 * servo_id
+    yield sim.servo_registers
+    sim.servo_registers.clear()
+
+
+def test_resolve_registers():
+    assert [reg[0] for reg in resolve_registers()] == list(SERVO_REGISTER_GROUPS['health'])
+    regs = resolve_registers(['temperature', 'version', 'temperature', 0x000E, (0x0006, 32)])
+    assert [reg[0] for reg in regs] == ['temperature', 'version_major', 'version_minor', 'version_revision', '0x000E', '0x0006']
+    assert regs[-1] == ('0x0006', 0x0006, 32, 1)
+    with pytest.raises(AssertionError):
+        resolve_registers(['unknown'])
+
+
+@pytest.mark.parametrize('pipelined', [False, True])
+def test_snapshot_values(arm, pipelined_arm, registers, pipelined):
+    arm = pipelined_arm if pipelined else arm
+    code, snapshot = arm.get_servo_snapshot(registers=['temperature', 'bus_voltage', 'position'])
+    assert code == 0
+    assert list(snapshot['servos'].keys()) == list(range(1, arm.axis + 1))
+    for servo_id, info in snapshot['servos'].items():
+        assert info['temperature'] == 30 + servo_id
+        assert info['bus_voltage'] == pytest.approx((4800 + servo_id) / 100)
+        # a 32 bits register is signed
+        assert info['position'] == -1000 * servo_id
+        assert info['status'] == 0 and info['error_code'] == 0
+    assert snapshot['elapsed'] >= 0
+
+
+def test_snapshot_more_reads_than_a_chunk(pipelined_arm, registers):
+    # the reads of the 7 servos are sent in several writes
+    names = list(SERVO_REGISTERS.keys())
+    assert len(names) * 7 > SNAPSHOT_CHUNK_SIZE
+    code, snapshot = pipelined_arm.get_servo_snapshot(servo_ids=range(1, 8), registers=names, with_dbmsg=False)
+    assert code == 0
+    for servo_id, info in snapshot['servos'].items():
+        assert 'status' not in info
+        assert list(info.keys()) == names
+        assert info['temperature'] == 30 + servo_id
+
+
+def test_servo_monitor(pipelined_arm, registers):
+    snapshots = []
+    monitor = pipelined_arm.start_servo_monitor(interval=0.05, servo_ids=[1, 2], registers=['temperature'],
+                                                with_dbmsg=False, history=5, callback=snapshots.append)
+    try:
+        expired = time.monotonic() + 2
+        while len(snapshots) < 8 and time.monotonic() < expired:
+            time.sleep(0.02)
+    finally:
+        monitor.stop()
+    assert not monitor.running
+    assert len(snapshots) >= 8
+    assert len(monitor.snapshots) == 5
+    assert monitor.latest is snapshots[-1]
+    assert monitor.error_count == 0 and monitor.last_code == 0
+    times, values = monitor.series('temperature', 2)
+    assert values == [32] * 5
+    assert times == sorted(times)
+
+
+class _Ticker(PeriodicThread):
+    def __init__(self, interval, duration=0):
+        super(_Ticker, self).__init__(interval)
+        self.duration = duration
+        self.times = []
+        self.woken = threading.Event()
+
+    def _tick(self):
+        self.times.append(time.monotonic())
+        time.sleep(self.duration)
+
+    def _wakeup(self):
+        self.woken.set()
+
+
+def test_periodic_thread_absolute_schedule():
+    # a work of 20ms does not shift the next ones of a 50ms interval
+    with _Ticker(0.05, duration=0.02) as ticker:
+        time.sleep(0.52)
+    assert not ticker.running and ticker.woken.is_set()
+    assert 9 <= len(ticker.times) <= 12
+    assert ticker.times[-1] - ticker.times[0] == pytest.approx(0.05 * (len(ticker.times) - 1), abs=0.03)
+
+
+def test_periodic_thread_slow_work_and_stop():
+    ticker = _Ticker(0.01, duration=0.05)
+    assert ticker.interval == 0.01
+    ticker.start()
+    ticker.start()
+    time.sleep(0.22)
+    start = time.monotonic()
+    ticker.stop()
+    assert time.monotonic() - start < 0.1
+    # the work longer than the interval is followed at once by the next one
+    assert 3 <= len(ticker.times) <= 6
+    assert _Ticker(0.001).interval == 0.01
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import math
+import time
+import pytest
+
+
+def test_connect(sim, arm):
+    assert arm.connected
+    assert arm.axis == sim.axis
+    assert arm.sn == sim.sn
+    assert arm.get_version()[0] == 0
+
+
+def test_report_follows_the_state(sim, arm):
+    # the simulated attitude is in radians, the arm reports degrees (is_radian=False)
+    sim.pose = [300.5, -20.25, 150.125, math.pi, 0.0, 0.0]
+    time.sleep(0.1)
+    assert arm.position == pytest.approx([300.5, -20.25, 150.125, 180.0, 0.0, 0.0], abs=1e-3)
+    assert arm.get_position()[1] == pytest.approx([300.5, -20.25, 150.125, 180.0, 0.0, 0.0], abs=1e-3)
+
+
+def test_move_line_is_executed(sim, arm):
+    code = arm.set_position(320, 10, 200, 180, 0, 0, speed=1000, wait=True, timeout=10)
+    assert code == 0
+    assert sim.pose[:3] == pytest.approx([320, 10, 200], abs=0.01)
+    assert arm.get_position()[1][:3] == pytest.approx([320, 10, 200], abs=0.01)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import math
+import time
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from xarm.wrapper import XArmAPI
+from xarm.core.utils.state_history import StateHistory
+
+
+def _fill(history, count, start=0):
+    for i in range(start, start + count):
+        history.append(float(i), [i, 2 * i, 0, 0, 0, 0], [0.1 * i] * 7, tcp_speed=i)
+
+
+def test_state_at_interpolates():
+    history = StateHistory(10)
+    _fill(history, 5)
+    assert history.time_range == (0.0, 4.0)
+    state = history.state_at(2.25)
+    assert state['time'] == 2.25
+    assert state['pose'][:2] == pytest.approx([2.25, 4.5])
+    assert state['angles'] == pytest.approx([0.225] * 7)
+    assert state['tcp_speed'] == pytest.approx(2.25)
+    assert history.state_at(2.25, interpolate=False)['time'] == 2.0
+    assert history.state_at(3.0)['pose'][0] == 3
+    # out of the time range
+    assert history.state_at(-0.5) is None
+    assert history.state_at(4.5) is None
+
+
+def test_ring_overwrites_the_oldest():
+    history = StateHistory(8)
+    _fill(history, 20)
+    assert len(history) == 8
+    assert history.time_range == (12.0, 19.0)
+    assert history.latest()['time'] == 19.0
+    assert history.state_at(11.5) is None
+    # the interpolation across the wrap point of the storage
+    assert history.state_at(15.5)['pose'][0] == pytest.approx(15.5)
+    states = history.states_between(13, 17)
+    assert states['time'].tolist() == [13.0, 14.0, 15.0, 16.0, 17.0]
+    assert len(history.states_between(30, 40)) == 0
+    history.clear()
+    assert len(history) == 0 and history.time_range is None and history.latest() is None
+
+
+def test_rpy_interpolated_along_the_shortest_path():
+    history = StateHistory(4)
+    history.append(0.0, [0, 0, 0, 0, 0, math.pi - 0.1], [0] * 7)
+    history.append(1.0, [0, 0, 0, 0, 0, -math.pi + 0.1], [0] * 7)
+    yaw = history.state_at(0.25)['pose'][5]
+    assert yaw == pytest.approx(math.pi - 0.05)
+    yaw = history.state_at(0.75)['pose'][5]
+    assert yaw == pytest.approx(-math.pi + 0.05)
+
+
+def test_filled_by_the_report_thread(sim):
+    arm = XArmAPI('127.0.0.1', is_radian=False, state_history_size=500)
+    try:
+        time.sleep(0.5)
+        history = arm.state_history
+        assert history is not None and len(history) > 10
+        t0, t1 = history.time_range
+        assert t0 < t1 <= time.monotonic()
+        state = history.state_at((t0 + t1) / 2)
+        assert state is not None
+        assert state['pose'][:3] == pytest.approx(arm.get_position()[1][:3], abs=1)
+    finally:
+        arm.disconnect()
+    assert XArmAPI('127.0.0.1', do_not_open=True).state_history is None
+
+
+def test_stamped_with_the_receive_time_of_the_port(sim, monkeypatch):
+    # a slow report handler does not shift the times of the frames queued meanwhile
+    arm = XArmAPI('127.0.0.1', is_radian=False, state_history_size=500, do_not_open=True)
+    handle_report_frame = arm._arm._handle_report_frame
+    lags = []
+
+    def _handle_report_frame(data, recv_time):
+        lags.append(time.monotonic() - recv_time)
+        time.sleep(0.03)
+        handle_report_frame(data, recv_time)
+
+    monkeypatch.setattr(arm._arm, '_handle_report_frame', _handle_report_frame)
+    arm.connect()
+    try:
+        time.sleep(0.5)
+        # the frames waited in the queue while the previous ones were handled
+        assert len(lags) > 5 and max(lags) > 0.01
+        assert arm.state_history.latest()['time'] < time.monotonic() - 0.01
+    finally:
+        arm.disconnect()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+from xarm.core.config.x_config import XCONF
+from xarm.core.utils import convert, crc16
+from xarm.x3.code import APIState
+
+# the version registers of the simulated gripper
+VERSION_ADDRS = (0x0801, 0x0802, 0x0803)
+VERSIONS = (3, 4, 3)
+
+
+def _read_frame(addr, count=1):
+    return [XCONF.GRIPPER_ID, 0x03] + list(convert.u16_to_bytes(addr)) + list(convert.u16_to_bytes(count))
+
+
+def _value(res):
+    # res: slave id, function code, byte count, data
+    return convert.bytes_to_u16(res[3:5])
+
+
+def test_batch_responses_in_order(arm):
+    rets = arm.getset_tgpio_modbus_batch([_read_frame(addr) for addr in VERSION_ADDRS], min_res_len=5)
+    assert [code for code, _ in rets] == [0] * len(VERSION_ADDRS)
+    assert tuple(_value(res) for _, res in rets) == VERSIONS
+
+
+def test_batch_limit_sec(arm, monkeypatch):
+    arm_cmd = arm._arm.arm_cmd
+    batches = []
+    send_batch = arm_cmd.send_batch
+
+    def _send_batch(requests):
+        batches.append(len(requests))
+        return send_batch(requests)
+
+    monkeypatch.setattr(arm_cmd, 'send_batch', _send_batch)
+    frames = [_read_frame(addr) for addr in VERSION_ADDRS]
+    rets = arm.getset_tgpio_modbus_batch(frames, min_res_len=5)
+    assert [code for code, _ in rets] == [0] * len(frames)
+    assert batches == [len(frames)]
+
+    # the frames are spaced by limit_sec, one request at a time
+    del batches[:]
+    start = time.monotonic()
+    rets = arm.getset_tgpio_modbus_batch(frames, min_res_len=5, limit_sec=0.02)
+    assert time.monotonic() - start >= 0.02 * (len(frames) - 1)
+    assert [code for code, _ in rets] == [0] * len(frames)
+    assert tuple(_value(res) for _, res in rets) == VERSIONS
+    assert batches == []
+
+
+def test_batch_transparent_transmission_crc(sim, arm, monkeypatch):
+    frames = [_read_frame(addr) for addr in VERSION_ADDRS]
+    rets = arm.getset_tgpio_modbus_batch(frames, min_res_len=5, is_tt=True, auto_crc=True)
+    assert [code for code, _ in rets] == [0] * len(frames)
+    assert tuple(_value(res) for _, res in rets) == VERSIONS
+    assert all(crc16.crc_modbus_check(res) for _, res in rets)
+
+    # the response of the second frame is corrupted, only its code is MODBUS_ERR_CRC
+    handler = sim._handlers[XCONF.UxbusReg.TGPIO_COM_DATA]
+
+    def _corrupt(params, conn, trans_id):
+        res = handler(params, conn, trans_id)
+        if convert.bytes_to_u16(params[3:5]) == VERSION_ADDRS[1]:
+            res = res[:-1] + bytes([res[-1] ^ 0xFF])
+        return res
+
+    monkeypatch.setitem(sim._handlers, XCONF.UxbusReg.TGPIO_COM_DATA, _corrupt)
+    rets = arm.getset_tgpio_modbus_batch(frames, min_res_len=5, is_tt=True, auto_crc=True)
+    assert [code for code, _ in rets] == [0, APIState.MODBUS_ERR_CRC, 0]
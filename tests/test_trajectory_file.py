@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import math
+import time
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from xarm.core.utils.trajectory_file import TrajectoryCapture, TrajectoryFile
+
+
+def _capture(count, rate=100.0, chunk_size=16, **kwargs):
+    capture = TrajectoryCapture(fields=('pose', 'angles', 'tcp_speed'), chunk_size=chunk_size, **kwargs)
+    for i in range(count):
+        capture.append(i / rate, [i, 0, 100, math.pi, 0, 0], [i * 0.01] * 7, tcp_speed=i)
+    return capture
+
+
+def test_columns_before_any_row():
+    capture = TrajectoryCapture(chunk_size=16)
+    columns = capture.columns()
+    assert len(columns['time']) == 0
+    assert columns['pose'].shape == (0, 6)
+    assert columns['angles'].shape == (0, 7)
+    # the empty columns do not leave a chunk behind
+    for i in range(3):
+        capture.append(i * 0.01, [i] * 6, [i] * 7)
+    columns = capture.columns()
+    assert capture.count == 3
+    assert len(columns['time']) == 3
+    assert columns['pose'][:, 0].tolist() == [0, 1, 2]
+
+
+def test_columns_across_chunks():
+    capture = _capture(40)
+    columns = capture.columns()
+    assert capture.count == 40
+    assert columns['time'] == pytest.approx(np.arange(40) / 100.0)
+    assert columns['pose'][:, 0].tolist() == list(range(40))
+    assert columns['tcp_speed'].tolist() == list(range(40))
+
+
+def test_max_duration():
+    capture = _capture(40, max_duration=0.1)
+    assert capture.count == 11
+    assert capture.dropped == 29
+
+
+def test_save_and_open(tmp_path):
+    filename = str(tmp_path / 'line.xtrj')
+    assert _capture(40).save(filename, meta={'device_type': 6}) == 40
+    with TrajectoryFile(filename) as traj:
+        assert traj.count == 40
+        assert traj.meta['device_type'] == 6
+        assert traj.fields == ('pose', 'angles', 'tcp_speed')
+        assert traj.rate == pytest.approx(100.0)
+        assert traj.duration == pytest.approx(0.39)
+        assert traj.index_at(0.1) == 10
+        assert traj['pose'][:, 0].tolist() == list(range(40))
+        assert traj.slice(0.1, 0.2)['tcp_speed'].tolist() == list(range(10, 21))
+
+
+def test_resample(tmp_path):
+    filename = str(tmp_path / 'line.xtrj')
+    _capture(40).save(filename)
+    with TrajectoryFile(filename) as traj:
+        pose = traj.resample('pose', rate=200)
+        assert len(pose) == 79
+        assert pose[:, 0] == pytest.approx(np.arange(79) / 2.0)
+        # the roll stays at +-pi, it is not interpolated through 0
+        assert np.abs(pose[:, 3]) == pytest.approx(math.pi, abs=1e-6)
+        with pytest.raises(ValueError):
+            traj.resample('angles', start=1.0)
+
+
+def test_capture_and_replay(sim, arm, tmp_path, monkeypatch):
+    filename = str(tmp_path / 'move.xtrj')
+    arm.set_position(207, 0, 112, 180, 0, 0, speed=1000, wait=True)
+    assert arm.start_capture_trajectory(fields=('pose', 'angles')) == 0
+    arm.set_position(247, 0, 112, 180, 0, 0, speed=200, wait=True)
+    # the reports of the end of the move
+    time.sleep(0.1)
+    assert arm.stop_capture_trajectory(filename) == 0
+    with TrajectoryFile(filename) as traj:
+        assert traj.count > 10
+        assert traj['pose'][-1][:3] == pytest.approx([247, 0, 112], abs=0.5)
+
+    closed = []
+    close = TrajectoryFile.close
+    monkeypatch.setattr(TrajectoryFile, 'close', lambda self: closed.append(self.filename) or close(self))
+    code, stats = arm.replay_trajectory(filename, mode='servo_cartesian', rate=100, timeout=10)
+    assert code == 0
+    # the file opened by the replay is closed, the setpoints are copies
+    assert closed == [filename]
+    assert sim.pose[:3] == pytest.approx([247, 0, 112], abs=0.5)
+    arm.set_mode(0)
+    arm.set_state(0)
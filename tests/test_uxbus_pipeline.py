@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import threading
+import pytest
+from xarm.core.config.x_config import XCONF
+from xarm.core.wrapper import uxbus_cmd_tcp
+from xarm.wrapper import XArmAPI
+from xarm.x3.code import APIState
+
+POSE = [300.5, -20.25, 150.125, 3.0, 0.5, -0.25]
+ANGLES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.0]
+
+
+@pytest.fixture(scope='module')
+def pipelined_arm(sim):
+    # the pipelining is opt-in, the default window is 1
+    arm = XArmAPI('127.0.0.1', is_radian=False, max_inflight=4)
+    yield arm
+    arm.disconnect()
+
+
+@pytest.fixture
+def arm_cmd(sim, pipelined_arm):
+    sim.pose = list(POSE)
+    sim.angles = list(ANGLES)
+    return pipelined_arm._arm.arm_cmd
+
+
+def test_default_window(arm):
+    assert arm._arm.arm_cmd.max_inflight == 1
+    assert arm._arm.arm_cmd.pipeline_lock is arm._arm.arm_cmd.lock
+
+
+def test_pipelined_getters_match_their_responses(sim, arm_cmd):
+    # the getters of several threads are in flight together, every one gets the response of its own request
+    assert arm_cmd.max_inflight > 1
+    errors = []
+
+    def worker(index):
+        for i in range(50):
+            if (index + i) % 2 == 0:
+                ret, expected = arm_cmd.get_tcp_pose(), POSE
+            else:
+                ret, expected = arm_cmd.get_joint_pos(), ANGLES
+            if ret[0] != 0 or ret[1:] != pytest.approx(expected, abs=1e-4):
+                errors.append((index, i, ret))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert errors == []
+
+
+def test_send_batch_responses_in_order(arm_cmd):
+    funcodes = [XCONF.UxbusReg.GET_TCP_POSE, XCONF.UxbusReg.GET_JOINT_POS, XCONF.UxbusReg.GET_STATE] * 3
+    trans_ids = arm_cmd.send_batch([(funcode, b'') for funcode in funcodes])
+    assert trans_ids is not None and trans_ids != -1
+    assert len(set(trans_ids)) == len(funcodes)
+    rets = arm_cmd.recv_batch(funcodes, trans_ids, [24, 28, 1] * 3, 5)
+    for funcode, ret in zip(funcodes, rets):
+        assert ret[0] == 0
+        if funcode == XCONF.UxbusReg.GET_TCP_POSE:
+            assert len(ret) == 25
+        elif funcode == XCONF.UxbusReg.GET_JOINT_POS:
+            assert len(ret) == 29
+        else:
+            assert len(ret) == 2
+
+
+def test_send_batch_keeps_the_window(sim, arm_cmd, monkeypatch):
+    # the frames of a batch larger than the window are sent as the responses free the slots
+    inflight = []
+    write = arm_cmd.arm_port.write
+
+    def _write(data):
+        inflight.append(len(arm_cmd._slots))
+        return write(data)
+
+    monkeypatch.setattr(arm_cmd.arm_port, 'write', _write)
+    monkeypatch.setattr(sim, 'latency', 0.002)
+    funcodes = [XCONF.UxbusReg.GET_STATE] * 20
+    trans_ids = arm_cmd.send_batch([(funcode, b'') for funcode in funcodes])
+    assert len(trans_ids) == len(funcodes)
+    assert 1 < len(inflight) < len(funcodes)
+    assert max(inflight) <= arm_cmd.max_inflight
+    rets = arm_cmd.recv_batch(funcodes, trans_ids, [1] * len(funcodes), 5)
+    assert [ret[0] for ret in rets] == [0] * len(funcodes)
+    assert arm_cmd._slots == {}
+
+
+def test_send_hex_cmd_rejects_a_pending_trans_id(arm_cmd):
+    trans_id = arm_cmd.send_modbus_request(XCONF.UxbusReg.GET_STATE, b'', 0)
+    datas = ['{:02x}'.format(trans_id >> 8), '{:02x}'.format(trans_id & 0xFF), '00', '02', '00', '01', '0d']
+    assert arm_cmd.send_hex_cmd(datas, 1) == [APIState.CMD_NUM_ERROR]
+    assert arm_cmd.send_modbus_request(XCONF.UxbusReg.GET_STATE, b'', 0, t_id=trans_id) == -1
+    # the pending request still gets its own response
+    assert arm_cmd.recv_modbus_response(XCONF.UxbusReg.GET_STATE, trans_id, 1, 5)[0] == 0
+    assert arm_cmd.send_hex_cmd(datas, 1)[0] == 0
+
+
+def test_unmatched_response_is_logged(arm, monkeypatch):
+    # the default window also goes through the dispatcher, a late response is dropped with a log
+    messages = []
+    monkeypatch.setattr(uxbus_cmd_tcp.logger, 'debug', messages.append)
+    arm_cmd = arm._arm.arm_cmd
+    trans_id = arm_cmd._get_trans_id()
+    assert not arm_cmd._dispatch_response(bytes([trans_id >> 8, trans_id & 0xFF, 0, 2, 0, 3, 13, 0, 0]))
+    assert len(messages) == 1 and 'trans_id={}'.format(trans_id) in messages[0]
+    # the responses of the heartbeat are not logged
+    assert not arm_cmd._dispatch_response(bytes([0, 0, 0, 2, 0, 2, 0, 0]))
+    assert len(messages) == 1
+
+
+def test_explicit_trans_id_is_used_once(arm_cmd):
+    # the id reserved for a command (feedback key) is the one sent, the next command gets a new one
+    trans_id = arm_cmd._get_trans_id()
+    ret = arm_cmd.send_modbus_request(XCONF.UxbusReg.GET_STATE, b'', 0, t_id=trans_id)
+    assert ret == trans_id
+    assert arm_cmd.recv_modbus_response(XCONF.UxbusReg.GET_STATE, ret, 1, 5)[0] == 0
+    ret = arm_cmd.send_modbus_request(XCONF.UxbusReg.GET_STATE, b'', 0)
+    assert ret != trans_id
+    assert arm_cmd.recv_modbus_response(XCONF.UxbusReg.GET_STATE, ret, 1, 5)[0] == 0
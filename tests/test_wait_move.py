@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+import pytest
+from xarm.x3.code import APIState
+
+
+def _hold_state(sim, state, delay, duration):
+    # the simulated motion does not advance out of the states 1/2, the tick keeps the state set here
+    time.sleep(delay)
+    sim.state = state
+    time.sleep(duration)
+    sim.state = 1
+
+
+def test_wait_move_through_a_short_state_5(sim, arm):
+    arm.set_position(207, 0, 112, 180, 0, 0, speed=1000, wait=True)
+    code = arm.set_position(287, 0, 112, 180, 0, 0, speed=100, wait=False)
+    assert code == 0
+    t = threading.Thread(target=_hold_state, args=(sim, 5, 0.2, 0.5))
+    t.start()
+    try:
+        # every report wakes the wait once the arm is moving, 0.5s in state 5 is not a stop
+        code = arm._arm.wait_move(timeout=10, set_cnt=40)
+    finally:
+        t.join()
+    assert code == 0
+    assert sim.pose[:3] == pytest.approx([287, 0, 112], abs=0.01)
+
+
+def test_wait_move_stops_after_1s_in_state_5(sim, arm):
+    arm.set_position(207, 0, 112, 180, 0, 0, speed=1000, wait=True)
+    code = arm.set_position(287, 0, 112, 180, 0, 0, speed=100, wait=False)
+    assert code == 0
+    t = threading.Thread(target=_hold_state, args=(sim, 5, 0.2, 2))
+    t.start()
+    try:
+        start = time.monotonic()
+        code = arm._arm.wait_move(timeout=10, set_cnt=60)
+        elapsed = time.monotonic() - start
+    finally:
+        t.join()
+        arm.set_state(4)
+        arm.set_state(0)
+    assert code == APIState.EMERGENCY_STOP
+    assert 1.0 <= elapsed < 2.0
@@ -1,2 +1,8 @@
 from .wrapper import XArmAPI
 from .version import __version__
+from .core.utils.lazy import lazy_attrs
+
+__getattr__, __dir__ = lazy_attrs(globals(), {
+    'AsyncXArmAPI': '.wrapper',
+    'XArmFleet': '.wrapper',
+})
@@ -1,2 +1,12 @@
-from .config.x_code import ControllerWarn, ControllerError, ServoError
 from .config.x_config import XCONF
+from .utils.lazy import lazy_attrs
+
+# the lazy names are listed, so "from xarm.core import *" still exports them (and loads them then)
+__all__ = ['XCONF', 'ControllerWarn', 'ControllerError', 'ServoError']
+
+# the code maps are large, they are only loaded when a code is described
+__getattr__, __dir__ = lazy_attrs(globals(), {
+    'ControllerWarn': '.config.x_code',
+    'ControllerError': '.config.x_code',
+    'ServoError': '.config.x_code',
+})
@@ -8,17 +8,97 @@
 
 import time
 import queue
+import struct
 import socket
 import select
 import threading
 from ..utils.log import logger
 from ..utils import convert
 
+_U16_BE = struct.Struct('>H')
+_U32_BE = struct.Struct('>I')
+
+
+class RecvBuffer(object):
+    """
+    Preallocated receive buffer for the socket ports
+    Data is written in place by socket.recv_into and frames are located by offset,
+    the only copy made is the bytes of a complete frame handed to the rx queue
+    """
+    def __init__(self, size=65536):
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+
+    def _reserve(self, size):
+        if len(self._buf) - self._end >= size:
+            return
+        remain = self._end - self._start
+        if remain + size > len(self._buf):
+            # a frame larger than the buffer, reallocate
+            buf = bytearray(max(len(self._buf) * 2, remain + size))
+            buf[:remain] = self._view[self._start:self._end]
+            self._view.release()
+            self._buf = buf
+            self._view = memoryview(self._buf)
+        elif remain > 0:
+            # only the tail of an incomplete frame is moved to the front
+            self._buf[:remain] = bytes(self._view[self._start:self._end])
+        self._start = 0
+        self._end = remain
+
+    def recv_into(self, recv_into_func, size=0):
+        """
+        Read from the stream directly into the free space of the buffer
+        :param recv_into_func: socket.recv_into
+        :param size: max bytes to read, 0 means all the free space
+        :return: bytes count received, 0 means the peer is closed
+        """
+        self._reserve(size if size > 0 else 1)
+        view = self._view[self._end:] if size <= 0 else self._view[self._end:self._end + size]
+        try:
+            n = recv_into_func(view)
+        finally:
+            view.release()
+        self._end += n
+        return n
+
+    def view(self, offset=0, size=None):
+        """memoryview of the unread data, valid until the next recv_into"""
+        start = self._start + offset
+        return self._view[start:self._end if size is None else start + size]
+
+    def u16_at(self, offset):
+        return _U16_BE.unpack_from(self._buf, self._start + offset)[0]
+
+    def u32_at(self, offset):
+        return _U32_BE.unpack_from(self._buf, self._start + offset)[0]
+
+    def skip(self, size):
+        self._start = min(self._start + size, self._end)
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def pop(self, size):
+        """Take a frame of size bytes out of the buffer"""
+        data = bytes(self._view[self._start:self._start + size])
+        self.skip(size)
+        return data
+
 
 class RxParse(object):
     def __init__(self, rx_que, fb_que=None):
         self.rx_que = rx_que
         self.fb_que = fb_que
+        self.dispatch = None
 
     def flush(self, fromid=-1, toid=-1):
         pass
@@ -28,6 +108,10 @@ class RxParse(object):
             if not self.fb_que:
                 return
             self.fb_que.put(data)
+        elif not is_report and self.dispatch is not None:
+            # responses are handed to the waiting request directly,
+            # the unmatched ones (late or heartbeat responses) are logged and dropped by the dispatcher
+            self.dispatch(data)
         else:
             self.rx_que.put(data)
 
@@ -43,16 +127,27 @@ class Port(threading.Thread):
         self.com = None
         self.rx_parse = RxParse(self.rx_que, self.fb_que)
         self.com_read = None
+        self.com_recv_into = None
         self.com_write = None
         self.port_type = ''
         self.buffer_size = 1
         self.heartbeat_thread = None
         self.alive = True
+        # size of the report frames, confirmed by the first report
+        self._report_size = 0
+        self._report_size_is_not_confirm = False
 
     @property
     def connected(self):
         return self._connected
 
+    def set_rx_dispatch(self, dispatch):
+        """
+        Route the responses to dispatch(data) -> bool in the receive thread instead of the rx queue
+        :param dispatch: callable or None (back to the rx queue)
+        """
+        self.rx_parse.dispatch = dispatch
+
     def run(self):
         if self.port_type == 'report-socket':
             self.recv_report_proc()
@@ -135,32 +230,61 @@ class Port(threading.Thread):
     #     logger.debug('[{}] recv thread had stopped'.format(self.port_type))
     #     self._connected = False
 
+    def _put_report(self, data, recv_time):
+        # the report frames are queued with the host receive time, read() returns (data, recv_time)
+        if self.rx_que.qsize() > 1:
+            self.rx_que.get()
+        self.rx_parse.put((data, recv_time), True)
+
+    def _parse_report_frames(self, rx_buf):
+        """
+        Take the complete report frames out of the buffer
+        :return: False if the stream is broken
+        """
+        while True:
+            if self._report_size == 0:
+                if len(rx_buf) < 4:
+                    break
+                self._report_size = rx_buf.u32_at(0)
+                if self._report_size == 233:
+                    self._report_size_is_not_confirm = True
+                    self._report_size = 245
+                logger.info('report_data_size: {}, size_is_not_confirm={}'.format(self._report_size, self._report_size_is_not_confirm))
+            size = self._report_size
+            if len(rx_buf) < size:
+                break
+            if self._report_size_is_not_confirm:
+                self._report_size_is_not_confirm = False
+                if rx_buf.u32_at(233) == 233:
+                    self._report_size = 233
+                    rx_buf.skip(233)
+                    continue
+            length = rx_buf.u32_at(0)
+            if length != size and not (size == 245 and length == 233):
+                logger.error('report data error, close, length={}, size={}'.format(length, size))
+                return False
+            self._put_report(rx_buf.pop(size), time.monotonic())
+        return True
+
+    def _parse_frames(self, rx_buf):
+        """Take the complete modbus tcp frames out of the buffer"""
+        while len(rx_buf) >= 6:
+            length = rx_buf.u16_at(4) + 6
+            if len(rx_buf) < length:
+                break
+            self.rx_parse.put(rx_buf.pop(length))
+
     def recv_report_proc(self):
         self.alive = True
         logger.debug('[{}] recv thread start'.format(self.port_type))
         failed_read_count = 0
         timeout_count = 0
-        size = 0
-        data_num = 0
-        buffer = b''
-        size_is_not_confirm = False
-
-        data_prev_us = 0
-        data_curr_us = 0
-        data_max_interval_us = 0
-        data_over_us = 205 * 1000  # over 205ms, cnts++
-        data_over_cnts = 0
-
-        recv_prev_us = 0
-        recv_curr_us = 0
-        recv_max_interval_us = 0
-        recv_over_us = 300 * 1000  # over 300ms, cnts++
-        recv_over_cnts = 0
+        rx_buf = RecvBuffer(max(self.buffer_size * 64, 65536))
 
         try:
             while self.connected and self.alive:
                 try:
-                    data = self.com_read(4 - data_num if size == 0 else (size - data_num))
+                    rx_size = rx_buf.recv_into(self.com_recv_into)
                 except socket.timeout:
                     timeout_count += 1
                     if timeout_count > 3:
@@ -168,80 +292,18 @@ class Port(threading.Thread):
                         logger.error('[{}] socket read timeout'.format(self.port_type))
                         break
                     continue
-                else:
-                    if len(data) == 0:
-                        failed_read_count += 1
-                        if failed_read_count > 5:
-                            self._connected = False
-                            logger.error('[{}] socket read failed, len=0'.format(self.port_type))
-                            break
-                        time.sleep(0.1)
-                        continue
-                    data_num += len(data)
-                    buffer += data
-                    if size == 0:
-                        if data_num != 4:
-                            continue
-                        size = convert.bytes_to_u32(buffer[0:4])
-                        if size == 233:
-                            size_is_not_confirm = True
-                            size = 245
-                        logger.info('report_data_size: {}, size_is_not_confirm={}'.format(size, size_is_not_confirm))
-                    else:
-                        if data_num < size:
-                            continue
-                        if size_is_not_confirm:
-                            size_is_not_confirm = True
-                            if convert.bytes_to_u32(buffer[233:237]) == 233:
-                                size = 233
-                                buffer = buffer[233:]
-                                continue
-
-                        if convert.bytes_to_u32(buffer[0:4]) != size and not (size_is_not_confirm and size == 245 and convert.bytes_to_u32(buffer[0:4]) == 233):
-                            logger.error('report data error, close, length={}, size={}'.format(convert.bytes_to_u32(buffer[0:4]), size))
-                            break
-
-                        # # buffer[494:502]
-                        # data_curr_us = convert.bytes_to_u64(buffer[-8:])
-                        # recv_curr_us = time.monotonic() * 1000000
-                        #
-                        # if data_prev_us != 0 and recv_prev_us != 0:
-                        #     data_interval_us = data_curr_us - data_prev_us
-                        #     data_over_cnts += 1 if data_interval_us > data_over_us else 0
-                        #
-                        #     recv_interval_us = recv_curr_us - recv_prev_us
-                        #     recv_over_cnts += 1 if recv_interval_us > recv_over_us else 0
-                        #
-                        #     print_flag = False
-                        #
-                        #     if data_interval_us > data_max_interval_us:
-                        #         data_max_interval_us = data_interval_us
-                        #         print_flag = True
-                        #     elif data_interval_us > data_over_us:
-                        #         print_flag = True
-                        #
-                        #     if recv_interval_us > recv_max_interval_us:
-                        #         recv_max_interval_us = recv_interval_us
-                        #         print_flag = True
-                        #     elif recv_interval_us > recv_over_us:
-                        #         print_flag = True
-                        #
-                        #     if print_flag:
-                        #         print('[RECV] Di={}, Dmax={}, Dcnts={}, Ri={}, Rmax={}, Rcnts={}'.format(
-                        #             data_interval_us / 1000, data_max_interval_us / 1000, data_over_cnts,
-                        #             recv_interval_us / 1000, recv_max_interval_us / 1000, recv_over_cnts
-                        #         ))
-                        # data_prev_us = data_curr_us
-                        # recv_prev_us = recv_curr_us
-
-                        if self.rx_que.qsize() > 1:
-                            self.rx_que.get()
-                        self.rx_parse.put(buffer, True)
-                        buffer = b''
-                        data_num = 0
-
-                    timeout_count = 0
-                    failed_read_count = 0
+                if rx_size == 0:
+                    failed_read_count += 1
+                    if failed_read_count > 5:
+                        self._connected = False
+                        logger.error('[{}] socket read failed, len=0'.format(self.port_type))
+                        break
+                    time.sleep(0.1)
+                    continue
+                timeout_count = 0
+                failed_read_count = 0
+                if not self._parse_report_frames(rx_buf):
+                    self.alive = False
         except Exception as e:
             if self.alive:
                 logger.error('[{}] recv error: {}'.format(self.port_type, e))
@@ -257,14 +319,14 @@ class Port(threading.Thread):
         is_main_serial = self.port_type == 'main-serial'
         try:
             failed_read_count = 0
-            buffer = b''
+            rx_buf = RecvBuffer(max(self.buffer_size * 64, 65536)) if is_main_tcp else None
             while self.connected and self.alive:
                 if is_main_tcp:
                     try:
-                        rx_data = self.com_read(self.buffer_size)
+                        rx_size = rx_buf.recv_into(self.com_recv_into)
                     except socket.timeout:
                         continue
-                    if len(rx_data) == 0:
+                    if rx_size == 0:
                         failed_read_count += 1
                         if failed_read_count > 5:
                             self._connected = False
@@ -272,16 +334,7 @@ class Port(threading.Thread):
                             break
                         time.sleep(0.1)
                         continue
-                    buffer += rx_data
-                    while True:
-                        if len(buffer) < 6:
-                            break
-                        length = convert.bytes_to_u16(buffer[4:6]) + 6
-                        if len(buffer) < length:
-                            break
-                        rx_data = buffer[:length]
-                        buffer = buffer[length:]
-                        self.rx_parse.put(rx_data)
+                    self._parse_frames(rx_buf)
                 elif is_main_serial:
                     rx_data = self.com_read(self.com.in_waiting or self.buffer_size)
                     self.rx_parse.put(rx_data)
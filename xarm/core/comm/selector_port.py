@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+The socket ports of many arms served by one thread
+SelectorSocketPort connects like SocketPort, but instead of a receive thread (and a heartbeat thread) per socket,
+the reads and the heartbeats of all the ports are done by the thread of the SelectorLoop they are registered on
+"""
+
+import time
+import socket
+import selectors
+import threading
+from collections import deque
+from ..utils.log import logger
+from .base import RecvBuffer
+from .socket_port import SocketPort
+
+# the report port is closed if nothing is received in this time (same as 3 timeouts of the report recv thread)
+REPORT_TIMEOUT = 4
+HEARTBEAT_INTERVAL = 1
+TICK_INTERVAL = 0.5
+
+
+class SelectorLoop(object):
+    """
+    One thread serving the reads of all the SelectorSocketPorts registered on it
+    """
+    def __init__(self, name='xarm-selector-loop'):
+        self._name = name
+        self._selector = None
+        self._thread = None
+        self._alive = False
+        self._calls = deque()
+        self._ports = set()
+        self._lock = threading.Lock()
+        self._wakeup_r, self._wakeup_w = None, None
+
+    @property
+    def alive(self):
+        return self._alive
+
+    @property
+    def port_count(self):
+        return len(self._ports)
+
+    def start(self):
+        with self._lock:
+            if self._alive:
+                return
+            self._selector = selectors.DefaultSelector()
+            self._wakeup_r, self._wakeup_w = socket.socketpair()
+            self._wakeup_r.setblocking(False)
+            self._wakeup_w.setblocking(False)
+            self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+            self._alive = True
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2):
+        with self._lock:
+            if not self._alive:
+                return
+            self._alive = False
+        self._wakeup()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def call_soon(self, func, *args):
+        """Run func(*args) in the loop thread"""
+        self._calls.append((func, args))
+        self._wakeup()
+
+    def register(self, port):
+        self.call_soon(self._register, port)
+
+    def unregister(self, port):
+        self.call_soon(self._unregister, port)
+
+    def _wakeup(self):
+        try:
+            self._wakeup_w.send(b'\0')
+        except (BlockingIOError, AttributeError, OSError):
+            # the wakeup is pending already or the loop is stopped
+            pass
+
+    def _register(self, port):
+        if not port.connected:
+            port.close()
+            return
+        try:
+            self._selector.register(port, selectors.EVENT_READ, port)
+            self._ports.add(port)
+        except Exception as e:
+            logger.error('[{}] register to the selector loop failed, {}'.format(port.port_type, e))
+            port.close()
+
+    def _unregister(self, port):
+        if port in self._ports:
+            self._ports.discard(port)
+            try:
+                self._selector.unregister(port)
+            except Exception:
+                pass
+
+    def _run(self):
+        logger.debug('[{}] thread start'.format(self._name))
+        next_tick = time.monotonic() + TICK_INTERVAL
+        try:
+            while self._alive:
+                events = self._selector.select(max(next_tick - time.monotonic(), 0))
+                for key, _ in events:
+                    if key.data is None:
+                        try:
+                            while self._wakeup_r.recv(4096):
+                                pass
+                        except (BlockingIOError, InterruptedError):
+                            pass
+                    else:
+                        key.data.on_readable()
+                while self._calls:
+                    func, args = self._calls.popleft()
+                    try:
+                        func(*args)
+                    except Exception as e:
+                        logger.error('[{}] call {} exception: {}'.format(self._name, func, e))
+                curr_time = time.monotonic()
+                if curr_time >= next_tick:
+                    next_tick = curr_time + TICK_INTERVAL
+                    for port in list(self._ports):
+                        port.on_tick(curr_time)
+        except Exception as e:
+            logger.error('[{}] exception: {}'.format(self._name, e))
+        finally:
+            for port in list(self._ports):
+                port.close()
+                self._unregister(port)
+            self._selector.close()
+            self._wakeup_r.close()
+            self._wakeup_w.close()
+            self._alive = False
+        logger.debug('[{}] thread had stopped'.format(self._name))
+
+
+class SelectorSocketPort(SocketPort):
+    """
+    SocketPort without its own threads, read by the thread of the SelectorLoop
+    :param loop: SelectorLoop
+    :param report_sink: called with every report frame and its receive time in the loop thread instead of putting it to the rx queue
+    :param others: same as SocketPort, the heartbeat is sent by the loop
+    """
+    def __init__(self, loop, server_ip, server_port, heartbeat=False, report_sink=None, **kwargs):
+        self._selector_loop = loop
+        self._report_sink = report_sink
+        self._send_heartbeat = heartbeat
+        self._rx_buf = None
+        self._port_stopped = threading.Event()
+        self._last_recv_time = self._last_heartbeat_time = time.monotonic()
+        super(SelectorSocketPort, self).__init__(server_ip, server_port, heartbeat=False, **kwargs)
+        if not self.connected:
+            self._port_stopped.set()
+
+    def start(self):
+        # called by SocketPort.__init__ after connected, the port is read by the loop instead of a thread
+        self._rx_buf = RecvBuffer(max(self.buffer_size * 64, 65536))
+        self._last_recv_time = time.monotonic()
+        self._selector_loop.register(self)
+
+    def join(self, timeout=None):
+        self._port_stopped.wait(timeout)
+
+    def is_alive(self):
+        return not self._port_stopped.is_set()
+
+    def fileno(self):
+        return self.com.fileno()
+
+    def close(self):
+        super(SelectorSocketPort, self).close()
+        self._connected = False
+        if not self._port_stopped.is_set():
+            self._port_stopped.set()
+            self._selector_loop.unregister(self)
+            logger.debug('[{}] selector port had stopped'.format(self.port_type))
+
+    def _put_report(self, data, recv_time):
+        if self._report_sink is not None:
+            self._report_sink(data, recv_time)
+        else:
+            super(SelectorSocketPort, self)._put_report(data, recv_time)
+
+    def on_readable(self):
+        if not self.alive:
+            return
+        try:
+            rx_size = self._rx_buf.recv_into(self.com_recv_into)
+        except (socket.timeout, BlockingIOError, InterruptedError):
+            return
+        except Exception as e:
+            if self.alive:
+                logger.error('[{}] recv error: {}'.format(self.port_type, e))
+            self.close()
+            return
+        if rx_size == 0:
+            logger.error('[{}] socket read failed, len=0'.format(self.port_type))
+            self.close()
+            return
+        self._last_recv_time = time.monotonic()
+        try:
+            if self.port_type == 'report-socket':
+                if not self._parse_report_frames(self._rx_buf):
+                    self.close()
+            else:
+                self._parse_frames(self._rx_buf)
+        except Exception as e:
+            logger.error('[{}] recv error: {}'.format(self.port_type, e))
+            self.close()
+
+    def on_tick(self, curr_time):
+        if self.port_type == 'report-socket' and curr_time - self._last_recv_time > REPORT_TIMEOUT:
+            logger.error('[{}] socket read timeout'.format(self.port_type))
+            self.close()
+            return
+        if self._send_heartbeat and curr_time - self._last_heartbeat_time >= HEARTBEAT_INTERVAL:
+            self._last_heartbeat_time = curr_time
+            if self.write(bytes([0, 0, 0, 1, 0, 2, 0, 0])) == -1:
+                self.close()
@@ -433,6 +433,7 @@ class XCONF(object):
     class UxbusConf:
         SET_TIMEOUT = 2000  # ms
         GET_TIMEOUT = 2000  # ms
+        MAX_INFLIGHT = 1  # max number of the pipelined requests in flight (socket only), 1 means no pipelining
 
     class ServoConf:
         CON_EN = 0x0100
@@ -10,68 +10,95 @@
 
 import struct
 
+_STRUCTS = {}
+
+
+def get_struct(fmt, n=1):
+    """
+    Cached struct.Struct of n values, e.g. get_struct('<f', 6) is struct.Struct('<6f')
+    :param fmt: byte order + format character, e.g. '<f', '>H'
+    """
+    key = (fmt, n)
+    st = _STRUCTS.get(key)
+    if st is None:
+        st = _STRUCTS[key] = struct.Struct('{}{}{}'.format(fmt[0], n, fmt[1:]))
+    return st
+
+
+def _as_buffer(data):
+    # the callers pass bytes or a list of the byte values (e.g. ret[1:] of the commands)
+    return data if isinstance(data, (bytes, bytearray, memoryview)) else bytes(data)
+
+
+_FP32_LE = get_struct('<f')
+_FP32_BE = get_struct('>f')
+_INT32_LE = get_struct('<i')
+_INT32_BE = get_struct('>i')
+_U16_BE = get_struct('>H')
+
 
 def fp32_to_bytes(data, is_big_endian=False):
     """小端字节序"""
-    return bytes(struct.pack('>f' if is_big_endian else '<f', data))
+    return (_FP32_BE if is_big_endian else _FP32_LE).pack(data)
 
 
 def int32_to_bytes(data, is_big_endian=False):
     """小端字节序"""
-    return bytes(struct.pack('>i' if is_big_endian else '<i', data))
+    return (_INT32_BE if is_big_endian else _INT32_LE).pack(data)
 
 
 def int32s_to_bytes(data, n):
     """小端字节序"""
     assert n > 0
-    ret = int32_to_bytes(data[0])
-    for i in range(1, n):
-        ret += int32_to_bytes(data[i])
-    return ret
+    return get_struct('<i', n).pack(*data[:n])
+
+
+def int32s_pack_into(buf, offset, data, n):
+    """小端字节序, 写入buf[offset:offset + n * 4]"""
+    get_struct('<i', n).pack_into(buf, offset, *data[:n])
 
 
 def bytes_to_fp32(data):
     """小端字节序"""
-    byte = bytes([data[0]])
-    byte += bytes([data[1]])
-    byte += bytes([data[2]])
-    byte += bytes([data[3]])
-    ret = struct.unpack('<f', byte)
-    return ret[0]
+    return _FP32_LE.unpack_from(_as_buffer(data[:4]))[0]
 
 
 def fp32s_to_bytes(data, n):
     """小端字节序"""
     assert n > 0
-    ret = fp32_to_bytes(data[0])
-    for i in range(1, n):
-        ret += fp32_to_bytes(data[i])
-    return ret
+    return get_struct('<f', n).pack(*data[:n])
+
+
+def fp32s_pack_into(buf, offset, data, n):
+    """小端字节序, 写入buf[offset:offset + n * 4]"""
+    get_struct('<f', n).pack_into(buf, offset, *data[:n])
 
 
 def bytes_to_fp32s(data, n):
     """小端字节序"""
-    ret = [0] * n
-    for i in range(n):
-        ret[i] = bytes_to_fp32(data[i * 4:i * 4 + 4])
-    return ret
+    return list(get_struct('<f', n).unpack_from(_as_buffer(data)))
+
+
+def fp32s_unpack_from(buf, offset, n):
+    """小端字节序, 读取buf[offset:offset + n * 4]"""
+    return list(get_struct('<f', n).unpack_from(buf, offset))
 
 
 def u16_to_bytes(data):
     """大端字节序"""
-    bts = bytes([data // 256 % 256])
-    bts += bytes([data % 256])
-    return bts
+    return _U16_BE.pack(data & 0xFFFF)
 
 
 def u16s_to_bytes(data, num):
     """大端字节序"""
-    bts = b''
-    if num != 0:
-        bts = u16_to_bytes(data[0])
-        for i in range(1, num):
-            bts += u16_to_bytes(data[i])
-    return bts
+    if num == 0:
+        return b''
+    return get_struct('>H', num).pack(*[val & 0xFFFF for val in data[:num]])
+
+
+def u16s_pack_into(buf, offset, data, num):
+    """大端字节序, 写入buf[offset:offset + num * 2]"""
+    get_struct('>H', num).pack_into(buf, offset, *[val & 0xFFFF for val in data[:num]])
 
 
 def bytes_to_u16(data):
@@ -82,18 +109,17 @@ def bytes_to_u16(data):
 
 def bytes_to_u16s(data, n):
     """大端字节序"""
-    ret = [0] * n
-    for i in range(n):
-        ret[i] = bytes_to_u16(data[i * 2: i * 2 + 2])
-    return ret
+    return list(get_struct('>H', n).unpack_from(_as_buffer(data)))
+
+
+def u16s_unpack_from(buf, offset, n):
+    """大端字节序, 读取buf[offset:offset + n * 2]"""
+    return list(get_struct('>H', n).unpack_from(buf, offset))
 
 
 def bytes_to_16s(data, n):
     """大端字节序"""
-    ret = [0] * n
-    for i in range(n):
-        ret[i] = struct.unpack('>h', bytes(data[i * 2: i * 2 + 2]))[0]
-    return ret
+    return list(get_struct('>h', n).unpack_from(_as_buffer(data)))
 
 
 def bytes_to_u32(data):
@@ -108,12 +134,7 @@ def bytes_to_u64(data):
 
 
 def bytes_to_num32(data, fmt='>l'):
-    byte = bytes([data[0]])
-    byte += bytes([data[1]])
-    byte += bytes([data[2]])
-    byte += bytes([data[3]])
-    ret = struct.unpack(fmt, byte)
-    return ret[0]
+    return struct.unpack_from(fmt, _as_buffer(data[:4]))[0]
 
 
 def bytes_to_long_big(data):
@@ -121,4 +142,4 @@ def bytes_to_long_big(data):
     return bytes_to_num32(data, '>l')
 
 def bytes_to_int32(data):
-    return int.from_bytes(data, byteorder='big', signed=True)
\ No newline at end of file
+    return int.from_bytes(data, byteorder='big', signed=True)
@@ -74,3 +74,20 @@ def crc_modbus(data):
     crc += bytes([s % 256])
     return crc
 
+
+def crc_modbus_check(data):
+    """
+    Check the crc of a modbus rtu frame
+    :param data: bytes or list of int, the last 2 bytes are the crc
+    :return: True if the crc is correct
+    """
+    return len(data) > 2 and crc_modbus(data[:-2]) == bytes(data[-2:])
+
+
+def crc_modbus_check_all(datas):
+    """
+    Check the crc of the modbus rtu frames
+    :param datas: [data, ...], see crc_modbus_check
+    :return: [True or False, ...] in the order of the frames
+    """
+    return [crc_modbus_check(data) for data in datas]
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Local kinematics of the arm from the DH parameters of the controller (get_dh_params). Requires numpy.
+The forward/inverse kinematics and the limit checks are computed for arrays of joint vectors/poses at once,
+instead of one controller round trip per pose (get_forward_kinematics, get_inverse_kinematics, is_joint_limit, is_tcp_limit)
+Units: mm and rad, the pose is [x, y, z, roll, pitch, yaw], the rotation is Rz(yaw) * Ry(pitch) * Rx(roll)
+"""
+
+import math
+
+# numpy is imported by the first KinematicsModel, not by the import of the sdk
+np = None
+
+# the order of the 4 parameters of every joint in the dh_params of get_dh_params
+DH_PARAM_ORDER = ('theta', 'd', 'alpha', 'a')
+
+# the joint/tcp limits are checked with the same tolerance as the sdk
+LIMIT_TOLERANCE = math.radians(0.1)
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('numpy is required by KinematicsModel')
+        np = numpy
+
+
+def rpy_to_matrix(rpy):
+    """
+    :param rpy: (N, 3) [roll, pitch, yaw] (rad)
+    :return: (N, 3, 3) rotation matrices
+    """
+    _load_numpy()
+    rpy = np.asarray(rpy, dtype=np.float64).reshape(-1, 3)
+    cr, sr = np.cos(rpy[:, 0]), np.sin(rpy[:, 0])
+    cp, sp = np.cos(rpy[:, 1]), np.sin(rpy[:, 1])
+    cy, sy = np.cos(rpy[:, 2]), np.sin(rpy[:, 2])
+    mat = np.empty((len(rpy), 3, 3))
+    mat[:, 0, 0] = cy * cp
+    mat[:, 0, 1] = cy * sp * sr - sy * cr
+    mat[:, 0, 2] = cy * sp * cr + sy * sr
+    mat[:, 1, 0] = sy * cp
+    mat[:, 1, 1] = sy * sp * sr + cy * cr
+    mat[:, 1, 2] = sy * sp * cr - cy * sr
+    mat[:, 2, 0] = -sp
+    mat[:, 2, 1] = cp * sr
+    mat[:, 2, 2] = cp * cr
+    return mat
+
+
+def matrix_to_rpy(mat):
+    """
+    :param mat: (N, 3, 3) rotation matrices (or (N, 4, 4) transforms)
+    :return: (N, 3) [roll, pitch, yaw] (rad), the yaw is 0 at the singularity (pitch = +-pi/2)
+    """
+    _load_numpy()
+    mat = np.asarray(mat, dtype=np.float64)
+    pitch = np.arcsin(np.clip(-mat[:, 2, 0], -1.0, 1.0))
+    roll = np.arctan2(mat[:, 2, 1], mat[:, 2, 2])
+    yaw = np.arctan2(mat[:, 1, 0], mat[:, 0, 0])
+    singular = np.hypot(mat[:, 2, 1], mat[:, 2, 2]) < 1e-9
+    if singular.any():
+        m = mat[singular]
+        sign = np.where(m[:, 2, 0] < 0, 1.0, -1.0)
+        roll[singular] = np.arctan2(sign * m[:, 0, 1], sign * m[:, 0, 2])
+        yaw[singular] = 0
+    return np.stack([roll, pitch, yaw], axis=1)
+
+
+def pose_to_matrix(poses):
+    """
+    :param poses: (N, 6) [x, y, z, roll, pitch, yaw] (mm, rad)
+    :return: (N, 4, 4) transforms
+    """
+    _load_numpy()
+    poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+    mat = np.zeros((len(poses), 4, 4))
+    mat[:, :3, :3] = rpy_to_matrix(poses[:, 3:6])
+    mat[:, :3, 3] = poses[:, :3]
+    mat[:, 3, 3] = 1
+    return mat
+
+
+def matrix_to_pose(mat):
+    """
+    :param mat: (N, 4, 4) transforms
+    :return: (N, 6) [x, y, z, roll, pitch, yaw] (mm, rad)
+    """
+    _load_numpy()
+    mat = np.asarray(mat, dtype=np.float64)
+    return np.concatenate([mat[:, :3, 3], matrix_to_rpy(mat)], axis=1)
+
+
+def _invert(mat):
+    inv = np.zeros_like(mat)
+    rot_t = np.swapaxes(mat[..., :3, :3], -1, -2)
+    inv[..., :3, :3] = rot_t
+    inv[..., :3, 3] = -np.einsum('...ij,...j->...i', rot_t, mat[..., :3, 3])
+    inv[..., 3, 3] = 1
+    return inv
+
+
+def rotation_vector(target, current):
+    """
+    :param target: (N, 3, 3) rotation matrices
+    :param current: (N, 3, 3) rotation matrices
+    :return: (N, 3) axis-angle vectors (rad) of the rotations from current to target, in the base frame
+    """
+    _load_numpy()
+    err = np.einsum('nij,nkj->nik', target, current)
+    vec = 0.5 * np.stack([err[:, 2, 1] - err[:, 1, 2], err[:, 0, 2] - err[:, 2, 0], err[:, 1, 0] - err[:, 0, 1]], axis=1)
+    sin = np.linalg.norm(vec, axis=1)
+    cos = np.clip((np.trace(err, axis1=1, axis2=2) - 1) * 0.5, -1.0, 1.0)
+    angle = np.arctan2(sin, cos)
+    scale = np.where(sin > 1e-9, angle / np.maximum(sin, 1e-9), 1.0)
+    vec *= scale[:, None]
+    # the rotation of pi, the axis is the column of err + I with the max norm
+    flip = (sin <= 1e-6) & (cos < 0)
+    if flip.any():
+        sym = err[flip] + np.eye(3)
+        cols = np.argmax(np.linalg.norm(sym, axis=1), axis=1)
+        axis = sym[np.arange(len(cols)), :, cols]
+        vec[flip] = axis / np.linalg.norm(axis, axis=1)[:, None] * math.pi
+    return vec
+
+
+def rotation_matrix(vec):
+    """
+    :param vec: (N, 3) axis-angle vectors (rad)
+    :return: (N, 3, 3) rotation matrices
+    """
+    _load_numpy()
+    vec = np.asarray(vec, dtype=np.float64).reshape(-1, 3)
+    angle = np.linalg.norm(vec, axis=1)
+    axis = vec / np.maximum(angle, 1e-12)[:, None]
+    skew = np.zeros((len(vec), 3, 3))
+    skew[:, 0, 1], skew[:, 0, 2], skew[:, 1, 2] = -axis[:, 2], axis[:, 1], -axis[:, 0]
+    skew -= np.swapaxes(skew, 1, 2)
+    sin, cos = np.sin(angle)[:, None, None], np.cos(angle)[:, None, None]
+    return np.eye(3) + sin * skew + (1 - cos) * np.matmul(skew, skew)
+
+
+class KinematicsModel(object):
+    """
+    Forward/inverse kinematics and the limit checks of the arm, vectorized over arrays of joint vectors/poses
+    The poses are in the user coordinate (the world offset applied) of the tcp (the tcp offset applied),
+    the same as the poses of get_position/set_position
+        ex:
+            code, model = arm.get_kinematics_model()
+            poses = model.forward(angles)  # angles: (N, dof), rad
+            angles, ok = model.inverse_path(poses, seed=arm.angles[:arm.axis])
+            out = model.is_joint_limit(angles) | model.is_tcp_limit(poses)
+
+    :param dh_params: the dh parameters (get_dh_params), 4 for every joint in the order of DH_PARAM_ORDER (mm, rad)
+    :param dof: number of the joints, default is len(dh_params) // 4
+    :param convention: 'modified' (Craig, the convention of the controller) or 'standard'
+    :param tcp_offset: [x, y, z, roll, pitch, yaw] (mm, rad) of the tcp in the flange
+    :param world_offset: [x, y, z, roll, pitch, yaw] (mm, rad) of the user coordinate in the base
+    :param joint_limits: [(min, max), ...] (rad) of every joint, None means not limited
+    :param tcp_limits: [(min, max), ...] of x, y, z (mm) and roll, pitch, yaw (rad) in the user coordinate,
+        a range whose min == max is not limited, None means not limited
+    """
+    def __init__(self, dh_params, dof=None, convention='modified', tcp_offset=None, world_offset=None,
+                 joint_limits=None, tcp_limits=None):
+        _load_numpy()
+        assert convention in ('modified', 'standard'), 'convention can only be modified or standard'
+        dof = len(dh_params) // 4 if dof is None else dof
+        assert 0 < dof <= len(dh_params) // 4, 'the number of the dh parameters is not enough for {} joints'.format(dof)
+        params = np.asarray(dh_params[:dof * 4], dtype=np.float64).reshape(dof, 4)
+        self._dof = dof
+        self._convention = convention
+        self._theta_offset = params[:, DH_PARAM_ORDER.index('theta')]
+        self._d = params[:, DH_PARAM_ORDER.index('d')]
+        alpha = params[:, DH_PARAM_ORDER.index('alpha')]
+        a = params[:, DH_PARAM_ORDER.index('a')]
+        # the constant part of every joint: RotX(alpha) * TransX(a)
+        self._links = np.zeros((dof, 4, 4))
+        self._links[:, 0, 0] = 1
+        self._links[:, 1, 1] = self._links[:, 2, 2] = np.cos(alpha)
+        self._links[:, 1, 2] = -np.sin(alpha)
+        self._links[:, 2, 1] = np.sin(alpha)
+        self._links[:, 0, 3] = a
+        self._links[:, 3, 3] = 1
+        self._tcp = pose_to_matrix(tcp_offset if tcp_offset is not None else [0] * 6)[0]
+        self._world = pose_to_matrix(world_offset if world_offset is not None else [0] * 6)[0]
+        self._world_inv = _invert(self._world)
+        self._joint_limits = None
+        if joint_limits is not None:
+            self._joint_limits = np.array([joint_limits[i] if i < len(joint_limits) else (-np.inf, np.inf)
+                                           for i in range(dof)], dtype=np.float64)
+        self._tcp_limits = None
+        if tcp_limits is not None:
+            limits = np.array([tcp_limits[i] if i < len(tcp_limits) else (0, 0) for i in range(6)], dtype=np.float64)
+            free = limits[:, 0] == limits[:, 1]
+            limits[free] = (-np.inf, np.inf)
+            self._tcp_limits = limits
+        # the weight (mm/rad) of the orientation error in the inverse kinematics
+        self._rot_weight = max(float(np.sum(np.abs(a)) + np.sum(np.abs(self._d))) / dof, 1.0)
+
+    @property
+    def dof(self):
+        return self._dof
+
+    @property
+    def convention(self):
+        return self._convention
+
+    @property
+    def joint_limits(self):
+        return None if self._joint_limits is None else self._joint_limits.tolist()
+
+    def _as_angles(self, angles):
+        angles = np.asarray(angles, dtype=np.float64)
+        single = angles.ndim == 1
+        angles = angles.reshape(-1, angles.shape[-1])[:, :self._dof]
+        assert angles.shape[1] == self._dof, 'the joint vectors need {} angles'.format(self._dof)
+        return angles, single
+
+    def _chain(self, angles, with_axes=False):
+        """
+        :param angles: (N, dof)
+        :return: tcp transforms (N, 4, 4) in the base, and the axes (N, dof, 3) and the origins (N, dof, 3) of the joints
+        """
+        n = len(angles)
+        theta = angles + self._theta_offset
+        cos, sin = np.cos(theta), np.sin(theta)
+        mat = np.broadcast_to(np.eye(4), (n, 4, 4)).copy()
+        axes = np.empty((n, self._dof, 3)) if with_axes else None
+        origins = np.empty((n, self._dof, 3)) if with_axes else None
+        modified = self._convention == 'modified'
+        for i in range(self._dof):
+            if modified:
+                mat = np.matmul(mat, self._links[i])
+            if with_axes:
+                axes[:, i] = mat[:, :3, 2]
+                origins[:, i] = mat[:, :3, 3]
+            # mat * RotZ(theta) * TransZ(d)
+            col0, col1 = mat[:, :, 0].copy(), mat[:, :, 1]
+            c, s = cos[:, i:i + 1], sin[:, i:i + 1]
+            mat[:, :, 0] = c * col0 + s * col1
+            mat[:, :, 1] = c * col1 - s * col0
+            mat[:, :, 3] += self._d[i] * mat[:, :, 2]
+            if not modified:
+                mat = np.matmul(mat, self._links[i])
+        return np.matmul(mat, self._tcp), axes, origins
+
+    def forward_matrix(self, angles, base=False):
+        """
+        :param angles: (N, dof) or (dof, ), rad
+        :param base: in the base coordinate instead of the user coordinate
+        :return: (N, 4, 4) transforms of the tcp
+        """
+        angles, _ = self._as_angles(angles)
+        mat = self._chain(angles)[0]
+        return mat if base else np.matmul(self._world_inv, mat)
+
+    def to_base(self, poses):
+        """
+        :param poses: (N, 6) poses in the user coordinate (mm, rad)
+        :return: (N, 4, 4) transforms of the poses in the base coordinate
+        """
+        return np.matmul(self._world, pose_to_matrix(poses))
+
+    def link_points(self, angles):
+        """
+        The origins of the joint frames and the tcp in the base coordinate, the links are the segments between them
+        :param angles: (N, dof), rad
+        :return: (N, dof + 1, 3)
+        """
+        angles, _ = self._as_angles(angles)
+        mat, _, origins = self._chain(angles, with_axes=True)
+        return np.concatenate([origins, mat[:, None, :3, 3]], axis=1)
+
+    def forward(self, angles):
+        """
+        Forward kinematics
+        :param angles: (N, dof) or (dof, ), rad
+        :return: (N, 6) or (6, ) poses [x, y, z, roll, pitch, yaw] (mm, rad)
+        """
+        angles, single = self._as_angles(angles)
+        poses = matrix_to_pose(np.matmul(self._world_inv, self._chain(angles)[0]))
+        return poses[0] if single else poses
+
+    def jacobian(self, angles):
+        """
+        Geometric jacobian of the tcp in the user coordinate
+        :param angles: (N, dof) or (dof, ), rad
+        :return: (N, 6, dof), rows are vx, vy, vz (mm/rad) and wx, wy, wz
+        """
+        angles, single = self._as_angles(angles)
+        mat, axes, origins = self._chain(angles, with_axes=True)
+        jac = self._jacobian(mat, axes, origins)
+        rot = self._world_inv[:3, :3]
+        jac = np.concatenate([np.einsum('ij,njk->nik', rot, jac[:, :3]), np.einsum('ij,njk->nik', rot, jac[:, 3:])], axis=1)
+        return jac[0] if single else jac
+
+    @staticmethod
+    def _jacobian(mat, axes, origins):
+        jac_v = np.cross(axes, mat[:, None, :3, 3] - origins)
+        return np.concatenate([np.swapaxes(jac_v, 1, 2), np.swapaxes(axes, 1, 2)], axis=1)
+
+    def inverse(self, poses, seeds=None, max_iter=100, pos_tol=1e-3, rot_tol=1e-5, damping=1e-3):
+        """
+        Inverse kinematics by damped least squares, all the poses are solved at once
+        :param poses: (N, 6) or (6, ) poses (mm, rad)
+        :param seeds: (N, dof) or (dof, ) the start joint vectors (warm starts), default is all 0,
+            the solution is the one near the seed, the angles are wrapped to the nearest ones of the seeds
+        :param max_iter: max number of the iterations
+        :param pos_tol: position tolerance (mm)
+        :param rot_tol: orientation tolerance (rad)
+        :param damping: damping factor of the least squares, relative to the scale of the arm
+        :return: tuple((angles, ok)), angles (N, dof) or (dof, ), ok (N, ) or bool, whether the pose is reached
+            Note: the joint limits are not checked, see is_joint_limit
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        single = poses.ndim == 1
+        poses = poses.reshape(-1, 6)
+        n = len(poses)
+        if seeds is None:
+            seeds = np.zeros((n, self._dof))
+        else:
+            seeds, _ = self._as_angles(seeds)
+            seeds = np.broadcast_to(seeds, (n, self._dof)) if len(seeds) == 1 else seeds
+        assert len(seeds) == n, 'the number of the seeds is not the same as the number of the poses'
+        target = self.to_base(poses)
+        angles = np.array(seeds, dtype=np.float64)
+        weight = self._rot_weight
+        lam2 = (damping * weight) ** 2
+        ok = np.zeros(n, dtype=bool)
+        active = np.arange(n)
+        for _ in range(max_iter):
+            mat, axes, origins = self._chain(angles[active], with_axes=True)
+            err_p = target[active, :3, 3] - mat[:, :3, 3]
+            err_r = rotation_vector(target[active, :3, :3], mat[:, :3, :3])
+            done = (np.linalg.norm(err_p, axis=1) <= pos_tol) & (np.linalg.norm(err_r, axis=1) <= rot_tol)
+            ok[active[done]] = True
+            if done.all():
+                active = active[:0]
+                break
+            keep = ~done
+            active = active[keep]
+            jac = self._jacobian(mat[keep], axes[keep], origins[keep])
+            jac[:, 3:] *= weight
+            err = np.concatenate([err_p[keep], err_r[keep] * weight], axis=1)
+            jjt = np.matmul(jac, np.swapaxes(jac, 1, 2)) + lam2 * np.eye(6)
+            step = np.einsum('nji,nj->ni', jac, np.linalg.solve(jjt, err[:, :, None])[:, :, 0])
+            # limit the step, the linearization is only valid near the current angles
+            norm = np.max(np.abs(step), axis=1)
+            step *= np.minimum(1.0, 0.5 / np.maximum(norm, 1e-12))[:, None]
+            angles[active] += step
+        angles = seeds + np.remainder(angles - seeds + math.pi, 2 * math.pi) - math.pi
+        return (angles[0], bool(ok[0])) if single else (angles, ok)
+
+    def inverse_path(self, poses, seed=None, **kwargs):
+        """
+        Inverse kinematics of a path, every pose is solved with the solution of the previous one as the seed,
+        so the joint vectors follow the path continuously (no branch flips)
+        :param poses: (N, 6) poses (mm, rad)
+        :param seed: (dof, ) the joint vector of the start (e.g. the current angles), default is all 0
+        :param kwargs: see inverse
+        :return: tuple((angles, ok)), angles (N, dof), ok (N, )
+        """
+        poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+        angles = np.empty((len(poses), self._dof))
+        ok = np.zeros(len(poses), dtype=bool)
+        seed = np.zeros(self._dof) if seed is None else self._as_angles(seed)[0][0]
+        for i in range(len(poses)):
+            sol, ok[i] = self.inverse(poses[i], seeds=seed, **kwargs)
+            angles[i] = sol
+            if ok[i]:
+                seed = sol
+        return angles, ok
+
+    def is_joint_limit(self, angles):
+        """
+        :param angles: (N, dof) or (dof, ), rad
+        :return: (N, ) or bool, True if any joint is out of its limit
+        """
+        angles, single = self._as_angles(angles)
+        if self._joint_limits is None:
+            out = np.zeros(len(angles), dtype=bool)
+        else:
+            out = ((angles < self._joint_limits[:, 0] - LIMIT_TOLERANCE)
+                   | (angles > self._joint_limits[:, 1] + LIMIT_TOLERANCE)).any(axis=1)
+        return bool(out[0]) if single else out
+
+    def is_tcp_limit(self, poses):
+        """
+        :param poses: (N, 6) or (6, ) poses (mm, rad)
+        :return: (N, ) or bool, True if the pose is out of the tcp limits
+            Note: only the limits given to the model, the controller may also check the safety boundary etc.
+        """
+        poses = np.asarray(poses, dtype=np.float64)
+        single = poses.ndim == 1
+        poses = poses.reshape(-1, 6)
+        if self._tcp_limits is None:
+            out = np.zeros(len(poses), dtype=bool)
+        else:
+            tolerance = np.array([0, 0, 0] + [LIMIT_TOLERANCE] * 3)
+            out = ((poses < self._tcp_limits[:, 0] - tolerance) | (poses > self._tcp_limits[:, 1] + tolerance)).any(axis=1)
+        return bool(out[0]) if single else out
+
+    def verify(self, arm, angles):
+        """
+        Compare the model with the controller on the sample joint vectors
+        :param arm: XArm instance (connected)
+        :param angles: (N, dof) sample joint vectors, rad
+        :return: tuple((code, result)), result: {
+                'count': number of the samples compared,
+                'fk_position_error': max position error (mm) of the forward kinematics,
+                'fk_orientation_error': max orientation error (rad) of the forward kinematics,
+                'ik_position_error': max position error (mm) of the local inverse kinematics of the controller poses,
+                'ik_orientation_error': max orientation error (rad) of the same,
+                'joint_limit_mismatch': number of the samples whose is_joint_limit differs from the controller
+            }
+        """
+        angles, _ = self._as_angles(angles)
+        poses = []
+        limits = []
+        for sample in angles:
+            code, pose = arm.get_forward_kinematics(sample.tolist(), input_is_radian=True, return_is_radian=True)
+            if code != 0:
+                return code, None
+            code, limit = arm.is_joint_limit(sample.tolist(), is_radian=True)
+            if code != 0:
+                return code, None
+            poses.append(pose)
+            limits.append(limit)
+        poses = np.array(poses, dtype=np.float64)
+        local = pose_to_matrix(self.forward(angles))
+        remote = pose_to_matrix(poses)
+        solved, _ = self.inverse(poses, seeds=angles)
+        solved = pose_to_matrix(self.forward(solved))
+        result = {
+            'count': len(angles),
+            'fk_position_error': float(np.max(np.linalg.norm(local[:, :3, 3] - remote[:, :3, 3], axis=1))),
+            'fk_orientation_error': float(np.max(np.linalg.norm(rotation_vector(remote[:, :3, :3], local[:, :3, :3]), axis=1))),
+            'ik_position_error': float(np.max(np.linalg.norm(solved[:, :3, 3] - remote[:, :3, 3], axis=1))),
+            'ik_orientation_error': float(np.max(np.linalg.norm(rotation_vector(remote[:, :3, :3], solved[:, :3, :3]), axis=1))),
+            'joint_limit_mismatch': int(np.sum(self.is_joint_limit(angles) != np.array(limits, dtype=bool))),
+        }
+        return 0, result
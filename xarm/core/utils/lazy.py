@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Lazy loading of the optional subsystems (blockly, studio, gcode parser, code maps, numpy, ...)
+The module is imported on the first attribute access instead of the import of the sdk,
+so a short script which only moves the arm does not pay for what it never uses
+"""
+
+import importlib
+
+
+class LazyModule(object):
+    """
+    Proxy of a module, the module is imported on the first attribute access
+        ex: _parse = LazyModule('.parse', __package__)
+            _parse.GcodeParser()  # xarm.x3.parse is imported here
+    :param name: module name, relative to package if it starts with '.'
+    :param package: package of the relative name
+    """
+    __slots__ = ('_lazy_name', '_lazy_package', '_lazy_module')
+
+    def __init__(self, name, package=None):
+        self._lazy_name = name
+        self._lazy_package = package
+        self._lazy_module = None
+
+    def _load(self):
+        module = self._lazy_module
+        if module is None:
+            module = importlib.import_module(self._lazy_name, self._lazy_package)
+            self._lazy_module = module
+        return module
+
+    @property
+    def loaded(self):
+        return self._lazy_module is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return '<LazyModule {}{}>'.format(self._lazy_name, '' if self.loaded else ' (not loaded)')
+
+
+def lazy_attrs(module_globals, attrs):
+    """
+    The module __getattr__ and __dir__ (PEP 562) of a package whose attributes are imported on the first access
+        ex: in xarm/wrapper/__init__.py
+            __getattr__, __dir__ = lazy_attrs(globals(), {'AsyncXArmAPI': '.async_xarm_api'})
+    :param module_globals: globals() of the package, an attribute is kept in it after the first access
+    :param attrs: {attribute name: module name (relative to the package)}
+    :return: tuple((__getattr__, __dir__))
+    """
+    package = module_globals['__name__']
+
+    def __getattr__(name):
+        if name not in attrs:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(package, name))
+        value = getattr(importlib.import_module(attrs[name], package), name)
+        module_globals[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(module_globals) | set(attrs))
+
+    return __getattr__, __dir__
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Validation of a whole path of linear motions before it is sent to the controller. Requires numpy.
+The lines between the waypoints are sampled and all the samples are checked at once with a KinematicsModel:
+reachability (local inverse kinematics), joint limits, tcp limits, the boundary of the reduced mode/fence
+and a coarse self-collision check of the links. The execution time is estimated with trapezoidal velocity profiles
+Units: mm and rad
+"""
+
+import math
+from . import kinematics
+
+np = None
+
+# the links are capsules of this radius (mm) in the self-collision check
+LINK_RADIUS = 40
+# the links closer than this in the chain are not checked against each other, their distance is given by the joints
+MIN_LINK_GAP = 3
+# a joint moving more than this (rad) between two neighbour samples means the line crosses a singularity or changes branch
+MAX_JOINT_JUMP = math.radians(20)
+# the rotation speed (rad/s) and acceleration (rad/s^2) of the tcp orientation in the time estimate,
+# the controller does not report them, the joint speed/acceleration are other quantities
+ROT_SPEED = math.pi / 4
+ROT_ACC = math.pi
+
+VERDICTS = ('unreachable', 'joint_limit', 'tcp_limit', 'out_of_boundary', 'self_collision')
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        kinematics._load_numpy()
+        np = kinematics.np
+
+
+def trapezoid_time(distance, speed, acc):
+    """
+    Time of a motion from rest to rest with a trapezoidal velocity profile
+    :param distance: (N, ) distances
+    :param speed: max speed
+    :param acc: acceleration
+    :return: (N, ) times (s)
+    """
+    _load_numpy()
+    distance = np.abs(np.asarray(distance, dtype=np.float64))
+    if speed <= 0 or acc <= 0:
+        return np.where(distance > 0, np.inf, 0.0)
+    full = distance >= speed * speed / acc
+    return np.where(full, distance / speed + speed / acc, 2 * np.sqrt(distance / acc))
+
+
+def trapezoid_time_at(position, distance, speed, acc):
+    """
+    Time when a trapezoidal motion of the distance passes the positions
+    :param position: (N, ) positions in [0, distance]
+    :return: (N, ) times (s)
+    """
+    _load_numpy()
+    position = np.clip(np.asarray(position, dtype=np.float64), 0, distance)
+    total = float(trapezoid_time([distance], speed, acc)[0])
+    if distance <= 0 or not math.isfinite(total):
+        return np.zeros_like(position) if distance <= 0 else np.full_like(position, np.inf)
+    ramp = min(speed * speed / (2 * acc), distance / 2)
+    return np.where(position <= ramp, np.sqrt(2 * position / acc),
+                    np.where(position >= distance - ramp, total - np.sqrt(2 * np.maximum(distance - position, 0) / acc),
+                             speed / acc + (position - ramp) / speed))
+
+
+def _segment_distance(p1, q1, p2, q2):
+    """Min distances (N, ) between the segments p1q1 and p2q2 (N, 3), the segments are not degenerate"""
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a = np.einsum('ij,ij->i', d1, d1)
+    e = np.einsum('ij,ij->i', d2, d2)
+    b = np.einsum('ij,ij->i', d1, d2)
+    c = np.einsum('ij,ij->i', d1, r)
+    f = np.einsum('ij,ij->i', d2, r)
+    denom = a * e - b * b
+    s = np.where(denom > 1e-9, np.clip((b * f - c * e) / np.maximum(denom, 1e-9), 0, 1), 0)
+    t = (b * s + f) / e
+    s = np.where(t < 0, np.clip(-c / a, 0, 1), np.where(t > 1, np.clip((b - c) / a, 0, 1), s))
+    t = np.clip(t, 0, 1)
+    return np.linalg.norm(p1 + d1 * s[:, None] - p2 - d2 * t[:, None], axis=1)
+
+
+def self_collision(model, angles, link_radius=LINK_RADIUS):
+    """
+    Coarse self-collision check, the links (see KinematicsModel.link_points) are capsules of link_radius,
+    this is not the collision model of the controller, the tool is the segment to the tcp (tcp offset)
+    :param angles: (N, dof), rad
+    :return: (N, ) True if two links not near in the chain intersect
+    """
+    _load_numpy()
+    points = model.link_points(angles)
+    out = np.zeros(len(points), dtype=bool)
+    if link_radius <= 0 or not len(points):
+        return out
+    # the distance between two neighbour joint origins is constant, the zero ones are not links
+    lengths = np.linalg.norm(points[0, 1:] - points[0, :-1], axis=1)
+    links = np.flatnonzero(lengths > 1e-6)
+    for i in range(len(links)):
+        for j in range(i + MIN_LINK_GAP, len(links)):
+            a, b = links[i], links[j]
+            dist = _segment_distance(points[:, a], points[:, a + 1], points[:, b], points[:, b + 1])
+            out |= dist < 2 * link_radius
+    return out
+
+
+def interpolate_line(start, end, step=10, rot_step=math.radians(2)):
+    """
+    Samples of the linear motion from start to end, the position is interpolated linearly,
+    the orientation around the fixed axis of the rotation between them
+    :param start: (6, ) pose, end: (6, ) pose (mm, rad)
+    :param step: max distance (mm) between two samples
+    :param rot_step: max rotation (rad) between two samples
+    :return: (K, 4, 4) transforms of the samples after start, the last one is end
+    """
+    _load_numpy()
+    mats = kinematics.pose_to_matrix([start, end])
+    vec = kinematics.rotation_vector(mats[1:, :3, :3], mats[:1, :3, :3])[0]
+    dist = np.linalg.norm(mats[1, :3, 3] - mats[0, :3, 3])
+    count = max(int(math.ceil(dist / step)), int(math.ceil(np.linalg.norm(vec) / rot_step)), 1)
+    ratio = np.arange(1, count + 1) / count
+    samples = np.zeros((count, 4, 4))
+    samples[:, :3, :3] = np.matmul(kinematics.rotation_matrix(ratio[:, None] * vec), mats[0, :3, :3])
+    samples[:, :3, 3] = mats[0, :3, 3] + ratio[:, None] * (mats[1, :3, 3] - mats[0, :3, 3])
+    samples[:, 3, 3] = 1
+    samples[-1] = mats[1]
+    return samples
+
+
+def _solve(model, poses, seed):
+    """Inverse kinematics of the samples in the order of the path, failed is True if not solved or not continuous"""
+    count = len(poses)
+    # all the samples from the seed at once, the ones not solved or not continuous are solved again from the previous one
+    angles, ok = model.inverse(poses, seeds=np.broadcast_to(seed, (count, model.dof)))
+    # the first sample is the first waypoint, the arm moves to it before the path, only its successors must be continuous
+    jump = np.max(np.abs(angles[1:] - angles[:-1]), axis=1) > MAX_JOINT_JUMP
+    bad = ~ok | np.concatenate([[False], jump])
+    failed = np.zeros(count, dtype=bool)
+    if bad.any():
+        start = int(bad.argmax())
+        prev = seed if start == 0 else angles[start - 1]
+        for k in range(start, count):
+            if k > start and failed[k - 1]:
+                # the path is already broken before, only the first sample of a failed run is solved again
+                failed[k] = not ok[k]
+            elif not ok[k] or (k > 0 and np.max(np.abs(angles[k] - prev)) > MAX_JOINT_JUMP):
+                sol, solved = model.inverse(poses[k], seeds=prev)
+                if solved:
+                    angles[k] = sol
+                failed[k] = not solved or (k > 0 and np.max(np.abs(angles[k] - prev)) > MAX_JOINT_JUMP)
+            if not failed[k]:
+                prev = angles[k]
+    return angles, failed
+
+
+def validate_path(model, poses, seed, radii=None, speed=100, acc=2000, rot_speed=ROT_SPEED, rot_acc=ROT_ACC,
+                  step=10, rot_step=math.radians(2), joint_ranges=None, boundary=None, link_radius=LINK_RADIUS):
+    """
+    Validate the linear motions through the waypoints
+    :param model: KinematicsModel
+    :param poses: (M, 6) waypoints in the user coordinate (mm, rad)
+    :param seed: (dof, ) joint vector (rad) at the first waypoint, or near it
+    :param radii: (M, ) blending radius at every waypoint, > 0 means the motion does not stop at the waypoint
+    :param speed: max tcp speed (mm/s), acc: tcp acceleration (mm/s^2)
+    :param rot_speed: max rotation speed (rad/s), rot_acc: rotation acceleration (rad/s^2)
+    :param step: max distance (mm) between two samples of a line, rot_step: max rotation (rad) between them
+    :param joint_ranges: [(min, max), ...] (rad), extra joint ranges (e.g. of the reduced mode), None means not used
+    :param boundary: [x_max, x_min, y_max, y_min, z_max, z_min] (mm) in the base coordinate, an axis whose max == min is not limited
+    :param link_radius: radius (mm) of the links in the self-collision check, 0 means not checked
+    :return: dict {
+            'unreachable', 'joint_limit', 'tcp_limit', 'out_of_boundary', 'self_collision': (M, ), True if the check failed
+                on the waypoint or on the line to it (tcp_limit is only checked on the waypoints, like set_position),
+            'ok': (M, ), True if all the checks passed,
+            'angles': (M, dof) joint vectors at the waypoints,
+            'times': (M, ) estimated times (s) when the waypoints are reached, from the start of the first motion,
+            'duration': estimated total time (s),
+        }
+    """
+    _load_numpy()
+    poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+    count = len(poses)
+    seed = np.asarray(seed, dtype=np.float64)[:model.dof]
+    # the samples, owner is the index of the waypoint every sample belongs to
+    mats = [kinematics.pose_to_matrix(poses[:1])]
+    for i in range(1, count):
+        mats.append(interpolate_line(poses[i - 1], poses[i], step=step, rot_step=rot_step))
+    owner = np.concatenate([np.full(len(m), i) for i, m in enumerate(mats)])
+    ends = np.cumsum([len(m) for m in mats]) - 1
+    mats = np.concatenate(mats)
+    samples = kinematics.matrix_to_pose(mats)
+
+    angles, unreachable = _solve(model, samples, seed)
+    joint_limit = model.is_joint_limit(angles)
+    if joint_ranges is not None:
+        ranges = np.array([joint_ranges[i] if i < len(joint_ranges) else (-np.inf, np.inf) for i in range(model.dof)])
+        joint_limit |= ((angles < ranges[:, 0] - kinematics.LIMIT_TOLERANCE) | (angles > ranges[:, 1] + kinematics.LIMIT_TOLERANCE)).any(axis=1)
+    joint_limit &= ~unreachable
+    out_of_boundary = np.zeros(len(samples), dtype=bool)
+    if boundary is not None:
+        pos = model.to_base(samples)[:, :3, 3]
+        for axis in range(3):
+            hi, lo = max(boundary[axis * 2:axis * 2 + 2]), min(boundary[axis * 2:axis * 2 + 2])
+            if hi != lo:
+                out_of_boundary |= (pos[:, axis] > hi) | (pos[:, axis] < lo)
+    collision = self_collision(model, angles, link_radius) & ~unreachable
+
+    def per_waypoint(values):
+        ret = np.zeros(count, dtype=bool)
+        np.logical_or.at(ret, owner, values)
+        return ret
+
+    result = {
+        'unreachable': per_waypoint(unreachable),
+        'joint_limit': per_waypoint(joint_limit),
+        'tcp_limit': model.is_tcp_limit(poses),
+        'out_of_boundary': per_waypoint(out_of_boundary),
+        'self_collision': per_waypoint(collision),
+    }
+    result['ok'] = ~np.any([result[name] for name in VERDICTS], axis=0)
+    result['angles'] = angles[ends]
+    result['times'], result['duration'] = estimate_times(poses, radii, speed, acc, rot_speed, rot_acc)
+    return result
+
+
+def estimate_times(poses, radii=None, speed=100, acc=2000, rot_speed=ROT_SPEED, rot_acc=ROT_ACC):
+    """
+    Estimate the times of the linear motions through the waypoints, a motion stops at a waypoint unless its radius > 0,
+    the waypoints blended together are one trapezoidal profile over their total length
+    :return: tuple((times, duration)), times (M, ) when the waypoints are reached, duration is the total time (s)
+    """
+    _load_numpy()
+    poses = np.asarray(poses, dtype=np.float64).reshape(-1, 6)
+    count = len(poses)
+    times = np.zeros(count)
+    if count < 2:
+        return times, 0.0
+    mats = kinematics.pose_to_matrix(poses)
+    dists = np.linalg.norm(mats[1:, :3, 3] - mats[:-1, :3, 3], axis=1)
+    rots = np.linalg.norm(kinematics.rotation_vector(mats[1:, :3, :3], mats[:-1, :3, :3]), axis=1)
+    radii = np.zeros(count) if radii is None else np.asarray(radii, dtype=np.float64)
+    start = 0
+    elapsed = 0.0
+    # the segment i is the motion from the waypoint i to i + 1
+    for i in range(count - 1):
+        if i < count - 2 and radii[i + 1] > 0:
+            continue
+        lin_pos = np.concatenate([[0], np.cumsum(dists[start:i + 1])])
+        rot_pos = np.concatenate([[0], np.cumsum(rots[start:i + 1])])
+        lin_time = float(trapezoid_time([lin_pos[-1]], speed, acc)[0])
+        rot_time = float(trapezoid_time([rot_pos[-1]], rot_speed, rot_acc)[0])
+        if lin_time >= rot_time:
+            run = trapezoid_time_at(lin_pos, lin_pos[-1], speed, acc)
+        else:
+            run = trapezoid_time_at(rot_pos, rot_pos[-1], rot_speed, rot_acc)
+        times[start:i + 2] = elapsed + run
+        elapsed = times[i + 1]
+        start = i + 1
+    return times, float(elapsed)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+
+
+class PeriodicThread(object):
+    """
+    Base of the monitors which do some work every interval in a background thread
+    The works are scheduled on absolute times, a slow one does not shift the next ones
+    (if it takes longer than the interval, the next one starts at once)
+    The subclass implements _tick (one work) and may implement _wakeup (wake its waiters when stopping)
+    :param interval: seconds between the works
+    :param min_interval: the interval is not less than it
+    """
+    def __init__(self, interval, min_interval=0.01):
+        self._interval = max(interval, min_interval)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self._wakeup()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _tick(self):
+        raise NotImplementedError
+
+    def _wakeup(self):
+        pass
+
+    def _run(self):
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            self._tick()
+            next_time += self._interval
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now
+            self._stop_event.wait(next_time - now)
+        self._wakeup()
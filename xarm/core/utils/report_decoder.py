@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2020, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Table driven decoders for the report frames (normal/rich/real and the old protocol)
+Every layout is split into a few segments, each segment is a precompiled struct.Struct,
+so a frame is unpacked with one unpack_from per segment instead of one struct call per value
+"""
+
+import struct
+
+
+class ReportSegment(object):
+    """
+    A contiguous block of a report frame with a single byte order
+    :param start: offset of the block in the frame
+    :param byte_order: '<' or '>'
+    :param fields: [(name, code, count), ...], name is None for the ignored field,
+        code is the struct format character, 's' is read as one bytes item, 'x' is padding
+    :param min_length: the block is decoded only if the frame length >= min_length, default is the end of the block
+    """
+    __slots__ = ('start', 'end', 'min_length', 'struct', 'fields', 'defaults')
+
+    def __init__(self, start, byte_order, fields, min_length=None):
+        fmt = byte_order
+        self.fields = []
+        self.defaults = []
+        index = 0
+        for name, code, count in fields:
+            fmt += '{}{}'.format(count, code) if count > 1 else code
+            if code == 'x':
+                continue
+            size = 1 if code == 's' else count
+            if name is not None:
+                self.fields.append((name, index, index + size, code == 's' or count == 1))
+            self.defaults.append((name, size, b'' if code == 's' else 0 if size == 1 else [0] * size))
+            index += size
+        self.struct = struct.Struct(fmt)
+        self.start = start
+        self.end = start + self.struct.size
+        self.min_length = self.end if min_length is None else min_length
+
+
+class ReportDecoder(object):
+    def __init__(self, name, segments):
+        self.name = name
+        self.segments = sorted(segments, key=lambda seg: seg.min_length)
+        self.fields = [field[0] for seg in self.segments for field in seg.fields]
+        self.segment_of = {field[0]: seg for seg in self.segments for field in seg.fields}
+
+    @staticmethod
+    def decode_segment(seg, data, into):
+        values = seg.struct.unpack_from(data, seg.start)
+        for name, start, stop, is_scalar in seg.fields:
+            into[name] = values[start] if is_scalar else list(values[start:stop])
+
+    def decode(self, data, length=None, into=None):
+        """
+        Decode the report frame
+        :param data: bytes/bytearray/memoryview of the whole frame
+        :param length: the valid length of data, default is len(data)
+        :param into: dict to fill in, default is a new dict
+        :return: dict, {field_name: value}, value is a list if the field has more than one item
+        """
+        length = len(data) if length is None else length
+        ret = {} if into is None else into
+        for seg in self.segments:
+            if seg.min_length > length:
+                break
+            self.decode_segment(seg, data, ret)
+        return ret
+
+    def view(self, data, length=None):
+        """
+        Lazy decoding of the report frame, see ReportView
+        :param data: bytes of the whole frame, must not be modified while the view is in use
+        :param length: the valid length of data, default is len(data)
+        :return: ReportView
+        """
+        return ReportView(self, data, len(data) if length is None else length)
+
+    def encode_into(self, buf, fields, length=None):
+        """
+        Inverse of decode, pack the fields into the frame buffer (used by the simulator and the tests)
+        :param buf: writable buffer (bytearray/memoryview) of the whole frame
+        :param fields: {field_name: value}, the missing fields are packed as 0
+        :param length: the frame length, default is len(buf)
+        """
+        length = len(buf) if length is None else length
+        for seg in self.segments:
+            if seg.min_length > length:
+                break
+            values = []
+            for name, size, default in seg.defaults:
+                value = default if name is None else fields.get(name, default)
+                if isinstance(default, list):
+                    values.extend(value[:size])
+                else:
+                    values.append(value)
+            seg.struct.pack_into(buf, seg.start, *values)
+        return buf
+
+
+class ReportView(dict):
+    """
+    Lazy mapping over a report frame, a field is decoded on its first access (together with the other
+    fields of its segment) and cached for the frame, the fields never accessed are never decoded
+    Same keys and values as ReportDecoder.decode, a field beyond the frame length is missing
+    Note: the decoded fields are the dict items, so the cached access is a plain dict lookup
+    """
+    __slots__ = ('decoder', 'data', 'length')
+
+    def __init__(self, decoder, data, length):
+        super(ReportView, self).__init__()
+        self.decoder = decoder
+        self.data = data
+        self.length = length
+
+    def __missing__(self, name):
+        seg = self.decoder.segment_of.get(name)
+        if seg is None or seg.min_length > self.length:
+            raise KeyError(name)
+        self.decoder.decode_segment(seg, self.data, self)
+        return dict.__getitem__(self, name)
+
+    def __contains__(self, name):
+        seg = self.decoder.segment_of.get(name)
+        return seg is not None and seg.min_length <= self.length
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        """Decode all the fields of the frame"""
+        return self.decoder.decode(self.data, self.length)
+
+
+# common header of the new protocol, state(low 4 bits) and mode(high 4 bits) share one byte
+_HEADER_SEGMENT = ReportSegment(0, '>', [('length', 'I', 1), ('state_mode', 'B', 1), ('cmd_num', 'H', 1)])
+
+_NORMAL_SEGMENTS = [
+    _HEADER_SEGMENT,
+    ReportSegment(7, '<', [
+        ('angles', 'f', 7), ('pose', 'f', 6), ('torque', 'f', 7),
+        ('mtbrake', 'B', 1), ('mtable', 'B', 1), ('error_code', 'B', 1), ('warn_code', 'B', 1),
+        ('pose_offset', 'f', 6), ('tcp_load', 'f', 4), ('collis_sens', 'B', 1), ('teach_sens', 'B', 1),
+        ('gravity_direction', 'f', 3),
+    ]),
+]
+
+_RICH_SEGMENTS = _NORMAL_SEGMENTS + [
+    ReportSegment(145, '<', [
+        ('arm_type', 'B', 1), ('arm_axis', 'B', 1), ('master_id', 'B', 1), ('slave_id', 'B', 1),
+        ('motor_tid', 'B', 1), ('motor_fid', 'B', 1), ('version', 's', 29), (None, 'x', 1),
+        ('trs_msg', 'f', 5), ('p2p_msg', 'f', 5), ('rot_msg', 'f', 2),
+    ]),
+    ReportSegment(229, '<', [('servo_codes', 'B', 16)]),
+    ReportSegment(245, '<', [('temperatures', 'b', 7)]),
+    ReportSegment(252, '<', [('speeds', 'f', 8)]),
+    ReportSegment(284, '>', [('count', 'I', 1)]),
+    ReportSegment(288, '<', [('world_offset', 'f', 6)]),
+    ReportSegment(312, '<', [('cgpio_reset_enable', 'B', 1), ('tgpio_reset_enable', 'B', 1)]),
+    ReportSegment(314, '<', [
+        ('is_simulation_robot', 'B', 1), ('is_collision_detection', 'B', 1), ('collision_tool_type', 'B', 1),
+        ('collision_tool_params', 'f', 6)
+    ], min_length=417),
+    ReportSegment(341, '>', [('voltages', 'H', 7)], min_length=417),
+    ReportSegment(355, '<', [('currents', 'f', 7), ('cgpio_head', 'B', 2)], min_length=417),
+    ReportSegment(385, '>', [('cgpio_values', 'H', 8)], min_length=417),
+    ReportSegment(401, '<', [('cgpio_input_conf', 'B', 8), ('cgpio_output_conf', 'B', 8)], min_length=417),
+    ReportSegment(417, '<', [('cgpio_input_conf2', 'B', 8), ('cgpio_output_conf2', 'B', 8)]),
+    ReportSegment(433, '<', [('ft_ext_force', 'f', 6), ('ft_raw_force', 'f', 6)]),
+    ReportSegment(481, '<', [('iden_progress', 'B', 1)]),
+    ReportSegment(482, '<', [('pose_aa', 'f', 3)]),
+    ReportSegment(494, '<', [('mode_flags', 'B', 1)]),
+    ReportSegment(495, '<', [('reduced_mode_is_on', 'B', 1)]),
+    ReportSegment(496, '>', [('reduced_tcp_boundary', 'h', 6)]),
+]
+
+_REAL_SEGMENTS = [
+    _HEADER_SEGMENT,
+    ReportSegment(7, '<', [('angles', 'f', 7), ('pose', 'f', 6), ('torque', 'f', 7)]),
+    ReportSegment(87, '<', [('ft_ext_force', 'f', 6), ('ft_raw_force', 'f', 6)]),
+]
+
+_NORMAL_OLD_SEGMENTS = [
+    ReportSegment(0, '>', [
+        ('length', 'I', 1), ('state', 'B', 1), ('mtbrake', 'B', 1), ('mtable', 'B', 1),
+        ('error_code', 'B', 1), ('warn_code', 'B', 1)
+    ]),
+    ReportSegment(9, '<', [('angles', 'f', 7), ('pose', 'f', 6)]),
+    ReportSegment(61, '>', [('cmd_num', 'H', 1)]),
+    ReportSegment(63, '<', [('pose_offset', 'f', 6)]),
+]
+
+_RICH_OLD_SEGMENTS = _NORMAL_OLD_SEGMENTS + [
+    ReportSegment(87, '<', [
+        ('arm_type', 'B', 1), ('arm_axis', 'B', 1), ('master_id', 'B', 1), ('slave_id', 'B', 1),
+        ('motor_tid', 'B', 1), ('motor_fid', 'B', 1), ('version', 's', 29), (None, 'x', 1),
+        ('trs_msg', 'f', 5), ('p2p_msg', 'f', 5), ('rot_msg', 'f', 2),
+    ]),
+    ReportSegment(171, '>', [('sv3_msg', 'H', 8)]),
+]
+
+REPORT_DECODERS = {
+    'normal': ReportDecoder('normal', _NORMAL_SEGMENTS),
+    'rich': ReportDecoder('rich', _RICH_SEGMENTS),
+    'real': ReportDecoder('real', _REAL_SEGMENTS),
+    'normal_old': ReportDecoder('normal_old', _NORMAL_OLD_SEGMENTS),
+    'rich_old': ReportDecoder('rich_old', _RICH_OLD_SEGMENTS),
+}
+
+
+def get_report_decoder(report_type, is_old_protocol=False):
+    if report_type != 'real' and is_old_protocol:
+        return REPORT_DECODERS['{}_old'.format('rich' if report_type == 'rich' else 'normal')]
+    return REPORT_DECODERS.get(report_type, REPORT_DECODERS['normal'])
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Fixed-capacity history of the reported robot state, used to look up the state of the robot at a given time
+(e.g. the pose when a camera frame was captured). Requires numpy.
+"""
+
+import math
+import threading
+
+# numpy is imported by the first StateHistory, not by the import of the sdk
+np = None
+STATE_HISTORY_DTYPE = None
+
+
+def _load_numpy():
+    global np, STATE_HISTORY_DTYPE
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('numpy is required by StateHistory')
+        STATE_HISTORY_DTYPE = numpy.dtype([
+            ('time', numpy.float64),  # host time.monotonic() when the report was received
+            ('pose', numpy.float64, (6,)),  # [x(mm), y(mm), z(mm), roll(rad), pitch(rad), yaw(rad)]
+            ('angles', numpy.float64, (7,)),  # rad
+            ('tcp_speed', numpy.float64),  # mm/s
+            ('joint_speeds', numpy.float64, (7,)),  # rad/s
+            ('torques', numpy.float64, (7,)),
+        ])
+        np = numpy
+
+
+class StateHistory(object):
+    """
+    Ring buffer of the reported states, the storage is allocated once in the constructor,
+    appending never allocates, so it is safe to fill at any report rate
+    :param capacity: max number of the states kept, the oldest state is overwritten if full
+    """
+    def __init__(self, capacity):
+        _load_numpy()
+        self._capacity = max(int(capacity), 2)
+        self._buf = np.zeros(self._capacity, dtype=STATE_HISTORY_DTYPE)
+        self._times = self._buf['time']
+        self._head = 0  # index of the next write
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._size = 0
+
+    def append(self, t, pose, angles, tcp_speed=0, joint_speeds=None, torques=None):
+        """
+        Add a state, the time must not be earlier than the last one
+        """
+        with self._lock:
+            row = self._buf[self._head]
+            row['time'] = t
+            row['pose'] = pose[:6]
+            row['angles'] = angles[:7]
+            row['tcp_speed'] = tcp_speed
+            if joint_speeds is not None:
+                row['joint_speeds'] = joint_speeds[:7]
+            if torques is not None:
+                row['torques'] = torques[:7]
+            self._head = (self._head + 1) % self._capacity
+            self._size = min(self._size + 1, self._capacity)
+
+    def _segments(self):
+        # the buffer in time order as at most two slices of the storage: [(start, stop), ...]
+        if self._size < self._capacity:
+            return [(0, self._size)]
+        return [(self._head, self._capacity), (0, self._head)]
+
+    def _search(self, t, side):
+        # number of the states (in time order) whose time < t (side='left') or <= t (side='right')
+        count = 0
+        for start, stop in self._segments():
+            n = int(np.searchsorted(self._times[start:stop], t, side=side))
+            count += n
+            if n < stop - start:
+                break
+        return count
+
+    def _index(self, i):
+        # storage index of the i-th state in time order
+        return (self._head - self._size + i) % self._capacity
+
+    @property
+    def time_range(self):
+        """
+        (oldest time, latest time), None if empty
+        """
+        with self._lock:
+            if self._size == 0:
+                return None
+            return float(self._times[self._index(0)]), float(self._times[self._index(self._size - 1)])
+
+    def latest(self):
+        """
+        Copy of the latest state (structured numpy record), None if empty
+        """
+        with self._lock:
+            if self._size == 0:
+                return None
+            return self._buf[self._index(self._size - 1)].copy()
+
+    def states_between(self, t0, t1):
+        """
+        States received in [t0, t1]
+        :return: structured numpy array (copy) in time order, fields: time/pose/angles/tcp_speed/joint_speeds/torques
+        """
+        with self._lock:
+            i0 = self._search(t0, 'left')
+            i1 = self._search(t1, 'right')
+            if i1 <= i0:
+                return np.zeros(0, dtype=STATE_HISTORY_DTYPE)
+            idx = (self._head - self._size + np.arange(i0, i1)) % self._capacity
+            return self._buf[idx]
+
+    def state_at(self, t, interpolate=True):
+        """
+        State of the robot at time t, linearly interpolated between the two neighbouring reports
+        (roll/pitch/yaw are interpolated along the shortest path)
+        :param t: host time.monotonic()
+        :param interpolate: interpolate or return the nearest report
+        :return: structured numpy record (copy), None if t is out of the time range of the history
+        """
+        with self._lock:
+            if self._size == 0:
+                return None
+            i = self._search(t, 'left')
+            if i >= self._size:
+                if t > self._times[self._index(self._size - 1)]:
+                    return None
+                i = self._size - 1
+            after = self._buf[self._index(i)]
+            if after['time'] == t:
+                return after.copy()
+            if i == 0:
+                return None
+            before = self._buf[self._index(i - 1)]
+            t0, t1 = before['time'], after['time']
+            if not interpolate:
+                return (before if t - t0 <= t1 - t else after).copy()
+            ratio = (t - t0) / (t1 - t0) if t1 > t0 else 0
+            state = before.copy()
+            state['time'] = t
+            for name in ('pose', 'angles', 'tcp_speed', 'joint_speeds', 'torques'):
+                state[name] = before[name] + (after[name] - before[name]) * ratio
+            rpy_diff = (after['pose'][3:6] - before['pose'][3:6] + math.pi) % (2 * math.pi) - math.pi
+            rpy = before['pose'][3:6] + rpy_diff * ratio
+            state['pose'][3:6] = (rpy + math.pi) % (2 * math.pi) - math.pi
+            return state
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+
+def percentiles(values, scale=1000.0):
+    """
+    Summary of the times, used by the statistics of the servo streamer and the fleet
+    :param values: times (s)
+    :param scale: the times are multiplied by it, default is 1000 (ms)
+    :return: {'mean', 'p50', 'p90', 'p99', 'max'}, all 0 if no values
+    """
+    if not values:
+        return {'mean': 0, 'p50': 0, 'p90': 0, 'p99': 0, 'max': 0}
+    values = sorted(values)
+    n = len(values)
+    return {
+        'mean': sum(values) / n * scale,
+        'p50': values[int((n - 1) * 0.5)] * scale,
+        'p90': values[int((n - 1) * 0.9)] * scale,
+        'p99': values[int((n - 1) * 0.99)] * scale,
+        'max': values[-1] * scale,
+    }
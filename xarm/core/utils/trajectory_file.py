@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Trajectories captured by the sdk from the report stream, stored in a columnar binary file. Requires numpy.
+Layout of the file:
+    fixed header: magic (4s), format version (u16), reserved (u16), size of the metadata (u64), offset of the data (u64)
+    metadata: utf-8 json, {'count', 'rate', 'axis', 'device_type', ..., 'columns': [{'name', 'dtype', 'shape', 'offset'}, ...]}
+    data: the columns one after another, every column is contiguous and starts at a multiple of 64 bytes
+The columns are opened memory-mapped, opening and seeking do not read the file
+"""
+
+import os
+import json
+import math
+import struct
+import threading
+
+np = None
+
+MAGIC = b'XTRJ'
+FORMAT_VERSION = 1
+_FIXED_HEADER = struct.Struct('<4sHHQQ')
+_ALIGN = 64
+
+# name: (number of values, dtype), the values are float32 like the commands and reports of the controller
+TRAJECTORY_FIELDS = {
+    'pose': (6, 'float32'),  # [x(mm), y(mm), z(mm), roll(rad), pitch(rad), yaw(rad)]
+    'angles': (7, 'float32'),  # rad
+    'tcp_speed': (1, 'float32'),  # mm/s
+    'joint_speeds': (7, 'float32'),  # rad/s
+    'torques': (7, 'float32'),
+}
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('numpy is required by the trajectory files')
+        np = numpy
+
+
+def _aligned(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_trajectory(filename, columns, meta=None):
+    """
+    Write a trajectory file, the file is written to a temporary file first and then renamed
+    :param filename: path of the file
+    :param columns: {name: array}, 'time' (seconds from the start, float64) is required, the others have the same length
+    :param meta: dict, extra metadata (e.g. rate, robot model), json serializable
+    :return: number of the rows
+    """
+    _load_numpy()
+    assert 'time' in columns, 'the column time is required'
+    count = len(columns['time'])
+    arrays = []
+    layout = []
+    offset = 0
+    for name, values in columns.items():
+        dtype = 'float64' if name == 'time' else TRAJECTORY_FIELDS.get(name, (0, 'float32'))[1]
+        array = np.ascontiguousarray(values, dtype=dtype)
+        assert len(array) == count, 'the column {} has {} rows, not {}'.format(name, len(array), count)
+        arrays.append(array)
+        layout.append({'name': name, 'dtype': array.dtype.str, 'shape': list(array.shape[1:]), 'offset': offset})
+        offset = _aligned(offset + array.nbytes)
+    info = dict(meta or {})
+    info.update({'count': count, 'columns': layout})
+    data = json.dumps(info).encode('utf-8')
+    data_offset = _aligned(_FIXED_HEADER.size + len(data))
+    tmp_filename = '{}.tmp'.format(filename)
+    with open(tmp_filename, 'wb') as f:
+        f.write(_FIXED_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(data), data_offset))
+        f.write(data)
+        for array, column in zip(arrays, layout):
+            f.seek(data_offset + column['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_offset + offset)
+    os.replace(tmp_filename, filename)
+    return count
+
+
+class TrajectoryFile(object):
+    """
+    A trajectory file opened memory-mapped (read only), the columns are numpy views of the file
+        ex:
+            traj = TrajectoryFile('pick.xtrj')
+            print(traj.count, traj.duration, traj.rate, traj.meta['device_type'])
+            angles = traj['angles'][traj.index_at(10.0):]  # from the 10th second, nothing is read before the access
+            setpoints = traj.resample('angles', rate=250)  # for the replay at a fixed rate
+    :param filename: path of the file
+    """
+    def __init__(self, filename):
+        _load_numpy()
+        self._filename = filename
+        self._mm = np.memmap(filename, dtype=np.uint8, mode='r')
+        if len(self._mm) < _FIXED_HEADER.size:
+            raise ValueError('{} is not a trajectory file'.format(filename))
+        magic, version, _, meta_size, data_offset = _FIXED_HEADER.unpack(bytes(self._mm[:_FIXED_HEADER.size]))
+        if magic != MAGIC:
+            raise ValueError('{} is not a trajectory file'.format(filename))
+        if version > FORMAT_VERSION:
+            raise ValueError('the format version {} of {} is not supported'.format(version, filename))
+        self._meta = json.loads(bytes(self._mm[_FIXED_HEADER.size:_FIXED_HEADER.size + meta_size]).decode('utf-8'))
+        self._count = self._meta['count']
+        self._columns = {}
+        for column in self._meta['columns']:
+            self._columns[column['name']] = np.ndarray(
+                shape=(self._count, ) + tuple(column['shape']), dtype=np.dtype(column['dtype']),
+                buffer=self._mm, offset=data_offset + column['offset'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def close(self):
+        self._columns = {}
+        self._mm = None
+
+    @property
+    def filename(self):
+        return self._filename
+
+    @property
+    def meta(self):
+        return self._meta
+
+    @property
+    def fields(self):
+        return tuple(name for name in self._columns if name != 'time')
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def times(self):
+        return self._columns['time']
+
+    @property
+    def duration(self):
+        return float(self.times[-1] - self.times[0]) if self._count > 1 else 0.0
+
+    @property
+    def rate(self):
+        """Rate (Hz) of the captured reports"""
+        rate = self._meta.get('rate')
+        if rate:
+            return rate
+        return (self._count - 1) / self.duration if self.duration > 0 else 0
+
+    def index_at(self, t):
+        """
+        :param t: seconds from the start
+        :return: index of the first row at or after t
+        """
+        return int(np.searchsorted(self.times, self.times[0] + t, side='left')) if self._count else 0
+
+    def slice(self, start=0, end=None):
+        """
+        Rows in [start, end] (seconds from the start), views of the file
+        :return: {name: array}
+        """
+        i0 = self.index_at(start)
+        i1 = self._count if end is None else int(np.searchsorted(self.times, self.times[0] + end, side='right'))
+        return {name: values[i0:i1] for name, values in self._columns.items()}
+
+    def resample(self, name, rate=None, start=0, end=None):
+        """
+        Values of a column at a fixed rate, linearly interpolated between the captured rows
+        (roll/pitch/yaw of the pose are interpolated along the shortest path)
+        :param name: column name, e.g. 'angles' or 'pose'
+        :param rate: rate (Hz), default is the rate of the file
+        :param start: seconds from the start, end: seconds from the start, default is the end of the file
+            raise ValueError if start is out of the trajectory or after end
+        :return: numpy array (float64), one row per 1/rate seconds from start
+        """
+        rate = rate or self.rate
+        assert rate > 0 and self._count > 1, 'the trajectory is too short to resample'
+        # only the rows in [start, end] are read from the file
+        t0 = float(self.times[0])
+        end = self.duration if end is None else min(end, self.duration)
+        if start < 0 or start > end:
+            raise ValueError('the range [{}, {}] is out of the trajectory (0 ~ {:.3f}s)'.format(start, end, self.duration))
+        ticks = start + np.arange(int(math.floor((end - start) * rate + 1e-9)) + 1) / float(rate)
+        i0 = max(int(np.searchsorted(self.times, t0 + start, side='right')) - 1, 0)
+        i1 = min(int(np.searchsorted(self.times, t0 + end, side='left')) + 1, self._count)
+        times = self.times[i0:i1] - t0
+        values = np.asarray(self._columns[name][i0:i1], dtype=np.float64)
+        if values.ndim == 1:
+            return np.interp(ticks, times, values)
+        if name == 'pose':
+            values = values.copy()
+            values[:, 3:6] = np.unwrap(values[:, 3:6], axis=0)
+        ret = np.stack([np.interp(ticks, times, values[:, i]) for i in range(values.shape[1])], axis=1)
+        if name == 'pose':
+            ret[:, 3:6] = (ret[:, 3:6] + math.pi) % (2 * math.pi) - math.pi
+        return ret
+
+
+class TrajectoryCapture(object):
+    """
+    Capture of the reported states, the rows are kept in chunks allocated every chunk_size rows,
+    appending only copies the values, so it is safe at any report rate
+    :param fields: names of TRAJECTORY_FIELDS to capture, the time is always captured
+    :param max_duration: max seconds from the first row, the rows after it are dropped, None means not limited
+    :param meta: dict, metadata saved in the file (e.g. the robot model)
+    :param chunk_size: rows of every chunk
+    """
+    def __init__(self, fields=('pose', 'angles'), max_duration=None, meta=None, chunk_size=4096):
+        _load_numpy()
+        for name in fields:
+            assert name in TRAJECTORY_FIELDS, 'field {} is not one of {}'.format(name, tuple(TRAJECTORY_FIELDS))
+        self._fields = tuple(fields)
+        self._max_duration = max_duration
+        self._meta = dict(meta or {})
+        self._chunk_size = max(int(chunk_size), 16)
+        self._first_time = None
+        self._chunks = []
+        self._chunk = None
+        self._pos = 0
+        self._count = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    @property
+    def fields(self):
+        return self._fields
+
+    @property
+    def meta(self):
+        return self._meta
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def dropped(self):
+        return self._dropped
+
+    def _empty_chunk(self, rows):
+        chunk = {'time': np.empty(rows, dtype=np.float64)}
+        for name in self._fields:
+            size, dtype = TRAJECTORY_FIELDS[name]
+            chunk[name] = np.empty(rows if size == 1 else (rows, size), dtype=dtype)
+        return chunk
+
+    def _new_chunk(self):
+        chunk = self._empty_chunk(self._chunk_size)
+        self._chunks.append(chunk)
+        self._pos = 0
+        return chunk
+
+    def append(self, t, pose, angles, tcp_speed=0, joint_speeds=None, torques=None):
+        """
+        Add a reported state
+        :param t: host time.monotonic() when the report was received
+        """
+        with self._lock:
+            if self._first_time is None:
+                self._first_time = t
+            elif self._max_duration is not None and t - self._first_time > self._max_duration:
+                self._dropped += 1
+                return
+            chunk = self._chunk
+            if chunk is None or self._pos >= self._chunk_size:
+                chunk = self._chunk = self._new_chunk()
+            i = self._pos
+            chunk['time'][i] = t
+            for name in self._fields:
+                if name == 'pose':
+                    chunk[name][i] = pose[:6]
+                elif name == 'angles':
+                    chunk[name][i] = angles[:7]
+                elif name == 'tcp_speed':
+                    chunk[name][i] = tcp_speed
+                elif name == 'joint_speeds':
+                    chunk[name][i] = joint_speeds[:7] if joint_speeds is not None else 0
+                elif name == 'torques':
+                    chunk[name][i] = torques[:7] if torques is not None else 0
+            self._pos += 1
+            self._count += 1
+
+    def columns(self):
+        """
+        The captured rows, the time is in seconds from the first row
+        :return: {name: array}
+        """
+        with self._lock:
+            if not self._chunks:
+                # nothing captured yet, zero-length columns (the chunks are only allocated by append)
+                return self._empty_chunk(0)
+            columns = {}
+            for name in ('time', ) + self._fields:
+                parts = [chunk[name] for chunk in self._chunks[:-1]]
+                parts.append(self._chunks[-1][name][:self._pos])
+                columns[name] = np.concatenate(parts)
+        if len(columns['time']):
+            columns['time'] = columns['time'] - columns['time'][0]
+        return columns
+
+    def save(self, filename, meta=None):
+        """
+        Write the captured rows to a trajectory file
+        :param meta: dict, extra metadata of the file, added to the metadata of the capture
+        :return: number of the rows
+        """
+        columns = self.columns()
+        info = dict(self._meta)
+        info.update(meta or {})
+        times = columns['time']
+        if len(times) > 1 and times[-1] > 0:
+            info.setdefault('rate', (len(times) - 1) / float(times[-1]))
+        return write_trajectory(filename, columns, info)
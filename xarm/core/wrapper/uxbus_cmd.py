@@ -23,6 +23,18 @@ def lock_require(func):
     return decorator
 
 
+def pipeline_require(func):
+    """
+    For the requests without side effects (getters), they only need the pipeline lock,
+    which is the same as the lock, unless the transport allows more than one request in flight
+    """
+    @functools.wraps(func)
+    def decorator(*args, **kwargs):
+        with args[0].pipeline_lock:
+            return func(*args, **kwargs)
+    return decorator
+
+
 class UxbusCmd(object):
     BAUDRATES = (4800, 9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600,
                  1000000, 1500000, 2000000, 2500000)
@@ -36,6 +48,7 @@ class UxbusCmd(object):
         self._cmd_num = 0
         self._debug = False
         self.lock = threading.Lock()
+        self.pipeline_lock = self.lock
         self._G_TOUT = XCONF.UxbusConf.GET_TIMEOUT / 1000
         self._S_TOUT = XCONF.UxbusConf.SET_TIMEOUT / 1000
         self._last_comm_time = time.monotonic()
@@ -55,6 +68,10 @@ class UxbusCmd(object):
     def _get_trans_id(self):
         return 0
 
+    def _trans_id_in_use(self, trans_id):
+        # a request sent with this transaction id is still waiting for its response (pipelined transports only)
+        return False
+
     def set_timeout(self, timeout):
         try:
             if isinstance(timeout, (tuple, list)):
@@ -89,7 +106,7 @@ class UxbusCmd(object):
         trans_id = self._get_trans_id()
         if feedback_key and self._set_feedback_key_tranid:
             self._set_feedback_key_tranid(feedback_key, trans_id, self._feedback_type)
-        ret = self.send_modbus_request(funcode, datas, num)
+        ret = self.send_modbus_request(funcode, datas, num, t_id=trans_id)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP]
         ret = self.recv_modbus_response(funcode, ret, 0, self._S_TOUT if timeout is None else timeout)
@@ -104,7 +121,7 @@ class UxbusCmd(object):
             return [XCONF.UxbusState.ERR_NOTTCP]
         return self.recv_modbus_response(funcode, ret, num_get, self._S_TOUT)
 
-    @lock_require
+    @pipeline_require
     def get_nu8(self, funcode, num):
         ret = self.send_modbus_request(funcode, 0, 0)
         if ret == -1:
@@ -124,7 +141,7 @@ class UxbusCmd(object):
         ret = self.recv_modbus_response(funcode, ret, 0, self._S_TOUT)
         return ret
 
-    @lock_require
+    @pipeline_require
     def get_nu16(self, funcode, num):
         ret = self.send_modbus_request(funcode, 0, 0)
         if ret == -1:
@@ -145,7 +162,7 @@ class UxbusCmd(object):
         if feedback_key and self._set_feedback_key_tranid:
             self._set_feedback_key_tranid(feedback_key, trans_id, self._feedback_type)
         hexdata = convert.fp32s_to_bytes(datas, num)
-        ret = self.send_modbus_request(funcode, hexdata, num * 4)
+        ret = self.send_modbus_request(funcode, hexdata, num * 4, t_id=trans_id)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP]
         ret = self.recv_modbus_response(funcode, ret, 0, self._S_TOUT)
@@ -164,7 +181,7 @@ class UxbusCmd(object):
             self._set_feedback_key_tranid(feedback_key, trans_id, self._feedback_type)
         hexdata = convert.fp32s_to_bytes(datas, num)
         hexdata += additional_bytes
-        ret = self.send_modbus_request(funcode, hexdata, num * 4 + len(additional_bytes))
+        ret = self.send_modbus_request(funcode, hexdata, num * 4 + len(additional_bytes), t_id=trans_id)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP]
         ret = self.recv_modbus_response(funcode, ret, rx_len, self._S_TOUT if timeout is None else timeout)
@@ -182,7 +199,7 @@ class UxbusCmd(object):
         if feedback_key and self._set_feedback_key_tranid:
             self._set_feedback_key_tranid(feedback_key, trans_id, self._feedback_type)
         hexdata = convert.int32s_to_bytes(datas, num)
-        ret = self.send_modbus_request(funcode, hexdata, num * 4)
+        ret = self.send_modbus_request(funcode, hexdata, num * 4, t_id=trans_id)
         if ret == -1:
             return [XCONF.UxbusState.ERR_NOTTCP]
         ret = self.recv_modbus_response(funcode, ret, 0, self._S_TOUT)
@@ -190,7 +207,7 @@ class UxbusCmd(object):
             self._set_feedback_type_no_lock(self._feedback_type)
         return ret
 
-    @lock_require
+    @pipeline_require
     def get_nfp32(self, funcode, num, timeout=None):
         ret = self.send_modbus_request(funcode, 0, 0)
         if ret == -1:
@@ -201,7 +218,7 @@ class UxbusCmd(object):
         data[1:num+1] = convert.bytes_to_fp32s(ret[1:num * 4 + 1], num)
         return data
 
-    @lock_require
+    @pipeline_require
     def get_nfp32_with_datas(self, funcode, datas, num_send, num_get, timeout=None):
         ret = self.send_modbus_request(funcode, datas, num_send)
         if ret == -1:
@@ -212,7 +229,7 @@ class UxbusCmd(object):
         data[1:num_get + 1] = convert.bytes_to_fp32s(ret[1:num_get * 4 + 1], num_get)
         return data
 
-    @lock_require
+    @pipeline_require
     def swop_nfp32(self, funcode, datas, txn, rxn):
         hexdata = convert.fp32s_to_bytes(datas, txn)
         ret = self.send_modbus_request(funcode, hexdata, txn * 4)
@@ -224,7 +241,7 @@ class UxbusCmd(object):
         data[1:rxn+1] = convert.bytes_to_fp32s(ret[1:rxn * 4 + 1], rxn)
         return data
 
-    @lock_require
+    @pipeline_require
     def is_nfp32(self, funcode, datas, txn):
         hexdata = convert.fp32s_to_bytes(datas, txn)
         ret = self.send_modbus_request(funcode, hexdata, txn * 4)
@@ -700,7 +717,7 @@ class UxbusCmd(object):
         ret = self.recv_modbus_response(XCONF.UxbusReg.TGPIO_W16B, ret, 0, self._G_TOUT)
         return ret
 
-    @lock_require
+    @pipeline_require
     def tgpio_addr_r16(self, addr, bid=XCONF.TGPIO_HOST_ID, fmt='>l'):
         txdata = bytes([bid])
         txdata += convert.u16_to_bytes(addr)
@@ -723,7 +740,7 @@ class UxbusCmd(object):
         ret = self.recv_modbus_response(XCONF.UxbusReg.TGPIO_W32B, ret, 0, self._G_TOUT)
         return ret
 
-    @lock_require
+    @pipeline_require
     def tgpio_addr_r32(self, addr, bid=XCONF.TGPIO_HOST_ID, fmt='>l'):
         txdata = bytes([bid])
         txdata += convert.u16_to_bytes(addr)
@@ -806,12 +823,18 @@ class UxbusCmd(object):
 
     @lock_require
     def tgpio_set_modbus(self, modbus_t, len_t, host_id=XCONF.TGPIO_HOST_ID, limit_sec=0.0, is_transparent_transmission=False):
-        txdata = bytes([host_id])
-        txdata += bytes(modbus_t)
+        return self._tgpio_set_modbus(modbus_t, len_t, host_id=host_id, limit_sec=limit_sec, is_transparent_transmission=is_transparent_transmission)
+
+    def _wait_modbus_interval(self, limit_sec):
         if limit_sec > 0:
             diff_time = time.monotonic() - self._last_modbus_comm_time
             if diff_time < limit_sec:
                 time.sleep(limit_sec - diff_time)
+
+    def _tgpio_set_modbus(self, modbus_t, len_t, host_id=XCONF.TGPIO_HOST_ID, limit_sec=0.0, is_transparent_transmission=False):
+        txdata = bytes([host_id])
+        txdata += bytes(modbus_t)
+        self._wait_modbus_interval(limit_sec)
         ret = self.send_modbus_request(XCONF.UxbusReg.TGPIO_COM_DATA if is_transparent_transmission else XCONF.UxbusReg.TGPIO_MODBUS, txdata, len_t + 1)
         if ret == -1:
             self._last_modbus_comm_time = time.monotonic()
@@ -821,6 +844,29 @@ class UxbusCmd(object):
         self._last_modbus_comm_time = time.monotonic()
         return ret
 
+    @lock_require
+    def tgpio_set_modbus_batch(self, modbus_list, host_id=XCONF.TGPIO_HOST_ID, limit_sec=0.0, is_transparent_transmission=False):
+        """
+        Send the modbus frames and wait for their responses, holding the command lock for the whole batch.
+        If the port is pipelined and limit_sec is 0, the frames are sent back to back in one write (no spacing between them),
+        else they are sent one at a time like tgpio_set_modbus, every frame at least limit_sec after the previous communication
+        :param modbus_list: [modbus_t, ...], modbus_t is the same as the one of tgpio_set_modbus
+        :param limit_sec: min interval (s) between two modbus communications of the tool
+        :return: [ret, ...] in the order of the frames, ret is the same as the one of tgpio_set_modbus
+        """
+        funcode = XCONF.UxbusReg.TGPIO_COM_DATA if is_transparent_transmission else XCONF.UxbusReg.TGPIO_MODBUS
+        send_batch = getattr(self, 'send_batch', None) if limit_sec <= 0 else None
+        trans_ids = send_batch([(funcode, bytes([host_id]) + bytes(modbus_t)) for modbus_t in modbus_list]) if send_batch is not None else None
+        if trans_ids is None:
+            return [self._tgpio_set_modbus(modbus_t, len(modbus_t), host_id=host_id, limit_sec=limit_sec,
+                                           is_transparent_transmission=is_transparent_transmission) for modbus_t in modbus_list]
+        if trans_ids == -1:
+            rets = [[XCONF.UxbusState.ERR_NOTTCP] * (7 + 1) for _ in modbus_list]
+        else:
+            rets = self.recv_batch([funcode] * len(trans_ids), trans_ids, [-1] * len(trans_ids), self._G_TOUT)
+        self._last_modbus_comm_time = time.monotonic()
+        return rets
+
     @lock_require
     def tgpio_delay_set_digital(self, ionum, on_off, delay_sec):
         txdata = bytes([ionum, on_off])
@@ -1378,6 +1424,9 @@ class UxbusCmd(object):
             # datas length error
             return [-2]
         trans_id = int('{}{}'.format(datas[0], datas[1]), base=16)
+        if self._trans_id_in_use(trans_id):
+            # transaction id error, a pipelined request with the same id is waiting for its response
+            return [XCONF.UxbusState.ERR_NUM]
         prot_id = int('{}{}'.format(datas[2], datas[3]), base=16)
         if prot_id not in [0, 2, 3]:
             # protocol_identifier error, only support 0/2/3, 
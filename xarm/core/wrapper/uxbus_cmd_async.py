@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Private Modbus TCP protocol (the same framing as UxbusCmdTcp) and the report protocol on asyncio streams
+"""
+
+import time
+import struct
+import asyncio
+from ..utils import convert
+from ..utils.log import logger
+from ..utils.report_decoder import get_report_decoder
+from ..config.x_config import XCONF
+
+PRIVATE_MODBUS_TCP_PROTOCOL = 0x02
+TRANSACTION_ID_MAX = 65535
+
+_HEADER = struct.Struct('>HHHB')
+
+
+class AsyncUxbusCmdTcp(object):
+    """
+    The command connection, several requests can be in flight at the same time (up to max_inflight),
+    the responses are matched to the requests by the transaction id in the receive task.
+    The return values of the commands are the same as UxbusCmdTcp, ret[0] is the code
+    """
+    def __init__(self, max_inflight=4):
+        self._reader = None
+        self._writer = None
+        self._recv_task = None
+        self._pending = {}
+        self._max_inflight = max(int(max_inflight), 1)
+        self._inflight_sem = None
+        self._transaction_id = 1
+        self._protocol_identifier = PRIVATE_MODBUS_TCP_PROTOCOL
+        self._state_is_ready = False
+        self._has_err_warn = False
+        self._G_TOUT = XCONF.UxbusConf.GET_TIMEOUT / 1000
+        self._S_TOUT = XCONF.UxbusConf.SET_TIMEOUT / 1000
+        self._last_comm_time = time.monotonic()
+        self.feedback_callback = None
+
+    @property
+    def connected(self):
+        return self._writer is not None and self._recv_task is not None and not self._recv_task.done()
+
+    @property
+    def state_is_ready(self):
+        return self._state_is_ready
+
+    @property
+    def has_err_warn(self):
+        return self._has_err_warn
+
+    @property
+    def last_comm_time(self):
+        return self._last_comm_time
+
+    def set_timeout(self, timeout):
+        if isinstance(timeout, (int, float)) and timeout > 0:
+            self._S_TOUT = self._G_TOUT = timeout
+        return self._S_TOUT
+
+    async def connect(self, host, port=XCONF.SocketConf.TCP_CONTROL_PORT, timeout=3):
+        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        self._inflight_sem = asyncio.Semaphore(self._max_inflight)
+        self._recv_task = asyncio.ensure_future(self._recv_loop())
+        logger.info('async main-socket connect {} success'.format(host))
+
+    async def close(self):
+        if self._recv_task is not None:
+            self._recv_task.cancel()
+            try:
+                await self._recv_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._recv_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._reader = None
+
+    async def _recv_loop(self):
+        try:
+            while True:
+                data = await self._reader.readexactly(6)
+                data += await self._reader.readexactly(convert.bytes_to_u16(data[4:6]))
+                self._last_comm_time = time.monotonic()
+                if data[6] == 0xFF:
+                    if self.feedback_callback:
+                        self.feedback_callback(data)
+                    continue
+                future = self._pending.get(convert.bytes_to_u16(data[0:2]))
+                if future is not None and not future.done():
+                    future.set_result(data)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError) as e:
+            logger.error('[async main-socket] recv error: {}'.format(e))
+        finally:
+            # wake up the waiting requests, None means the connection is closed
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_result(None)
+
+    def check_private_protocol(self, data):
+        state = data[7]
+        self._state_is_ready = not (state & 0x10)
+        if state & 0x08:
+            return XCONF.UxbusState.INVALID
+        if state & 0x40:
+            self._has_err_warn = True
+            return XCONF.UxbusState.ERR_CODE
+        if state & 0x20:
+            self._has_err_warn = True
+            return XCONF.UxbusState.WAR_CODE
+        self._has_err_warn = False
+        return 0
+
+    async def request(self, funcode, pdu, num, timeout):
+        """
+        Send a request and wait for its response
+        :param funcode: register (function code)
+        :param pdu: bytes of the parameters
+        :param num: number of the bytes expected in the response
+        :param timeout: timeout(s)
+        :return: [code, byte1, byte2, ...]
+        """
+        ret = [0] * (num + 1)
+        if not self.connected:
+            ret[0] = XCONF.UxbusState.ERR_NOTTCP
+            return ret
+        async with self._inflight_sem:
+            trans_id = self._transaction_id
+            self._transaction_id = self._transaction_id % TRANSACTION_ID_MAX + 1
+            future = asyncio.get_event_loop().create_future()
+            self._pending[trans_id] = future
+            try:
+                self._writer.write(_HEADER.pack(trans_id, self._protocol_identifier, len(pdu) + 1, funcode) + pdu)
+                await self._writer.drain()
+                data = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                ret[0] = XCONF.UxbusState.ERR_TOUT
+                return ret
+            except (ConnectionError, OSError):
+                ret[0] = XCONF.UxbusState.ERR_NOTTCP
+                return ret
+            finally:
+                self._pending.pop(trans_id, None)
+        if data is None:
+            ret[0] = XCONF.UxbusState.ERR_NOTTCP
+            return ret
+        if convert.bytes_to_u16(data[2:4]) != self._protocol_identifier:
+            ret[0] = XCONF.UxbusState.ERR_PROT
+            return ret
+        if data[6] != funcode:
+            ret[0] = XCONF.UxbusState.ERR_FUN
+            return ret
+        ret[0] = self.check_private_protocol(data)
+        length = min(num, len(data) - 8)
+        ret[1:length + 1] = data[8:8 + length]
+        return ret
+
+    async def set_nu8(self, funcode, datas, num, timeout=None):
+        return await self.request(funcode, bytes(datas[:num]) if num > 0 else b'', 0, self._S_TOUT if timeout is None else timeout)
+
+    async def get_nu8(self, funcode, num):
+        return await self.request(funcode, b'', num, self._G_TOUT)
+
+    async def get_nu16(self, funcode, num):
+        ret = await self.request(funcode, b'', num * 2, self._G_TOUT)
+        return [ret[0]] + convert.bytes_to_u16s(ret[1:num * 2 + 1], num)
+
+    async def set_nfp32(self, funcode, datas, num, timeout=None):
+        return await self.request(funcode, convert.fp32s_to_bytes(datas, num), 0, self._S_TOUT if timeout is None else timeout)
+
+    async def get_nfp32(self, funcode, num):
+        ret = await self.request(funcode, b'', num * 4, self._G_TOUT)
+        return [ret[0]] + convert.bytes_to_fp32s(ret[1:num * 4 + 1], num)
+
+    async def swop_nfp32(self, funcode, datas, txn, rxn):
+        ret = await self.request(funcode, convert.fp32s_to_bytes(datas, txn), rxn * 4, self._G_TOUT)
+        return [ret[0]] + convert.bytes_to_fp32s(ret[1:rxn * 4 + 1], rxn)
+
+    async def get_version(self):
+        return await self.get_nu8(XCONF.UxbusReg.GET_VERSION, 40)
+
+    async def motion_en(self, axis_id, enable):
+        return await self.set_nu8(XCONF.UxbusReg.MOTION_EN, [axis_id, int(enable)], 2, timeout=max(self._S_TOUT, 5))
+
+    async def set_state(self, value):
+        return await self.set_nu8(XCONF.UxbusReg.SET_STATE, [value], 1)
+
+    async def get_state(self):
+        return await self.get_nu8(XCONF.UxbusReg.GET_STATE, 1)
+
+    async def set_mode(self, mode):
+        return await self.set_nu8(XCONF.UxbusReg.SET_MODE, [mode], 1)
+
+    async def get_cmdnum(self):
+        return await self.get_nu16(XCONF.UxbusReg.GET_CMDNUM, 1)
+
+    async def get_err_code(self):
+        return await self.get_nu8(XCONF.UxbusReg.GET_ERROR, 2)
+
+    async def clean_err(self):
+        return await self.set_nu8(XCONF.UxbusReg.CLEAN_ERR, [], 0)
+
+    async def clean_war(self):
+        return await self.set_nu8(XCONF.UxbusReg.CLEAN_WAR, [], 0)
+
+    async def get_tcp_pose(self):
+        return await self.get_nfp32(XCONF.UxbusReg.GET_TCP_POSE, 6)
+
+    async def get_joint_pos(self):
+        return await self.get_nfp32(XCONF.UxbusReg.GET_JOINT_POS, 7)
+
+    async def get_fk(self, angles):
+        return await self.swop_nfp32(XCONF.UxbusReg.GET_FK, angles, 7, 6)
+
+    async def get_ik(self, pose):
+        return await self.swop_nfp32(XCONF.UxbusReg.GET_IK, pose, 6, 7)
+
+    async def move_line(self, mvpose, mvvelo, mvacc, mvtime):
+        return await self.set_nfp32(XCONF.UxbusReg.MOVE_LINE, list(mvpose[:6]) + [mvvelo, mvacc, mvtime], 9)
+
+    async def move_joint(self, mvjoint, mvvelo, mvacc, mvtime):
+        return await self.set_nfp32(XCONF.UxbusReg.MOVE_JOINT, list(mvjoint[:7]) + [mvvelo, mvacc, mvtime], 10)
+
+    async def move_gohome(self, mvvelo, mvacc, mvtime):
+        return await self.set_nfp32(XCONF.UxbusReg.MOVE_HOME, [mvvelo, mvacc, mvtime], 3)
+
+    async def move_servoj(self, mvjoint, mvvelo, mvacc, mvtime):
+        return await self.set_nfp32(XCONF.UxbusReg.MOVE_SERVOJ, list(mvjoint[:7]) + [mvvelo, mvacc, mvtime], 10)
+
+    async def move_servo_cartesian(self, mvpose, mvvelo, mvacc, mvtime):
+        return await self.set_nfp32(XCONF.UxbusReg.MOVE_SERVO_CART, list(mvpose[:6]) + [mvvelo, mvacc, mvtime], 9)
+
+    async def sleep_instruction(self, sltime):
+        return await self.set_nfp32(XCONF.UxbusReg.SLEEP_INSTT, [sltime], 1)
+
+
+class AsyncReportStream(object):
+    """
+    The report connection, every frame is decoded with the precompiled report decoders
+    """
+    def __init__(self, report_type='rich'):
+        self._report_type = report_type
+        self._decoder = get_report_decoder(report_type)
+        self._reader = None
+        self._writer = None
+
+    @property
+    def connected(self):
+        return self._reader is not None
+
+    async def connect(self, host, port=None, timeout=3):
+        if port is None:
+            port = {
+                'normal': XCONF.SocketConf.TCP_REPORT_NORM_PORT,
+                'real': XCONF.SocketConf.TCP_REPORT_REAL_PORT,
+            }.get(self._report_type, XCONF.SocketConf.TCP_REPORT_RICH_PORT)
+        self._reader, self._writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        logger.info('async report-socket connect {} success'.format(host))
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+    async def frames(self):
+        """
+        Async iterator over the raw report frames
+        The first 4 bytes of a frame is the frame size, except that the old firmware
+        reports 233 in the 245 bytes rich frame, the size is confirmed by the next frame
+        """
+        reader = self._reader
+        head = await reader.readexactly(4)
+        size = convert.bytes_to_u32(head)
+        if size == 233:
+            data = head + await reader.readexactly(229)
+            head = await reader.readexactly(4)
+            if convert.bytes_to_u32(head) != 233:
+                data += head + await reader.readexactly(8)
+                size = 245
+                head = b''
+            yield data
+        else:
+            head += await reader.readexactly(size - 4)
+            yield head
+            head = b''
+        while True:
+            data = head + await reader.readexactly(size - len(head))
+            head = b''
+            length = convert.bytes_to_u32(data[0:4])
+            if length != size and not (size == 245 and length == 233):
+                raise ValueError('report data error, length={}, size={}'.format(length, size))
+            yield data
+
+    def decode(self, data):
+        report = self._decoder.decode(data)
+        if 'state_mode' in report:
+            report['state'] = report['state_mode'] & 0x0F
+            report['mode'] = report['state_mode'] >> 4
+        return report
@@ -10,7 +10,10 @@
 
 import time
 import struct
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from ..utils import convert
+from ..utils.log import logger
 from .uxbus_cmd import UxbusCmd, lock_require
 from ..config.x_config import XCONF
 
@@ -18,6 +21,8 @@ STANDARD_MODBUS_TCP_PROTOCOL = 0x00
 PRIVATE_MODBUS_TCP_PROTOCOL = 0x02
 TRANSACTION_ID_MAX = 65535    # cmd序号 最大值
 
+_HEADER = struct.Struct('>HHHB')
+
 
 def debug_log_datas(datas, label=''):
     print('{}:'.format(label), end=' ')
@@ -28,14 +33,34 @@ def debug_log_datas(datas, label=''):
     print()
 
 
+class _NoLock(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
 class UxbusCmdTcp(UxbusCmd):
-    def __init__(self, arm_port, set_feedback_key_tranid=None):
+    def __init__(self, arm_port, set_feedback_key_tranid=None, max_inflight=XCONF.UxbusConf.MAX_INFLIGHT):
         super(UxbusCmdTcp, self).__init__(set_feedback_key_tranid=set_feedback_key_tranid)
         self.arm_port = arm_port
         self._has_err_warn = False
         self._last_comm_time = time.monotonic()
         self._transaction_id = 1
         self._protocol_identifier = PRIVATE_MODBUS_TCP_PROTOCOL
+        # pending requests: {trans_id: future}, the futures are resolved by the receive thread
+        self._pending = {}
+        # {trans_id: inflight_sem} of the requests holding a slot of the in-flight window,
+        # a slot is released when the response arrives or the wait for it ends, whichever is first
+        self._slots = {}
+        self._send_lock = threading.Lock()
+        self._max_inflight = 1
+        self._inflight_sem = threading.BoundedSemaphore(1)
+        self._pipelined = hasattr(arm_port, 'set_rx_dispatch')
+        if self._pipelined:
+            arm_port.set_rx_dispatch(self._dispatch_response)
+        self.set_max_inflight(max_inflight)
 
     @property
     def has_err_warn(self):
@@ -55,8 +80,62 @@ class UxbusCmdTcp(UxbusCmd):
     def get_protocol_identifier(self):
         return self._protocol_identifier
     
+    @property
+    def max_inflight(self):
+        return self._max_inflight
+
+    def set_max_inflight(self, max_inflight):
+        """
+        Set the in-flight window, the max number of requests waiting for their responses at the same time
+        Only the getters are pipelined, the commands with side effects are still serialized by the lock,
+        the frames of send_batch are sent as the window allows
+        :param max_inflight: >= 1, 1 means one request at a time (the default)
+        """
+        max_inflight = max(int(max_inflight), 1) if self._pipelined else 1
+        self._max_inflight = max_inflight
+        self._inflight_sem = threading.BoundedSemaphore(max_inflight)
+        self.pipeline_lock = _NoLock() if max_inflight > 1 else self.lock
+        return 0
+
+    def _next_trans_id(self):
+        # called with the send lock held, the ids still pending (e.g. set by send_hex_cmd) are skipped
+        trans_id = self._transaction_id
+        while trans_id in self._pending:
+            trans_id = trans_id % TRANSACTION_ID_MAX + 1
+        self._transaction_id = trans_id % TRANSACTION_ID_MAX + 1
+        return trans_id
+
     def _get_trans_id(self):
-        return self._transaction_id
+        # reserve a transaction id, the caller sends its request with it (t_id),
+        # so the pipelined requests from other threads can not take it
+        with self._send_lock:
+            return self._next_trans_id()
+
+    def _trans_id_in_use(self, trans_id):
+        return trans_id in self._pending
+
+    def _release_slot(self, trans_id):
+        # pop is atomic, the slot is released once even if the response and the timeout of the wait race
+        inflight_sem = self._slots.pop(trans_id, None)
+        if inflight_sem is not None:
+            inflight_sem.release()
+
+    def _dispatch_response(self, data):
+        if len(data) < 8:
+            return False
+        trans_id = (data[0] << 8) | data[1]
+        future = self._pending.get(trans_id)
+        if future is None or future.done():
+            # a late response (its wait timed out), the response of the heartbeat or an unexpected one,
+            # logged like the frames skipped by the receive loop of the unpipelined connection
+            if self._debug:
+                debug_log_datas(data, label='recv(unmatched)')
+            if trans_id != 0:
+                logger.debug('drop unmatched response, trans_id={}, funcode={}'.format(trans_id, data[6]))
+            return False
+        future.set_result(data)
+        self._release_slot(trans_id)
+        return True
 
     def check_protocol_header(self, data, t_trans_id, t_prot_id, t_unit_id):
         trans_id = convert.bytes_to_u16(data[0:2])
@@ -88,28 +167,109 @@ class UxbusCmdTcp(UxbusCmd):
         return 0
     
     def send_modbus_request(self, unit_id, pdu_data, pdu_len, prot_id=-1, t_id=None):
-        trans_id = self._transaction_id if t_id is None else t_id
         prot_id = self._protocol_identifier if prot_id < 0 else prot_id
-        send_data = convert.u16_to_bytes(trans_id)
-        send_data += convert.u16_to_bytes(prot_id)
-        send_data += convert.u16_to_bytes(pdu_len + 1)
-        send_data += bytes([unit_id])
+        pdu = convert.u16_to_bytes(prot_id)
+        pdu += convert.u16_to_bytes(pdu_len + 1)
+        pdu += bytes([unit_id])
         for i in range(pdu_len):
-            send_data += bytes([pdu_data[i]])
-        self.arm_port.flush()
-        if self._debug:
-            debug_log_datas(send_data, label='send({})'.format(unit_id))
-        ret = self.arm_port.write(send_data)
+            pdu += bytes([pdu_data[i]])
+        inflight_sem = self._inflight_sem
+        # wait for a free slot of the in-flight window, no slot within the command timeout means the responses stopped
+        if self._pipelined and not inflight_sem.acquire(timeout=self._S_TOUT):
+            return -1
+        with self._send_lock:
+            if t_id is not None and self._pipelined and t_id in self._pending:
+                # the response could not be told from the one of the pending request
+                inflight_sem.release()
+                return -1
+            trans_id = t_id if t_id is not None else self._next_trans_id()
+            send_data = convert.u16_to_bytes(trans_id) + pdu
+            if self._pipelined:
+                self._pending[trans_id] = Future()
+                self._slots[trans_id] = inflight_sem
+            else:
+                self.arm_port.flush()
+            if self._debug:
+                debug_log_datas(send_data, label='send({})'.format(unit_id))
+            ret = self.arm_port.write(send_data)
         if ret != 0:
+            if self._pipelined:
+                self._pending.pop(trans_id, None)
+                self._release_slot(trans_id)
             return -1
-        if t_id is None:
-            self._transaction_id = self._transaction_id % TRANSACTION_ID_MAX + 1
         return trans_id
-    
-    def recv_modbus_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
-        prot_id = self._protocol_identifier if t_prot_id < 0 else t_prot_id
-        ret = [0] * 320 if num == -1 else [0] * (num + 1)
-        ret[0] = XCONF.UxbusState.ERR_TOUT
+
+    def send_batch(self, requests, window=None):
+        """
+        Send several requests with as few writes as the in-flight window allows, the responses are matched to
+        the requests by the transaction ids. Every request takes a slot of the window: the free slots are filled
+        in one write, then the next requests wait for the responses of the ones in flight (within the command
+        timeout), so a batch larger than the window is sent while its first responses arrive
+        :param requests: [(funcode, pdu_data), ...]
+        :param window: size of an own in-flight window of the batch, None means the window of the getters (max_inflight),
+            e.g. the motion commands are limited by the command buffer of the controller instead
+        :return: the transaction ids of the requests, -1 if a write failed or no slot was free within the timeout,
+            None if not supported by the port
+        """
+        if not self._pipelined:
+            return None
+        prot_id = self._protocol_identifier
+        inflight_sem = self._inflight_sem if window is None else threading.BoundedSemaphore(max(int(window), 1))
+        expired = time.monotonic() + self._S_TOUT
+        trans_ids = []
+        index = 0
+        while index < len(requests):
+            if not inflight_sem.acquire(timeout=max(expired - time.monotonic(), 0)):
+                break
+            count = 1
+            while index + count < len(requests) and inflight_sem.acquire(blocking=False):
+                count += 1
+            frames = []
+            with self._send_lock:
+                for funcode, pdu_data in requests[index:index + count]:
+                    trans_id = self._next_trans_id()
+                    frames.append(_HEADER.pack(trans_id, prot_id, len(pdu_data) + 1, funcode))
+                    frames.append(pdu_data)
+                    self._pending[trans_id] = Future()
+                    self._slots[trans_id] = inflight_sem
+                    trans_ids.append(trans_id)
+                send_data = b''.join(frames)
+                if self._debug:
+                    debug_log_datas(send_data, label='send(batch)')
+                ret = self.arm_port.write(send_data)
+            if ret != 0:
+                break
+            index += count
+        if index < len(requests):
+            # the responses of the requests already sent are discarded when they arrive
+            for trans_id in trans_ids:
+                self._pending.pop(trans_id, None)
+                self._release_slot(trans_id)
+            return -1
+        return trans_ids
+
+    def recv_batch(self, funcodes, trans_ids, rx_lens, timeout):
+        """
+        Wait for the responses of the requests sent by send_batch
+        :return: [ret, ...], ret is the same as the one of recv_modbus_response
+        """
+        expired = time.monotonic() + timeout
+        return [self.recv_modbus_response(funcode, trans_id, rx_len, max(expired - time.monotonic(), 0.001))
+                for funcode, trans_id, rx_len in zip(funcodes, trans_ids, rx_lens)]
+
+    def _wait_response(self, t_trans_id, timeout):
+        future = self._pending.get(t_trans_id)
+        if future is None:
+            return self._read_response(t_trans_id, timeout)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            return -1
+        finally:
+            self._pending.pop(t_trans_id, None)
+            self._release_slot(t_trans_id)
+
+    def _read_response(self, t_trans_id, timeout):
         expired = time.monotonic() + timeout
         while time.monotonic() < expired:
             remaining = expired - time.monotonic()
@@ -117,37 +277,45 @@ class UxbusCmdTcp(UxbusCmd):
             if rx_data == -1:
                 time.sleep(0.001)
                 continue
-            self._last_comm_time = time.monotonic()
-            if self._debug:
-                debug_log_datas(rx_data, label='recv({})'.format(t_unit_id))
-            code = self.check_protocol_header(rx_data, t_trans_id, prot_id, t_unit_id)
-            if code != 0:
-                if code != XCONF.UxbusState.ERR_NUM:
-                    ret[0] = code
-                    return ret
-                else:
-                    continue
-            if prot_id != STANDARD_MODBUS_TCP_PROTOCOL and not ret_raw:
-                # Private Modbus TCP Protocol
-                ret[0] = self.check_private_protocol(rx_data)
-                num = convert.bytes_to_u16(rx_data[4:6]) - 2
-                ret = ret[:num + 1] if len(ret) >= num + 1 else [ret[0]] * (num + 1)
-                length = len(rx_data) - 8
-                for i in range(num):
-                    if i >= length:
-                        break
-                    ret[i + 1] = rx_data[i + 8]       
-            else:
-                # Standard Modbus TCP Protocol
-                ret[0] = 0
-                num = convert.bytes_to_u16(rx_data[4:6]) + 6
-                ret = ret[:num + 1] if len(ret) >= num + 1 else [ret[0]] * (num + 1)
-                length = len(rx_data)
-                for i in range(num):
-                    if i >= length:
-                        break
-                    ret[i + 1] = rx_data[i]
+            if len(rx_data) >= 2 and convert.bytes_to_u16(rx_data[0:2]) != t_trans_id:
+                continue
+            return rx_data
+        return -1
+
+    def recv_modbus_response(self, t_unit_id, t_trans_id, num, timeout, t_prot_id=-1, ret_raw=False):
+        prot_id = self._protocol_identifier if t_prot_id < 0 else t_prot_id
+        ret = [0] * 320 if num == -1 else [0] * (num + 1)
+        ret[0] = XCONF.UxbusState.ERR_TOUT
+        rx_data = self._wait_response(t_trans_id, timeout)
+        if rx_data == -1:
+            return ret
+        self._last_comm_time = time.monotonic()
+        if self._debug:
+            debug_log_datas(rx_data, label='recv({})'.format(t_unit_id))
+        code = self.check_protocol_header(rx_data, t_trans_id, prot_id, t_unit_id)
+        if code != 0:
+            ret[0] = code
             return ret
+        if prot_id != STANDARD_MODBUS_TCP_PROTOCOL and not ret_raw:
+            # Private Modbus TCP Protocol
+            ret[0] = self.check_private_protocol(rx_data)
+            num = convert.bytes_to_u16(rx_data[4:6]) - 2
+            ret = ret[:num + 1] if len(ret) >= num + 1 else [ret[0]] * (num + 1)
+            length = len(rx_data) - 8
+            for i in range(num):
+                if i >= length:
+                    break
+                ret[i + 1] = rx_data[i + 8]       
+        else:
+            # Standard Modbus TCP Protocol
+            ret[0] = 0
+            num = convert.bytes_to_u16(rx_data[4:6]) + 6
+            ret = ret[:num + 1] if len(ret) >= num + 1 else [ret[0]] * (num + 1)
+            length = len(rx_data)
+            for i in range(num):
+                if i >= length:
+                    break
+                ret[i + 1] = rx_data[i]
         return ret
 
     # def send_hex_request(self, send_data):
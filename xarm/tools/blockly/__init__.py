@@ -1 +1,2 @@
-from ._blockly_tool import BlocklyTool
\ No newline at end of file
+from ._blockly_tool import BlocklyTool
+from ._blockly_cache import BlocklyCodeCache, BlocklyProgram
\ No newline at end of file
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import os
+import sys
+import json
+import marshal
+import hashlib
+import threading
+from collections import OrderedDict
+from ._blockly_tool import BlocklyTool
+from ...version import __version__
+
+# the params of BlocklyTool.to_python which change the generated codes, and their default
+_CONVERT_OPTIONS = (
+    ('init', True), ('wait_seconds', 1), ('mode', 0), ('state', 0), ('error_exit', True), ('stop_exit', True),
+    ('is_exec', False), ('is_ide', False), ('vacuum_version', '1'),
+)
+
+_converter_version = None
+
+
+def _get_converter_version():
+    """
+    The SDK version and the sha256 of the sources of the converter (_blockly_*.py),
+    the apps converted by another version are not used (the on-disk cache may be shared by the SDK versions)
+    """
+    global _converter_version
+    if _converter_version is None:
+        sha = hashlib.sha256(__version__.encode('utf-8'))
+        blockly_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(blockly_dir)):
+            if name.startswith('_blockly_') and name.endswith('.py'):
+                with open(os.path.join(blockly_dir, name), 'rb') as f:
+                    sha.update(f.read())
+        _converter_version = '{}-{}'.format(__version__, sha.hexdigest()[:16])
+    return _converter_version
+
+
+class BlocklyProgram(object):
+    """A converted blockly app, see BlocklyCodeCache.get"""
+    __slots__ = ('key', 'succeed', 'source', 'code')
+
+    def __init__(self, key, succeed, source, code):
+        self.key = key
+        self.succeed = succeed
+        self.source = source
+        self.code = code
+
+
+class BlocklyCodeCache(object):
+    """
+    Content-addressed cache of the converted blockly apps, the generated source and the compiled code object
+    are kept in memory (LRU), and optionally on disk
+    The key is the sha256 of the xml, the conversion options (axis_type, loop_max_frequency, vacuum_version, ...)
+    and the version of the converter (SDK version and the sha256 of its sources),
+    the xml is only hashed again if its mtime or size is changed
+    :param maxsize: max number of the apps kept in memory
+    :param cache_dir: directory of the on-disk cache, default is None (memory only)
+    """
+    def __init__(self, maxsize=32, cache_dir=None):
+        self.maxsize = max(maxsize, 1)
+        self.cache_dir = cache_dir
+        self._programs = OrderedDict()
+        self._digests = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._programs.clear()
+            self._digests.clear()
+
+    def _get_digest(self, path):
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._digests.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        self._digests[path] = (stamp, digest)
+        return digest
+
+    @staticmethod
+    def _get_options(arm, kwargs):
+        options = {name: kwargs.get(name, default) for name, default in _CONVERT_OPTIONS}
+        highlight_callback = kwargs.get('highlight_callback', None)
+        options['highlight_callback'] = [highlight_callback is not None, bool(highlight_callback)]
+        options['axis_type'] = list(kwargs.get('axis_type', []))
+        options['loop_max_frequency'] = kwargs.get('loop_max_frequency', None) if 'loop_max_frequency' in kwargs else 'unset'
+        # an instance is not part of the codes, only None and the ip are
+        options['arm'] = arm if arm is None or isinstance(arm, str) else 'instance'
+        return options
+
+    def _disk_paths(self, key):
+        return (os.path.join(self.cache_dir, '{}.py'.format(key)),
+                os.path.join(self.cache_dir, '{}.{}.bin'.format(key, sys.implementation.cache_tag)))
+
+    def _load_disk(self, key, filename):
+        source_path, code_path = self._disk_paths(key)
+        if not os.path.exists(source_path):
+            return None
+        with open(source_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        code = None
+        if os.path.exists(code_path):
+            try:
+                with open(code_path, 'rb') as f:
+                    code = marshal.load(f)
+            except Exception:
+                code = None
+        if code is None:
+            code = compile(source, filename, 'exec')
+        return BlocklyProgram(key, True, source, code)
+
+    def _save_disk(self, program):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        source_path, code_path = self._disk_paths(program.key)
+        for path, mode, data in [(source_path, 'w', program.source), (code_path, 'wb', marshal.dumps(program.code))]:
+            tmp_path = '{}.{}.tmp'.format(path, threading.get_ident())
+            with open(tmp_path, mode, **({'encoding': 'utf-8'} if mode == 'w' else {})) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+    def get(self, path, arm=None, **kwargs):
+        """
+        Get the converted app, convert it if not cached
+        :param path: path of the app xml
+        :param arm: same as BlocklyTool.to_python
+        :param kwargs: the params of BlocklyTool.to_python
+        :return: BlocklyProgram, source/code is None if the conversion is failed (succeed is False)
+        """
+        path = os.path.abspath(path)
+        digest = self._get_digest(path)
+        options = json.dumps(self._get_options(arm, kwargs), sort_keys=True, default=repr)
+        key = hashlib.sha256('{}:{}:{}'.format(_get_converter_version(), digest, options).encode('utf-8')).hexdigest()
+        filename = '<blockly:{}>'.format(path)
+        with self._lock:
+            program = self._programs.get(key)
+            if program is not None:
+                self._programs.move_to_end(key)
+                self.hits += 1
+                return program
+        program = None
+        if self.cache_dir:
+            try:
+                program = self._load_disk(key, filename)
+            except Exception:
+                program = None
+        if program is None:
+            blockly_tool = BlocklyTool(path)
+            succeed = blockly_tool.to_python(arm=arm, **kwargs)
+            source = blockly_tool.codes if succeed else None
+            program = BlocklyProgram(key, succeed, source, compile(source, filename, 'exec') if succeed else None)
+            if succeed and self.cache_dir:
+                try:
+                    self._save_disk(program)
+                except Exception:
+                    pass
+        with self._lock:
+            self.misses += 1
+            self._programs[key] = program
+            self._programs.move_to_end(key)
+            while len(self._programs) > self.maxsize:
+                self._programs.popitem(last=False)
+        return program
+
+
+# shared by XArm.run_blockly_app
+default_cache = BlocklyCodeCache()
@@ -28,6 +28,41 @@ def create_logger(name):
 
 GCODE_PATTERN = r'([A-Z])([-+]?[0-9.]+)'
 CLEAN_PATTERN = r'\s+|\(.*?\)|;.*'
+GCODE_RE = re.compile(GCODE_PATTERN)
+CLEAN_RE = re.compile(CLEAN_PATTERN)
+PROGRAM_END_CMDS = ('M2', 'M02', 'M30')
+
+
+def prepare_gcode(cmd):
+    """
+    Clean and validate one line of gcode
+    :param cmd: the line
+    :return: code, data
+        code: 0: valid, -1: null after clean, -2: starts with %, -3: no gcode word
+        data: the bytes to send (with the line feed), None if not valid
+    """
+    data = CLEAN_RE.sub('', cmd.strip().upper())
+    if not data:
+        return -1, None
+    if data[0] == '%':
+        return -2, None
+    if not GCODE_RE.search(data):
+        return -3, None
+    return 0, data.encode('utf-8', 'replace') + b'\n'
+
+
+class GcodeLine(object):
+    """A valid line of a gcode program, see GcodeClient.load_file"""
+    __slots__ = ('lineno', 'cmd', 'data', 'is_end')
+
+    def __init__(self, lineno, cmd, data):
+        self.lineno = lineno
+        self.cmd = cmd
+        self.data = data
+        self.is_end = data[:-1].decode('utf-8', 'replace') in PROGRAM_END_CMDS
+
+    def __repr__(self):
+        return 'GcodeLine({}, {!r})'.format(self.lineno, self.cmd)
 
 
 class GcodeClient(object):
@@ -38,6 +73,7 @@ class GcodeClient(object):
             self.logger = create_logger('gcode')
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self.sock.setblocking(True)
         self.sock.connect((robot_ip, 504))
         self.logger.info('Connetc to GcodeServer({}) success'.format(robot_ip))
@@ -46,21 +82,16 @@ class GcodeClient(object):
     def close(self):
         self.sock.close()
 
-    def execute(self, cmd):
-        data = re.sub(CLEAN_PATTERN, '', cmd.strip().upper())
-        if not data:
-            # self.logger.warning('[E] null after clean {}'.format(cmd))
-            return -1, []
-        if data[0] == '%':
-            # self.logger.warning('[E] starts with % ({})'.format(cmd))
-            return -2, []
-        if not re.findall(GCODE_PATTERN, data):
-            # self.logger.warning('[E] not found {}'.format(cmd))
-            return -3, []
-        data = data.encode('utf-8', 'replace')
-        with self._lock:
-            self.sock.send(data + b'\n')
-            ret = self.sock.recv(5)
+    def _recv_reply(self):
+        ret = b''
+        while len(ret) < 5:
+            data = self.sock.recv(5 - len(ret))
+            if not data:
+                raise ConnectionError('GcodeServer closed the connection')
+            ret += data
+        return ret
+
+    def _parse_reply(self, cmd, ret):
         code, mode_state, err = ret[0:3]
         state, mode = mode_state & 0x0F, mode_state >> 4
         cmdnum = ret[3] << 8 | ret[4]
@@ -69,22 +100,84 @@ class GcodeClient(object):
         elif state >= 4:
             self.logger.warning('[{}], code={}, err={}, mode={}, state={}, cmdnum={}'.format(cmd, code, err, mode, state, cmdnum))
         return code, [mode, state, err, cmdnum]
-    
-    def execute_file(self, filepath):
+
+    def execute(self, cmd):
+        code, data = prepare_gcode(cmd)
+        if code != 0:
+            return code, []
+        with self._lock:
+            self.sock.send(data)
+            ret = self._recv_reply()
+        return self._parse_reply(cmd, ret)
+
+    @staticmethod
+    def load_file(filepath):
+        """
+        Parse the gcode file once, the lines are cleaned and validated and kept as the bytes to send,
+        the invalid lines are dropped and the lines after the program end (M2/M02/M30) are ignored
+        :param filepath: gcode file
+        :return: [GcodeLine, ...], the program for execute_program, None if the file is not found
+        """
         if not os.path.exists(filepath) or os.path.isdir(filepath):
-            return -99
+            return None
+        program = []
         with open(filepath, 'r') as f:
-            for line in f.readlines():
+            for lineno, line in enumerate(f, 1):
                 cmd = line.strip()
-                if not cmd:
+                code, data = prepare_gcode(cmd)
+                if code != 0:
                     continue
-                code, info = self.execute(cmd)
-                if code < 0:
+                program.append(GcodeLine(lineno, cmd, data))
+                if program[-1].is_end:
+                    break
+        return program
+
+    def execute_program(self, program, window=1):
+        """
+        Send the program loaded by load_file
+        :param program: [GcodeLine, ...]
+        :param window: max number of lines sent and not replied yet, 1 means line by line (wait the reply of every line),
+            a bigger window keeps the controller busy instead of waiting one round trip per line,
+            the replies are matched with the lines in order, nothing is sent after the reply of the first failed line
+            Note: up to window - 1 lines after the failed line may already be sent when its reply arrives
+        :return: code, 0 means success, otherwise the code of the first failed line
+        """
+        window = max(int(window), 1)
+        total = len(program)
+        sent = 0
+        acked = 0
+        failed = False
+        ret_code = 0
+        with self._lock:
+            while acked < total:
+                if not failed and sent < total and sent - acked < window:
+                    end = min(total, acked + window)
+                    self.sock.sendall(b''.join(line.data for line in program[sent:end]))
+                    sent = end
                     continue
-                if code != 0 or info[2] != 0:
-                    if code != 1 and code != 2:
-                        return code
-                if cmd in ['M2', 'M02', 'M30']:
-                    self.logger.info('[{}] Program End'.format(cmd))
+                if acked >= sent:
                     break
-        return 0
+                line = program[acked]
+                code, info = self._parse_reply(line.cmd, self._recv_reply())
+                acked += 1
+                # after the failed line, the lines in flight are drained so the next command gets its own reply
+                if failed:
+                    continue
+                if (code != 0 or info[2] != 0) and code != 1 and code != 2:
+                    failed = True
+                    ret_code = code
+                elif line.is_end:
+                    self.logger.info('[{}] Program End'.format(line.cmd))
+        return ret_code
+
+    def execute_file(self, filepath, window=1):
+        """
+        Execute the gcode file
+        :param filepath: gcode file
+        :param window: see execute_program, default is 1 (line by line)
+        :return: code, 0 means success, -99 means the file is not found
+        """
+        program = self.load_file(filepath)
+        if program is None:
+            return -99
+        return self.execute_program(program, window=window)
@@ -26,6 +26,43 @@ def create_logger(name):
     return logger
 
 
+# max quantity of one read request, limited by the pdu size (253 bytes)
+MAX_READ_BITS = 2000
+MAX_READ_REGISTERS = 125
+
+
+def plan_reads(addrs, max_quantity, max_gap=0):
+    """
+    Merge the addresses into the fewest read requests
+    :param addrs: iterable of the addresses, or (addr, quantity) for a block of addresses
+    :param max_quantity: max quantity of one request, MAX_READ_REGISTERS or MAX_READ_BITS
+    :param max_gap: two ranges are merged if at most max_gap addresses which are not requested are between them,
+        reading a few more addresses is cheaper than one more request
+    :return: [(addr, quantity), ...] sorted by the addr
+    """
+    spans = []
+    for item in addrs:
+        addr, quantity = item if isinstance(item, (tuple, list)) else (item, 1)
+        assert 0 <= addr and quantity > 0 and addr + quantity <= 0x10000, 'invalid address: {}'.format(item)
+        spans.append((addr, addr + quantity))
+    ranges = []
+    for start, end in sorted(spans):
+        if ranges:
+            last_start, last_end = ranges[-1]
+            if end <= last_end:
+                continue
+            if start - last_end <= max_gap and end - last_start <= max_quantity:
+                ranges[-1][1] = end
+                continue
+            # the addresses already covered are not read again
+            start = max(start, last_end)
+        while end - start > max_quantity:
+            ranges.append([start, start + max_quantity])
+            start += max_quantity
+        ranges.append([start, end])
+    return [(start, end - start) for start, end in ranges]
+
+
 class ModbusTcpClient(object):
     def __init__(self, ip, port=502, unit_id=0x01, logger=None):
         if isinstance(logger, logging.Logger):
@@ -42,93 +79,149 @@ class ModbusTcpClient(object):
         self._unit_id = unit_id
         self._func_code = 0x00
         self._lock = threading.Lock()
+        self._rx_buf = bytearray()
 
     def close(self):
         self.sock.close()
 
+    def __recv_frame(self, expired):
+        # one whole frame (MBAP header + pdu) from the receive buffer, the socket is read in large chunks,
+        # the bytes after the frame are kept for the next one, return None if timeout
+        buf = self._rx_buf
+        while True:
+            if len(buf) >= 7:
+                frame_len = struct.unpack_from('>H', buf, 4)[0] + 6
+                if len(buf) >= frame_len:
+                    frame = bytes(buf[:frame_len])
+                    del buf[:frame_len]
+                    return frame
+            timeout = expired - time.monotonic()
+            if timeout <= 0:
+                return None
+            self.sock.settimeout(timeout)
+            try:
+                data = self.sock.recv(4096)
+            except socket.timeout:
+                return None
+            finally:
+                self.sock.settimeout(None)
+            if not data:
+                self.logger.error('modbus tcp connection is closed')
+                return None
+            buf.extend(data)
+
+    def __check_frame(self, frame, send_transaction_id, send_unit_id, send_func_code):
+        if len(frame) < 8:
+            self.logger.warning('Receive a reply without the func code ({}), discard it and continue waiting.'.format(frame))
+            return False
+        transaction_id, protocol_id = struct.unpack_from('>HH', frame)
+        unit_id = frame[6]
+        func_code = frame[7]
+        if transaction_id != send_transaction_id:
+            self.logger.warning('Receive a reply with a mismatched transaction id (S: {}, R: {}), discard it and continue waiting.'.format(send_transaction_id, transaction_id))
+        elif protocol_id != self._protocol_id:
+            self.logger.warning('Receive a reply with a mismatched protocol id (S: {}, R: {}), discard it and continue waiting.'.format(self._protocol_id, protocol_id))
+        elif unit_id != send_unit_id:
+            self.logger.warning('Receive a reply with a mismatched unit id (S: {}, R: {}), discard it and continue waiting.'.format(send_unit_id, unit_id))
+        elif func_code != send_func_code and func_code != send_func_code + 0x80:
+            self.logger.warning('Receive a reply with a mismatched func code (S: {}, R: {}), discard it and continue waiting.'.format(send_func_code, func_code))
+        else:
+            return True
+        return False
+
+    def __check_exception(self, recv_data):
+        if len(recv_data) == 9:
+            self.logger.error('modbus tcp data exception, exp={}, res={}'.format(recv_data[8], recv_data))
+            return recv_data[8], recv_data
+        return 0, recv_data
+
     def __wait_to_response(self, transaction_id=None, unit_id=None, func_code=None, timeout=3):
         expired = time.monotonic() + timeout
-        recv_data = b''
-        length = 0
-        code = -3  # TIMEOUT
         send_transaction_id = transaction_id if transaction_id is not None else self._transaction_id
         send_unit_id = unit_id if unit_id is not None else self._unit_id
         send_func_code = func_code if func_code is not None else self._func_code
-        while time.monotonic() < expired:
-            if len(recv_data) < 7:
-                recv_data += self.sock.recv(7 - len(recv_data))
-            if len(recv_data) < 7:
-                continue
-            if length == 0:
-                length = struct.unpack('>H', recv_data[4:6])[0]
-            if len(recv_data) < length + 6:
-                recv_data += self.sock.recv(length + 6 - len(recv_data))
-            if len(recv_data) < length + 6:
-                continue
-            transaction_id = struct.unpack('>H', recv_data[0:2])[0]
-            protocol_id = struct.unpack('>H', recv_data[2:4])[0]
-            unit_id = recv_data[6]
-            func_code = recv_data[7]
-            if transaction_id != send_transaction_id:
-                self.logger.warning('Receive a reply with a mismatched transaction id (S: {}, R: {}), discard it and continue waiting.'.format(send_transaction_id, transaction_id))
-                length = 0
-                recv_data = b''
-                continue
-            elif protocol_id != self._protocol_id:
-                self.logger.warning('Receive a reply with a mismatched protocol id (S: {}, R: {}), discard it and continue waiting.'.format(self._protocol_id, protocol_id))
-                length = 0
-                recv_data = b''
-                continue
-            elif unit_id != send_unit_id:
-                self.logger.warning('Receive a reply with a mismatched unit id (S: {}, R: {}), discard it and continue waiting.'.format(send_unit_id, unit_id))
-                length = 0
-                recv_data = b''
-                continue
-            elif func_code != send_func_code and func_code != send_func_code + 0x80:
-                self.logger.warning('Receive a reply with a mismatched func code (S: {}, R: {}), discard it and continue waiting.'.format(send_func_code, func_code))
-                length = 0
-                recv_data = b''
-                continue
-            else:
-                code = 0
-                break
-        if code == 0 and len(recv_data) == 9:
-            self.logger.error('modbus tcp data exception, exp={}, res={}'.format(recv_data[8], recv_data))
-            return recv_data[8], recv_data
-        elif code != 0:
-            self.logger.error('recv timeout, len={}, res={}'.format(len(recv_data), recv_data))
-        return code, recv_data
+        while True:
+            recv_data = self.__recv_frame(expired)
+            if recv_data is None:
+                # a partial frame is kept, it is discarded by its transaction id once completed
+                self.logger.error('recv timeout, len={}, res={}'.format(len(self._rx_buf), bytes(self._rx_buf)))
+                return -3, bytes(self._rx_buf)  # TIMEOUT
+            if self.__check_frame(recv_data, send_transaction_id, send_unit_id, send_func_code):
+                return self.__check_exception(recv_data)
 
-    def __pack_to_send(self, pdu_data, unit_id=None):
+    def __pack(self, pdu_data, unit_id=None):
         self._transaction_id = self._transaction_id % 65535 + 1
         unit_id = unit_id if unit_id is not None else self._unit_id
-        data = struct.pack('>HHHB', self._transaction_id, self._protocol_id, len(pdu_data) + 1, unit_id)
-        data += pdu_data
-        self.sock.send(data)
+        return struct.pack('>HHHB', self._transaction_id, self._protocol_id, len(pdu_data) + 1, unit_id) + pdu_data
+
+    def __pack_to_send(self, pdu_data, unit_id=None):
+        self.sock.send(self.__pack(pdu_data, unit_id=unit_id))
 
     def __request(self, pdu, unit_id=None):
         with self._lock:
             self._func_code = pdu[0]
             self.__pack_to_send(pdu)
             return self.__wait_to_response(unit_id=unit_id, func_code=pdu[0])
+
+    def __request_pipelined(self, pdus, max_inflight=16, timeout=3):
+        """
+        Requests in flight at the same time, the responses are matched by the transaction id
+        :param pdus: [pdu, ...]
+        :param max_inflight: max number of the requests sent and not responded
+        :param timeout: timeout(s) of every response
+        :return: [(code, recv_data), ...] in the order of the pdus, same as __request,
+            code is -1 if the reply of a request fails the check (e.g. a mismatched func code), -3 if not responded
+        """
+        results = [None] * len(pdus)
+        with self._lock:
+            pending = {}  # transaction id: index of the pdu
+            index = 0
+            while index < len(pdus) or pending:
+                # the requests which fit in the window are sent in one write
+                data = b''
+                while index < len(pdus) and len(pending) < max_inflight:
+                    data += self.__pack(pdus[index])
+                    pending[self._transaction_id] = index
+                    index += 1
+                if data:
+                    self.sock.sendall(data)
+                recv_data = self.__recv_frame(time.monotonic() + timeout)
+                if recv_data is None:
+                    self.logger.error('recv timeout, {} requests are not responded'.format(len(pending) + len(pdus) - index))
+                    break
+                transaction_id = struct.unpack_from('>H', recv_data)[0]
+                i = pending.get(transaction_id)
+                if i is None:
+                    self.logger.warning('Receive a reply with an unknown transaction id ({}), discard it and continue waiting.'.format(transaction_id))
+                    continue
+                # the request of a known transaction id is not sent again, a reply failing the check ends it
+                del pending[transaction_id]
+                if self.__check_frame(recv_data, transaction_id, self._unit_id, pdus[i][0]):
+                    results[i] = self.__check_exception(recv_data)
+                else:
+                    results[i] = -1, recv_data  # MALFORMED
+        return [(-3, b'') if ret is None else ret for ret in results]  # TIMEOUT
     
+    @staticmethod
+    def __decode_read(code, res_data, quantity, func_code, signed=False):
+        if func_code == 0x01 or func_code == 0x02:
+            if code == 0 and len(res_data) == 9 + (quantity + 7) // 8:
+                return code, [(res_data[9 + i // 8] >> (i % 8) & 0x01) for i in range(quantity)]
+        elif code == 0 and len(res_data) == 9 + quantity * 2:
+            return 0, list(struct.unpack('>{}{}'.format(quantity, 'h' if signed else 'H'), res_data[9:]))
+        return code, res_data
+
     def __read_bits(self, addr, quantity, func_code=0x01):
         assert func_code == 0x01 or func_code == 0x02
         pdu = struct.pack('>BHH', func_code, addr, quantity)
         code, res_data = self.__request(pdu)
-        if code == 0 and len(res_data) == 9 + (quantity + 7) // 8:
-            return code, [(res_data[9 + i // 8] >> (i % 8) & 0x01) for i in range(quantity)]
-        else:
-            return code, res_data
+        return self.__decode_read(code, res_data, quantity, func_code)
 
     def __read_registers(self, addr, quantity, func_code=0x03, signed=False):
         assert func_code == 0x03 or func_code == 0x04
         pdu = struct.pack('>BHH', func_code, addr, quantity)
         code, res_data = self.__request(pdu)
-        if code == 0 and len(res_data) == 9 + quantity * 2:
-            return 0, list(struct.unpack('>{}{}'.format(quantity, 'h' if signed else 'H'), res_data[9:]))
-        else:
-            return code, res_data
+        return self.__decode_read(code, res_data, quantity, func_code, signed=signed)
     
     def read_coil_bits(self, addr, quantity):
         """
@@ -153,7 +246,61 @@ class ModbusTcpClient(object):
         func_code: 0x04
         """
         return self.__read_registers(addr, quantity, func_code=0x04, signed=signed)
-    
+
+    def __read_ranges(self, func_code, ranges, values, signed=False, max_inflight=16, timeout=3):
+        """
+        Read the ranges pipelined into values ({addr: value})
+        :return: [code, ...] of the ranges, -1 if the response is malformed
+        """
+        pdus = [struct.pack('>BHH', func_code, addr, quantity) for addr, quantity in ranges]
+        codes = []
+        for (addr, quantity), (ret_code, res_data) in zip(ranges, self.__request_pipelined(pdus, max_inflight=max_inflight, timeout=timeout)):
+            ret_code, ret = self.__decode_read(ret_code, res_data, quantity, func_code, signed=signed)
+            if ret_code != 0 or not isinstance(ret, list):
+                codes.append(ret_code or -1)
+                continue
+            codes.append(0)
+            for i, value in enumerate(ret):
+                values[addr + i] = value
+        return codes
+
+    def read_multiple(self, func_code, addrs, signed=False, max_gap=0, max_inflight=16, timeout=3):
+        """
+        Read scattered addresses of one table with the fewest requests, the requests are pipelined
+            ex: read_multiple(0x03, [0, 1, 2, 10, (100, 4)], max_gap=8)  # 2 requests: (0, 11) and (100, 4)
+        :param func_code: 0x01(coil bits), 0x02(input bits), 0x03(holding registers), 0x04(input registers)
+        :param addrs: iterable of the addresses, or (addr, quantity) for a block of addresses
+        :param signed: the registers are signed or not
+        :param max_gap: see plan_reads, default is 0 (only the requested addresses are read),
+            with max_gap > 0 a merged request which fails with an exception code (e.g. an address in the gap is not mapped)
+            is read again as the requested ranges
+        :param max_inflight: max number of the requests sent and not responded
+        :param timeout: timeout(s) of every response
+        :return: tuple((code, {addr: value})), code is the first failed code of the requests (-1 if a response is malformed),
+            the addresses of the failed requests are not in the dict
+        """
+        assert func_code in (0x01, 0x02, 0x03, 0x04)
+        is_bits = func_code == 0x01 or func_code == 0x02
+        max_quantity = MAX_READ_BITS if is_bits else MAX_READ_REGISTERS
+        addrs = list(addrs)
+        values = {}
+        ranges = plan_reads(addrs, max_quantity, max_gap=max_gap)
+        codes = self.__read_ranges(func_code, ranges, values, signed=signed, max_inflight=max_inflight, timeout=timeout)
+        failed = [rng for rng, ret_code in zip(ranges, codes) if ret_code > 0]
+        if failed and max_gap > 0:
+            exact = [(addr, quantity) for addr, quantity in plan_reads(addrs, max_quantity)
+                     if any(start <= addr and addr + quantity <= start + count for start, count in failed)]
+            codes = [ret_code for ret_code in codes if ret_code <= 0]
+            codes += self.__read_ranges(func_code, exact, values, signed=signed, max_inflight=max_inflight, timeout=timeout)
+        code = next((ret_code for ret_code in codes if ret_code != 0), 0)
+        requested = {}
+        for item in addrs:
+            addr, quantity = item if isinstance(item, (tuple, list)) else (item, 1)
+            for i in range(addr, addr + quantity):
+                if i in values:
+                    requested[i] = values[i]
+        return code, requested
+
     def write_single_coil_bit(self, addr, on):
         """
         func_code: 0x05
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Fixed-rate streaming of the setpoints in the servo modes (servo motion / velocity control)
+Usage:
+    arm.set_mode(1)
+    arm.set_state(0)
+    streamer = ServoStreamer(arm, trajectory, mode='servo_cartesian', rate=250)
+    streamer.start()
+    streamer.wait()
+    print(streamer.stats())
+"""
+
+import time
+import threading
+from collections import deque
+from ..core.utils.log import logger
+from ..core.utils.stats import percentiles
+from ..x3.code import APIState
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class ServoStreamer(object):
+    """
+    Send the setpoints at a fixed rate in a dedicated thread
+    The ticks are scheduled on absolute time.perf_counter() deadlines (no drift), a tick which is late by
+    more than one period is skipped instead of being sent late, so the stream never falls behind
+    :param arm: XArmAPI instance, the mode and the state must be set by the caller
+    :param source: the setpoints
+        1. a numpy array (or a list) of the setpoints, one row per tick, the rows of the skipped ticks are skipped
+        2. an iterator/generator, one setpoint is pulled for every tick sent
+        the streaming stops at the end of the source
+    :param mode: 'servo_j' (set_servo_angle_j, mode 1), 'servo_cartesian' (set_servo_cartesian, mode 1),
+        'vc_joint_velocity' (vc_set_joint_velocity, mode 4), 'vc_cartesian_velocity' (vc_set_cartesian_velocity, mode 5)
+    :param rate: rate(Hz) of the ticks, e.g. 100~500
+    :param is_radian: the setpoints are in radians or not, default is arm.default_is_radian
+    :param is_tool_coord: for 'servo_cartesian' and 'vc_cartesian_velocity'
+    :param speed/mvacc: for 'servo_j' and 'servo_cartesian'
+    :param duration: for the velocity modes, the velocity is kept for duration seconds after the last setpoint,
+        default is 3 periods (at least 0.05s), the arm stops by itself if the stream stalls
+    :param stop_on_error: stop if the arm has error or is stopped, or the command is failed
+    :param busy_wait: spin for the last busy_wait seconds before a deadline instead of sleeping, improves the jitter
+    :param history: number of the recent ticks kept for the statistics
+    """
+    MODES = ('servo_j', 'servo_cartesian', 'vc_joint_velocity', 'vc_cartesian_velocity')
+
+    def __init__(self, arm, source, mode='servo_cartesian', rate=250, is_radian=None, is_tool_coord=False,
+                 speed=None, mvacc=None, duration=None, stop_on_error=True, busy_wait=0.0005, history=10000):
+        assert mode in self.MODES, 'mode must be one of {}'.format(self.MODES)
+        assert 0 < rate <= 1000, 'rate must be in (0, 1000]'
+        self._arm = arm
+        self._mode = mode
+        self._period = 1.0 / rate
+        self._is_radian = arm.default_is_radian if is_radian is None else is_radian
+        self._is_tool_coord = is_tool_coord
+        self._speed = speed
+        self._mvacc = mvacc
+        self._duration = max(3 * self._period, 0.05) if duration is None else duration
+        self._stop_on_error = stop_on_error
+        self._busy_wait = max(busy_wait, 0)
+        if (np is not None and isinstance(source, np.ndarray)) or isinstance(source, (list, tuple)):
+            self._rows = source
+            self._iter = None
+        else:
+            self._rows = None
+            self._iter = iter(source)
+        self._send = self._get_sender()
+        self._thread = None
+        self._running = False
+        self._done = threading.Event()
+        self._jitters = deque(maxlen=history)
+        self._rtts = deque(maxlen=history)
+        self._sent_count = 0
+        self._missed_count = 0
+        self._error_count = 0
+        self._last_code = 0
+        self._start_time = 0
+        self._stop_time = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def last_code(self):
+        return self._last_code
+
+    def _get_sender(self):
+        arm = self._arm
+        if self._mode == 'servo_j':
+            return lambda setpoint: arm.set_servo_angle_j(
+                setpoint, speed=self._speed, mvacc=self._mvacc, is_radian=self._is_radian)
+        elif self._mode == 'servo_cartesian':
+            return lambda setpoint: arm.set_servo_cartesian(
+                setpoint, speed=self._speed, mvacc=self._mvacc, is_radian=self._is_radian, is_tool_coord=self._is_tool_coord)
+        elif self._mode == 'vc_joint_velocity':
+            return lambda setpoint: arm.vc_set_joint_velocity(
+                setpoint, is_radian=self._is_radian, duration=self._duration)
+        else:
+            return lambda setpoint: arm.vc_set_cartesian_velocity(
+                setpoint, is_radian=self._is_radian, is_tool_coord=self._is_tool_coord, duration=self._duration)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._done.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop streaming, in the velocity modes a zero velocity is sent"""
+        self._running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def wait(self, timeout=None):
+        """
+        Wait for the end of the stream (end of the source, stop() or error)
+        :return: True if the stream is ended
+        """
+        return self._done.wait(timeout)
+
+    def _next_setpoint(self, tick):
+        if self._rows is not None:
+            if tick >= len(self._rows):
+                return None
+            row = self._rows[tick]
+            return row.tolist() if hasattr(row, 'tolist') else row
+        try:
+            setpoint = next(self._iter)
+        except StopIteration:
+            return None
+        return setpoint.tolist() if hasattr(setpoint, 'tolist') else setpoint
+
+    def _sleep_until(self, deadline):
+        perf_counter = time.perf_counter
+        remaining = deadline - perf_counter() - self._busy_wait
+        if remaining > 0:
+            time.sleep(remaining)
+        while perf_counter() < deadline:
+            # yield the GIL while spinning
+            time.sleep(0)
+
+    def _run(self):
+        perf_counter = time.perf_counter
+        period = self._period
+        arm = self._arm
+        tick = 0
+        self._start_time = start = perf_counter()
+        try:
+            while self._running:
+                deadline = start + tick * period
+                self._sleep_until(deadline)
+                now = perf_counter()
+                late = now - deadline
+                if late >= period:
+                    # skip the ticks already missed instead of sending them late
+                    skipped = int(late / period)
+                    self._missed_count += skipped
+                    tick += skipped
+                    deadline = start + tick * period
+                    late = now - deadline
+                self._jitters.append(late)
+                setpoint = self._next_setpoint(tick)
+                if setpoint is None:
+                    break
+                code = self._send(setpoint)
+                self._rtts.append(perf_counter() - now)
+                self._sent_count += 1
+                self._last_code = code
+                tick += 1
+                if code != 0:
+                    self._error_count += 1
+                    if self._stop_on_error:
+                        logger.error('servo streamer stopped, code={}'.format(code))
+                        break
+                if self._stop_on_error and (arm.has_error or arm.state >= 4 or not arm.connected):
+                    logger.error('servo streamer stopped, the arm has error or is stopped')
+                    self._last_code = APIState.NOT_READY if arm.connected else APIState.NOT_CONNECTED
+                    break
+        except Exception as e:
+            logger.error('servo streamer exception: {}'.format(e))
+            self._last_code = APIState.API_EXCEPTION
+        finally:
+            self._stop_time = perf_counter()
+            try:
+                if self._mode in ('vc_joint_velocity', 'vc_cartesian_velocity') and arm.connected:
+                    self._send([0] * (7 if self._mode == 'vc_joint_velocity' else 6))
+            except Exception as e:
+                logger.error('servo streamer, send the zero velocity failed: {}'.format(e))
+            finally:
+                self._running = False
+                self._done.set()
+
+    def stats(self):
+        """
+        Statistics of the stream
+        :return: dict
+            sent: number of the setpoints sent
+            missed: number of the ticks skipped because they were late by more than one period
+            errors: number of the failed commands
+            rate: actual rate(Hz) of the setpoints sent
+            jitter: percentiles(ms) of the delay of the ticks from their deadlines, {'mean', 'p50', 'p90', 'p99', 'max'}
+            rtt: percentiles(ms) of the round-trip time of the commands, {'mean', 'p50', 'p90', 'p99', 'max'}
+        """
+        elapsed = (self._stop_time if not self._running else time.perf_counter()) - self._start_time
+        return {
+            'sent': self._sent_count,
+            'missed': self._missed_count,
+            'errors': self._error_count,
+            'rate': self._sent_count / elapsed if elapsed > 0 else 0,
+            'jitter': percentiles(list(self._jitters)),
+            'rtt': percentiles(list(self._rtts)),
+        }
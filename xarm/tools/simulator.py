@@ -0,0 +1,843 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+"""
+Simulated xArm controller for the tests and the benchmarks
+It serves the private Modbus TCP protocol on the control port and the normal/rich/real reports on the report ports,
+so XArmAPI('127.0.0.1') connects to it unchanged.
+The standard Modbus TCP requests (protocol id 0, used by xarm.tools.modbus_tcp.ModbusTcpClient) on the control port
+read and write the simulated coils and holding registers (the input bits/registers read the same tables).
+A gripper (xArm Gripper / BIO Gripper registers) is simulated on the tool modbus, it moves to the target position
+at the speed set once it is enabled.
+The gcode port (504, xarm.tools.gcode.GcodeClient) replies every line, the lines are recorded but not executed.
+Note:
+    1. It is not a kinematic model, a linear motion only moves the pose and a joint motion only moves the angles
+        (except go home), get_fk/get_ik return the current pose/angles
+    2. The registers which are not simulated reply success with an empty payload
+Usage:
+    python -m xarm.tools.simulator [--latency 0.001] [--jitter 0.001] [--fragment 16]
+    or
+    with XArmSimulator(latency=0.001) as sim:
+        arm = XArmAPI('127.0.0.1')
+"""
+
+import math
+import time
+import random
+import struct
+import socket
+import asyncio
+import argparse
+import threading
+from collections import deque
+from ..core.config.x_config import XCONF
+from ..core.utils import convert, crc16
+from ..core.utils.log import logger
+from ..core.utils.report_decoder import REPORT_DECODERS
+
+_HEADER = struct.Struct('>HHH')
+
+HOME_POSE = [207.0, 0.0, 112.0, math.pi, 0.0, 0.0]
+# (theta, d, alpha, a) of every joint (mm, rad), the modified dh parameters of a xArm6, HOME_POSE is its pose at 0
+DH_PARAMS = [
+    0, 267, 0, 0,
+    -1.3849179, 0, -math.pi / 2, 0,
+    1.3849179, 0, 0, 289.48866,
+    0, 342.5, -math.pi / 2, 77.5,
+    0, 0, math.pi / 2, 0,
+    0, 97, -math.pi / 2, 76,
+]
+REPORT_LENGTHS = {'normal': 145, 'rich': 508, 'real': 135}
+MAX_ROT_SPEED = 1.0  # rad/s, used for the orientation part of a linear motion
+
+
+def _wrap_angle(angle):
+    return (angle + math.pi) % (2 * math.pi) - math.pi
+
+
+class _Motion(object):
+    """A queued motion command, the pose/angles are interpolated from the values when it starts"""
+    __slots__ = ('kind', 'target_pose', 'target_angles', 'speed', 'duration', 'elapsed',
+                 'start_pose', 'start_angles', 'conn', 'trans_id', 'feedback_type', 'started')
+
+    def __init__(self, kind, target_pose=None, target_angles=None, speed=0.0, duration=None,
+                 conn=None, trans_id=0, feedback_type=0):
+        self.kind = kind
+        self.target_pose = target_pose
+        self.target_angles = target_angles
+        self.speed = speed
+        self.duration = duration
+        self.elapsed = 0.0
+        self.start_pose = None
+        self.start_angles = None
+        self.conn = conn
+        self.trans_id = trans_id
+        self.feedback_type = feedback_type
+        self.started = False
+
+    def start(self, pose, angles):
+        self.started = True
+        self.start_pose = list(pose)
+        self.start_angles = list(angles)
+        if self.duration is not None:
+            return
+        duration = 0.0
+        speed = max(abs(self.speed), 1e-6)
+        if self.target_pose is not None:
+            dist = math.sqrt(sum((self.target_pose[i] - pose[i]) ** 2 for i in range(3)))
+            rot = max(abs(_wrap_angle(self.target_pose[i] - pose[i])) for i in range(3, 6))
+            duration = max(dist / speed if self.kind == 'line' else 0, rot / MAX_ROT_SPEED)
+        if self.target_angles is not None:
+            duration = max(duration, max(abs(self.target_angles[i] - angles[i]) for i in range(7)) / speed)
+        self.duration = duration
+
+    def advance(self, dt, pose, angles):
+        """Move on dt seconds, update pose/angles in place, return the time used"""
+        used = min(dt, self.duration - self.elapsed)
+        self.elapsed += used
+        ratio = 1.0 if self.duration <= 0 else min(self.elapsed / self.duration, 1.0)
+        if self.target_pose is not None:
+            for i in range(3):
+                pose[i] = self.start_pose[i] + (self.target_pose[i] - self.start_pose[i]) * ratio
+            for i in range(3, 6):
+                pose[i] = _wrap_angle(self.start_pose[i] + _wrap_angle(self.target_pose[i] - self.start_pose[i]) * ratio)
+        if self.target_angles is not None:
+            for i in range(7):
+                angles[i] = self.start_angles[i] + (self.target_angles[i] - self.start_angles[i]) * ratio
+        return used
+
+    @property
+    def done(self):
+        return self.started and self.elapsed >= self.duration
+
+
+class _Connection(object):
+    """Outgoing side of a client connection, with the injected latency, jitter and fragmentation"""
+    def __init__(self, sim, writer):
+        self._sim = sim
+        self._writer = writer
+        self._queue = asyncio.Queue()
+        self._last_send_at = 0
+        self.feedback_type = 0
+        self.closed = False
+        self.task = asyncio.ensure_future(self._write_loop())
+
+    def send(self, data):
+        if self.closed:
+            return
+        loop = asyncio.get_event_loop()
+        send_at = loop.time() + self._sim.latency + (random.uniform(0, self._sim.jitter) if self._sim.jitter > 0 else 0)
+        # the jitter never reorders the frames of one connection
+        self._last_send_at = max(send_at, self._last_send_at)
+        self._queue.put_nowait((self._last_send_at, data))
+
+    async def _write_loop(self):
+        loop = asyncio.get_event_loop()
+        try:
+            while True:
+                send_at, data = await self._queue.get()
+                delay = send_at - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                fragment = self._sim.fragment
+                if fragment > 0:
+                    pos = 0
+                    while pos < len(data):
+                        size = random.randint(1, fragment)
+                        self._writer.write(data[pos:pos + size])
+                        pos += size
+                        await self._writer.drain()
+                        await asyncio.sleep(0)
+                else:
+                    self._writer.write(data)
+                    await self._writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        self.task.cancel()
+        try:
+            self._writer.close()
+        except Exception:
+            pass
+
+
+class XArmSimulator(object):
+    def __init__(self, host='127.0.0.1', control_port=XCONF.SocketConf.TCP_CONTROL_PORT, report_ports=None, gcode_port=504,
+                 axis=6, arm_type=6, version='v2.5.0', sn='XI1305SIM', control_box_sn='AC1305SIM',
+                 tick_hz=100, report_hz=100, latency=0.0, jitter=0.0, fragment=0):
+        """
+        :param host: the address to listen on
+        :param control_port: the port of the private Modbus TCP protocol, default is 502
+        :param report_ports: {'normal': port, 'rich': port, 'real': port}, default is 30001/30002/30003
+        :param gcode_port: the port of the gcode server, None means not served
+        :param axis: number of axes
+        :param arm_type: arm type reported in the version
+        :param version: firmware version reported to the SDK
+        :param sn: robot sn, control_box_sn: control box sn
+        :param tick_hz: rate of the motion simulation
+        :param report_hz: rate of the reports on every report connection
+        :param latency: delay(s) of every frame sent to the clients
+        :param jitter: extra random delay(s) in [0, jitter] of every frame, the order of the frames is kept
+        :param fragment: split every frame into random chunks of 1~fragment bytes, 0 means no fragmentation
+        """
+        self.host = host
+        self.control_port = control_port
+        self.report_ports = {
+            'normal': XCONF.SocketConf.TCP_REPORT_NORM_PORT,
+            'rich': XCONF.SocketConf.TCP_REPORT_RICH_PORT,
+            'real': XCONF.SocketConf.TCP_REPORT_REAL_PORT,
+        }
+        self.report_ports.update(report_ports or {})
+        self.gcode_port = gcode_port
+        self.axis = axis
+        self.arm_type = arm_type
+        self.version = version
+        self.sn = sn
+        self.control_box_sn = control_box_sn
+        self.tick_hz = tick_hz
+        self.report_hz = report_hz
+        self.latency = latency
+        self.jitter = jitter
+        self.fragment = fragment
+
+        self.state = 4
+        self.mode = 0
+        self.error_code = 0
+        self.warn_code = 0
+        self.motion_enabled = False
+        self.pose = list(HOME_POSE)
+        self.angles = [0.0] * 7
+        self.tcp_speed = 0.0
+        self.joint_speeds = [0.0] * 7
+        self.collis_sens = 3
+        self.teach_sens = 3
+        self.dh_params = list(DH_PARAMS)
+        # {(servo_id, addr): value}, the servo registers not set read as 0
+        self.servo_registers = {}
+        # {addr: value} of the standard Modbus TCP server, the addresses not set read as 0
+        self.modbus_bits = {}
+        self.modbus_registers = {}
+        # the addresses of the standard Modbus TCP server which are not mapped, a read of them replies
+        # the exception illegal data address
+        self.modbus_unmapped = set()
+        # the gripper on the tool modbus (slave id XCONF.GRIPPER_ID), {addr: value} of its registers
+        self.tool_baud_inx = 11  # index of 2000000 in UxbusCmd.BAUDRATES
+        self.gripper_registers = {0x0801: 3, 0x0802: 4, 0x0803: 3}
+        self.gripper_position = 0.0
+        self.gripper_target = 0
+        # time.monotonic() when the gripper reached the last target, used to measure the gripper-completion latency
+        self.gripper_idle_time = 0
+        # the lines received by the gcode server, and {line: code} of the lines replied with a non-zero code
+        self.gcode_lines = []
+        self.gcode_codes = {}
+        self.request_count = 0
+        self._queue = deque()
+        self._planned_pose = list(self.pose)
+        self._planned_angles = list(self.angles)
+        self._report_count = 0
+        self._report_times = {}
+        self._connections = []
+        # time.monotonic() when the last queued motion finished, used to measure the motion-completion latency
+        self.idle_time = 0
+
+        self._loop = None
+        self._thread = None
+        self._stop_event = None
+        self._ready = threading.Event()
+        self._start_error = None
+        self._handlers = self._build_handlers()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def cmd_num(self):
+        return len(self._queue)
+
+    def report_time(self, count):
+        """time.monotonic() when the report with the count was built, None if unknown (only the latest 1024)"""
+        return self._report_times.get(count)
+
+    def start(self, timeout=5):
+        """Serve in a background thread, return after the ports are listening"""
+        self._ready.clear()
+        self._start_error = None
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout) or self._start_error is not None:
+            raise Exception('simulator start failed, {}'.format(self._start_error))
+
+    def stop(self):
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def run(self):
+        """Serve in the calling thread until stop()"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        except Exception as e:
+            self._start_error = e
+            self._ready.set()
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _main(self):
+        self._stop_event = asyncio.Event()
+        servers = [await asyncio.start_server(self._handle_control, self.host, self.control_port)]
+        for report_type, port in self.report_ports.items():
+            servers.append(await asyncio.start_server(
+                lambda r, w, report_type=report_type: self._handle_report(report_type, r, w), self.host, port))
+        if self.gcode_port is not None:
+            servers.append(await asyncio.start_server(self._handle_gcode, self.host, self.gcode_port))
+        logger.info('xArm simulator is listening on {}, control port {}, report ports {}'.format(
+            self.host, self.control_port, self.report_ports))
+        tick_task = asyncio.ensure_future(self._tick_loop())
+        self._ready.set()
+        try:
+            await self._stop_event.wait()
+        finally:
+            tick_task.cancel()
+            for server in servers:
+                server.close()
+            # closing the writers first ends the client handlers by eof, a handler ended by cancel
+            # is reported by the callback of start_server as an exception (python 3.11)
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            if tasks:
+                await asyncio.wait(tasks, timeout=1.0)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _open_connection(self, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError:
+                pass
+        conn = _Connection(self, writer)
+        self._connections.append(conn)
+        return conn
+
+    def _close_connection(self, conn):
+        conn.close()
+        if conn in self._connections:
+            self._connections.remove(conn)
+
+    ################################ control ################################
+    async def _handle_control(self, reader, writer):
+        conn = self._open_connection(writer)
+        try:
+            while True:
+                header = await reader.readexactly(6)
+                frame = header + await reader.readexactly(_HEADER.unpack(header)[2])
+                self._handle_request(conn, frame)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self._close_connection(conn)
+
+    def _status_byte(self):
+        status = 0
+        if self.error_code:
+            status |= 0x40
+        if self.warn_code:
+            status |= 0x20
+        if not self._is_ready():
+            status |= 0x10
+        return status
+
+    def _is_ready(self):
+        return self.motion_enabled and self.state not in [4, 5] and self.error_code == 0
+
+    def _handle_request(self, conn, frame):
+        self.request_count += 1
+        trans_id, prot_id, _ = _HEADER.unpack_from(frame)
+        if prot_id == 0:
+            self._handle_modbus_request(conn, frame)
+            return
+        funcode = frame[6]
+        handler = self._handlers.get(funcode)
+        payload = b''
+        if handler is not None:
+            payload = handler(frame[7:], conn, trans_id) or b''
+        body = bytes([funcode, self._status_byte()]) + payload
+        conn.send(_HEADER.pack(trans_id, prot_id, len(body)) + body)
+
+    def _handle_modbus_request(self, conn, frame):
+        # frame: mbap header(7 bytes, with the unit id) + pdu
+        trans_id, unit_id, pdu = _HEADER.unpack_from(frame)[0], frame[6], frame[7:]
+        func_code = pdu[0]
+        body = None
+        exception_code = 0x03
+        if func_code in (0x01, 0x02, 0x03, 0x04) and len(pdu) >= 5:
+            addr, quantity = struct.unpack_from('>HH', pdu, 1)
+            if any(addr + i in self.modbus_unmapped for i in range(quantity)):
+                exception_code = 0x02
+            elif func_code <= 0x02 and 0 < quantity <= 2000:
+                data = bytearray((quantity + 7) // 8)
+                for i in range(quantity):
+                    if self.modbus_bits.get(addr + i, 0):
+                        data[i // 8] |= 1 << (i % 8)
+                body = bytes([func_code, len(data)]) + bytes(data)
+            elif func_code >= 0x03 and 0 < quantity <= 125:
+                values = [self.modbus_registers.get(addr + i, 0) & 0xFFFF for i in range(quantity)]
+                body = struct.pack('>BB{}H'.format(quantity), func_code, quantity * 2, *values)
+        elif func_code == 0x05 and len(pdu) >= 5:
+            addr, value = struct.unpack_from('>HH', pdu, 1)
+            self.modbus_bits[addr] = 1 if value == 0xFF00 else 0
+            body = bytes(pdu[:5])
+        elif func_code == 0x06 and len(pdu) >= 5:
+            addr, value = struct.unpack_from('>HH', pdu, 1)
+            self.modbus_registers[addr] = value
+            body = bytes(pdu[:5])
+        elif func_code == 0x10 and len(pdu) >= 6:
+            addr, quantity = struct.unpack_from('>HH', pdu, 1)
+            for i, value in enumerate(struct.unpack_from('>{}H'.format(quantity), pdu, 6)):
+                self.modbus_registers[addr + i] = value
+            body = bytes(pdu[:5])
+        if body is None:
+            # illegal function, illegal data address or illegal data value
+            body = bytes([func_code | 0x80, 0x01 if func_code not in (0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x10) else exception_code])
+        conn.send(_HEADER.pack(trans_id, 0, len(body) + 1) + bytes([unit_id]) + body)
+
+    def _send_feedback(self, motion, feedback_type, code=XCONF.FeedbackCode.SUCCESS):
+        if motion.conn is None or not (motion.feedback_type & feedback_type):
+            return
+        body = bytes([0xFF, self._status_byte(), feedback_type, 0, 0, 0, code, 0, 0, 0])
+        motion.conn.send(_HEADER.pack(motion.trans_id, 2, len(body)) + body)
+
+    def _build_handlers(self):
+        reg = XCONF.UxbusReg
+
+        def fp32s(values):
+            return convert.fp32s_to_bytes(values, len(values))
+
+        def zeros(size):
+            return lambda params, conn, trans_id: bytes(size)
+
+        handlers = {
+            reg.GET_VERSION: lambda params, conn, trans_id: self._version_bytes(),
+            reg.GET_ROBOT_SN: lambda params, conn, trans_id: '{}\0{}'.format(self.sn, self.control_box_sn).encode().ljust(40, b'\0'),
+            reg.CHECK_VERIFY: zeros(1),
+            reg.MOTION_EN: self._on_motion_enable,
+            reg.SET_STATE: self._on_set_state,
+            reg.GET_STATE: lambda params, conn, trans_id: bytes([self.state]),
+            reg.GET_CMDNUM: lambda params, conn, trans_id: convert.u16_to_bytes(self.cmd_num),
+            reg.GET_ERROR: lambda params, conn, trans_id: bytes([self.error_code, self.warn_code]),
+            reg.CLEAN_ERR: self._on_clean_error,
+            reg.CLEAN_WAR: self._on_clean_warn,
+            reg.SET_MODE: self._on_set_mode,
+            reg.SET_COLLIS_SENS: self._on_set_collis_sens,
+            reg.SET_TEACH_SENS: self._on_set_teach_sens,
+            reg.MOVE_LINE: self._on_move_line,
+            reg.MOVE_LINEB: self._on_move_line,
+            reg.MOVE_LINE_TOOL: self._on_move_line_tool,
+            reg.MOVE_LINE_AA: self._on_move_line,
+            reg.MOVE_RELATIVE: self._on_move_relative,
+            reg.MOVE_JOINT: self._on_move_joint,
+            reg.MOVE_JOINTB: self._on_move_joint,
+            reg.MOVE_HOME: self._on_move_home,
+            reg.MOVE_CIRCLE: self._on_move_circle,
+            reg.SLEEP_INSTT: self._on_sleep,
+            reg.MOVE_SERVOJ: self._on_servoj,
+            reg.MOVE_SERVO_CART: self._on_servo_cartesian,
+            reg.FEEDBACK_CHECK: self._on_feedback_check,
+            reg.SET_FEEDBACK_TYPE: self._on_set_feedback_type,
+            reg.GET_TCP_POSE: lambda params, conn, trans_id: fp32s(self.pose),
+            reg.GET_TCP_POSE_AA: lambda params, conn, trans_id: fp32s(self.pose),
+            reg.GET_JOINT_POS: self._on_get_joint_pos,
+            reg.GET_IK: lambda params, conn, trans_id: fp32s(self.angles),
+            reg.GET_FK: lambda params, conn, trans_id: fp32s(self.pose),
+            reg.GET_DH: lambda params, conn, trans_id: fp32s((self.dh_params + [0] * 28)[:28]),
+            reg.IS_JOINT_LIMIT: zeros(1),
+            reg.IS_TCP_LIMIT: zeros(1),
+            reg.GET_JOINT_TAU: zeros(28),
+            reg.GET_REPORT_TAU_OR_I: zeros(1),
+            reg.GET_SAFE_LEVEL: zeros(1),
+            reg.GET_REDUCED_MODE: zeros(1),
+            reg.GET_ALLOW_APPROX_MOTION: zeros(1),
+            reg.GET_TRAJ_RW_STATUS: zeros(1),
+            reg.GET_HD_TYPES: zeros(2),
+            reg.SERVO_R16B: self._on_servo_read,
+            reg.SERVO_R32B: self._on_servo_read,
+            reg.SERVO_DBMSG: zeros(16),
+            reg.TGPIO_R16B: self._on_tgpio_read,
+            reg.TGPIO_W16B: self._on_tgpio_write,
+            reg.TGPIO_MODBUS: self._on_tool_modbus,
+            reg.TGPIO_COM_DATA: self._on_tool_com_data,
+            reg.TGPIO_R32B: zeros(4),
+        }
+        return handlers
+
+    def _version_bytes(self):
+        version = '{},{},{},{},{}'.format(self.axis, self.arm_type, self.sn, self.control_box_sn, self.version)
+        return version.encode().ljust(40, b'\0')[:40]
+
+    @staticmethod
+    def _floats(params, num):
+        num = min(num, len(params) // 4)
+        return convert.bytes_to_fp32s(params[:num * 4], num)
+
+    def _on_motion_enable(self, params, conn, trans_id):
+        self.motion_enabled = bool(params[1]) if len(params) >= 2 else True
+        if not self.motion_enabled:
+            self._stop_motion(4)
+
+    def _on_set_state(self, params, conn, trans_id):
+        value = params[0] if params else 0
+        if value == 0:
+            if self.motion_enabled and self.error_code == 0:
+                self.state = 1 if self._queue else 2
+        elif value == 3:
+            if self.state == 1:
+                self.state = 3
+        elif value == 4:
+            self._stop_motion(4)
+
+    def _on_clean_error(self, params, conn, trans_id):
+        if self.error_code:
+            self.error_code = 0
+            self._stop_motion(4)
+
+    def _on_clean_warn(self, params, conn, trans_id):
+        self.warn_code = 0
+
+    def _on_set_mode(self, params, conn, trans_id):
+        self.mode = params[0] if params else 0
+        self._stop_motion(self.state)
+
+    def _on_set_collis_sens(self, params, conn, trans_id):
+        self.collis_sens = params[0] if params else self.collis_sens
+
+    def _on_set_teach_sens(self, params, conn, trans_id):
+        self.teach_sens = params[0] if params else self.teach_sens
+
+    def _on_servo_read(self, params, conn, trans_id):
+        if len(params) < 3:
+            return bytes(4)
+        value = self.servo_registers.get((params[0], convert.bytes_to_u16(params[1:3])), 0)
+        return convert.int32_to_bytes(int(value), is_big_endian=True)
+
+    def _on_tgpio_read(self, params, conn, trans_id):
+        if len(params) >= 3 and convert.bytes_to_u16(params[1:3]) == XCONF.ServoConf.MODBUS_BAUDRATE & 0x0FFF:
+            return convert.int32_to_bytes(self.tool_baud_inx, is_big_endian=True)
+        return bytes(4)
+
+    def _on_tgpio_write(self, params, conn, trans_id):
+        if len(params) >= 7 and convert.bytes_to_u16(params[1:3]) == 0x1A0B:
+            self.tool_baud_inx = int(convert.bytes_to_fp32(params[3:7]))
+
+    ################################ tool gripper ################################
+    @property
+    def gripper_moving(self):
+        return self.gripper_registers.get(XCONF.ServoConf.CON_EN, 0) == 1 and int(self.gripper_position) != self.gripper_target
+
+    def _gripper_read(self, addr):
+        if addr == 0x0000:
+            enabled = self.gripper_registers.get(XCONF.ServoConf.CON_EN, 0) == 1
+            return (1 if self.gripper_moving else 0) | ((XCONF.BioGripperState.IS_ENABLED if enabled else 0) << 2)
+        if addr in (XCONF.ServoConf.CURR_POS, XCONF.ServoConf.CURR_POS + 1):
+            value = int(self.gripper_position) & 0xFFFFFFFF
+            return value >> 16 if addr == XCONF.ServoConf.CURR_POS else value & 0xFFFF
+        return self.gripper_registers.get(addr, 0)
+
+    def _gripper_write(self, addr, value):
+        self.gripper_registers[addr] = value
+        # the low word of the target position (TAGET_POS or the position of the G2 block) starts the motion
+        if addr in (XCONF.ServoConf.TAGET_POS + 1, 0x0C04):
+            target = (self.gripper_registers.get(addr - 1, 0) << 16) | value
+            self.gripper_target = target - (1 << 32) if target & 0x80000000 else target
+
+    def _on_tool_modbus(self, params, conn, trans_id):
+        # params: host id + modbus rtu frame without crc, the response is the same
+        if len(params) < 3 or params[1] != XCONF.GRIPPER_ID:
+            return bytes(params[:1])
+        host_id, frame = params[0], params[1:]
+        func_code = frame[1]
+        if func_code == 0x03 and len(frame) >= 6:
+            addr, quantity = struct.unpack_from('>HH', frame, 2)
+            values = [self._gripper_read(addr + i) & 0xFFFF for i in range(quantity)]
+            return bytes([host_id]) + struct.pack('>BBB{}H'.format(quantity), frame[0], func_code, quantity * 2, *values)
+        if func_code == 0x06 and len(frame) >= 6:
+            addr, value = struct.unpack_from('>HH', frame, 2)
+            self._gripper_write(addr, value)
+            return bytes([host_id]) + bytes(frame[:6])
+        if func_code == 0x10 and len(frame) >= 7:
+            addr, quantity = struct.unpack_from('>HH', frame, 2)
+            for i, value in enumerate(struct.unpack_from('>{}H'.format(quantity), frame, 7)):
+                self._gripper_write(addr + i, value)
+            return bytes([host_id]) + bytes(frame[:6])
+        return bytes([host_id, frame[0], func_code | 0x80, 0x01])
+
+    def _on_tool_com_data(self, params, conn, trans_id):
+        # transparent transmission: the frames are with the crc, a frame with a wrong crc is not replied
+        if len(params) < 5 or not crc16.crc_modbus_check(params[1:]):
+            return bytes(params[:1])
+        res = self._on_tool_modbus(params[:-2], conn, trans_id)
+        return res + crc16.crc_modbus(res[1:]) if len(res) > 1 else res
+
+    def _tick_gripper(self, dt):
+        if not self.gripper_moving:
+            return
+        speed = self.gripper_registers.get(XCONF.ServoConf.POS_SPD, 0) or 2000
+        diff = self.gripper_target - self.gripper_position
+        step = min(abs(diff), speed * dt)
+        self.gripper_position += step if diff > 0 else -step
+        if abs(self.gripper_target - self.gripper_position) < 1:
+            self.gripper_position = float(self.gripper_target)
+            self.gripper_idle_time = time.monotonic()
+
+    def _on_set_feedback_type(self, params, conn, trans_id):
+        conn.feedback_type = params[0] if params else 0
+
+    def _on_get_joint_pos(self, params, conn, trans_id):
+        if not params:
+            return convert.fp32s_to_bytes(self.angles, 7)
+        values = list(self.angles)
+        if params[0] & 0x0F >= 2:
+            values += self.joint_speeds
+        if params[0] & 0x0F >= 3:
+            values += [0.0] * 7
+        return convert.fp32s_to_bytes(values, len(values))
+
+    def _stop_motion(self, state):
+        for motion in self._queue:
+            self._send_feedback(motion, XCONF.FeedbackType.MOTION_FINISH, XCONF.FeedbackCode.DISCARD)
+        self._queue.clear()
+        self._planned_pose = list(self.pose)
+        self._planned_angles = list(self.angles)
+        self.tcp_speed = 0.0
+        self.joint_speeds = [0.0] * 7
+        self.state = state
+
+    def _enqueue(self, motion, params_len, check_index=None):
+        """Queue the motion, the reply has 3 bytes if the command carries the only_check_type byte"""
+        if not self._is_ready() or self.mode != 0:
+            return b'' if check_index is None or params_len <= check_index else bytes(3)
+        if motion.target_pose is not None:
+            self._planned_pose = list(motion.target_pose)
+        if motion.target_angles is not None:
+            self._planned_angles = list(motion.target_angles)
+        self._queue.append(motion)
+        self.state = 1 if self.state != 3 else 3
+        return b'' if check_index is None or params_len <= check_index else bytes(3)
+
+    def _motion(self, kind, conn, trans_id, **kwargs):
+        return _Motion(kind, conn=conn, trans_id=trans_id, feedback_type=conn.feedback_type, **kwargs)
+
+    def _on_move_line(self, params, conn, trans_id):
+        # MOVE_LINE: 9 floats [+ bytes], the common version: 10 floats (with radius) + 3/4 bytes
+        num = 10 if len(params) in [43, 44] else 9
+        values = self._floats(params, num)
+        target = values[:6]
+        extra = params[num * 4:]
+        if num == 10 and len(extra) >= 1 and extra[0] == 1:
+            # tool coordinate
+            target = [self._planned_pose[i] + target[i] for i in range(6)]
+        return self._enqueue(self._motion('line', conn, trans_id, target_pose=target, speed=values[6]), len(params) - num * 4, 0)
+
+    def _on_move_line_tool(self, params, conn, trans_id):
+        values = self._floats(params, 9)
+        target = [self._planned_pose[i] + values[i] for i in range(6)]
+        return self._enqueue(self._motion('line', conn, trans_id, target_pose=target, speed=values[6]), len(params) - 36, 0)
+
+    def _on_move_relative(self, params, conn, trans_id):
+        values = self._floats(params, 11)
+        extra = params[44:]
+        if extra and extra[0]:
+            target = [self._planned_angles[i] + values[i] for i in range(7)]
+            motion = self._motion('joint', conn, trans_id, target_angles=target, speed=values[7])
+        else:
+            target = [self._planned_pose[i] + values[i] for i in range(6)]
+            motion = self._motion('line', conn, trans_id, target_pose=target, speed=values[7])
+        return self._enqueue(motion, len(extra), 2)
+
+    def _on_move_joint(self, params, conn, trans_id):
+        values = self._floats(params, 10)
+        motion = self._motion('joint', conn, trans_id, target_angles=values[:7], speed=values[7])
+        return self._enqueue(motion, len(params) - 40, 0)
+
+    def _on_move_home(self, params, conn, trans_id):
+        values = self._floats(params, 3)
+        motion = self._motion('joint', conn, trans_id, target_angles=[0.0] * 7, target_pose=list(HOME_POSE), speed=values[0])
+        return self._enqueue(motion, len(params) - 12, 0)
+
+    def _on_move_circle(self, params, conn, trans_id):
+        values = self._floats(params, 16)
+        motion = self._motion('line', conn, trans_id, target_pose=values[6:12], speed=values[12])
+        return self._enqueue(motion, len(params) - 64, 0)
+
+    def _on_sleep(self, params, conn, trans_id):
+        values = self._floats(params, 1)
+        return self._enqueue(self._motion('sleep', conn, trans_id, duration=max(values[0], 0)), 0)
+
+    def _on_feedback_check(self, params, conn, trans_id):
+        return self._enqueue(self._motion('check', conn, trans_id, duration=0.0), 0)
+
+    def _on_servoj(self, params, conn, trans_id):
+        if self._is_ready() and self.mode == 1:
+            self.angles = self._floats(params, 7)
+            self._planned_angles = list(self.angles)
+
+    def _on_servo_cartesian(self, params, conn, trans_id):
+        if self._is_ready() and self.mode == 1:
+            self.pose = self._floats(params, 6)
+            self._planned_pose = list(self.pose)
+
+    ################################ motion ################################
+    async def _tick_loop(self):
+        interval = 1.0 / self.tick_hz
+        last_time = time.monotonic()
+        while True:
+            await asyncio.sleep(interval)
+            curr_time = time.monotonic()
+            self._tick_gripper(curr_time - last_time)
+            self._tick(curr_time - last_time)
+            last_time = curr_time
+
+    def _tick(self, dt):
+        if self.state not in [1, 2] or dt <= 0:
+            self.tcp_speed = 0.0
+            self.joint_speeds = [0.0] * 7
+            return
+        last_pose = list(self.pose)
+        last_angles = list(self.angles)
+        remain = dt
+        while remain > 0 and self._queue:
+            motion = self._queue[0]
+            if not motion.started:
+                motion.start(self.pose, self.angles)
+                self._send_feedback(motion, XCONF.FeedbackType.MOTION_START)
+            remain -= motion.advance(remain, self.pose, self.angles)
+            if motion.done:
+                self._queue.popleft()
+                self._send_feedback(motion, XCONF.FeedbackType.MOTION_FINISH)
+                if not self._queue:
+                    self.idle_time = time.monotonic()
+            else:
+                break
+        self.state = 1 if self._queue else 2
+        self.tcp_speed = math.sqrt(sum((self.pose[i] - last_pose[i]) ** 2 for i in range(3))) / dt
+        self.joint_speeds = [(self.angles[i] - last_angles[i]) / dt for i in range(7)]
+
+    ################################ gcode ################################
+    async def _handle_gcode(self, reader, writer):
+        conn = self._open_connection(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                cmd = line.strip().decode('utf-8', 'replace')
+                self.gcode_lines.append(cmd)
+                # reply: code, mode << 4 | state, error code, cmdnum (2 bytes)
+                conn.send(bytes([self.gcode_codes.get(cmd, 0), (self.mode << 4) | (self.state & 0x0F), self.error_code])
+                          + convert.u16_to_bytes(self.cmd_num))
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            pass
+        finally:
+            self._close_connection(conn)
+
+    ################################ report ################################
+    async def _handle_report(self, report_type, reader, writer):
+        conn = self._open_connection(writer)
+        interval = 1.0 / self.report_hz
+        try:
+            while not conn.closed:
+                conn.send(self.build_report(report_type))
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._close_connection(conn)
+
+    def build_report(self, report_type='rich'):
+        """A report frame ('normal'/'rich'/'real') of the current state"""
+        length = REPORT_LENGTHS[report_type]
+        return bytes(REPORT_DECODERS[report_type].encode_into(bytearray(length), self._report_fields(length)))
+
+    def _report_fields(self, length):
+        self._report_count += 1
+        self._report_times[self._report_count] = time.monotonic()
+        self._report_times.pop(self._report_count - 1024, None)
+        enabled = 0xFF if self.motion_enabled else 0
+        return {
+            'length': length,
+            'state_mode': (self.state & 0x0F) | (self.mode << 4),
+            'cmd_num': self.cmd_num,
+            'angles': self.angles,
+            'pose': self.pose,
+            'torque': [0.0] * 7,
+            'mtbrake': enabled,
+            'mtable': enabled,
+            'error_code': self.error_code,
+            'warn_code': self.warn_code,
+            'pose_offset': [0.0] * 6,
+            'tcp_load': [0.0] * 4,
+            'collis_sens': self.collis_sens,
+            'teach_sens': self.teach_sens,
+            'gravity_direction': [0.0, 0.0, -1.0],
+            'arm_type': self.arm_type,
+            'arm_axis': self.axis,
+            'version': self.version.encode(),
+            'trs_msg': [1000.0, 1.0, 50000.0, 0.1, 1000.0],
+            'p2p_msg': [20.0, 0.01, 20.0, 0.0001, 4.0],
+            'rot_msg': [2.3, 57.3],
+            'temperatures': [30] * 7,
+            'speeds': [self.tcp_speed] + self.joint_speeds,
+            'count': self._report_count,
+            'collision_tool_params': [0.0] * 6,
+            'voltages': [4800] * 7,
+            'currents': [0.0] * 7,
+            'cgpio_values': [0] * 8,
+            'cgpio_input_conf': [0] * 8,
+            'cgpio_output_conf': [0] * 8,
+            'is_collision_detection': 1,
+            'reduced_tcp_boundary': [9999, -9999, 9999, -9999, 9999, -9999],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='simulated xArm controller')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--control-port', type=int, default=XCONF.SocketConf.TCP_CONTROL_PORT)
+    parser.add_argument('--axis', type=int, default=6)
+    parser.add_argument('--tick-hz', type=float, default=100)
+    parser.add_argument('--report-hz', type=float, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help='delay(s) of every frame')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random delay(s) of every frame')
+    parser.add_argument('--fragment', type=int, default=0, help='split the frames into chunks of 1~N bytes')
+    args = parser.parse_args()
+    sim = XArmSimulator(host=args.host, control_port=args.control_port, axis=args.axis, tick_hz=args.tick_hz,
+                        report_hz=args.report_hz, latency=args.latency, jitter=args.jitter, fragment=args.fragment)
+    try:
+        sim.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
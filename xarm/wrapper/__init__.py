@@ -1 +1,8 @@
 from .xarm_api import XArmAPI
+from ..core.utils.lazy import lazy_attrs
+
+# asyncio and the selector loop are only loaded by the scripts which use them
+__getattr__, __dir__ = lazy_attrs(globals(), {
+    'AsyncXArmAPI': '.async_xarm_api',
+    'XArmFleet': '.xarm_fleet',
+})
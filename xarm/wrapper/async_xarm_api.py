@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import math
+import time
+import asyncio
+from ..core.config.x_config import XCONF
+from ..core.utils.log import logger
+from ..core.wrapper.uxbus_cmd_async import AsyncUxbusCmdTcp, AsyncReportStream
+from ..x3.code import APIState
+
+
+class AsyncXArmAPI(object):
+    def __init__(self, port=None, is_radian=False, enable_report=True, report_type='rich',
+                 max_inflight=4, report_queue_size=1):
+        """
+        The xArm API on asyncio streams, all the I/O runs in the event loop of the caller (no threads)
+        Note: only a subset of XArmAPI is available, the return values are the same as XArmAPI
+
+            ex:
+                async with AsyncXArmAPI('192.168.1.185') as arm:
+                    await arm.motion_enable(True)
+                    await arm.set_mode(0)
+                    await arm.set_state(0)
+                    await arm.set_position(300, 0, 200, 180, 0, 0, wait=True)
+                    async for report in arm.reports():
+                        print(report['pose'])
+
+        :param port: ip-address(such as '192.168.1.185')
+        :param is_radian: set the default unit is radians or not, default is False
+        :param enable_report: connect the report socket or not, default is True
+            Note: the wait of the motion commands uses the report if enabled, otherwise polls the state
+        :param report_type: 'normal' / 'rich' / 'real', default is 'rich'
+        :param max_inflight: max number of the requests in flight at the same time, default is 4
+        :param report_queue_size: size of the queue of every reports() iterator, the oldest report is dropped if full
+        """
+        self._port = port
+        self._default_is_radian = is_radian
+        self._enable_report = enable_report
+        self._report_queue_size = report_queue_size
+        self.arm_cmd = AsyncUxbusCmdTcp(max_inflight=max_inflight)
+        self._stream_report = AsyncReportStream(report_type)
+        self._report_task = None
+        self._report_queues = []
+        self._report_cond = None
+        self._last_report = {}
+        self._last_report_time = 0
+
+        self._state = 4
+        self._mode = 0
+        self._cmd_num = 0
+        self._error_code = 0
+        self._warn_code = 0
+        self._position = [201.5, 0, 140.5, 3.1415926, 0, 0]
+        self._angles = [0] * 7
+
+        self._last_tcp_speed = 100  # mm/s
+        self._last_tcp_acc = 2000  # mm/s^2
+        self._last_joint_speed = 0.3490658503988659  # 20 °/s
+        self._last_joint_acc = 8.726646259971648  # 500 °/s^2
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+
+    @property
+    def connected(self):
+        return self.arm_cmd.connected
+
+    @property
+    def reported(self):
+        return self._report_task is not None and not self._report_task.done()
+
+    @property
+    def default_is_radian(self):
+        return self._default_is_radian
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def cmd_num(self):
+        return self._cmd_num
+
+    @property
+    def error_code(self):
+        return self._error_code
+
+    @property
+    def warn_code(self):
+        return self._warn_code
+
+    @property
+    def position(self):
+        """
+        Cartesian position of the last report, [x(mm), y(mm), z(mm), roll(° or rad), pitch(° or rad), yaw(° or rad)]
+        """
+        return self._position[:3] + [self._convert_from_radian(val) for val in self._position[3:6]]
+
+    @property
+    def angles(self):
+        """
+        Servo angles of the last report, (unit: rad if self.default_is_radian is True else °)
+        """
+        return [self._convert_from_radian(val) for val in self._angles]
+
+    @property
+    def last_report(self):
+        """
+        The last decoded report, {field_name: value}
+        """
+        return self._last_report
+
+    def _convert_to_radian(self, val, is_radian=None):
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        return val if is_radian else math.radians(val)
+
+    def _convert_from_radian(self, val, is_radian=None):
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        return val if is_radian else math.degrees(val)
+
+    @staticmethod
+    def _check_code(code):
+        return 0 if code in [0, XCONF.UxbusState.ERR_CODE, XCONF.UxbusState.WAR_CODE, XCONF.UxbusState.STATE_NOT_READY] else code
+
+    def _check_move_code(self, code):
+        if code in [0, XCONF.UxbusState.WAR_CODE]:
+            return 0 if self.arm_cmd.state_is_ready else XCONF.UxbusState.STATE_NOT_READY
+        return code
+
+    async def connect(self, port=None):
+        """
+        Connect to xArm
+
+        :param port: ip-address, default is the port of the constructor
+        """
+        if self.connected:
+            return
+        self._port = port if port is not None else self._port
+        if not self._port:
+            raise Exception('can not connect to port/ip {}'.format(self._port))
+        await self.arm_cmd.connect(self._port)
+        self._report_cond = asyncio.Condition()
+        if self._enable_report:
+            await self._stream_report.connect(self._port)
+            self._report_task = asyncio.ensure_future(self._report_loop())
+
+    async def disconnect(self):
+        """
+        Disconnect
+        """
+        if self._report_task is not None:
+            self._report_task.cancel()
+            try:
+                await self._report_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._report_task = None
+        await self._stream_report.close()
+        await self.arm_cmd.close()
+
+    async def _report_loop(self):
+        try:
+            async for data in self._stream_report.frames():
+                report = self._stream_report.decode(data)
+                self._last_report = report
+                self._last_report_time = time.monotonic()
+                self._state = report.get('state', self._state)
+                self._mode = report.get('mode', self._mode)
+                self._cmd_num = report.get('cmd_num', self._cmd_num)
+                self._error_code = report.get('error_code', self._error_code)
+                self._warn_code = report.get('warn_code', self._warn_code)
+                self._position = report.get('pose', self._position)
+                self._angles = report.get('angles', self._angles)
+                for que in self._report_queues:
+                    if que.full():
+                        que.get_nowait()
+                    que.put_nowait(report)
+                async with self._report_cond:
+                    self._report_cond.notify_all()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError) as e:
+            logger.error('[async report-socket] recv error: {}'.format(e))
+        finally:
+            for que in self._report_queues:
+                if que.full():
+                    que.get_nowait()
+                que.put_nowait(None)
+            async with self._report_cond:
+                self._report_cond.notify_all()
+
+    async def reports(self, queue_size=None):
+        """
+        Async iterator over the reports, every report is a dict of the decoded fields (same names as the report decoders)
+        plus 'state' and 'mode', the iteration stops when the report connection is closed
+
+            ex:
+                async for report in arm.reports():
+                    print(report['state'], report['angles'])
+
+        :param queue_size: the reports are dropped (oldest first) if the consumer is slower than the report rate,
+            default is report_queue_size of the constructor
+        """
+        que = asyncio.Queue(queue_size or self._report_queue_size)
+        self._report_queues.append(que)
+        try:
+            while self.reported or not que.empty():
+                report = await que.get()
+                if report is None:
+                    break
+                yield report
+        finally:
+            self._report_queues.remove(que)
+
+    async def get_version(self):
+        """
+        Get the xArm firmware version
+
+        :return: tuple((code, version)), only when code is 0, the returned result is correct.
+            code: See the API code documentation for details.
+        """
+        ret = await self.arm_cmd.get_version()
+        ret[0] = self._check_code(ret[0])
+        version = ''.join(map(chr, ret[1:]))
+        return ret[0], version[:version.find('\0')] if ret[0] == 0 else None
+
+    async def get_state(self):
+        """
+        Get state
+
+        :return: tuple((code, state)), only when code is 0, the returned result is correct.
+            code: See the API code documentation for details.
+            state: 1 in motion, 2 sleeping, 3 suspended, 4 stopping
+        """
+        ret = await self.arm_cmd.get_state()
+        ret[0] = self._check_code(ret[0])
+        if ret[0] == 0:
+            self._state = ret[1]
+        return ret[0], self._state
+
+    async def set_state(self, state=0):
+        """
+        Set the xArm state
+
+        :param state: default is 0
+            0: sport state
+            3: pause state
+            4: stop state
+        :return: code
+        """
+        ret = await self.arm_cmd.set_state(state)
+        return self._check_code(ret[0])
+
+    async def set_mode(self, mode=0):
+        """
+        Set the xArm mode
+
+        :param mode: default is 0
+            0: position control mode
+            1: servo motion mode
+            2: joint teaching mode
+            4: joint velocity control mode
+            5: cartesian velocity control mode
+            6: joint online trajectory planning mode
+            7: cartesian online trajectory planning mode
+        :return: code
+        """
+        ret = await self.arm_cmd.set_mode(mode)
+        return self._check_code(ret[0])
+
+    async def motion_enable(self, enable=True, servo_id=None):
+        """
+        Motion enable
+
+        :param enable: True/False
+        :param servo_id: 1-(Number of axes), None(8)
+        :return: code
+        """
+        ret = await self.arm_cmd.motion_en(8 if servo_id is None else servo_id, int(enable))
+        return self._check_code(ret[0])
+
+    async def get_cmdnum(self):
+        """
+        Get the cmd count in cache
+
+        :return: tuple((code, cmd_num)), only when code is 0, the returned result is correct.
+        """
+        ret = await self.arm_cmd.get_cmdnum()
+        ret[0] = self._check_code(ret[0])
+        if ret[0] == 0:
+            self._cmd_num = ret[1]
+        return ret[0], self._cmd_num
+
+    async def get_err_warn_code(self):
+        """
+        Get the controller error and warn code
+
+        :return: tuple((code, [error_code, warn_code])), only when code is 0, the returned result is correct.
+        """
+        ret = await self.arm_cmd.get_err_code()
+        ret[0] = self._check_code(ret[0])
+        if ret[0] == 0:
+            self._error_code, self._warn_code = ret[1:3]
+        return ret[0], [self._error_code, self._warn_code]
+
+    async def clean_error(self):
+        """
+        Clean the error, need to be manually enabled motion(arm.motion_enable(True)) and set state(arm.set_state(state=0))after clean error
+
+        :return: code
+        """
+        ret = await self.arm_cmd.clean_err()
+        return self._check_code(ret[0])
+
+    async def clean_warn(self):
+        """
+        Clean the warn
+
+        :return: code
+        """
+        ret = await self.arm_cmd.clean_war()
+        return self._check_code(ret[0])
+
+    async def get_position(self, is_radian=None):
+        """
+        Get the cartesian position
+
+        :param is_radian: the returned value (only roll/pitch/yaw) is in radians or not, default is self.default_is_radian
+        :return: tuple((code, [x, y, z, roll, pitch, yaw])), only when code is 0, the returned result is correct.
+        """
+        ret = await self.arm_cmd.get_tcp_pose()
+        ret[0] = self._check_code(ret[0])
+        if ret[0] != 0:
+            return ret[0], None
+        return 0, ret[1:4] + [self._convert_from_radian(val, is_radian) for val in ret[4:7]]
+
+    async def get_servo_angle(self, is_radian=None):
+        """
+        Get the servo angles
+
+        :param is_radian: the returned value is in radians or not, default is self.default_is_radian
+        :return: tuple((code, [angle-1, ..., angle-7])), only when code is 0, the returned result is correct.
+        """
+        ret = await self.arm_cmd.get_joint_pos()
+        ret[0] = self._check_code(ret[0])
+        if ret[0] != 0:
+            return ret[0], None
+        return 0, [self._convert_from_radian(val, is_radian) for val in ret[1:8]]
+
+    async def get_forward_kinematics(self, angles, input_is_radian=None, return_is_radian=None):
+        """
+        Get the pose by the angles
+
+        :param angles: [angle-1, angle-2, ..., angle-n]
+        :param input_is_radian: the param angles value is in radians or not, default is self.default_is_radian
+        :param return_is_radian: the returned value is in radians or not, default is self.default_is_radian
+        :return: tuple((code, pose)), only when code is 0, the returned result is correct.
+        """
+        angles = [self._convert_to_radian(val, input_is_radian) for val in angles] + [0] * (7 - len(angles))
+        ret = await self.arm_cmd.get_fk(angles)
+        ret[0] = self._check_code(ret[0])
+        if ret[0] != 0:
+            return ret[0], None
+        return 0, ret[1:4] + [self._convert_from_radian(val, return_is_radian) for val in ret[4:7]]
+
+    async def get_inverse_kinematics(self, pose, input_is_radian=None, return_is_radian=None):
+        """
+        Get the angles by the pose
+
+        :param pose: [x(mm), y(mm), z(mm), roll, pitch, yaw]
+        :param input_is_radian: the param pose value(only roll/pitch/yaw) is in radians or not, default is self.default_is_radian
+        :param return_is_radian: the returned value is in radians or not, default is self.default_is_radian
+        :return: tuple((code, angles)), only when code is 0, the returned result is correct.
+        """
+        pose = list(pose[:3]) + [self._convert_to_radian(val, input_is_radian) for val in pose[3:6]]
+        ret = await self.arm_cmd.get_ik(pose)
+        ret[0] = self._check_code(ret[0])
+        if ret[0] != 0:
+            return ret[0], None
+        return 0, [self._convert_from_radian(val, return_is_radian) for val in ret[1:8]]
+
+    async def set_position(self, x, y, z, roll, pitch, yaw, speed=None, mvacc=None, mvtime=0,
+                           is_radian=None, wait=False, timeout=None):
+        """
+        Set the cartesian position (linear motion)
+
+        :param x: cartesian position x, (unit: mm)
+        :param y: cartesian position y, (unit: mm)
+        :param z: cartesian position z, (unit: mm)
+        :param roll: rotate around the X axis, (unit: rad if is_radian is True else °)
+        :param pitch: rotate around the Y axis, (unit: rad if is_radian is True else °)
+        :param yaw: rotate around the Z axis, (unit: rad if is_radian is True else °)
+        :param speed: move speed (mm/s), default is the last used speed
+        :param mvacc: move acceleration (mm/s^2), default is the last used acceleration
+        :param mvtime: 0, reserved
+        :param is_radian: the roll/pitch/yaw in radians or not, default is self.default_is_radian
+        :param wait: whether to wait for the arm to complete, default is False
+        :param timeout: maximum waiting time(unit: second), default is None(no timeout), only valid if wait is True
+        :return: code
+        """
+        self._last_tcp_speed = speed if speed is not None else self._last_tcp_speed
+        self._last_tcp_acc = mvacc if mvacc is not None else self._last_tcp_acc
+        mvpose = [x, y, z] + [self._convert_to_radian(val, is_radian) for val in (roll, pitch, yaw)]
+        ret = await self.arm_cmd.move_line(mvpose, self._last_tcp_speed, self._last_tcp_acc, mvtime)
+        code = self._check_move_code(ret[0])
+        if code == 0 and wait:
+            code = await self.wait_move(timeout)
+        return code
+
+    async def set_servo_angle(self, angle, speed=None, mvacc=None, mvtime=0, is_radian=None, wait=False, timeout=None):
+        """
+        Set the servo angles (joint motion)
+
+        :param angle: angle list, [angle-1, ..., angle-n], (unit: rad if is_radian is True else °)
+        :param speed: move speed (unit: rad/s if is_radian is True else °/s), default is the last used speed
+        :param mvacc: move acceleration (unit: rad/s^2 if is_radian is True else °/s^2), default is the last used acceleration
+        :param mvtime: 0, reserved
+        :param is_radian: the angle in radians or not, default is self.default_is_radian
+        :param wait: whether to wait for the arm to complete, default is False
+        :param timeout: maximum waiting time(unit: second), default is None(no timeout), only valid if wait is True
+        :return: code
+        """
+        self._last_joint_speed = self._convert_to_radian(speed, is_radian) if speed is not None else self._last_joint_speed
+        self._last_joint_acc = self._convert_to_radian(mvacc, is_radian) if mvacc is not None else self._last_joint_acc
+        angles = [self._convert_to_radian(val, is_radian) for val in angle] + [0] * (7 - len(angle))
+        ret = await self.arm_cmd.move_joint(angles, self._last_joint_speed, self._last_joint_acc, mvtime)
+        code = self._check_move_code(ret[0])
+        if code == 0 and wait:
+            code = await self.wait_move(timeout)
+        return code
+
+    async def move_gohome(self, speed=None, mvacc=None, mvtime=0, is_radian=None, wait=False, timeout=None):
+        """
+        Move to go home (Back to zero)
+
+        :param speed: gohome speed (unit: rad/s if is_radian is True else °/s), default is 50 °/s
+        :param mvacc: gohome acceleration (unit: rad/s^2 if is_radian is True else °/s^2), default is 5000 °/s^2
+        :param mvtime: 0, reserved
+        :param is_radian: the speed and acceleration are in radians or not, default is self.default_is_radian
+        :param wait: whether to wait for the arm to complete, default is False
+        :param timeout: maximum waiting time(unit: second), default is None(no timeout), only valid if wait is True
+        :return: code
+        """
+        speed = self._convert_to_radian(speed, is_radian) if speed is not None else math.radians(50)
+        mvacc = self._convert_to_radian(mvacc, is_radian) if mvacc is not None else math.radians(5000)
+        ret = await self.arm_cmd.move_gohome(speed, mvacc, mvtime)
+        code = self._check_move_code(ret[0])
+        if code == 0 and wait:
+            code = await self.wait_move(timeout)
+        return code
+
+    async def set_servo_angle_j(self, angles, speed=None, mvacc=None, mvtime=0, is_radian=None):
+        """
+        Set the servo angle, execute only the last instruction, need to be set to servo motion mode(self.set_mode(1))
+
+        :param angles: angle list, (unit: rad if is_radian is True else °)
+        :param speed: speed, reserved
+        :param mvacc: acceleration, reserved
+        :param mvtime: 0, reserved
+        :param is_radian: the angles in radians or not, default is self.default_is_radian
+        :return: code
+        """
+        angles = [self._convert_to_radian(val, is_radian) for val in angles] + [0] * (7 - len(angles))
+        ret = await self.arm_cmd.move_servoj(angles, speed or 0, mvacc or 0, mvtime)
+        return self._check_move_code(ret[0])
+
+    async def set_servo_cartesian(self, mvpose, speed=None, mvacc=None, mvtime=0, is_radian=None):
+        """
+        Set the servo cartesian, execute only the last instruction, need to be set to servo motion mode(self.set_mode(1))
+
+        :param mvpose: cartesian position, [x(mm), y(mm), z(mm), roll, pitch, yaw]
+        :param speed: move speed (mm/s), reserved
+        :param mvacc: move acceleration (mm/s^2), reserved
+        :param mvtime: 0, reserved
+        :param is_radian: the roll/pitch/yaw of the mvpose in radians or not, default is self.default_is_radian
+        :return: code
+        """
+        mvpose = list(mvpose[:3]) + [self._convert_to_radian(val, is_radian) for val in mvpose[3:6]]
+        ret = await self.arm_cmd.move_servo_cartesian(mvpose, speed or 0, mvacc or 0, mvtime)
+        return self._check_move_code(ret[0])
+
+    async def _wait_report(self, timeout):
+        async with self._report_cond:
+            try:
+                await asyncio.wait_for(self._report_cond.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait_move(self, timeout=None):
+        """
+        Wait until the motion finish or timeout, the state of the report is used if the report is enabled,
+        otherwise the state is polled every 50ms
+
+        :param timeout: maximum waiting time(unit: second), default is None(no timeout)
+        :return: code
+        """
+        expired = time.monotonic() + timeout if timeout is not None else 0
+        moving_reported = False
+        cnt = 0
+        cnt_time = 0
+        state5_cnt = 0
+        state5_cnt_time = 0
+        max_cnt = 2 if self._state == 1 else 10
+        while timeout is None or time.monotonic() < expired:
+            if not self.connected:
+                return APIState.NOT_CONNECTED
+            by_report = self.reported and time.monotonic() - self._last_report_time < 0.4
+            if by_report:
+                state = self._state
+            else:
+                code, state = await self.get_state()
+                if code != 0:
+                    return code
+            if self._error_code != 0:
+                return APIState.HAS_ERROR
+            if state >= 4:
+                if state == 5 and time.monotonic() - state5_cnt_time >= 0.05:
+                    # the same debounce as XArmAPI.wait_move, about 1s in state 5 however often the wait is woken
+                    state5_cnt_time = time.monotonic()
+                    state5_cnt += 1
+                if state != 5 or state5_cnt >= 20:
+                    return APIState.EMERGENCY_STOP
+            else:
+                state5_cnt = 0
+            if state in [0, 1, 3]:
+                cnt = 0
+                moving_reported = moving_reported or (by_report and state == 1)
+            else:
+                if time.monotonic() - cnt_time >= 0.05:
+                    cnt_time = time.monotonic()
+                    cnt += 1
+                if cnt >= max_cnt or (moving_reported and by_report and self._cmd_num == 0):
+                    return 0
+            if by_report:
+                await self._wait_report(0.05)
+            else:
+                await asyncio.sleep(0.05)
+        return APIState.WAIT_FINISH_TIMEOUT
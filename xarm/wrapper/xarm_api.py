@@ -80,6 +80,19 @@ class XArmAPI(object):
                 Note: only available in the param `check_cmdnum_limit` is True
             check_is_ready: check if the arm is ready to move or not, default is True
                 Note: only available if firmware_version < 1.5.20
+            max_inflight: max number of the requests in flight at the same time on the socket connection, default is 1 (no pipelining)
+                Note: only the getters are pipelined, the commands with side effects (motion/set) are still sent one by one,
+                    the batches (get_servo_snapshot, getset_tgpio_modbus_batch) keep up to max_inflight requests in flight,
+                    submit_motion_batch is limited by the command buffer of the controller instead
+            state_history_size: keep the last N reported states (pose/angles/speeds/torques with the host receive time), default is 0 (disabled)
+                Note: requires numpy, see the property `state_history`
+            callback_queue_size: run every report callback in its own worker thread with a bounded queue, default is 0 (disabled)
+                Note: the location/report/state-like callbacks only get the latest value (the pending value is replaced),
+                    the error/warn, feedback and connect callbacks get all the events in order, the events queued while
+                    more than callback_queue_size are pending are counted as overflow, see the property `callback_stats`
+                Note: if enabled, max_callback_thread_count is ignored for the report callbacks
+            fleet: XArmFleet which serves the sockets and the reports of this arm, default is None (own threads)
+                Note: use XArmFleet.add to create the arm instead of passing it
         """
         self._is_radian = is_radian
         self._arm = XArm(port=port,
@@ -204,6 +217,41 @@ class XArmAPI(object):
         """
         return self._arm.connected
 
+    @property
+    def state_history(self):
+        """
+        History of the reported states, None if not enabled by the param state_history_size of the constructor
+        Note: the time is the host time.monotonic() when the report was received, the units are mm and rad
+            ex:
+                t = time.monotonic()  # the capture time of a camera frame
+                state = arm.state_history.state_at(t)  # interpolated, fields: time/pose/angles/tcp_speed/joint_speeds/torques
+                states = arm.state_history.states_between(t - 1, t)  # structured numpy array
+        """
+        return self._arm.state_history
+
+    @property
+    def callback_stats(self):
+        """
+        Statistics of the report callbacks, only available if the param callback_queue_size of the constructor > 0
+        Note: a slow callback only lags (or skips coalesced values of) its own events, the report parsing and the other callbacks are not blocked
+
+        :return: [{'name': event name, 'callback': callback name, 'policy': 'coalesce' or 'fifo',
+            'delivered': .., 'dropped': .., 'overflow': .., 'pending': .., 'lag_last': .., 'lag_max': .., 'lag_mean': ..}, ...]
+            dropped: the coalesced values replaced by a newer one, overflow: the fifo events queued beyond callback_queue_size
+            lag_xxx: seconds from the event to the start of the callback
+        """
+        return self._arm.callback_stats
+
+    @property
+    def wait_latency_stats(self):
+        """
+        Latency statistics of the motion-completion waits (wait=True / wait_move), in seconds
+        Note: the waits are woken by the report stream, get_state is only polled if the report is not available
+        
+        :return: {'count': .., 'polled': .., 'last': .., 'avg': .., 'max': ..}
+        """
+        return self._arm.wait_latency_stats
+
     @property
     def default_is_radian(self):
         """
@@ -1070,6 +1118,43 @@ class XArmAPI(object):
                                         repeat_pause_time=repeat_pause_time, automatic_calibration=automatic_calibration,
                                         speed=speed, mvacc=mvacc, mvtime=mvtime, wait=wait)
 
+    def submit_motion_batch(self, commands, speed=None, mvacc=None, mvtime=None, is_radian=None,
+                            wait=False, timeout=None, chunk_size=256):
+        """
+        Submit many motion commands at once, the commands are encoded together and sent in one write
+            (as many as the command buffer of the controller allows), and their acks are collected together,
+            instead of one request/response per command (socket connection, one request at a time on serial).
+        Note:
+            1. The commands are sent by a background thread, the acks are collected asynchronously,
+                if the command buffer is full (see max_cmdnum), the sending waits for the controller to consume it.
+            2. Sending stops at the first failed command, the remaining commands are not sent.
+            3. The last_used_position/last_used_angles/last_used_xxx_speed/last_used_xxx_acc will be modified.
+
+        :param commands: list of the commands, every command is one of
+            1. [x, y, z, roll, pitch, yaw] or [x, y, z, roll, pitch, yaw, radius]: linear motion, same as set_position
+            2. {'pose': [x, y, z, roll, pitch, yaw], 'radius': None, 'speed': None, 'mvacc': None, 'relative': False}
+            3. {'angles': [angle1, ..., angle7], 'radius': None, 'speed': None, 'mvacc': None, 'relative': False}: joint motion
+            the speed/mvacc/mvtime of the command overrides the ones of the batch
+        :param speed: default speed of the commands (mm/s for the linear motion, rad/s or degree/s for the joint motion)
+        :param mvacc: default acceleration of the commands
+        :param mvtime: 0, reserved
+        :param is_radian: the roll/pitch/yaw/angles/speed of the commands are in radians or not, default is self.default_is_radian
+        :param wait: whether to wait for all the commands to be acked and the arm to complete, default is False
+        :param timeout: maximum waiting time(unit: second), default is None(no timeout), only valid if wait is True
+        :param chunk_size: max number of the commands in one write, default is 256
+            Note: the commands in flight are limited by the command buffer of the controller (see max_cmdnum),
+                not by the max_inflight of the constructor
+        :return: tuple((code, batch)), only when code is 0, the batch is valid.
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            batch: MotionBatch instance, None if the commands are not submitted (not connected, not ready or an invalid command)
+                batch.codes: the result code of every command, None if not acked yet
+                batch.wait(timeout=None): wait until all the commands are acked, return the first non-zero code
+                batch.cancel(): stop sending the remaining commands
+                batch.done: all the commands are acked or the sending stopped
+        """
+        return self._arm.submit_motion_batch(commands, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian,
+                                             wait=wait, timeout=timeout, chunk_size=chunk_size)
+
     def set_servo_attach(self, servo_id=None):
         """
         Attach the servo
@@ -1269,6 +1354,84 @@ class XArmAPI(object):
         """
         return self._arm.get_trajectory_rw_status()
 
+    def start_capture_trajectory(self, fields=('pose', 'angles'), max_duration=None):
+        """
+        Start capturing the trajectory from the report stream on the client side (requires numpy),
+        unlike start_record_trajectory, nothing is recorded on the controller and any mode can be captured
+        Note:
+            1. every report is captured, the rate depends on the report_type of the constructor ('real' is the fastest)
+            2. the time of a state is the host time when its report was received
+
+        :param fields: the captured fields, the time is always captured, default is ('pose', 'angles')
+            'pose': [x(mm), y(mm), z(mm), roll(rad), pitch(rad), yaw(rad)]
+            'angles': joint angles (rad)
+            'tcp_speed': tcp speed (mm/s)
+            'joint_speeds': joint speeds (rad/s)
+            'torques': joint torques
+        :param max_duration: max seconds to capture, the reports after it are dropped, default is None (not limited)
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.start_capture_trajectory(fields=fields, max_duration=max_duration)
+
+    def stop_capture_trajectory(self, filename=None):
+        """
+        Stop capturing the trajectory started by start_capture_trajectory, and save it to a local file
+        The file is columnar binary with a header (the rate of the reports, the robot model, the offsets, ...),
+        open it with xarm.core.utils.trajectory_file.TrajectoryFile (memory-mapped), or replay it by replay_trajectory
+
+        :param filename: path of the local file to save, default is None (not saved)
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.stop_capture_trajectory(filename=filename)
+
+    @property
+    def trajectory_capture(self):
+        """
+        The capture (TrajectoryCapture) started by start_capture_trajectory, None if not capturing
+            capture.count: number of the states captured
+            capture.columns(): the captured states, {name: numpy array}
+        """
+        return self._arm.trajectory_capture
+
+    def replay_trajectory(self, trajectory, mode='servo_j', rate=250, start=0, end=None, speed=None, mvacc=None,
+                          move_to_start=True, wait=True, timeout=None):
+        """
+        Replay a trajectory captured by start_capture_trajectory/stop_capture_trajectory with the servo motion (mode 1),
+        the captured states are resampled at a fixed rate and streamed on absolute deadlines,
+        so the timing of the capture is kept (see xarm.tools.servo_streamer.ServoStreamer)
+        Note:
+            1. the arm is left in the servo motion mode (mode 1) after the replay
+            2. the tcp offset and the world offset should be the same as when captured (see the metadata of the file)
+
+        :param trajectory: path of the file, or a TrajectoryFile
+        :param mode: 'servo_j' (the captured angles by set_servo_angle_j) or 'servo_cartesian' (the captured poses by set_servo_cartesian)
+        :param rate: rate (Hz) of the setpoints, default is 250
+        :param start: seconds from the start of the trajectory to replay from, default is 0
+        :param end: seconds from the start of the trajectory to replay to, default is None (the end)
+        :param speed: speed of set_servo_angle_j/set_servo_cartesian
+        :param mvacc: acceleration of set_servo_angle_j/set_servo_cartesian
+        :param move_to_start: move to the first setpoint (mode 0, wait) before the replay, default is True
+        :param wait: wait for the end of the replay, default is True
+        :param timeout: max seconds to wait (the move to the start and the replay), default is None (forever)
+        :return: tuple((code, stats)), stats is None if not wait
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            stats: statistics of the stream, {'sent', 'missed', 'errors', 'rate', 'jitter', 'rtt'}
+        """
+        return self._arm.replay_trajectory(trajectory, mode=mode, rate=rate, start=start, end=end, speed=speed,
+                                           mvacc=mvacc, move_to_start=move_to_start, wait=wait, timeout=timeout)
+
+    def stop_replay_trajectory(self):
+        """
+        Stop the replay started by replay_trajectory
+
+        :return: tuple((code, stats)), stats is None if not replaying
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            stats: statistics of the stream, {'sent', 'missed', 'errors', 'rate', 'jitter', 'rtt'}
+        """
+        return self._arm.stop_replay_trajectory()
+
     def get_reduced_mode(self):
         """
         Get reduced mode
@@ -1912,6 +2075,40 @@ class XArmAPI(object):
         """
         return self._arm.get_gripper_status()
 
+    def start_gripper_monitor(self, gripper_type='gripper', interval=0.1, callback=None):
+        """
+        Poll the state of the gripper (xArm Gripper or BIO Gripper) in a background thread
+        The reads of a poll are sent together (pipelined) and do not block the other commands,
+        the waits of the gripper motion (wait=True) use the latest state instead of polling by themselves
+
+        :param gripper_type: 'gripper' (xArm Gripper) or 'bio' (BIO Gripper)
+        :param interval: seconds between the polls, default is 0.1 (the period of the status polls of the waits),
+            a shorter one ends the waits earlier but takes more of the bandwidth of the RS485 bus (shared with the other modbus commands)
+        :param callback: called with every state in the monitor thread, callback(state)
+            state: {'seq': .., 'time': .., 'code': .., 'status': .., 'position': .., 'error_code': ..}
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.start_gripper_monitor(gripper_type=gripper_type, interval=interval, callback=callback)
+
+    def stop_gripper_monitor(self):
+        """
+        Stop the gripper monitor started by start_gripper_monitor
+
+        :return: code
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+        """
+        return self._arm.stop_gripper_monitor()
+
+    @property
+    def gripper_monitor(self):
+        """
+        The gripper monitor (GripperMonitor) started by start_gripper_monitor, None if not started
+            monitor.latest: the latest state
+            monitor.wait_update(seq, timeout): wait for a state newer than seq
+        """
+        return self._arm.gripper_monitor
+
     def get_gripper_err_code(self, **kwargs):
         """
         Get the gripper error code
@@ -2424,10 +2621,50 @@ class XArmAPI(object):
         """
         return self._arm.get_servo_debug_msg(show=show, lang=lang)
 
+    def get_servo_snapshot(self, servo_ids=None, registers=None, with_dbmsg=True):
+        """
+        Read the registers of all the servos at once, used only for debugging and health monitoring
+        All the reads are sent together (pipelined) instead of one round trip per read
+
+        :param servo_ids: the servo ids, default is None (all the joints)
+        :param registers: the registers to read, default is None (('health', ))
+            the register names: 'state', 'current', 'temperature', 'bus_voltage', 'position', 'position_deviation',
+                'alarm_code', 'mu_alarm_count', 'version_major', ... (see xarm.x3.servo_snapshot.SERVO_REGISTERS)
+            the group names: 'health', 'version', 'pids'
+            the addresses: 0x000E (read as 16 bits) or (0x0006, 32)
+        :param with_dbmsg: read the status and the error code of the servos too (same as get_servo_debug_msg)
+        :return: tuple((code, snapshot)), only when code is 0, all the values are read successfully.
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            snapshot: {'time': timestamp, 'elapsed': seconds, 'servos': {servo_id: {'status': .., 'error_code': .., register_name: value, ...}}}
+                the value is None if the read is failed
+        """
+        return self._arm.get_servo_snapshot(servo_ids=servo_ids, registers=registers, with_dbmsg=with_dbmsg)
+
+    def start_servo_monitor(self, interval=1.0, servo_ids=None, registers=None, with_dbmsg=True, history=3600, callback=None):
+        """
+        Take the servo snapshots (get_servo_snapshot) periodically in a background thread, for the trend monitoring
+
+        :param interval: seconds between the snapshots
+        :param servo_ids/registers/with_dbmsg: see get_servo_snapshot
+        :param history: max number of the snapshots kept
+        :param callback: called with every snapshot in the monitor thread, callback(snapshot)
+        :return: ServoSnapshotMonitor
+            monitor.series(register, servo_id): time series of a register, (times, values)
+            monitor.latest / monitor.snapshots: the latest snapshot / the snapshots kept
+            monitor.stop(): stop the monitor
+        """
+        return self._arm.start_servo_monitor(interval=interval, servo_ids=servo_ids, registers=registers,
+                                             with_dbmsg=with_dbmsg, history=history, callback=callback)
+
     def run_blockly_app(self, path, **kwargs):
         """
         Run the app generated by xArmStudio software
         :param path: app path
+        :param kwargs:
+            cache: BlocklyCodeCache (xarm.tools.blockly) of the converted apps, default is the shared cache (in memory),
+                the app is converted and compiled again only if the xml content or the conversion options are changed,
+                False to convert every time
+                ex: cache=BlocklyCodeCache(maxsize=32, cache_dir='/tmp/blockly_cache') to keep the converted apps on disk
         """
         return self._arm.run_blockly_app(path, **kwargs)
 
@@ -3062,6 +3299,33 @@ class XArmAPI(object):
         """
         return self._arm.getset_tgpio_modbus_data(datas, min_res_len=min_res_len, host_id=host_id, is_transparent_transmission=is_transparent_transmission, use_503_port=use_503_port, **kwargs)
 
+    def getset_tgpio_modbus_batch(self, datas_list, min_res_len=0, host_id=9, is_transparent_transmission=False, use_503_port=False, limit_sec=0.0, **kwargs):
+        """
+        Send several modbus frames to the tool gpio back to back, the responses are returned in order
+        The frames are sent together (pipelined) instead of one round trip per frame, the same as
+        calling getset_tgpio_modbus_data for every frame
+
+        :param datas_list: [data_list, ...], the data_list is the same as the one of getset_tgpio_modbus_data
+        :param min_res_len: the minimum length of the modbus response data, int or list of int (one for every frame)
+        :param host_id: host_id, default is 9 (TGPIO_HOST_ID)
+            9: END RS485
+            11: CONTROLLER RS485
+        :param is_transparent_transmission: whether to choose transparent transmission, default is False
+            Note: only available if firmware_version >= 1.11.0
+        :param use_503_port: whether to use port 503 for communication, default is False
+        :param limit_sec: min interval(unit: second) between two modbus communications of the tool, default is 0
+            Note: if limit_sec > 0, the frames are sent one at a time with the interval instead of back to back
+        :param kwargs:
+            auto_crc: append the crc to the frames (transparent transmission only), default is False
+            check_crc: check the crc of the responses (transparent transmission only), default is the value of auto_crc
+                code is 24 if the crc of the response is wrong
+
+        :return: list of tuple((code, modbus_response)) in the order of the frames
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            modbus_response: modbus response data
+        """
+        return self._arm.getset_tgpio_modbus_batch(datas_list, min_res_len=min_res_len, host_id=host_id, is_transparent_transmission=is_transparent_transmission, use_503_port=use_503_port, limit_sec=limit_sec, **kwargs)
+
     def set_report_tau_or_i(self, tau_or_i=0):
         """
         Set the reported torque or electric current
@@ -3900,6 +4164,75 @@ class XArmAPI(object):
                 dh_params[24:28]: DH parameters of Joint-7
         """
         return self._arm.get_dh_params()
+
+    def get_kinematics_model(self, refresh=False):
+        """
+        Get a local kinematics model of the arm (requires numpy), built from the DH parameters of the controller,
+        the current TCP offset, world offset and limits. Its forward/inverse kinematics and limit checks run
+        on arrays of poses/joint vectors at once, without a round trip to the controller per pose
+        Note:
+            1. only available if firmware_version >= 2.0.0
+            2. the units of the model are always mm and radian
+            3. the model keeps the offsets of the call, call again after set_tcp_offset/set_world_offset
+            4. model.verify(self, angles) compares the model with the controller on sample joint vectors
+        ex:
+            code, model = arm.get_kinematics_model()
+            poses = model.forward(angles_list)  # (N, 6)
+            angles, ok = model.inverse_path(poses, seed=arm.angles[:arm.axis])
+            out_of_range = model.is_joint_limit(angles) | model.is_tcp_limit(poses)
+
+        :param refresh: read the DH parameters from the controller again, default is False (cached)
+        :return: tuple((code, model)), only when code is 0, the returned result is correct.
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            model: KinematicsModel (xarm.core.utils.kinematics)
+        """
+        return self._arm.get_kinematics_model(refresh=refresh)
+
+    def validate_path(self, paths, speed=None, mvacc=None, is_radian=None, seed=None, step=10,
+                      link_radius=None, refresh=False, rot_speed=None, rot_acc=None):
+        """
+        Validate a path of linear motions (the paths of move_arc_lines or the poses of set_position) before executing it,
+        and estimate its execution time. The lines between the waypoints are sampled every step mm and checked
+        locally at once (requires numpy): reachability, joint limits (and the joint ranges of the reduced mode),
+        tcp limits, the tcp boundary of the reduced mode/fence mode and a coarse self-collision check of the links
+        Note:
+            1. only available if firmware_version >= 2.0.0
+            2. the checks use the local kinematics model (see get_kinematics_model) and the cached limits,
+                a path passing them can still be refused by the controller, e.g. by its own collision model
+            3. the time is estimated with trapezoidal velocity profiles, a waypoint with radius > 0 does not stop the motion
+
+        :param paths: [[x, y, z, roll, pitch, yaw(, radius)], ...]
+        :param speed: tcp speed (mm/s), default is self.last_used_tcp_speed
+        :param mvacc: tcp acceleration (mm/s^2), default is self.last_used_tcp_acc
+        :param is_radian: the roll/pitch/yaw of the paths and the seed/returned angles are in radians or not, default is self.default_is_radian
+        :param seed: joint angles at (or near) the first waypoint, default is the current angles
+        :param step: max distance (mm) between the samples of a line, default is 10
+        :param link_radius: radius (mm) of the links in the self-collision check, 0 means not checked,
+            default is 40 if the self-collision detection of the controller is on, else 0
+        :param refresh: read the DH parameters and the reduced states from the controller again, default is False (cached)
+        :param rot_speed: rotation speed of the tcp orientation in the time estimate (rad/s or °/s),
+            default is 45°/s (path_validation.ROT_SPEED), the joint speed is not used
+        :param rot_acc: rotation acceleration of the tcp orientation in the time estimate (rad/s^2 or °/s^2),
+            default is 180°/s^2 (path_validation.ROT_ACC)
+        :return: tuple((code, result)), only when code is 0, the returned result is correct.
+            code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
+            result: {
+                'ok': True if all the waypoints passed,
+                'duration': estimated execution time (s),
+                'waypoints': [{
+                    'ok': True if all the checks passed,
+                    'unreachable': the waypoint or the line to it can not be reached continuously,
+                    'joint_limit': out of the joint limits,
+                    'tcp_limit': out of the tcp limits,
+                    'out_of_boundary': out of the tcp boundary of the reduced mode/fence mode,
+                    'self_collision': the links intersect,
+                    'angles': joint angles at the waypoint,
+                    'time': estimated time (s) when the waypoint is reached,
+                }, ...]
+            }
+        """
+        return self._arm.validate_path(paths, speed=speed, mvacc=mvacc, is_radian=is_radian, seed=seed, step=step,
+                                       link_radius=link_radius, refresh=refresh, rot_speed=rot_speed, rot_acc=rot_acc)
     
     def set_dh_params(self, dh_params, flag=0):
         """
@@ -4105,6 +4438,11 @@ class XArmAPI(object):
         :return : Hexadecimal data_list or code
             code: See the [API Code Documentation](./xarm_api_code.md#api-code) for details.
                 Note: code 129~144 means modbus tcp exception, the actual modbus tcp exception code is (code-0x80), refer to [Standard Modbus TCP](../UF_ModbusTCP_Manual.md)
+                -2: the length of datas is less than 7
+                -3: the protocol identifier is not 0/2/3
+                -4: the length field does not match the length of datas
+                5 (APIState.CMD_NUM_ERROR): the transaction id is used by a request still waiting for its response
+                    (a pipelined getter or a motion batch), send it again with another transaction id
         """
         return self._arm.send_hex_cmd(datas, **kwargs)
     
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from ..core.comm.selector_port import SelectorLoop, SelectorSocketPort
+from ..core.utils.log import logger
+from ..core.utils.stats import percentiles
+from .xarm_api import XArmAPI
+
+
+class _FeedbackSink(object):
+    """Takes the place of the feedback queue of the arm, the feedbacks are handled by the worker of the fleet"""
+    def __init__(self, fleet, entry):
+        self._fleet = fleet
+        self._entry = entry
+
+    def put(self, data):
+        self._fleet._put_feedback(self._entry, data)
+
+
+class _FleetEntry(object):
+    """An arm of the fleet: the pending work of the worker, the state of the housekeeping and the statistics"""
+    def __init__(self, arm, history):
+        self.arm = arm
+        self.attached = False
+        # only the latest report is kept, the feedbacks are kept in order
+        self.report = None
+        self.feedbacks = deque()
+        self.queued = False
+        # housekeeping, same as the report thread of the arm
+        self.protocol_identifier = 2
+        self.last_send_time = 0
+        self.report_connected = False
+        self.connect_failed_cnt = 0
+        self.next_report_connect = 0
+        self.timed_comm_cnt = 0
+        self.timed_comm_send_time = 0
+        # the housekeeping of the arm running in the pool of the housekeeper, None if not running
+        self.housekeeping = None
+        # statistics
+        self.report_count = 0
+        self.dropped_count = 0
+        self.last_recv_time = None
+        self.intervals = deque(maxlen=history)
+        self.lags = deque(maxlen=history)
+        self.handle_times = deque(maxlen=history)
+
+
+class XArmFleet(object):
+    """
+    Many arms in one process, served by three threads (and the small pool of the housekeeper) whatever the number of the arms
+        1. the selector loop: reads the control and the report sockets of all the arms, sends the heartbeats
+        2. the worker: handles the reports and the feedbacks of all the arms (decode, properties, callbacks, waits)
+        3. the housekeeper: keeps the connections alive, reconnects the report sockets, the timed communication,
+            the arms are kept in parallel by a small pool, a slow or unreachable arm only delays itself
+    instead of 4~6 threads per arm, the arms are XArmAPI instances and their APIs work the same
+    Note:
+        1. the report callbacks are run by the worker, a slow callback delays the reports of all the arms,
+            use the param callback_queue_size of the arm to run them in their own threads
+        2. only the socket connections (ip) are supported
+
+        ex:
+            with XArmFleet() as fleet:
+                fleet.add('192.168.1.185', name='left')
+                fleet.add('192.168.1.186', name='right', report_type='normal')
+                for arm in fleet:
+                    arm.motion_enable(True)
+                fleet['left'].set_position(x=300, wait=True)
+                print(fleet.stats())
+
+    :param history: number of the recent reports of every arm used by the statistics
+    :param housekeeping_interval: interval(s) of the housekeeping of the arms
+    :param housekeeping_workers: max number of the arms kept at the same time
+    """
+    def __init__(self, history=1000, housekeeping_interval=0.5, housekeeping_workers=4):
+        self._history = history
+        self._housekeeping_interval = housekeeping_interval
+        self._housekeeping_workers = max(int(housekeeping_workers), 1)
+        self._loop = SelectorLoop()
+        self._arms = OrderedDict()
+        self._entries = {}
+        self._ready = deque()
+        self._cond = threading.Condition()
+        self._alive = False
+        self._worker = None
+        self._housekeeper = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return len(self._arms)
+
+    def __iter__(self):
+        return iter(list(self._arms.values()))
+
+    def __getitem__(self, name):
+        return self._arms[name]
+
+    def __contains__(self, name):
+        return name in self._arms
+
+    @property
+    def names(self):
+        return list(self._arms.keys())
+
+    @property
+    def alive(self):
+        return self._alive
+
+    def start(self):
+        if self._alive:
+            return
+        self._alive = True
+        self._loop.start()
+        self._worker = threading.Thread(target=self._worker_thread, name='xarm-fleet-worker', daemon=True)
+        self._worker.start()
+        self._housekeeper = threading.Thread(target=self._housekeeper_thread, name='xarm-fleet-housekeeper', daemon=True)
+        self._housekeeper.start()
+
+    def close(self):
+        """Disconnect all the arms and stop the threads"""
+        for name in self.names:
+            self.remove(name)
+        self._alive = False
+        with self._cond:
+            self._cond.notify_all()
+        for thread in [self._worker, self._housekeeper]:
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(2)
+        self._loop.stop()
+
+    def add(self, port, name=None, **kwargs):
+        """
+        Create an arm served by the fleet
+        :param port: ip-address(such as '192.168.1.185')
+        :param name: name of the arm in the fleet, default is the ip-address
+        :param kwargs: the params of XArmAPI
+        :return: XArmAPI instance
+        """
+        name = port if name is None else name
+        assert name not in self._arms, 'the name {} is used'.format(name)
+        self.start()
+        kwargs['fleet'] = self
+        arm = XArmAPI(port, **kwargs)
+        self._arms[name] = arm
+        return arm
+
+    def remove(self, name):
+        """Disconnect the arm and remove it from the fleet"""
+        arm = self._arms.pop(name, None)
+        if arm is not None:
+            arm.disconnect()
+        return arm
+
+    def stats(self):
+        """
+        Statistics of the arms
+        :return: {name: {
+                'connected': .., 'reported': ..,
+                'reports': number of the reports handled, 'dropped': number of the reports replaced by a newer one,
+                'report_rate': rate(Hz) of the reports received,
+                'interval': time between the reports received (ms),
+                'lag': time from the receive of a report to the start of its handling (ms),
+                'handle': time used to handle a report (ms),
+            }}, the times are {'mean', 'p50', 'p90', 'p99', 'max'} of the recent reports
+        """
+        stats = OrderedDict()
+        for name, arm in self._arms.items():
+            entry = self._entries.get(arm._arm)
+            intervals = list(entry.intervals) if entry else []
+            stats[name] = {
+                'connected': arm.connected,
+                'reported': arm._arm.reported,
+                'reports': entry.report_count if entry else 0,
+                'dropped': entry.dropped_count if entry else 0,
+                'report_rate': len(intervals) / sum(intervals) if intervals and sum(intervals) > 0 else 0,
+                'interval': percentiles(intervals),
+                'lag': percentiles(list(entry.lags) if entry else []),
+                'handle': percentiles(list(entry.handle_times) if entry else []),
+            }
+        return stats
+
+    ######################## used by the arms ########################
+    def _get_entry(self, arm):
+        entry = self._entries.get(arm)
+        if entry is None:
+            entry = _FleetEntry(arm, self._history)
+            self._entries[arm] = entry
+        return entry
+
+    def open_port(self, arm, server_ip, server_port, is_report=False, **kwargs):
+        """Create the socket port of the arm, read by the selector loop"""
+        entry = self._get_entry(arm)
+        if is_report:
+            kwargs['report_sink'] = lambda data, recv_time: self._put_report(entry, data, recv_time)
+        elif kwargs.get('fb_que') is not None:
+            kwargs['fb_que'] = _FeedbackSink(self, entry)
+        return SelectorSocketPort(self._loop, server_ip, server_port, **kwargs)
+
+    def attach(self, arm):
+        """The arm is connected, start to handle its reports"""
+        entry = self._get_entry(arm)
+        entry.report_connected = arm.reported
+        with self._cond:
+            entry.attached = True
+            self._enqueue(entry)
+
+    def detach(self, arm):
+        """The arm is disconnected"""
+        entry = self._entries.pop(arm, None)
+        if entry is not None:
+            with self._cond:
+                entry.attached = False
+                entry.report = None
+                entry.feedbacks.clear()
+
+    def _enqueue(self, entry):
+        if not entry.queued and (entry.feedbacks or (entry.attached and entry.report is not None)):
+            entry.queued = True
+            self._ready.append(entry)
+            self._cond.notify()
+
+    def _put_report(self, entry, data, recv_time):
+        with self._cond:
+            if entry.report is not None:
+                entry.dropped_count += 1
+            entry.report = (data, recv_time)
+            if entry.last_recv_time is not None:
+                entry.intervals.append(recv_time - entry.last_recv_time)
+            entry.last_recv_time = recv_time
+            self._enqueue(entry)
+
+    def _put_feedback(self, entry, data):
+        with self._cond:
+            entry.feedbacks.append(data)
+            self._enqueue(entry)
+
+    ######################## threads ########################
+    def _worker_thread(self):
+        while self._alive:
+            with self._cond:
+                while self._alive and not self._ready:
+                    self._cond.wait(1)
+                if not self._alive:
+                    break
+                # round robin, an arm with pending work is queued again after the work taken now
+                entry = self._ready.popleft()
+                entry.queued = False
+                feedbacks = list(entry.feedbacks)
+                entry.feedbacks.clear()
+                report = entry.report if entry.attached else None
+                if report is not None:
+                    entry.report = None
+            arm = entry.arm
+            for data in feedbacks:
+                try:
+                    arm._feedback_callback(data)
+                except Exception as e:
+                    logger.error('handle feedback exception: {}'.format(e))
+            if report is not None:
+                data, recv_time = report
+                start_time = time.monotonic()
+                try:
+                    arm._handle_report_frame(data, recv_time)
+                except Exception as e:
+                    logger.error(e)
+                entry.report_count += 1
+                entry.lags.append(start_time - recv_time)
+                entry.handle_times.append(time.monotonic() - start_time)
+
+    def _housekeeper_thread(self):
+        executor = ThreadPoolExecutor(max_workers=self._housekeeping_workers, thread_name_prefix='xarm-fleet-housekeeping')
+        try:
+            while self._alive:
+                curr_time = time.monotonic()
+                for entry in list(self._entries.values()):
+                    # an arm still kept since the last round (e.g. blocked by a timeout) is skipped, not waited for
+                    if not entry.attached or (entry.housekeeping is not None and not entry.housekeeping.done()):
+                        continue
+                    entry.housekeeping = executor.submit(self._safe_housekeep, entry, curr_time)
+                time.sleep(self._housekeeping_interval)
+        finally:
+            executor.shutdown(wait=False)
+
+    def _safe_housekeep(self, entry, curr_time):
+        try:
+            self._housekeep(entry, curr_time)
+        except Exception as e:
+            logger.error('fleet housekeeping exception: {}'.format(e))
+
+    @staticmethod
+    def _stop_arm(entry):
+        entry.attached = False
+        entry.arm._handle_report_stopped()
+
+    def _housekeep(self, entry, curr_time):
+        # the same as the report thread and the timed communication thread of an arm
+        arm = entry.arm
+        if not arm.connected:
+            self._stop_arm(entry)
+            return
+        if arm._timed_comm and arm._keep_heart and curr_time - entry.timed_comm_send_time > 10 \
+                and curr_time - arm.arm_cmd.last_comm_time > arm._timed_comm_interval:
+            if entry.timed_comm_cnt == 0:
+                code, _ = arm.get_cmdnum()
+            elif entry.timed_comm_cnt == 1:
+                code, _ = arm.get_state()
+            else:
+                code, _ = arm.get_err_warn_code()
+            entry.timed_comm_cnt = (entry.timed_comm_cnt + 1) % 3
+            if code >= 0:
+                entry.timed_comm_send_time = curr_time
+        if not arm._enable_report:
+            return
+        if arm._keep_heart:
+            if entry.protocol_identifier != 3 and arm.version_is_ge(1, 8, 6) and arm.arm_cmd.set_protocol_identifier(3) == 0:
+                entry.protocol_identifier = 3
+            if entry.protocol_identifier == 3 and curr_time - entry.last_send_time > 10 and curr_time - arm.arm_cmd.last_comm_time > 30:
+                code, _ = arm.get_state()
+                if code >= 0:
+                    entry.last_send_time = curr_time
+                if curr_time - arm.arm_cmd.last_comm_time > 90:
+                    logger.error('client timeout over 90s, disconnect')
+                    self._stop_arm(entry)
+                    return
+        if arm.reported:
+            entry.connect_failed_cnt = 0
+            if not entry.report_connected:
+                entry.report_connected = True
+                arm._report_connect_changed_callback(True, True)
+            return
+        if entry.report_connected:
+            entry.report_connected = False
+            arm._report_connect_changed_callback(True, False)
+        if curr_time < entry.next_report_connect:
+            return
+        if arm._stream_report:
+            # wait 2s after the close before the reconnection, without blocking the other arms
+            try:
+                arm._stream_report.close()
+            except:
+                pass
+            arm._stream_report = None
+            entry.next_report_connect = curr_time + 2
+            return
+        arm._connect_report()
+        if not arm.reported:
+            entry.connect_failed_cnt += 1
+            if entry.connect_failed_cnt <= 10 or entry.protocol_identifier == 3:
+                entry.next_report_connect = curr_time + 2
+            else:
+                logger.error('report thread is break, connected={}, failed_cnts={}'.format(arm.connected, entry.connect_failed_cnt))
+                self._stop_arm(entry)
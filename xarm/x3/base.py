@@ -12,25 +12,20 @@ import time
 import math
 import uuid
 import queue
-import struct
 import threading
 from collections.abc import Iterable
-try:
-    from multiprocessing.pool import ThreadPool
-except:
-    ThreadPool = None
-try:
-    import asyncio
-
-    if sys.version_info.major >= 3 and sys.version_info.minor >= 5:
-        from .grammar_async import AsyncObject as BaseObject
-    else:
-        from .grammar_coroutine import CoroutineObject as BaseObject
-except:
-    asyncio = None
+from ..core.utils.lazy import LazyModule
+# the event loop and the thread pool of the callbacks are only used if max_callback_thread_count is set
+asyncio = LazyModule('asyncio')
+pool = LazyModule('multiprocessing.pool')
+if sys.version_info.major >= 3 and sys.version_info.minor >= 5:
+    from .grammar_async import AsyncObject as BaseObject
+else:
+    from .grammar_coroutine import CoroutineObject as BaseObject
 if not hasattr(math, 'inf'):
     setattr(math, 'inf', float('inf'))
 from .events import Events
+from .dispatcher import CallbackDispatcher
 from ..core.config.x_config import XCONF
 from ..core.comm import SocketPort
 try:
@@ -40,16 +35,15 @@ except:
 from ..core.wrapper import UxbusCmdSer, UxbusCmdTcp
 from ..core.utils.log import logger, pretty_print
 from ..core.utils import convert, crc16
-from ..core.config.x_code import ControllerWarn, ControllerError, ControllerErrorCodeMap, ControllerWarnCodeMap
+from ..core.utils.report_decoder import REPORT_DECODERS
+from ..core.utils.state_history import StateHistory
+x_code = LazyModule('..core.config.x_code', __package__)
 from .utils import compare_time, compare_version, filter_invaild_number
 from .decorator import xarm_is_connected, xarm_is_ready, xarm_is_not_simulation_mode, xarm_wait_until_cmdnum_lt_max, xarm_wait_until_not_pause
 from .code import APIState
 from ..tools.threads import ThreadManage
 from ..version import __version__
 
-controller_error_keys = ControllerErrorCodeMap.keys()
-controller_warn_keys = ControllerWarnCodeMap.keys()
-
 print('SDK_VERSION: {}'.format(__version__))
 
 
@@ -90,10 +84,16 @@ class Base(BaseObject, Events):
             self._default_linear_motor_baud = kwargs.get('default_linear_motor_baud', kwargs.get('default_linear_track_baud', 2000000))
 
             self._max_callback_thread_count = kwargs.get('max_callback_thread_count', 0)
+            self._max_inflight = kwargs.get('max_inflight', XCONF.UxbusConf.MAX_INFLIGHT)
             self._asyncio_loop = None
             self._asyncio_loop_alive = False
             self._asyncio_loop_thread = None
             self._pool = None
+            # callback_queue_size > 0: the report callbacks are run by the CallbackDispatcher (per-callback queue and worker)
+            callback_queue_size = kwargs.get('callback_queue_size', 0)
+            self._callback_dispatcher = CallbackDispatcher(callback_queue_size) if callback_queue_size > 0 else None
+            # XArmFleet: the sockets are read by the selector loop of the fleet and the reports are handled by its worker
+            self._fleet = kwargs.get('fleet', None)
             self._thread_manage = ThreadManage()
 
             self._rewrite_modbus_baudrate_method = kwargs.get('rewrite_modbus_baudrate_method', True)
@@ -239,6 +239,10 @@ class Base(BaseObject, Events):
             self.linear_motor_is_enabled = False
             self._ft_ext_force = [0, 0, 0, 0, 0, 0]
             self._ft_raw_force = [0, 0, 0, 0, 0, 0]
+            # (ReportView, set of the lazy fields not applied yet) of the last report, see _update_lazy_report
+            self._lazy_report = None
+            self._mtbrake_mtable_raw = None
+            self._servo_codes_raw = None
             self._only_check_result = 0
             self._keep_heart = True
 
@@ -252,6 +256,25 @@ class Base(BaseObject, Events):
             self._fb_transid_type_map = {}
             self._fb_transid_result_map = {}
 
+            # the motion-completion waits are woken by the report thread / feedback thread through this condition
+            self._report_cond = threading.Condition()
+            self._report_state_key = None  # (state, cmd_num, mode, error_code) of the last report
+            self._report_recv_time = 0
+            self._report_change_time = 0
+            self._report_every_waiters = 0  # number of the waits which are woken by every report, not only the changes
+            self._last_feedback_time = 0
+            self._wait_latency_stats = {'count': 0, 'polled': 0, 'last': 0, 'total': 0, 'max': 0}
+
+            self._state_history = None
+            state_history_size = kwargs.get('state_history_size', 0)
+            if state_history_size > 0:
+                try:
+                    self._state_history = StateHistory(state_history_size)
+                except ImportError as e:
+                    logger.error('state history is disabled, {}'.format(e))
+            # TrajectoryCapture of start_capture_trajectory, filled with the reports like the state history
+            self._trajectory_capture = None
+
             if not do_not_open:
                 self.connect()
 
@@ -369,6 +392,9 @@ class Base(BaseObject, Events):
 
         self._ft_ext_force = [0, 0, 0, 0, 0, 0]
         self._ft_raw_force = [0, 0, 0, 0, 0, 0]
+        self._lazy_report = None
+        self._mtbrake_mtable_raw = None
+        self._servo_codes_raw = None
 
         self._has_motion_cmd = False
         self._need_sync = False
@@ -469,10 +495,12 @@ class Base(BaseObject, Events):
 
     @property
     def realtime_tcp_speed(self):
+        self._update_lazy_report('speeds')
         return self._realtime_tcp_speed
 
     @property
     def realtime_joint_speeds(self):
+        self._update_lazy_report('speeds')
         return [speed if self._default_is_radian else math.degrees(speed) for speed in self._realtime_joint_speeds]
 
     @property
@@ -491,6 +519,90 @@ class Base(BaseObject, Events):
     def reported(self):
         return self._stream_report is not None and self._stream_report.connected
 
+    @property
+    def state_history(self):
+        return self._state_history
+
+    @property
+    def callback_stats(self):
+        """
+        Statistics of the report callbacks run by the CallbackDispatcher, [] if callback_queue_size is 0
+        :return: [{'name', 'callback', 'policy', 'delivered', 'dropped', 'overflow', 'pending', 'lag_last', 'lag_max', 'lag_mean'}, ...]
+        """
+        return self._callback_dispatcher.stats() if self._callback_dispatcher is not None else []
+
+    @property
+    def wait_latency_stats(self):
+        """
+        Latency of the motion-completion waits (wait_move/wait feedback),
+        from the arrival of the report/feedback which completes the motion to the return of the wait
+        :return: {'count': waits completed by the report/feedback, 'polled': waits completed by polling get_state,
+            'last': last latency(s), 'avg': average latency(s), 'max': max latency(s)}
+        """
+        stats = self._wait_latency_stats
+        return {
+            'count': stats['count'],
+            'polled': stats['polled'],
+            'last': stats['last'],
+            'avg': stats['total'] / stats['count'] if stats['count'] else 0,
+            'max': stats['max'],
+        }
+
+    def _record_wait_latency(self, event_time):
+        stats = self._wait_latency_stats
+        if event_time <= 0:
+            stats['polled'] += 1
+            return
+        latency = max(time.monotonic() - event_time, 0)
+        stats['count'] += 1
+        stats['last'] = latency
+        stats['total'] += latency
+        stats['max'] = max(stats['max'], latency)
+
+    @property
+    def _report_is_alive(self):
+        # the state in the report is fresh enough to replace get_state
+        return self.reported and time.monotonic() - self._report_recv_time < 0.4
+
+    def _notify_report_waiters(self, is_feedback=False):
+        curr_time = time.monotonic()
+        if is_feedback:
+            self._last_feedback_time = curr_time
+        else:
+            self._report_recv_time = curr_time
+            state_key = (self._state, self._cmd_num, self._mode, self._error_code)
+            if state_key != self._report_state_key:
+                self._report_state_key = state_key
+                self._report_change_time = curr_time
+            elif self._report_every_waiters <= 0:
+                return
+        with self._report_cond:
+            self._report_cond.notify_all()
+
+    def _wait_report_event(self, timeout=0.05, every_report=False):
+        """
+        Wait for the next change of state/cmdnum/feedback, sleep instead if the report is not available
+        :param every_report: woken by every report, not only the changes
+        """
+        if self._report_is_alive:
+            with self._report_cond:
+                if every_report:
+                    self._report_every_waiters += 1
+                try:
+                    self._report_cond.wait(timeout)
+                finally:
+                    if every_report:
+                        self._report_every_waiters -= 1
+        else:
+            time.sleep(timeout)
+
+    def _get_wait_state(self):
+        # use the state of the report, only request it through the command socket if the report is not available
+        if self._report_is_alive:
+            return 0, self._state, True
+        code, state = self.get_state()
+        return code, state, False
+
     @property
     def ready(self):
         return self._is_ready
@@ -501,6 +613,7 @@ class Base(BaseObject, Events):
 
     @property
     def is_simulation_robot(self):
+        self._update_lazy_report('collision')
         return self._is_simulation_robot
 
     def check_is_simulation_robot(self):
@@ -631,6 +744,7 @@ class Base(BaseObject, Events):
 
     @property
     def tcp_load(self):
+        self._update_lazy_report('tcp_load')
         return self._tcp_load
 
     @property
@@ -651,6 +765,7 @@ class Base(BaseObject, Events):
 
     @property
     def temperatures(self):
+        self._update_lazy_report('temperatures')
         return self._temperatures
 
     @property
@@ -709,6 +824,7 @@ class Base(BaseObject, Events):
 
     @property
     def gravity_direction(self):
+        self._update_lazy_report('gravity_direction')
         return self._gravity_direction
 
     @property
@@ -729,18 +845,22 @@ class Base(BaseObject, Events):
 
     @property
     def voltages(self):
+        self._update_lazy_report('voltages')
         return self._voltages
 
     @property
     def currents(self):
+        self._update_lazy_report('currents')
         return self._currents
 
     @property
     def cgpio_states(self):
+        self._update_lazy_report('cgpio_states')
         return self._cgpio_states
 
     @property
     def self_collision_params(self):
+        self._update_lazy_report('collision')
         return [self._is_collision_detection, self._collision_tool_type, self._collision_tool_params]
 
     @property
@@ -769,14 +889,17 @@ class Base(BaseObject, Events):
     
     @property
     def reduced_tcp_boundary(self):
+        self._update_lazy_report('reduced_tcp_boundary')
         return self._reduced_tcp_boundary
     
     @property
     def ft_ext_force(self):
+        self._update_lazy_report('ft_force')
         return self._ft_ext_force
 
     @property
     def ft_raw_force(self):
+        self._update_lazy_report('ft_force')
         return self._ft_raw_force
     
     @property
@@ -842,6 +965,8 @@ class Base(BaseObject, Events):
 
     def _clean_thread(self):
         self._thread_manage.join(1)
+        if self._callback_dispatcher is not None:
+            self._callback_dispatcher.stop(1)
         if self._pool:
             try:
                 self._pool.close()
@@ -849,9 +974,14 @@ class Base(BaseObject, Events):
             except:
                 pass
     
+    def _create_socket_port(self, server_port, is_report=False, **kwargs):
+        if self._fleet is not None:
+            return self._fleet.open_port(self, self._port, server_port, is_report=is_report, forbid_uds=self._forbid_uds, **kwargs)
+        return SocketPort(self._port, server_port, forbid_uds=self._forbid_uds, **kwargs)
+
     def connect_503(self):
-        self._stream_503 = SocketPort(self._port, XCONF.SocketConf.TCP_CONTROL_PORT + 1,
-            heartbeat=self._enable_heartbeat, buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds)
+        self._stream_503 = self._create_socket_port(XCONF.SocketConf.TCP_CONTROL_PORT + 1,
+            heartbeat=self._enable_heartbeat, buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE)
         if not self.connected_503:
             return -1
         self.arm_cmd_503 = UxbusCmdTcp(self._stream_503, set_feedback_key_tranid=self._set_feedback_key_tranid)
@@ -885,22 +1015,24 @@ class Base(BaseObject, Events):
             if self._port == 'localhost' or re.match(
                     r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$",
                     self._port):
-                self._stream = SocketPort(self._port, XCONF.SocketConf.TCP_CONTROL_PORT,
-                                          heartbeat=self._enable_heartbeat,
-                                          buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, forbid_uds=self._forbid_uds, fb_que=self._feedback_que)
+                self._stream = self._create_socket_port(XCONF.SocketConf.TCP_CONTROL_PORT,
+                                                        heartbeat=self._enable_heartbeat,
+                                                        buffer_size=XCONF.SocketConf.TCP_CONTROL_BUF_SIZE, fb_que=self._feedback_que)
                 if not self.connected:
                     raise Exception('connect socket failed')
 
                 self._report_error_warn_changed_callback()
-                self._feedback_thread = threading.Thread(target=self._feedback_thread_handle, daemon=True)
-                self._feedback_thread.start()
+                if self._fleet is None:
+                    # with the fleet, the feedbacks are handled by the worker of the fleet
+                    self._feedback_thread = threading.Thread(target=self._feedback_thread_handle, daemon=True)
+                    self._feedback_thread.start()
 
-                self.arm_cmd = UxbusCmdTcp(self._stream, set_feedback_key_tranid=self._set_feedback_key_tranid)
+                self.arm_cmd = UxbusCmdTcp(self._stream, set_feedback_key_tranid=self._set_feedback_key_tranid, max_inflight=self._max_inflight)
                 self.arm_cmd.set_protocol_identifier(2)
                 self._stream_type = 'socket'
 
                 try:
-                    if self._timed_comm:
+                    if self._timed_comm and self._fleet is None:
                         self._timed_comm_t = threading.Thread(target=self._timed_comm_thread, daemon=True)
                         self._timed_comm_t.start()
                 except:
@@ -919,15 +1051,18 @@ class Base(BaseObject, Events):
                 self._support_feedback = self.version_is_ge(2, 0, 102)
                 self.arm_cmd.set_debug(self._debug)
 
-                if self._max_callback_thread_count < 0 and asyncio is not None:
+                if self._max_callback_thread_count < 0:
                     self._asyncio_loop = asyncio.new_event_loop()
                     self._asyncio_loop_thread = threading.Thread(target=self._run_asyncio_loop, daemon=True)
                     self._thread_manage.append(self._asyncio_loop_thread)
                     self._asyncio_loop_thread.start()
-                elif self._max_callback_thread_count > 0 and ThreadPool is not None:
-                    self._pool = ThreadPool(self._max_callback_thread_count)
+                elif self._max_callback_thread_count > 0:
+                    self._pool = pool.ThreadPool(self._max_callback_thread_count)
 
-                if self._stream.connected and self._enable_report:
+                if self._fleet is not None:
+                    # the reports, the heartbeats and the reconnection of the report socket are handled by the fleet
+                    self._fleet.attach(self)
+                elif self._stream.connected and self._enable_report:
                     self._report_thread = threading.Thread(target=self._report_thread_handle, daemon=True)
                     self._report_thread.start()
                     self._thread_manage.append(self._report_thread)
@@ -944,13 +1079,13 @@ class Base(BaseObject, Events):
                 self.arm_cmd = UxbusCmdSer(self._stream)
                 self._stream_type = 'serial'
 
-                if self._max_callback_thread_count < 0 and asyncio is not None:
+                if self._max_callback_thread_count < 0:
                     self._asyncio_loop = asyncio.new_event_loop()
                     self._asyncio_loop_thread = threading.Thread(target=self._run_asyncio_loop, daemon=True)
                     self._thread_manage.append(self._asyncio_loop_thread)
                     self._asyncio_loop_thread.start()
-                elif self._max_callback_thread_count > 0 and ThreadPool is not None:
-                    self._pool = ThreadPool(self._max_callback_thread_count)
+                elif self._max_callback_thread_count > 0:
+                    self._pool = pool.ThreadPool(self._max_callback_thread_count)
 
                 if self._enable_report:
                     self._report_thread = threading.Thread(target=self._auto_get_report_thread, daemon=True)
@@ -992,7 +1127,9 @@ class Base(BaseObject, Events):
 
     def _run_callback(self, callback, msg, name='', enable_callback_thread=True):
         try:
-            if self._asyncio_loop_alive and enable_callback_thread:
+            if self._callback_dispatcher is not None and enable_callback_thread:
+                self._callback_dispatcher.dispatch(callback, msg, name=name)
+            elif self._asyncio_loop_alive and enable_callback_thread:
                 coroutine = self._async_run_callback(callback, msg)
                 asyncio.run_coroutine_threadsafe(coroutine, self._asyncio_loop)
             elif self._pool is not None and enable_callback_thread:
@@ -1046,6 +1183,8 @@ class Base(BaseObject, Events):
         self._report_connect_changed_callback(False, False)
         with self._pause_cond:
             self._pause_cond.notifyAll()
+        if self._fleet is not None:
+            self._fleet.detach(self)
         self._clean_thread()
 
     def set_timeout(self, timeout):
@@ -1091,20 +1230,17 @@ class Base(BaseObject, Events):
                     pass
                 time.sleep(2)
             if self._report_type == 'real':
-                self._stream_report = SocketPort(
-                    self._port, XCONF.SocketConf.TCP_REPORT_REAL_PORT,
-                    buffer_size=1024 if not self._is_old_protocol else 87,
-                    forbid_uds=self._forbid_uds)
+                self._stream_report = self._create_socket_port(
+                    XCONF.SocketConf.TCP_REPORT_REAL_PORT, is_report=True,
+                    buffer_size=1024 if not self._is_old_protocol else 87)
             elif self._report_type == 'normal':
-                self._stream_report = SocketPort(
-                    self._port, XCONF.SocketConf.TCP_REPORT_NORM_PORT,
-                    buffer_size=XCONF.SocketConf.TCP_REPORT_NORMAL_BUF_SIZE if not self._is_old_protocol else 87,
-                    forbid_uds=self._forbid_uds)
+                self._stream_report = self._create_socket_port(
+                    XCONF.SocketConf.TCP_REPORT_NORM_PORT, is_report=True,
+                    buffer_size=XCONF.SocketConf.TCP_REPORT_NORMAL_BUF_SIZE if not self._is_old_protocol else 87)
             else:
-                self._stream_report = SocketPort(
-                    self._port, XCONF.SocketConf.TCP_REPORT_RICH_PORT,
-                    buffer_size=1024 if not self._is_old_protocol else 187,
-                    forbid_uds=self._forbid_uds)
+                self._stream_report = self._create_socket_port(
+                    XCONF.SocketConf.TCP_REPORT_RICH_PORT, is_report=True,
+                    buffer_size=1024 if not self._is_old_protocol else 187)
 
     def __report_callback(self, report_id, item, name=''):
         if report_id in self._report_callbacks.keys():
@@ -1235,12 +1371,10 @@ class Base(BaseObject, Events):
                 if not report_socket_connected:
                     report_socket_connected = True
                     self._report_connect_changed_callback(main_socket_connected, report_socket_connected)
-                recv_data = self._stream_report.read(1)
-                if recv_data != -1:
-                    size = convert.bytes_to_u32(recv_data)
-                    if self._is_old_protocol and size > 256:
-                        self._is_old_protocol = False
-                    self._handle_report_data(recv_data)
+                report = self._stream_report.read(1)
+                if report != -1:
+                    # the receive time is taken by the receive thread of the port, not after the queue
+                    self._handle_report_frame(*report)
                 # else:
                 #     if self.connected:
                 #         code, err_warn = self.get_err_warn_code()
@@ -1259,23 +1393,102 @@ class Base(BaseObject, Events):
                 if not self._stream_report or not self._stream_report.connected:
                     self._connect_report()
             time.sleep(0.001)
+        self._handle_report_stopped()
+
+    def _handle_report_frame(self, recv_data, recv_time):
+        size = convert.bytes_to_u32(recv_data)
+        if self._is_old_protocol and size > 256:
+            self._is_old_protocol = False
+        self._handle_report_data(recv_data)
+        if self._state_history is not None:
+            self._state_history.append(recv_time, self._position, self._angles, self._realtime_tcp_speed,
+                                       self._realtime_joint_speeds, self._joints_torque)
+        capture = self._trajectory_capture
+        if capture is not None:
+            capture.append(recv_time, self._position, self._angles, self._realtime_tcp_speed,
+                           self._realtime_joint_speeds, self._joints_torque)
+        self._notify_report_waiters()
+
+    def _handle_report_stopped(self):
+        # the main socket is disconnected, wake up the waits and close the sockets
         if self._pause_cnts > 0:
             with self._pause_cond:
                 self._pause_cond.notifyAll()
+        with self._report_cond:
+            self._report_cond.notify_all()
         self.disconnect()
 
+    def _update_lazy_report(self, name):
+        """
+        Decode the lazy field of the last report if it is not decoded yet, the lazy fields are only decoded on access
+        :param name: 'gravity_direction', 'tcp_load', 'temperatures', 'speeds', 'collision', 'voltages', 'currents',
+            'cgpio_states', 'ft_force', 'reduced_tcp_boundary'
+        """
+        lazy = self._lazy_report
+        if lazy is None or name not in lazy[1]:
+            return
+        fields, pending = lazy
+        pending.discard(name)
+        try:
+            if name == 'gravity_direction':
+                self._gravity_direction = fields['gravity_direction']
+            elif name == 'tcp_load':
+                tcp_load = fields['tcp_load']
+                if compare_version(self.version_number, (0, 2, 0)):
+                    self._tcp_load = [float('{:.3f}'.format(tcp_load[0])), [float('{:.3f}'.format(i)) for i in tcp_load[1:]]]
+                else:
+                    self._tcp_load = [float('{:.3f}'.format(tcp_load[0])), [float('{:.3f}'.format(i * 1000)) for i in tcp_load[1:]]]
+            elif name == 'temperatures':
+                self._temperatures = fields['temperatures']
+            elif name == 'speeds':
+                speeds = fields['speeds']
+                self._realtime_tcp_speed = speeds[0]
+                self._realtime_joint_speeds = speeds[1:]
+            elif name == 'collision':
+                self._is_simulation_robot = bool(fields['is_simulation_robot'])
+                self._is_collision_detection, self._collision_tool_type = fields['is_collision_detection'], fields['collision_tool_type']
+                self._collision_tool_params = fields['collision_tool_params']
+            elif name == 'voltages':
+                self._voltages = list(map(lambda x: x / 100, fields['voltages']))
+            elif name == 'currents':
+                self._currents = fields['currents']
+            elif name == 'cgpio_states':
+                cgpio_states = []
+                cgpio_states.extend(fields['cgpio_head'])
+                cgpio_states.extend(fields['cgpio_values'])
+                cgpio_states[6:10] = list(map(lambda x: x / 4095.0 * 10.0, cgpio_states[6:10]))
+                cgpio_states.append(list(fields['cgpio_input_conf']))
+                cgpio_states.append(list(fields['cgpio_output_conf']))
+                if self._control_box_type_is_1300 and fields.length >= 433:
+                    cgpio_states[-2].extend(fields['cgpio_input_conf2'])
+                    cgpio_states[-1].extend(fields['cgpio_output_conf2'])
+                self._cgpio_states = cgpio_states
+            elif name == 'ft_force':
+                # FT_SENSOR
+                self._ft_ext_force = fields['ft_ext_force']
+                self._ft_raw_force = fields['ft_raw_force']
+            elif name == 'reduced_tcp_boundary':
+                self._reduced_tcp_boundary = fields['reduced_tcp_boundary']
+        except Exception as e:
+            logger.error('decode report field {} exception: {}'.format(name, e))
+
     def _handle_report_data(self, data):
-        def __handle_report_normal_old(rx_data):
+        _decoders = REPORT_DECODERS
+
+        def __handle_report_normal_old(rx_data, fields=None):
             report_time = time.monotonic()
             interval = report_time - self._last_report_time
             self._max_report_interval = max(self._max_report_interval, interval)
             self._last_report_time = report_time
             # print('length:', convert.bytes_to_u32(rx_data[0:4]))
-            state, mtbrake, mtable, error_code, warn_code = rx_data[4:9]
-            angles = convert.bytes_to_fp32s(rx_data[9:7 * 4 + 9], 7)
-            pose = convert.bytes_to_fp32s(rx_data[37:6 * 4 + 37], 6)
-            cmd_num = convert.bytes_to_u16(rx_data[61:63])
-            pose_offset = convert.bytes_to_fp32s(rx_data[63:6 * 4 + 63], 6)
+            if fields is None:
+                fields = _decoders['normal_old'].decode(rx_data)
+            state, mtbrake, mtable, error_code, warn_code = \
+                fields['state'], fields['mtbrake'], fields['mtable'], fields['error_code'], fields['warn_code']
+            angles = fields['angles']
+            pose = fields['pose']
+            cmd_num = fields['cmd_num']
+            pose_offset = fields['pose_offset']
 
             if error_code != self._error_code or warn_code != self._warn_code:
                 if error_code != self._error_code:
@@ -1406,13 +1619,15 @@ class Base(BaseObject, Events):
                 self._is_sync = True
 
         def __handle_report_rich_old(rx_data):
-            __handle_report_normal_old(rx_data)
-            (self._arm_type,
-             arm_axis,
-             self._arm_master_id,
-             self._arm_slave_id,
-             self._arm_motor_tid,
-             self._arm_motor_fid) = rx_data[87:93]
+            # the layout of rich_old starts with the fields of normal_old, the frame is decoded once
+            fields = _decoders['rich_old'].decode(rx_data)
+            __handle_report_normal_old(rx_data, fields)
+            self._arm_type = fields['arm_type']
+            arm_axis = fields['arm_axis']
+            self._arm_master_id = fields['master_id']
+            self._arm_slave_id = fields['slave_id']
+            self._arm_motor_tid = fields['motor_tid']
+            self._arm_motor_fid = fields['motor_fid']
 
             if 7 >= arm_axis >= 5:
                 self._arm_axis = arm_axis
@@ -1423,10 +1638,10 @@ class Base(BaseObject, Events):
             elif self._arm_type == 3:
                 self._arm_axis = 7
 
-            ver_msg = rx_data[93:122]
+            ver_msg = fields['version']
             # self._version = str(ver_msg, 'utf-8')
 
-            trs_msg = convert.bytes_to_fp32s(rx_data[123:143], 5)
+            trs_msg = fields['trs_msg']
             # trs_msg = [i[0] for i in trs_msg]
             (self._tcp_jerk,
              self._min_tcp_acc,
@@ -1437,7 +1652,7 @@ class Base(BaseObject, Events):
             #     self._tcp_jerk, self._min_tcp_acc, self._max_tcp_acc, self._min_tcp_speed, self._max_tcp_speed
             # ))
 
-            p2p_msg = convert.bytes_to_fp32s(rx_data[143:163], 5)
+            p2p_msg = fields['p2p_msg']
             # p2p_msg = [i[0] for i in p2p_msg]
             (self._joint_jerk,
              self._min_joint_acc,
@@ -1449,20 +1664,21 @@ class Base(BaseObject, Events):
             #     self._min_joint_speed, self._max_joint_speed
             # ))
 
-            rot_msg = convert.bytes_to_fp32s(rx_data[163:171], 2)
+            rot_msg = fields['rot_msg']
             # rot_msg = [i[0] for i in rot_msg]
             self._rot_jerk, self._max_rot_acc = rot_msg
             # print('rot_jerk: {}, mac_acc: {}'.format(self._rot_jerk, self._max_rot_acc))
 
-            sv3_msg = convert.bytes_to_u16s(rx_data[171:187], 8)
+            sv3_msg = fields.get('sv3_msg')
             self._first_report_over = True
 
         def __handle_report_real(rx_data):
-            state, mode = rx_data[4] & 0x0F, rx_data[4] >> 4
-            cmd_num = convert.bytes_to_u16(rx_data[5:7])
-            angles = convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7)
-            pose = convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6)
-            torque = convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7)
+            fields = _decoders['real'].decode(rx_data)
+            state, mode = fields['state_mode'] & 0x0F, fields['state_mode'] >> 4
+            cmd_num = fields['cmd_num']
+            angles = fields['angles']
+            pose = fields['pose']
+            torque = fields['torque']
             if cmd_num != self._cmd_num:
                 self._cmd_num = cmd_num
                 self._report_cmdnum_changed_callback()
@@ -1494,35 +1710,34 @@ class Base(BaseObject, Events):
             if not self._is_sync and self._state not in [4, 5]:
                 self._sync()
                 self._is_sync = True
-            length = len(rx_data)
-            if length >= 135:
+            if 'ft_ext_force' in fields:
                 # FT_SENSOR
-                self._ft_ext_force = convert.bytes_to_fp32s(rx_data[87:111], 6)
-                self._ft_raw_force = convert.bytes_to_fp32s(rx_data[111:135], 6)
+                self._ft_ext_force = fields['ft_ext_force']
+                self._ft_raw_force = fields['ft_raw_force']
 
-        def __handle_report_normal(rx_data):
+        def __handle_report_normal(rx_data, fields, lazy_names=('gravity_direction', 'tcp_load')):
             report_time = time.monotonic()
             interval = report_time - self._last_report_time
             self._max_report_interval = max(self._max_report_interval, interval)
             self._last_report_time = report_time
             # print('length:', convert.bytes_to_u32(rx_data[0:4]), len(rx_data))
-            state, mode = rx_data[4] & 0x0F, rx_data[4] >> 4
+            state, mode = fields['state_mode'] & 0x0F, fields['state_mode'] >> 4
             # if state != self._state or mode != self._mode:
             #     print('mode: {}, state={}, time={}'.format(mode, state, time.monotonic()))
-            cmd_num = convert.bytes_to_u16(rx_data[5:7])
-            angles = convert.bytes_to_fp32s(rx_data[7:7 * 4 + 7], 7)
-            pose = convert.bytes_to_fp32s(rx_data[35:6 * 4 + 35], 6)
-            torque = convert.bytes_to_fp32s(rx_data[59:7 * 4 + 59], 7)
-            mtbrake, mtable, error_code, warn_code = rx_data[87:91]
-            pose_offset = convert.bytes_to_fp32s(rx_data[91:6 * 4 + 91], 6)
-            tcp_load = convert.bytes_to_fp32s(rx_data[115:4 * 4 + 115], 4)
-            collis_sens, teach_sens = rx_data[131:133]
+            cmd_num = fields['cmd_num']
+            angles = fields['angles']
+            pose = fields['pose']
+            torque = fields['torque']
+            mtbrake, mtable, error_code, warn_code = \
+                fields['mtbrake'], fields['mtable'], fields['error_code'], fields['warn_code']
+            pose_offset = fields['pose_offset']
+            collis_sens, teach_sens = fields['collis_sens'], fields['teach_sens']
             # if (collis_sens not in list(range(6)) or teach_sens not in list(range(6))) \
             #         and ((error_code != 0 and error_code not in controller_error_keys) or (warn_code != 0 and warn_code not in controller_warn_keys)):
             #     self._stream_report.close()
             #     logger.warn('ReportDataException: data={}'.format(rx_data))
             #     return
-            length = convert.bytes_to_u32(rx_data[0:4])
+            length = fields['length']
             data_len = len(rx_data)
             if (length != data_len and (length != 233 or data_len != 245)) or collis_sens not in list(range(6)) or teach_sens not in list(range(6)) \
                 or mode not in list(range(12)) or state not in list(range(10)):
@@ -1534,7 +1749,8 @@ class Base(BaseObject, Events):
                     state, mode, collis_sens, teach_sens, error_code, warn_code
                 ))
                 return
-            self._gravity_direction = convert.bytes_to_fp32s(rx_data[133:3*4 + 133], 3)
+            # the fields not needed by the checks and the callbacks are decoded on access
+            self._lazy_report = (fields, set(lazy_names))
 
             reset_tgpio_params = False
             reset_linear_motor_params = False
@@ -1612,18 +1828,19 @@ class Base(BaseObject, Events):
                 self._mode = mode
                 self._report_mode_changed_callback()
 
-            mtbrake = [mtbrake & 0x01, mtbrake >> 1 & 0x01, mtbrake >> 2 & 0x01, mtbrake >> 3 & 0x01,
-                       mtbrake >> 4 & 0x01, mtbrake >> 5 & 0x01, mtbrake >> 6 & 0x01, mtbrake >> 7 & 0x01]
-            mtable = [mtable & 0x01, mtable >> 1 & 0x01, mtable >> 2 & 0x01, mtable >> 3 & 0x01,
-                      mtable >> 4 & 0x01, mtable >> 5 & 0x01, mtable >> 6 & 0x01, mtable >> 7 & 0x01]
-
-            if mtbrake != self._arm_motor_brake_states or mtable != self._arm_motor_enable_states:
-                self._arm_motor_enable_states = mtable
-                self._arm_motor_brake_states = mtbrake
-                self._report_mtable_mtbrake_changed_callback()
+            # the bit lists are only rebuilt if the raw bytes are changed
+            if (mtbrake, mtable) != self._mtbrake_mtable_raw:
+                self._mtbrake_mtable_raw = (mtbrake, mtable)
+                mtbrake_states = [mtbrake >> i & 0x01 for i in range(8)]
+                mtable_states = [mtable >> i & 0x01 for i in range(8)]
+                if mtbrake_states != self._arm_motor_brake_states or mtable_states != self._arm_motor_enable_states:
+                    self._arm_motor_enable_states = mtable_states
+                    self._arm_motor_brake_states = mtbrake_states
+                    self._report_mtable_mtbrake_changed_callback()
 
             if not self._is_first_report:
-                if state in [4, 5] or not all([bool(item[0] & item[1]) for item in zip(mtbrake, mtable)][:self.axis]):
+                axis_mask = (1 << self.axis) - 1
+                if state in [4, 5] or (mtbrake & mtable & axis_mask) != axis_mask:
                     # if self._is_ready:
                     #     pretty_print('[report], xArm is not ready to move', color='red')
                     self._is_ready = False
@@ -1653,13 +1870,7 @@ class Base(BaseObject, Events):
             self._last_update_state_time = update_time
             self._last_update_err_time = update_time
 
-            self._arm_motor_brake_states = mtbrake
-            self._arm_motor_enable_states = mtable
             self._joints_torque = torque
-            if compare_version(self.version_number, (0, 2, 0)):
-                self._tcp_load = [float('{:.3f}'.format(tcp_load[0])), [float('{:.3f}'.format(i)) for i in tcp_load[1:]]]
-            else:
-                self._tcp_load = [float('{:.3f}'.format(tcp_load[0])), [float('{:.3f}'.format(i * 1000)) for i in tcp_load[1:]]]
             self._collision_sensitivity = collis_sens
             self._teach_sensitivity = teach_sens
 
@@ -1689,20 +1900,34 @@ class Base(BaseObject, Events):
 
         def __handle_report_rich(rx_data):
             # print('interval={}, max_interval={}'.format(interval, self._max_report_interval))
-            __handle_report_normal(rx_data)
-            (self._arm_type,
-             arm_axis,
-             self._arm_master_id,
-             self._arm_slave_id,
-             self._arm_motor_tid,
-             self._arm_motor_fid) = rx_data[145:151]
+            fields = _decoders['rich'].view(rx_data)
+            length = len(rx_data)
+            lazy_names = ['gravity_direction', 'tcp_load']
+            # the fields with listeners are decoded with the report, the others on access
+            if length >= 252 and not self._report_callbacks.get(self.REPORT_TEMPERATURE_CHANGED_ID):
+                lazy_names.append('temperatures')
+            if length >= 284 and self._state_history is None and self._trajectory_capture is None:
+                lazy_names.append('speeds')
+            if length >= 417:
+                lazy_names.extend(['collision', 'voltages', 'currents', 'cgpio_states'])
+            if length >= 481:
+                lazy_names.append('ft_force')
+            if length >= 508:
+                lazy_names.append('reduced_tcp_boundary')
+            __handle_report_normal(rx_data, fields, lazy_names)
+            self._arm_type = fields['arm_type']
+            arm_axis = fields['arm_axis']
+            self._arm_master_id = fields['master_id']
+            self._arm_slave_id = fields['slave_id']
+            self._arm_motor_tid = fields['motor_tid']
+            self._arm_motor_fid = fields['motor_fid']
 
             if 7 >= arm_axis >= 5:
                 self._arm_axis = arm_axis
 
             # self._version = str(rx_data[151:180], 'utf-8')
 
-            trs_msg = convert.bytes_to_fp32s(rx_data[181:201], 5)
+            trs_msg = fields['trs_msg']
             # trs_msg = [i[0] for i in trs_msg]
             (self._tcp_jerk,
              self._min_tcp_acc,
@@ -1713,7 +1938,7 @@ class Base(BaseObject, Events):
             #     self._tcp_jerk, self._min_tcp_acc, self._max_tcp_acc, self._min_tcp_speed, self._max_tcp_speed
             # ))
 
-            p2p_msg = convert.bytes_to_fp32s(rx_data[201:221], 5)
+            p2p_msg = fields['p2p_msg']
             # p2p_msg = [i[0] for i in p2p_msg]
             (self._joint_jerk,
              self._min_joint_acc,
@@ -1725,42 +1950,41 @@ class Base(BaseObject, Events):
             #     self._min_joint_speed, self._max_joint_speed
             # ))
 
-            rot_msg = convert.bytes_to_fp32s(rx_data[221:229], 2)
+            rot_msg = fields['rot_msg']
             # rot_msg = [i[0] for i in rot_msg]
             self._rot_jerk, self._max_rot_acc = rot_msg
             # print('rot_jerk: {}, mac_acc: {}'.format(self._rot_jerk, self._max_rot_acc))
 
-            servo_codes = [val for val in rx_data[229:245]]
-            for i in range(self.axis):
-                if self._servo_codes[i][0] != servo_codes[i * 2] or self._servo_codes[i][1] != servo_codes[i * 2 + 1]:
-                    print('servo_error_code, servo_id={}, status={}, code={}'.format(i + 1, servo_codes[i * 2], servo_codes[i * 2 + 1]))
-                self._servo_codes[i][0] = servo_codes[i * 2]
-                self._servo_codes[i][1] = servo_codes[i * 2 + 1]
+            servo_codes = fields['servo_codes']
+            if servo_codes != self._servo_codes_raw:
+                self._servo_codes_raw = servo_codes
+                for i in range(self.axis):
+                    if self._servo_codes[i][0] != servo_codes[i * 2] or self._servo_codes[i][1] != servo_codes[i * 2 + 1]:
+                        print('servo_error_code, servo_id={}, status={}, code={}'.format(i + 1, servo_codes[i * 2], servo_codes[i * 2 + 1]))
+                    self._servo_codes[i][0] = servo_codes[i * 2]
+                    self._servo_codes[i][1] = servo_codes[i * 2 + 1]
 
             self._first_report_over = True
 
-            # length = convert.bytes_to_u32(rx_data[0:4])
-            length = len(rx_data)
-            if length >= 252:
-                temperatures = list(struct.unpack('>7b', struct.pack('>7B', *rx_data[245:252])))
+            if length >= 252 and 'temperatures' not in lazy_names:
+                temperatures = fields['temperatures']
                 # temperatures = list(map(int, rx_data[245:252]))
-                if temperatures != self.temperatures:
+                if temperatures != self._temperatures:
                     self._temperatures = temperatures
                     self._report_temperature_changed_callback()
-            if length >= 284:
-                speeds = convert.bytes_to_fp32s(rx_data[252:8 * 4 + 252], 8)
+            if length >= 284 and 'speeds' not in lazy_names:
+                speeds = fields['speeds']
                 self._realtime_tcp_speed = speeds[0]
                 self._realtime_joint_speeds = speeds[1:]
-                # print(speeds[0], speeds[1:])
             if length >= 288:
-                count = convert.bytes_to_u32(rx_data[284:288])
+                count = fields['count']
                 # print(count, rx_data[284:288])
                 if self._count != -1 and count != self._count:
                     self._count = count
                     self._report_count_changed_callback()
                 self._count = count
             if length >= 312:
-                world_offset = convert.bytes_to_fp32s(rx_data[288:6 * 4 + 288], 6)
+                world_offset = fields['world_offset']
                 for i in range(len(world_offset)):
                     if i < 3:
                         world_offset[i] = float('{:.3f}'.format(world_offset[i]))
@@ -1769,52 +1993,26 @@ class Base(BaseObject, Events):
                 if math.inf not in world_offset and -math.inf not in world_offset and not (10 <= self._error_code <= 17):
                     self._world_offset = world_offset
             if length >= 314:
-                self._cgpio_reset_enable, self._tgpio_reset_enable = rx_data[312:314]
-            if length >= 417:
-                self._is_simulation_robot = bool(rx_data[314])
-                self._is_collision_detection, self._collision_tool_type = rx_data[315:317]
-                self._collision_tool_params = convert.bytes_to_fp32s(rx_data[317:341], 6)
-
-                voltages = convert.bytes_to_u16s(rx_data[341:355], 7)
-                voltages = list(map(lambda x: x / 100, voltages))
-                self._voltages = voltages
-
-                currents = convert.bytes_to_fp32s(rx_data[355:383], 7)
-                self._currents = currents
-
-                cgpio_states = []
-                cgpio_states.extend(rx_data[383:385])
-                cgpio_states.extend(convert.bytes_to_u16s(rx_data[385:401], 8))
-                cgpio_states[6:10] = list(map(lambda x: x / 4095.0 * 10.0, cgpio_states[6:10]))
-                cgpio_states.append(list(map(int, rx_data[401:409])))
-                cgpio_states.append(list(map(int, rx_data[409:417])))
-                if self._control_box_type_is_1300 and length >= 433:
-                    cgpio_states[-2].extend(list(map(int, rx_data[417:425])))
-                    cgpio_states[-1].extend(list(map(int, rx_data[425:433])))
-                self._cgpio_states = cgpio_states
-            if length >= 481:
-                # FT_SENSOR
-                self._ft_ext_force = convert.bytes_to_fp32s(rx_data[433:457], 6)
-                self._ft_raw_force = convert.bytes_to_fp32s(rx_data[457:481], 6)
+                self._cgpio_reset_enable, self._tgpio_reset_enable = fields['cgpio_reset_enable'], fields['tgpio_reset_enable']
             if length >= 482:
-                iden_progress = rx_data[481]
+                iden_progress = fields['iden_progress']
                 if iden_progress != self._iden_progress:
                     self._iden_progress = iden_progress
                     self._report_iden_progress_changed_callback()
             if length >= 494:
-                pose_aa = convert.bytes_to_fp32s(rx_data[482:494], 3)
+                pose_aa = fields['pose_aa']
                 for i in range(len(pose_aa)):
                     pose_aa[i] = filter_invaild_number(pose_aa[i], 6, default=self._pose_aa[i])
                 self._pose_aa = self._position[:3] + pose_aa
             if length >= 495:
-                self._is_reduced_mode = rx_data[494] & 0x01
-                self._is_fence_mode = (rx_data[494] >> 1) & 0x01
-                self._is_report_current = (rx_data[494] >> 2) & 0x01  # 针对get_report_tau_or_i的结果
-                self._is_approx_motion = (rx_data[494] >> 3) & 0x01
-                self._is_cart_continuous = (rx_data[494] >> 4) & 0x01
+                mode_flags = fields['mode_flags']
+                self._is_reduced_mode = mode_flags & 0x01
+                self._is_fence_mode = (mode_flags >> 1) & 0x01
+                self._is_report_current = (mode_flags >> 2) & 0x01  # 针对get_report_tau_or_i的结果
+                self._is_approx_motion = (mode_flags >> 3) & 0x01
+                self._is_cart_continuous = (mode_flags >> 4) & 0x01
             if length >= 496:
-                self._reduced_mode_is_on = rx_data[495]
-                self._reduced_tcp_boundary = convert.bytes_to_16s(rx_data[496:508], 6)
+                self._reduced_mode_is_on = fields['reduced_mode_is_on']
 
         try:
             if self._report_type == 'real':
@@ -1828,7 +2026,7 @@ class Base(BaseObject, Events):
                 if self._is_old_protocol:
                     __handle_report_normal_old(data)
                 else:
-                    __handle_report_normal(data)
+                    __handle_report_normal(data, _decoders['normal'].decode(data))
         except Exception as e:
             logger.error(e)
 
@@ -2221,8 +2419,8 @@ class Base(BaseObject, Events):
                          '获取控制器错误警告码' if lang == 'cn' else 'GetErrorWarnCode',
                          '状态' if lang == 'cn' else 'Status',
                          ret[0]), color='light_blue')
-            controller_error = ControllerError(self._error_code, status=0)
-            controller_warn = ControllerWarn(self._warn_code, status=0)
+            controller_error = x_code.ControllerError(self._error_code, status=0)
+            controller_warn = x_code.ControllerWarn(self._warn_code, status=0)
             pretty_print('* {}: {}, {}: {}'.format(
                 '错误码' if lang == 'cn' else 'ErrorCode',
                 controller_error.code,
@@ -2301,11 +2499,13 @@ class Base(BaseObject, Events):
         self._fb_transid_result_map.pop(trans_id, -1)
     
     def _wait_feedback(self, timeout=None, trans_id=-1, ignore_log=False):
+        wait_start = time.monotonic()
         if timeout is not None:
             expired = time.monotonic() + timeout + (self._sleep_finish_time if self._sleep_finish_time > time.monotonic() else 0)
         else:
             expired = 0
         state5_cnt = 0
+        state5_cnt_time = 0
         while timeout is None or time.monotonic() < expired:
             if not self.connected:
                 self._fb_transid_result_map.clear()
@@ -2317,12 +2517,14 @@ class Base(BaseObject, Events):
                 if not ignore_log:
                     self.log_api_info('wait_feedback, xarm has error, error={}'.format(self.error_code), code=APIState.HAS_ERROR)
                 return APIState.HAS_ERROR, -1
-            code, state = self.get_state()
+            code, state, _ = self._get_wait_state()
             if code != 0:
                 return code, -1
             if state >= 4:
                 self._sleep_finish_time = 0
-                if state == 5:
+                if state == 5 and time.monotonic() - state5_cnt_time >= 0.05:
+                    # debounced like the polling, 20 counts are about 1s in state 5 however often the wait is woken
+                    state5_cnt_time = time.monotonic()
                     state5_cnt += 1
                 if state != 5 or state5_cnt >= 20:
                     self._fb_transid_result_map.clear()
@@ -2332,8 +2534,9 @@ class Base(BaseObject, Events):
             else:
                 state5_cnt = 0
             if trans_id in self._fb_transid_result_map:
+                self._record_wait_latency(max(wait_start, self._last_feedback_time))
                 return 0, self._fb_transid_result_map.pop(trans_id, -1)
-            time.sleep(0.05)
+            self._wait_report_event(0.05 if timeout is None else max(min(expired - time.monotonic(), 0.05), 0))
         return APIState.WAIT_FINISH_TIMEOUT, -1
     
     def wait_move(self, timeout=None, trans_id=-1, set_cnt=2):
@@ -2343,10 +2546,17 @@ class Base(BaseObject, Events):
             expired = time.monotonic() + timeout + (self._sleep_finish_time if self._sleep_finish_time > time.monotonic() else 0)
         else:
             expired = 0
-        _, state = self.get_state()
+        wait_start = time.monotonic()
+        _, state, _ = self._get_wait_state()
         cnt = 0
         state5_cnt = 0
+        state5_cnt_time = 0
         max_cnt = set_cnt if _ == 0 and state == 1 else 10
+        # once the report shows the arm moving, set_cnt consecutive reports out of the moving state complete the wait
+        moving_reported = False
+        stop_reports = 0
+        stop_report_time = 0
+        cnt_time = 0
         while timeout is None or time.monotonic() < expired:
             if not self.connected:
                 self.log_api_info('wait_move, xarm is disconnect', code=APIState.NOT_CONNECTED)
@@ -2356,12 +2566,14 @@ class Base(BaseObject, Events):
                 return APIState.HAS_ERROR
             if self.mode != 0 and self.mode != 11:
                 return 0
-            code, state = self.get_state()
+            code, state, by_report = self._get_wait_state()
             if code != 0:
                 return code
             if state >= 4:
                 self._sleep_finish_time = 0
-                if state == 5:
+                if state == 5 and time.monotonic() - state5_cnt_time >= 0.05:
+                    # debounced like the polling, 20 counts are about 1s in state 5 however often the wait is woken
+                    state5_cnt_time = time.monotonic()
                     state5_cnt += 1
                 if state != 5 or state5_cnt >= 20:
                     self.log_api_info('wait_move, xarm is stop, state={}'.format(state), code=APIState.EMERGENCY_STOP)
@@ -2370,19 +2582,31 @@ class Base(BaseObject, Events):
                 state5_cnt = 0
             if time.monotonic() < self._sleep_finish_time or state == 3:
                 cnt = 0
+                stop_reports = 0
                 max_cnt = 2 if state == 3 else max_cnt
-                time.sleep(0.05)
+                self._wait_report_event(0.05)
                 continue
             if state == 0 or state == 1:
                 cnt = 0
+                stop_reports = 0
                 max_cnt = set_cnt
-                time.sleep(0.05)
+                moving_reported = moving_reported or (by_report and state == 1)
+                self._wait_report_event(0.05)
                 continue
             else:
-                cnt += 1
-                if cnt >= max_cnt:
+                if time.monotonic() - cnt_time >= 0.05:
+                    # keep the same debounce interval as polling, the wait may be woken more often by the report
+                    cnt_time = time.monotonic()
+                    cnt += 1
+                if by_report and self._report_recv_time != stop_report_time:
+                    stop_report_time = self._report_recv_time
+                    stop_reports += 1
+                if cnt >= max_cnt or (moving_reported and self._cmd_num == 0 and stop_reports >= set_cnt):
+                    # the change may be reported before the wait, only the time waited is the latency
+                    self._record_wait_latency(max(wait_start, self._report_change_time) if by_report else 0)
                     return 0
-                time.sleep(0.05)
+                # count the consecutive reports out of the moving state
+                self._wait_report_event(0.05, every_report=moving_reported)
         return APIState.WAIT_FINISH_TIMEOUT
 
     @xarm_is_connected(_type='set')
@@ -2548,6 +2772,45 @@ class Base(BaseObject, Events):
             self.log_api_info('API -> getset_tgpio_modbus_data -> code={}, response={}'.format(ret[0], ret[2:]), code=ret[0])
         return ret[0], ret[2:]
 
+    def getset_tgpio_modbus_batch(self, datas_list, min_res_len=0, ignore_log=False, host_id=XCONF.TGPIO_HOST_ID, is_transparent_transmission=False, use_503_port=False, limit_sec=0.0, **kwargs):
+        """
+        Send several modbus frames back to back, same as getset_tgpio_modbus_data for every frame
+        :param datas_list: [datas, ...], datas is the same as the one of getset_tgpio_modbus_data
+        :param min_res_len: the minimum length of the responses, int or [int, ...] (one for every frame)
+        :param limit_sec: min interval (s) between two frames, > 0 means the frames are sent one at a time
+        :param kwargs: is_tt/auto_crc: same as getset_tgpio_modbus_data
+            check_crc: check the crc of the responses of the transparent transmission, default is the value of auto_crc
+        :return: [(code, response), ...] in the order of the frames
+        """
+        if not self.connected:
+            return [(APIState.NOT_CONNECTED, [])] * len(datas_list)
+        is_tt = kwargs.get('is_tt', is_transparent_transmission)
+        auto_crc = is_tt and kwargs.get('auto_crc', False)
+        check_crc = is_tt and kwargs.get('check_crc', auto_crc)
+        modbus_list = []
+        for datas in datas_list:
+            datas = self._hexstr_to_ints(datas) if isinstance(datas, str) else list(datas)
+            if auto_crc:
+                datas.extend(list(crc16.crc_modbus(datas)))
+            modbus_list.append(datas)
+        if use_503_port:
+            if not self.connected_503 and self.connect_503() != 0:
+                return [(APIState.NOT_CONNECTED, [])] * len(datas_list)
+            arm_cmd = self.arm_cmd_503
+        else:
+            # tgpio_set_modbus_func is bound to the command of the 503 port by set_tgpio_modbus_use_503_port
+            arm_cmd = getattr(self.arm_cmd.tgpio_set_modbus_func, '__self__', self.arm_cmd)
+        rets = arm_cmd.tgpio_set_modbus_batch(modbus_list, host_id=host_id, limit_sec=limit_sec, is_transparent_transmission=is_tt)
+        min_res_lens = min_res_len if isinstance(min_res_len, (list, tuple)) else [min_res_len] * len(rets)
+        codes = [self._check_modbus_code(ret, length + 2, host_id=host_id) for ret, length in zip(rets, min_res_lens)]
+        if check_crc:
+            for i, valid in enumerate(crc16.crc_modbus_check_all([ret[2:] for ret in rets])):
+                if codes[i] == 0 and not valid:
+                    codes[i] = APIState.MODBUS_ERR_CRC
+        if not ignore_log:
+            self.log_api_info('API -> getset_tgpio_modbus_batch -> codes={}'.format(codes), code=next((code for code in codes if code != 0), 0))
+        return [(code, ret[2:]) for code, ret in zip(codes, rets)]
+
     @xarm_is_connected(_type='set')
     def set_simulation_robot(self, on_off):
         ret = self.arm_cmd.set_simulation_robot(on_off)
@@ -2600,6 +2863,7 @@ class Base(BaseObject, Events):
         feedback_type = self._fb_transid_type_map.pop(trans_id, -1)
         if feedback_type != -1:
             self._fb_transid_result_map[trans_id] = data[12]  # feedback_code
+            self._notify_report_waiters(is_feedback=True)
         if feedback_type & data[8] == 0:
             return
         self.__report_callback(self.FEEDBACK_ID, data, name='feedback')
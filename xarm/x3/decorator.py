@@ -42,7 +42,7 @@ def xarm_is_connected(_type='set'):
     return _xarm_is_connected
 
 
-def xarm_is_ready(_type='set'):
+def xarm_is_ready(_type='set', default=-99):
     def _xarm_is_ready(func):
         @functools.wraps(func)
         def decorator(self, *args, **kwargs):
@@ -58,10 +58,10 @@ def xarm_is_ready(_type='set'):
                     logger.error('xArm is not ready')
                     logger.info('Please check the arm for errors. If so, please clear the error first. '
                                 'Then enable the motor, set the mode and set the state')
-                    return APIState.NOT_READY if _type == 'set' else (APIState.NOT_READY, 'xArm is not ready')
+                    return APIState.NOT_READY if _type == 'set' else (APIState.NOT_READY, default if default != -99 else 'xArm is not ready')
             else:
                 logger.error('xArm is not connected')
-                return APIState.NOT_CONNECTED if _type == 'set' else (APIState.NOT_CONNECTED, 'xArm is not connect')
+                return APIState.NOT_CONNECTED if _type == 'set' else (APIState.NOT_CONNECTED, default if default != -99 else 'xArm is not connect')
         return decorator
     return _xarm_is_ready
 
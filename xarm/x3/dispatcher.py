@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+
+import time
+import threading
+from collections import deque
+from ..core.utils.log import logger
+
+IDLE_TIMEOUT = 5
+
+# the callbacks of these events only need the latest value, the pending value is replaced by the newer one
+COALESCE_EVENTS = {
+    'location', 'report', 'state_changed', 'mode_changed', 'cmdnum_changed', 'count_changed',
+    'temperature_changed', '(mtable/mtbrake)_changed', 'iden_progress_changed',
+}
+
+
+class _Channel(object):
+    """Pending events of one callback, delivered in order by its own worker thread"""
+    def __init__(self, callback, name, coalesce, maxsize):
+        self.callback = callback
+        self.name = name
+        self.coalesce = coalesce
+        self.queue = deque()
+        self.maxsize = 1 if coalesce else max(maxsize, 1)
+        self.cond = threading.Condition()
+        self.alive = True
+        self.delivered = 0
+        # coalesce: the pending values replaced by a newer one, fifo: the events queued while maxsize were pending
+        self.dropped = 0
+        self.overflow = 0
+        self.lag_last = 0
+        self.lag_max = 0
+        self.lag_total = 0
+        # the worker exits when idle, and is started again by the next event
+        self.thread = None
+
+    def put(self, msg):
+        with self.cond:
+            if len(self.queue) >= self.maxsize:
+                if self.coalesce:
+                    # the latest value wins
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:
+                    # the in-order events are never dropped (and the report thread never waits), the queue grows
+                    if not self.overflow:
+                        logger.warning('{} callback is slow, more than {} events are pending'.format(self.name, self.maxsize))
+                    self.overflow += 1
+            self.queue.append((time.monotonic(), msg))
+            if self.thread is None and self.alive:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.alive = False
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if self.alive and not self.queue:
+                    self.cond.wait(IDLE_TIMEOUT)
+                if not self.queue:
+                    self.thread = None
+                    return
+                put_time, msg = self.queue.popleft()
+            lag = time.monotonic() - put_time
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self.lag_total += lag
+            self.delivered += 1
+            try:
+                self.callback(msg)
+            except Exception as e:
+                logger.error('run {} callback exception: {}'.format(self.name, e))
+
+    def stats(self):
+        with self.cond:
+            pending = len(self.queue)
+        return {
+            'name': self.name,
+            'callback': getattr(self.callback, '__qualname__', repr(self.callback)),
+            'policy': 'coalesce' if self.coalesce else 'fifo',
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'overflow': self.overflow,
+            'pending': pending,
+            'lag_last': self.lag_last,
+            'lag_max': self.lag_max,
+            'lag_mean': self.lag_total / self.delivered if self.delivered else 0,
+        }
+
+
+class CallbackDispatcher(object):
+    """
+    Run the report callbacks out of the report thread, every callback has its own bounded queue and worker,
+    so a slow callback never stalls the report parsing or the other callbacks
+    The location/report/state-like events are coalesced (latest value wins),
+    the other events (error/warn, feedback, connect) are all delivered in order, none is dropped
+    :param maxsize: number of the pending in-order events of every callback, more are still queued and counted as overflow
+    """
+    def __init__(self, maxsize=64):
+        self._maxsize = maxsize
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def dispatch(self, callback, msg, name=''):
+        key = (callback, name)
+        channel = self._channels.get(key)
+        if channel is None:
+            with self._lock:
+                channel = self._channels.get(key)
+                if channel is None:
+                    channel = _Channel(callback, name, name in COALESCE_EVENTS, self._maxsize)
+                    self._channels[key] = channel
+        channel.put(msg)
+
+    def stop(self, timeout=1):
+        with self._lock:
+            channels = list(self._channels.values())
+            self._channels.clear()
+        for channel in channels:
+            channel.stop()
+        for channel in channels:
+            thread = channel.thread
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def stats(self):
+        """
+        Statistics of every callback
+        :return: [{'name', 'callback', 'policy', 'delivered', 'dropped', 'overflow', 'pending', 'lag_last', 'lag_max', 'lag_mean'}, ...]
+            dropped: the coalesced values replaced by a newer one
+            overflow: the in-order events queued while maxsize events were pending
+            lag_xxx: seconds from the event to the start of the callback
+        """
+        with self._lock:
+            channels = list(self._channels.values())
+        return [channel.stats() for channel in channels]
@@ -6,8 +6,10 @@
 #
 # Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
 
-import asyncio
 from ..core.utils.log import logger
+from ..core.utils.lazy import LazyModule
+
+asyncio = LazyModule('asyncio')
 
 class AsyncObject(object):
     async def _asyncio_loop_func(self):
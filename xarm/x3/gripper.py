@@ -14,15 +14,21 @@ from ..core.utils.log import logger
 from ..core.utils import convert
 from .code import APIState
 from .gpio import GPIO
+from .gripper_monitor import GripperMonitor
 from .decorator import xarm_is_connected, xarm_wait_until_not_pause, xarm_is_not_simulation_mode
 
 
+def _gripper_state(code, status=None, position=None):
+    return {'code': code, 'status': status, 'position': position}
+
+
 class Gripper(GPIO):
     def __init__(self):
         super(Gripper, self).__init__()
         self._gripper_error_code = 0
         self._bio_gripper_version = 0  # 0表示未曾获取SN判别，1表示旧的(获取SN失败), 2表示新的(获取SN成功)
         self._bio_gripper_mode = -1    # -1表示未获取
+        self._gripper_monitor = None
 
     @property
     def gripper_error_code(self):
@@ -40,6 +46,85 @@ class Gripper(GPIO):
                or (self.gripper_version_numbers[0] == 3 and self.gripper_version_numbers[1] > 4) \
                or (self.gripper_version_numbers[0] == 3 and self.gripper_version_numbers[1] == 4 and self.gripper_version_numbers[2] >= 3)
 
+    @property
+    def gripper_monitor(self):
+        return self._gripper_monitor
+
+    @xarm_is_connected(_type='set')
+    @xarm_is_not_simulation_mode(ret=0)
+    def start_gripper_monitor(self, gripper_type='gripper', interval=0.1, callback=None):
+        """
+        Poll the state of the gripper in a background thread, the waits of the gripper motion use the latest state of it
+        :param gripper_type: 'gripper' (xArm Gripper) or 'bio' (BIO Gripper)
+        :param interval: seconds between the polls, default is the period of the status polls of the waits (0.1),
+            a shorter one ends the waits earlier but takes more of the bandwidth of the RS485 bus (shared with the other modbus commands)
+        :param callback: called with every state in the monitor thread, callback(state)
+        :return: code
+        """
+        self.stop_gripper_monitor()
+        code = self.checkset_modbus_baud(self._default_bio_baud if gripper_type == 'bio' else self._default_gripper_baud)
+        if code != 0:
+            return code
+        self._gripper_monitor = GripperMonitor(self, gripper_type=gripper_type, interval=interval, callback=callback)
+        self._gripper_monitor.start()
+        self.log_api_info('API -> start_gripper_monitor(gripper_type={}, interval={}) -> code=0'.format(gripper_type, interval), code=0)
+        return 0
+
+    def stop_gripper_monitor(self):
+        monitor = self._gripper_monitor
+        self._gripper_monitor = None
+        if monitor is not None:
+            monitor.stop()
+        return 0
+
+    def _get_gripper_state_monitor(self, gripper_type, field=None):
+        monitor = self._gripper_monitor
+        if monitor is not None and monitor.running and monitor.gripper_type == gripper_type \
+                and (field is None or field in monitor.fields):
+            return monitor
+        return None
+
+    def _get_gripper_state_interval(self, gripper_type, poll_interval, field=None):
+        monitor = self._get_gripper_state_monitor(gripper_type, field=field)
+        return poll_interval if monitor is None else monitor.interval
+
+    def _iter_gripper_states(self, gripper_type, expired, poll_interval, poll, field=None):
+        """
+        The new states of the gripper until expired, from the gripper monitor if it is running, else by polling
+        :param poll: read the state if polling, return {'code': code, 'status': status, 'position': position}
+        """
+        monitor = self._get_gripper_state_monitor(gripper_type, field=field)
+        if monitor is not None:
+            # only the states polled after the call
+            state = monitor.latest
+            seq = state['seq'] if state is not None else 0
+            while self.connected and monitor.running:
+                remaining = expired - time.monotonic()
+                if remaining <= 0:
+                    return
+                state = monitor.wait_update(seq, timeout=remaining)
+                if state is not None:
+                    seq = state['seq']
+                    yield self._check_gripper_monitor_state(gripper_type, state, field=field)
+        while time.monotonic() < expired:
+            yield poll()
+            time.sleep(poll_interval)
+
+    def _check_gripper_monitor_state(self, gripper_type, state, field=None):
+        """
+        Check the state of the gripper monitor the same as the getter polled by the wait (_get_modbus_gripper_position),
+        the position is None if the error code is not read or not 0, the code is END_EFFECTOR_HAS_FAULT if the gripper has fault
+        """
+        if gripper_type != 'gripper' or field != 'position':
+            return state
+        error_code = state['error_code']
+        state = dict(state)
+        if (error_code is not None and 0 < error_code < 128) or self._gripper_error_code != 0:
+            state['code'] = APIState.END_EFFECTOR_HAS_FAULT
+        if error_code != 0:
+            state['position'] = None
+        return state
+
     @xarm_is_connected(_type='get')
     def get_gripper_status(self):
         code = self.checkset_modbus_baud(self._default_gripper_baud)
@@ -387,10 +472,14 @@ class Gripper(GPIO):
             timeout = 10
         expired = time.monotonic() + timeout
         failed_cnt = 0
+        # the counts are of the polls every 0.2s, scaled to the same time if the states are from the gripper monitor
+        scale = 0.2 / self._get_gripper_state_interval('gripper', 0.2, field='position')
         code = APIState.WAIT_FINISH_TIMEOUT
-        while self.connected and time.monotonic() < expired:
-            _, p = self._get_modbus_gripper_position()
-            if self._gripper_error_code != 0:
+        for state in self._iter_gripper_states('gripper', expired, 0.2, self.__poll_gripper_position, field='position'):
+            if not self.connected:
+                break
+            _, p = state['code'], state['position']
+            if self._gripper_error_code != 0 or _ == APIState.END_EFFECTOR_HAS_FAULT:
                 print('xArm Gripper ErrorCode: {}'.format(self._gripper_error_code))
                 return APIState.END_EFFECTOR_HAS_FAULT
             failed_cnt = 0 if _ == 0 and p is not None else failed_cnt + 1
@@ -407,7 +496,7 @@ class Gripper(GPIO):
                         count2 = 0
                     else:
                         count2 += 1
-                        if count2 >= 10:
+                        if count2 >= 10 * scale:
                             return 0
                 else:
                     if cur_pos >= last_pos:
@@ -418,16 +507,20 @@ class Gripper(GPIO):
                         count2 = 0
                     else:
                         count2 += 1
-                        if count2 >= 10:
+                        if count2 >= 10 * scale:
                             return 0
-                if count >= 8:
+                if count >= 8 * scale:
                     return 0
             else:
-                if failed_cnt > 10:
+                if failed_cnt > 10 * scale:
                     return APIState.CHECK_FAILED
-            time.sleep(0.2)
         return code
 
+    def __poll_gripper_position(self):
+        ret = self._get_modbus_gripper_position()
+        code, pos = ret if isinstance(ret, tuple) else (ret, None)
+        return _gripper_state(code, position=pos)
+
     def __check_gripper_status(self, timeout=None):
         start_move = False
         not_start_move_cnt = 0
@@ -435,9 +528,13 @@ class Gripper(GPIO):
         if not timeout or not isinstance(timeout, (int, float)) or timeout <= 0:
             timeout = 10
         expired = time.monotonic() + timeout
+        # the counts are of the polls every 0.1s, scaled to the same time if the states are from the gripper monitor
+        scale = 0.1 / self._get_gripper_state_interval('gripper', 0.1, field='status')
         code = APIState.WAIT_FINISH_TIMEOUT
-        while self.connected and time.monotonic() < expired:
-            _, status = self.get_gripper_status()
+        for state in self._iter_gripper_states('gripper', expired, 0.1, lambda: _gripper_state(*self.get_gripper_status()), field='status'):
+            if not self.connected:
+                break
+            _, status = state['code'], state['status']
             failed_cnt = 0 if _ == 0 else failed_cnt + 1
             if _ == 0:
                 if status & 0x03 == 0 or status & 0x03 == 2:
@@ -445,15 +542,14 @@ class Gripper(GPIO):
                         return 0
                     else:
                         not_start_move_cnt += 1
-                        if not_start_move_cnt > 20:
+                        if not_start_move_cnt > 20 * scale:
                             return 0
                 elif not start_move:
                     not_start_move_cnt = 0
                     start_move = True
             else:
-                if failed_cnt > 10:
+                if failed_cnt > 10 * scale:
                     return APIState.CHECK_FAILED
-            time.sleep(0.1)
         return code
 
     def check_catch_gripper_status(self, timeout=None):
@@ -463,9 +559,13 @@ class Gripper(GPIO):
         if not timeout or not isinstance(timeout, (int, float)) or timeout <= 0:
             timeout = 10
         expired = time.monotonic() + timeout
+        # the counts are of the polls every 0.1s, scaled to the same time if the states are from the gripper monitor
+        scale = 0.1 / self._get_gripper_state_interval('gripper', 0.1, field='status')
         code = APIState.WAIT_FINISH_TIMEOUT
-        while self.connected and time.monotonic() < expired:
-            _, status = self.get_gripper_status()
+        for state in self._iter_gripper_states('gripper', expired, 0.1, lambda: _gripper_state(*self.get_gripper_status()), field='status'):
+            if not self.connected:
+                break
+            _, status = state['code'], state['status']
             failed_cnt = 0 if _ == 0 else failed_cnt + 1
             if _ == 0:
                 if status & 0x03 == 2:
@@ -473,15 +573,14 @@ class Gripper(GPIO):
                         return 0
                     else:
                         not_start_move_cnt += 1
-                        if not_start_move_cnt > 2:
+                        if not_start_move_cnt > 2 * scale:
                             return 0
                 elif not start_move:
                     not_start_move_cnt = 0
                     start_move = True
             else:
-                if failed_cnt > 10:
+                if failed_cnt > 10 * scale:
                     return APIState.CHECK_FAILED
-            time.sleep(0.1)
         return code
 
     @xarm_is_connected(_type='set')
@@ -562,23 +661,27 @@ class Gripper(GPIO):
             return code, []
         return self.getset_tgpio_modbus_data(data_frame, min_res_len=min_res_len, ignore_log=True)
 
+    def __poll_bio_gripper_status(self):
+        return _gripper_state(*self.get_bio_gripper_status())
+
     def __bio_gripper_wait_motion_completed(self, timeout=5, **kwargs):
         failed_cnt = 0
         expired = time.monotonic() + timeout
+        # the failed count is of the polls every 0.1s, scaled to the same time if the states are from the gripper monitor
+        scale = 0.1 / self._get_gripper_state_interval('bio', 0.1)
         code = APIState.WAIT_FINISH_TIMEOUT
         check_detected = kwargs.get('check_detected', False)
-        while time.monotonic() < expired:
-            _, status = self.get_bio_gripper_status()
+        for state in self._iter_gripper_states('bio', expired, 0.1, self.__poll_bio_gripper_status):
+            _, status = state['code'], state['status']
             failed_cnt = 0 if _ == 0 else failed_cnt + 1
             if _ == 0:
                 code = code if (status & 0x03) == XCONF.BioGripperState.IS_MOTION \
                     else APIState.END_EFFECTOR_HAS_FAULT if (status & 0x03) == XCONF.BioGripperState.IS_FAULT \
                     else 0 if not check_detected or (status & 0x03) == XCONF.BioGripperState.IS_DETECTED else code
             else:
-                code = APIState.NOT_CONNECTED if _ == APIState.NOT_CONNECTED else APIState.CHECK_FAILED if failed_cnt > 10 else code
+                code = APIState.NOT_CONNECTED if _ == APIState.NOT_CONNECTED else APIState.CHECK_FAILED if failed_cnt > 10 * scale else code
             if code != APIState.WAIT_FINISH_TIMEOUT:
                 break
-            time.sleep(0.1)
         if self.bio_gripper_error_code != 0:
             print('BIO Gripper ErrorCode: {}'.format(self.bio_gripper_error_code))
         if code == 0 and not self.bio_gripper_is_enabled:
@@ -588,17 +691,17 @@ class Gripper(GPIO):
     def __bio_gripper_wait_enable_completed(self, timeout=3):
         failed_cnt = 0
         expired = time.monotonic() + timeout
+        scale = 0.1 / self._get_gripper_state_interval('bio', 0.1)
         code = APIState.WAIT_FINISH_TIMEOUT
-        while time.monotonic() < expired:
-            _, status = self.get_bio_gripper_status()
+        for state in self._iter_gripper_states('bio', expired, 0.1, self.__poll_bio_gripper_status):
+            _ = state['code']
             failed_cnt = 0 if _ == 0 else failed_cnt + 1
             if _ == 0:
                 code = 0 if self.bio_gripper_is_enabled else code
             else:
-                code = APIState.NOT_CONNECTED if _ == APIState.NOT_CONNECTED else APIState.CHECK_FAILED if failed_cnt > 10 else code
+                code = APIState.NOT_CONNECTED if _ == APIState.NOT_CONNECTED else APIState.CHECK_FAILED if failed_cnt > 10 * scale else code
             if code != APIState.WAIT_FINISH_TIMEOUT:
                 break
-            time.sleep(0.1)
         return code
 
     @xarm_is_connected(_type='set')
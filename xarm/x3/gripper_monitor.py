@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+import time
+import threading
+from ..core.config.x_config import XCONF
+from ..core.utils import convert
+from ..core.utils.log import logger
+from ..core.utils.periodic import PeriodicThread
+from .code import APIState
+
+GRIPPER_TYPES = ('gripper', 'bio')
+
+# (name, addr, number of registers), read from the gripper (slave id XCONF.GRIPPER_ID) every poll
+GRIPPER_STATE_REGISTERS = {
+    'gripper': (('status', 0x0000, 1),
+                ('position', XCONF.ServoConf.CURR_POS, 2),
+                ('error_code', XCONF.ServoConf.ERR_CODE, 1)),
+    'bio': (('status', 0x0000, 1),
+            ('error_code', 0x000F, 1)),
+}
+
+
+def _read_frame(addr, count):
+    return [XCONF.GRIPPER_ID, 0x03] + list(convert.u16_to_bytes(addr)) + list(convert.u16_to_bytes(count))
+
+
+class GripperMonitor(PeriodicThread):
+    """
+    Poll the state of the gripper (xArm Gripper or BIO Gripper) in a background thread and keep the latest one,
+    the registers of a poll are read together (getset_tgpio_modbus_batch) instead of one locked round trip per register,
+    the waits of the gripper motion block on the condition of the monitor instead of polling by themselves
+    :param arm: XArm instance
+    :param gripper_type: 'gripper' (xArm Gripper) or 'bio' (BIO Gripper)
+    :param interval: seconds between the polls, default is the period of the status polls of the waits (0.1),
+        a shorter one ends the waits earlier but takes more of the bandwidth of the RS485 bus (shared with the other modbus commands)
+    :param callback: called with every state in the monitor thread, callback(state)
+    state: {
+        'seq': sequence number of the state, starting from 1,
+        'time': time.monotonic() of the poll,
+        'code': the first failed code of the reads,
+        'status': status register, None if not read or failed,
+        'position': current position (pulse) of the xArm Gripper, None if not read or failed,
+        'error_code': error code of the gripper, None if failed,
+    }
+    """
+    def __init__(self, arm, gripper_type='gripper', interval=0.1, callback=None):
+        assert gripper_type in GRIPPER_TYPES, 'gripper_type can only be one of {}'.format(GRIPPER_TYPES)
+        super(GripperMonitor, self).__init__(interval)
+        self._arm = arm
+        self._gripper_type = gripper_type
+        self._callback = callback
+        self._registers = GRIPPER_STATE_REGISTERS[gripper_type]
+        if gripper_type == 'gripper' and not arm.gripper_is_support_status:
+            self._registers = tuple(reg for reg in self._registers if reg[0] != 'status')
+        self._frames = [_read_frame(addr, count) for _, addr, count in self._registers]
+        self._res_lens = [3 + count * 2 for _, _, count in self._registers]
+        self._cond = threading.Condition()
+        self._state = None
+        self._seq = 0
+        self._error_count = 0
+
+    @property
+    def gripper_type(self):
+        return self._gripper_type
+
+    @property
+    def fields(self):
+        return tuple(reg[0] for reg in self._registers)
+
+    @property
+    def error_count(self):
+        return self._error_count
+
+    @property
+    def latest(self):
+        with self._cond:
+            return self._state
+
+    def wait_update(self, seq=0, timeout=None):
+        """
+        Wait for a state newer than seq
+        :param seq: sequence number of the last state seen, 0 means any state
+        :param timeout: seconds to wait, None means forever
+        :return: the state, None if timeout or the monitor is stopped
+        """
+        expired = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self._state is None or self._state['seq'] <= seq) and not self._stop_event.is_set():
+                remaining = None if expired is None else expired - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            state = self._state
+        return state if state is not None and state['seq'] > seq else None
+
+    def poll(self):
+        """
+        Read the state of the gripper once, the cached properties of the arm are updated like the getters
+        :return: state, see GripperMonitor
+        """
+        rets = self._arm.getset_tgpio_modbus_batch(self._frames, min_res_len=self._res_lens, ignore_log=True)
+        state = {'seq': 0, 'time': time.monotonic(), 'code': 0, 'status': None, 'position': None, 'error_code': None}
+        for (name, _, count), (code, res) in zip(self._registers, rets):
+            if code != 0:
+                state['code'] = state['code'] or code
+                continue
+            # res: slave id, function code, byte count, data
+            data = res[3:3 + count * 2]
+            state[name] = convert.bytes_to_long_big(data) if count == 2 else convert.bytes_to_u16(data)
+        self._update_arm(state)
+        return state
+
+    def _update_arm(self, state):
+        arm = self._arm
+        status, error_code = state['status'], state['error_code']
+        if self._gripper_type == 'gripper':
+            if error_code is not None and error_code < 128:
+                arm.gripper_error_code = error_code
+                if error_code != 0:
+                    arm.gripper_is_enabled = False
+                    arm.gripper_speed = 0
+        elif status is not None:
+            if (status & 0x03) != XCONF.BioGripperState.IS_FAULT:
+                arm.bio_gripper_error_code = 0
+            elif error_code is not None:
+                arm.bio_gripper_error_code = error_code
+            arm.bio_gripper_is_enabled = ((status >> 2) & 0x03) == XCONF.BioGripperState.IS_ENABLED
+
+    def _wakeup(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _tick(self):
+        if not self._arm.connected:
+            return
+        try:
+            state = self.poll()
+        except Exception as e:
+            logger.error('gripper monitor exception: {}'.format(e))
+            state = {'seq': 0, 'time': time.monotonic(), 'code': APIState.API_EXCEPTION,
+                     'status': None, 'position': None, 'error_code': None}
+        if state['code'] != 0:
+            self._error_count += 1
+        self._seq += 1
+        state['seq'] = self._seq
+        with self._cond:
+            self._state = state
+            self._cond.notify_all()
+        if self._callback is not None:
+            try:
+                self._callback(state)
+            except Exception as e:
+                logger.error('gripper monitor callback exception: {}'.format(e))
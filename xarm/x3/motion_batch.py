@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+
+import time
+import threading
+from collections import deque
+from ..core.utils import convert
+from ..core.utils.log import logger
+from .code import APIState
+
+
+class MotionBatch(object):
+    """
+    Handle of the motion commands submitted by XArm.submit_motion_batch
+    The commands are sent by a background thread, as many as the command buffer of the controller allows in one write
+    (the batch has its own in-flight window, the max_inflight of the getters does not limit it),
+    and the acks are collected by the same thread
+    :param arm: XArm instance
+    :param requests: [(funcode, float_data, byte_data, rx_len), ...], the encoded commands
+    :param chunk_size: max number of the commands in one write
+    """
+    def __init__(self, arm, requests, chunk_size=256):
+        self._arm = arm
+        self._requests = requests
+        self._chunk_size = max(int(chunk_size), 1)
+        # result code of every command, None means not acked yet
+        self._codes = [None] * len(requests)
+        self._sent = 0
+        self._acked = 0
+        # (ack time, count) of the acked commands which may not be counted in the reported cmdnum yet
+        self._unreported = deque()
+        self._cancelled = False
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def codes(self):
+        """
+        Result code of every command, None if not acked yet
+        0: accepted by the controller
+        APIState.NOT_READY: not sent, the batch was cancelled or stopped by a previous failure
+        others: the code of the command (the same as the code of set_position)
+        """
+        return list(self._codes)
+
+    @property
+    def sent_count(self):
+        return self._sent
+
+    @property
+    def acked_count(self):
+        return self._acked
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def code(self):
+        """The first non-zero code of the commands, 0 if all are accepted (or not acked yet)"""
+        for code in self._codes:
+            if code:
+                return code
+        return 0
+
+    def __len__(self):
+        return len(self._requests)
+
+    def start(self):
+        if not self._requests:
+            self._done.set()
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop sending the remaining commands, the commands already sent are not affected"""
+        self._cancelled = True
+
+    def wait(self, timeout=None):
+        """
+        Wait until all the commands are acked (not the end of the motions)
+        :return: code, the first non-zero code of the commands, APIState.WAIT_FINISH_TIMEOUT if timeout
+        """
+        if not self._done.wait(timeout):
+            return APIState.WAIT_FINISH_TIMEOUT
+        return self.code
+
+    def _room(self):
+        # free slots of the command buffer of the controller, the commands sent but not acked are not in cmdnum yet
+        arm = self._arm
+        if not arm._check_cmdnum_limit:
+            return self._chunk_size
+        unreported = self._unreported
+        if arm._report_is_alive:
+            while unreported and unreported[0][0] < arm._report_recv_time:
+                unreported.popleft()
+        else:
+            # cmd_num is got by the command after the acks
+            unreported.clear()
+        return arm._max_cmd_num - arm.cmd_num - (self._sent - self._acked) - sum(item[1] for item in unreported)
+
+    def _abort(self, code):
+        for i in range(len(self._requests)):
+            if self._codes[i] is None:
+                self._codes[i] = code
+        self._sent = self._acked = len(self._requests)
+
+    def _send_chunk(self, requests):
+        arm_cmd = self._arm.arm_cmd
+        send_batch = getattr(arm_cmd, 'send_batch', None)
+        trans_ids = None
+        if send_batch is not None:
+            # the write is serialized with the other set commands, the acks are matched by the transaction ids,
+            # so they are waited for without the lock (the whole chunk is in flight, the room of the buffer limits it)
+            with arm_cmd.lock:
+                trans_ids = send_batch([(funcode, convert.fp32s_to_bytes(float_data, len(float_data)) + byte_data)
+                                        for funcode, float_data, byte_data, _ in requests], window=len(requests))
+            if trans_ids is not None and trans_ids != -1:
+                # the same timeout as the move commands sent one by one
+                rets = arm_cmd.recv_batch([req[0] for req in requests], trans_ids, [req[3] for req in requests], 10)
+                return [ret[0] for ret in rets]
+        if trans_ids is None:
+            # the port does not support pipelining, one request at a time (set_nfp32_with_bytes takes the lock)
+            return [arm_cmd.set_nfp32_with_bytes(funcode, float_data, len(float_data), byte_data, rx_len)[0]
+                    for funcode, float_data, byte_data, rx_len in requests]
+        return [APIState.NO_TCP] * len(requests)
+
+    def _run(self):
+        arm = self._arm
+        total = len(self._requests)
+        try:
+            while self._sent < total:
+                # the state is not known before the first report (4 by default), the controller checks it then
+                stopped = arm._report_is_alive and (arm.has_error or arm.is_stop)
+                if self._cancelled or not arm.connected or stopped:
+                    self._abort(APIState.NOT_READY)
+                    break
+                room = min(self._room(), self._chunk_size, total - self._sent)
+                if room <= 0:
+                    # flow control, wait for the controller to consume the buffered commands
+                    arm._wait_report_event(0.05)
+                    if not arm._report_is_alive:
+                        arm.get_cmdnum()
+                    continue
+                start = self._sent
+                self._sent += room
+                codes = self._send_chunk(self._requests[start:start + room])
+                failed = False
+                for i, code in enumerate(codes):
+                    code = arm._check_code(code, is_move_cmd=True)
+                    self._codes[start + i] = code
+                    failed = failed or code != 0
+                self._acked = self._sent
+                self._unreported.append((time.monotonic(), room))
+                if failed:
+                    logger.error('motion batch stopped, code={}, index={}'.format(self.code, start))
+                    self._abort(APIState.NOT_READY)
+                    break
+        except Exception as e:
+            logger.error('motion batch exception: {}'.format(e))
+            self._abort(APIState.API_EXCEPTION)
+        finally:
+            self._done.set()
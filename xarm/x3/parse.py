@@ -28,6 +28,54 @@ GCODE_PARAM_T = 'T'  # Move-Time
 GCODE_PARAM_V = 'V'  # Value
 GCODE_PARAM_D = 'D'  # Addr
 
+_POSE_PARAMS = (GCODE_PARAM_X, GCODE_PARAM_Y, GCODE_PARAM_Z, GCODE_PARAM_A, GCODE_PARAM_B, GCODE_PARAM_C)
+_JOINT_PARAMS = (GCODE_PARAM_I, GCODE_PARAM_J, GCODE_PARAM_K, GCODE_PARAM_L, GCODE_PARAM_M, GCODE_PARAM_N, GCODE_PARAM_O)
+
+
+# a param is a letter followed by a number, e.g. X100.5, the same pattern as the per-letter lookup
+_PARAM_PATTERN = re.compile(r'([A-Za-z])(\-?\d+\.?\d*)')
+_HEX_PATTERNS = {}
+
+
+def scan_params(string, skip=0):
+    """
+    Scan the line once
+    :param string: gcode line
+    :param skip: the params starting before string[skip] are ignored (same as scanning string[skip:])
+    :return: {letter: value string} of the first occurrence of every letter
+    """
+    values = {}
+    for match in _PARAM_PATTERN.finditer(string, skip):
+        if match.group(1) not in values:
+            values[match.group(1)] = match.group(2)
+    return values
+
+
+class GcodeCommand(object):
+    """
+    A gcode line scanned once, the GcodeParser getters accept it instead of the line
+    :param line: gcode line, converted to upper case
+    """
+    __slots__ = ('line', 'values', 'tail_values')
+
+    def __init__(self, line):
+        self.line = line.upper()
+        # get_poses/get_joints skip the first 2 characters (the command itself)
+        self.values = values = {}
+        self.tail_values = tail_values = {}
+        for match in _PARAM_PATTERN.finditer(self.line):
+            ch, value = match.groups()
+            if ch not in values:
+                values[ch] = value
+            if ch not in tail_values and match.start() >= 2:
+                tail_values[ch] = value
+
+    def __str__(self):
+        return self.line
+
+    def __repr__(self):
+        return 'GcodeCommand({!r})'.format(self.line)
+
 
 class GcodeParser:
     def __init__(self):
@@ -36,20 +84,32 @@ class GcodeParser:
 
     @staticmethod
     def __get_value(string, ch, return_type, default=None):
-        pattern = r'{}(\-?\d+\.?\d*)'.format(ch)
-        data = re.findall(pattern, string)
-        if len(data) > 0:
-            return return_type(data[0])
+        values = string.values if isinstance(string, GcodeCommand) else scan_params(string)
+        data = values.get(ch)
+        if data is not None:
+            return return_type(data)
         return default
 
     @staticmethod
     def __get_hex_value(string, ch, default=None):
-        pattern = r'{}(-?\w{{3,4}})'.format(ch)
-        data = re.findall(pattern, string)
-        if len(data) > 0:
-            return int(data[0], base=16)
+        pattern = _HEX_PATTERNS.get(ch)
+        if pattern is None:
+            pattern = _HEX_PATTERNS[ch] = re.compile(r'{}(-?\w{{3,4}})'.format(ch))
+        match = pattern.search(string.line if isinstance(string, GcodeCommand) else string)
+        if match:
+            return int(match.group(1), base=16)
         return default
 
+    @staticmethod
+    def parse_file(path, encoding='utf-8'):
+        """
+        Parse the gcode file once
+        :param path: gcode file
+        :return: [GcodeCommand, ...] of the non-empty lines, for XArm.send_cmd_sync
+        """
+        with open(path, 'r', encoding=encoding) as f:
+            return [GcodeCommand(line) for line in map(str.strip, f) if line]
+
     def _get_int_value(self, string, ch, default=None):
         return self.__get_value(string, ch, int, default=default)
 
@@ -88,23 +148,13 @@ class GcodeParser:
     def get_id_num(self, string, default=None):
         return self._get_int_value(string, GCODE_PARAM_I, default=default)
 
+    @staticmethod
+    def __get_tail_floats(string, chs, default=None):
+        values = string.tail_values if isinstance(string, GcodeCommand) else scan_params(string, skip=2)
+        return [default if values.get(ch) is None else float(values[ch]) for ch in chs]
+
     def get_poses(self, string, default=None):
-        pose = [None] * 6
-        pose[0] = self._get_float_value(string[2:], GCODE_PARAM_X, default=default)
-        pose[1] = self._get_float_value(string[2:], GCODE_PARAM_Y, default=default)
-        pose[2] = self._get_float_value(string[2:], GCODE_PARAM_Z, default=default)
-        pose[3] = self._get_float_value(string[2:], GCODE_PARAM_A, default=default)
-        pose[4] = self._get_float_value(string[2:], GCODE_PARAM_B, default=default)
-        pose[5] = self._get_float_value(string[2:], GCODE_PARAM_C, default=default)
-        return pose
+        return self.__get_tail_floats(string, _POSE_PARAMS, default=default)
 
     def get_joints(self, string, default=None):
-        joints = [None] * 7
-        joints[0] = self._get_float_value(string[2:], GCODE_PARAM_I, default=default)
-        joints[1] = self._get_float_value(string[2:], GCODE_PARAM_J, default=default)
-        joints[2] = self._get_float_value(string[2:], GCODE_PARAM_K, default=default)
-        joints[3] = self._get_float_value(string[2:], GCODE_PARAM_L, default=default)
-        joints[4] = self._get_float_value(string[2:], GCODE_PARAM_M, default=default)
-        joints[5] = self._get_float_value(string[2:], GCODE_PARAM_N, default=default)
-        joints[6] = self._get_float_value(string[2:], GCODE_PARAM_O, default=default)
-        return joints
+        return self.__get_tail_floats(string, _JOINT_PARAMS, default=default)
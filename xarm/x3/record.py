@@ -9,17 +9,23 @@
 import json
 import time
 import uuid
-from urllib import request
 from .code import APIState
 from ..core.config.x_config import XCONF
 from ..core.utils.log import logger
 from .base import Base
 from .decorator import xarm_is_connected
+from ..core.utils.lazy import LazyModule
+
+request = LazyModule('urllib.request')
+# need numpy, loaded by the first capture/replay of the trajectories recorded by the sdk
+trajectory_file = LazyModule('..core.utils.trajectory_file', __package__)
+servo_streamer = LazyModule('..tools.servo_streamer', __package__)
 
 
 class Record(Base):
     def __init__(self):
         super(Record, self).__init__()
+        self._trajectory_replay = None
 
     @xarm_is_connected(_type='get')
     def get_trajectories(self, ip=None):
@@ -214,3 +220,109 @@ class Record(Base):
     def get_trajectory_rw_status(self):
         ret = self.arm_cmd.get_traj_rw_status()
         return ret[0], ret[1]
+
+    @property
+    def trajectory_capture(self):
+        return self._trajectory_capture
+
+    @xarm_is_connected(_type='set')
+    def start_capture_trajectory(self, fields=('pose', 'angles'), max_duration=None):
+        if not self.reported:
+            logger.error('start_capture_trajectory: the report is not connected')
+            return APIState.NOT_CONNECTED
+        meta = {
+            'start_time': time.time(),
+            'report_type': self._report_type,
+            'axis': self.axis,
+            'device_type': self.device_type,
+            'sn': self.sn,
+            'version': self.version,
+            'tcp_offset': list(self._position_offset),
+            'world_offset': list(self._world_offset),
+        }
+        try:
+            capture = trajectory_file.TrajectoryCapture(fields=fields, max_duration=max_duration, meta=meta)
+        except ImportError as e:
+            logger.error('start_capture_trajectory: {}'.format(e))
+            return APIState.API_EXCEPTION
+        self._trajectory_capture = capture
+        self.log_api_info('API -> start_capture_trajectory -> code=0, fields={}'.format(capture.fields), code=0)
+        return 0
+
+    def stop_capture_trajectory(self, filename=None):
+        capture = self._trajectory_capture
+        self._trajectory_capture = None
+        if capture is None:
+            return APIState.NOT_READY
+        if isinstance(filename, str) and filename.strip():
+            try:
+                count = capture.save(filename.strip())
+            except Exception as e:
+                logger.error('Save {} failed, {}'.format(filename, e))
+                return APIState.API_EXCEPTION
+            logger.info('Save {} success, {} states'.format(filename, count))
+        if capture.dropped:
+            logger.warning('capture trajectory: {} states after the max duration are dropped'.format(capture.dropped))
+        self.log_api_info('API -> stop_capture_trajectory -> code=0, count={}'.format(capture.count), code=0)
+        return 0
+
+    @xarm_is_connected(_type='set')
+    def replay_trajectory(self, trajectory, mode='servo_j', rate=250, start=0, end=None, speed=None, mvacc=None,
+                          move_to_start=True, wait=True, timeout=None):
+        assert mode in ('servo_j', 'servo_cartesian'), 'mode can only be servo_j or servo_cartesian'
+        name = 'angles' if mode == 'servo_j' else 'pose'
+        opened = None
+        try:
+            if isinstance(trajectory, str):
+                traj = opened = trajectory_file.TrajectoryFile(trajectory)
+            else:
+                traj = trajectory
+            if name not in traj.fields:
+                logger.error('replay_trajectory: {} is not captured in the trajectory'.format(name))
+                return APIState.API_EXCEPTION, None
+            setpoints = traj.resample(name, rate=rate, start=start, end=end)
+            if len(setpoints) == 0:
+                logger.error('replay_trajectory: no setpoints in [{}, {}]'.format(start, end))
+                return APIState.API_EXCEPTION, None
+        except Exception as e:
+            logger.error('replay_trajectory: {}'.format(e))
+            return APIState.API_EXCEPTION, None
+        finally:
+            # the setpoints are resampled copies, the file opened here is not used by the replay
+            if opened is not None:
+                opened.close()
+        self.stop_replay_trajectory()
+        if move_to_start:
+            self.set_mode(0)
+            self.set_state(0)
+            first = setpoints[0].tolist()
+            if mode == 'servo_j':
+                code = self.set_servo_angle(angle=first, is_radian=True, wait=True, timeout=timeout)
+            else:
+                code = self.set_position(*first, is_radian=True, wait=True, timeout=timeout)
+            if code != 0:
+                self.log_api_info('API -> replay_trajectory -> code={}, move to the start failed'.format(code), code=code)
+                return code, None
+        code = self.set_mode(1)
+        if code != 0:
+            return code, None
+        self.set_state(0)
+        time.sleep(0.1)
+        streamer = servo_streamer.ServoStreamer(self, setpoints, mode=mode, rate=rate, is_radian=True, speed=speed, mvacc=mvacc)
+        self._trajectory_replay = streamer
+        streamer.start()
+        self.log_api_info('API -> replay_trajectory -> code=0, setpoints={}, rate={}'.format(len(setpoints), rate), code=0)
+        if not wait:
+            return 0, None
+        streamer.wait(timeout)
+        if streamer.running:
+            streamer.stop()
+        return streamer.last_code, streamer.stats()
+
+    def stop_replay_trajectory(self):
+        streamer = self._trajectory_replay
+        self._trajectory_replay = None
+        if streamer is not None:
+            streamer.stop()
+            return streamer.last_code, streamer.stats()
+        return 0, None
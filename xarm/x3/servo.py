@@ -7,10 +7,13 @@
 # Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
 
 from ..core.config.x_config import XCONF
-from ..core.config.x_code import ServoError
 from ..core.utils.log import logger, pretty_print
 from .base import Base
 from .decorator import xarm_is_connected
+from .servo_snapshot import get_servo_snapshot, ServoSnapshotMonitor
+from ..core.utils.lazy import LazyModule
+
+x_code = LazyModule('..core.config.x_code', __package__)
 
 
 class Servo(Base):
@@ -24,7 +27,7 @@ class Servo(Base):
         lang = lang if lang == 'cn' else 'en'
         if self._check_code(ret[0]) == 0:
             for i in range(1, 9):
-                servo_error = ServoError(ret[i * 2], status=ret[i * 2 - 1])
+                servo_error = x_code.ServoError(ret[i * 2], status=ret[i * 2 - 1])
                 name = ('伺服-{}'.format(i) if lang == 'cn' else 'Servo-{}'.format(i)) if i < 8 else ('机械爪' if lang == 'cn' else 'Gripper')
                 dbmsg.append({
                     'name': name,
@@ -52,6 +55,27 @@ class Servo(Base):
             pretty_print('*' * 50, color='light_blue')
         return ret[0], dbmsg
 
+    @xarm_is_connected(_type='get')
+    def get_servo_snapshot(self, servo_ids=None, registers=None, with_dbmsg=True):
+        """
+        Read the registers of all the servos at once, the reads are pipelined instead of one round trip per read
+        :param servo_ids: the servo ids, default is all the joints
+        :param registers: the register names/groups/addresses, default is ('health', ), see servo_snapshot.resolve_registers
+        :param with_dbmsg: read the status and the error code of the servos too
+        :return: tuple((code, snapshot)), see servo_snapshot.get_servo_snapshot
+        """
+        return get_servo_snapshot(self, servo_ids=servo_ids, registers=registers, with_dbmsg=with_dbmsg)
+
+    def start_servo_monitor(self, interval=1.0, servo_ids=None, registers=None, with_dbmsg=True, history=3600, callback=None):
+        """
+        Take the servo snapshots periodically in a background thread
+        :return: ServoSnapshotMonitor, stop it by monitor.stop(), the time series by monitor.series(register, servo_id)
+        """
+        monitor = ServoSnapshotMonitor(self, interval=interval, servo_ids=servo_ids, registers=registers,
+                                       with_dbmsg=with_dbmsg, history=history, callback=callback)
+        monitor.start()
+        return monitor
+
     @xarm_is_connected(_type='set')
     def set_servo_zero(self, servo_id=None):
         """
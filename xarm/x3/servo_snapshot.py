@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# Software License Agreement (BSD License)
+#
+# Copyright (c) 2024, UFACTORY, Inc.
+# All rights reserved.
+#
+# Author: Vinman <vinman.wen@ufactory.cc> <vinman.cub@gmail.com>
+
+
+import time
+import threading
+from collections import OrderedDict, deque
+from ..core.config.x_config import XCONF
+from ..core.utils import convert
+from ..core.utils.log import logger
+from ..core.utils.periodic import PeriodicThread
+from .code import APIState
+
+# name: (addr, bits, scale), the value is the register value / scale
+SERVO_REGISTERS = OrderedDict([
+    ('state', (0x0000, 16, 1)),
+    ('rotate_speed', (0x0001, 16, 1)),
+    ('current_percentage', (0x0002, 16, 1)),
+    ('current', (0x0003, 16, 100)),
+    ('command_position', (0x0004, 32, 1)),
+    ('position', (0x0006, 32, 1)),
+    ('position_deviation', (0x0008, 32, 1)),
+    ('electrical_angle', (0x000B, 16, 1)),
+    ('drv8323_sr0', (0x000C, 16, 1)),
+    ('drv8323_sr1', (0x000D, 16, 1)),
+    ('temperature', (XCONF.ServoConf.GET_TEMP, 16, 1)),
+    ('alarm_code', (XCONF.ServoConf.ERR_CODE, 16, 1)),
+    ('alarm_current', (0x0010, 16, 1)),
+    ('alarm_speed', (0x0011, 16, 1)),
+    ('alarm_voltage', (0x0012, 16, 1)),
+    ('bus_voltage', (0x0018, 16, 100)),
+    ('mu_state', (0x001E, 16, 1)),
+    ('mu_alarm_count', (0x001F, 16, 1)),
+    ('feedback_position', (0x0040, 32, 1)),
+    ('version_major', (0x0801, 16, 1)),
+    ('version_minor', (0x0802, 16, 1)),
+    ('version_revision', (0x0803, 16, 1)),
+    ('harmonic_type', (0x081F, 16, 1)),
+    ('pos_kp', (XCONF.ServoConf.POS_KP, 16, 1)),
+    ('pos_fwdkp', (XCONF.ServoConf.POS_FWDKP, 16, 1)),
+    ('pos_pwdtc', (XCONF.ServoConf.POS_PWDTC, 16, 1)),
+    ('spd_kp', (XCONF.ServoConf.SPD_KP, 16, 1)),
+    ('spd_ki', (XCONF.ServoConf.SPD_KI, 16, 1)),
+    ('curr_kp', (XCONF.ServoConf.CURR_KP, 16, 1)),
+    ('curr_ki', (XCONF.ServoConf.CURR_KI, 16, 1)),
+    ('spd_ifilt', (XCONF.ServoConf.SPD_IFILT, 16, 1)),
+    ('spd_ofilt', (XCONF.ServoConf.SPD_OFILT, 16, 1)),
+    ('curr_ifilt', (XCONF.ServoConf.CURR_IFILT, 16, 1)),
+    ('pos_kd', (XCONF.ServoConf.POS_KD, 16, 1)),
+    ('pos_cmdilt', (XCONF.ServoConf.POS_CMDILT, 16, 1)),
+    ('over_temp', (XCONF.ServoConf.OVER_TEMP, 16, 1)),
+])
+
+# the names which are expanded to several registers
+SERVO_REGISTER_GROUPS = {
+    'version': ('version_major', 'version_minor', 'version_revision'),
+    'pids': ('pos_kp', 'pos_fwdkp', 'pos_pwdtc', 'spd_kp', 'spd_ki', 'curr_kp', 'curr_ki', 'spd_ifilt',
+             'spd_ofilt', 'curr_ifilt', 'pos_kd', 'pos_cmdilt', 'temperature', 'over_temp'),
+    'health': ('state', 'current', 'temperature', 'bus_voltage', 'position_deviation', 'alarm_code', 'mu_alarm_count'),
+}
+
+DEFAULT_SNAPSHOT_REGISTERS = ('health', )
+
+# max number of the requests in one write
+SNAPSHOT_CHUNK_SIZE = 32
+
+
+def resolve_registers(registers=None):
+    """
+    :param registers: iterable of the register names (SERVO_REGISTERS), the group names (SERVO_REGISTER_GROUPS),
+        the addresses (read as 16 bits) or (addr, bits), default is DEFAULT_SNAPSHOT_REGISTERS
+    :return: [(name, addr, bits, scale), ...], without duplicates
+    """
+    resolved = OrderedDict()
+
+    def _add(item):
+        if isinstance(item, str):
+            if item in SERVO_REGISTER_GROUPS:
+                for name in SERVO_REGISTER_GROUPS[item]:
+                    _add(name)
+                return
+            assert item in SERVO_REGISTERS, 'unknown servo register: {}'.format(item)
+            addr, bits, scale = SERVO_REGISTERS[item]
+            resolved[item] = (item, addr, bits, scale)
+        else:
+            addr, bits = item if isinstance(item, (tuple, list)) else (item, 16)
+            assert bits in (16, 32), 'the bits of the servo register can only be 16 or 32'
+            name = '0x{:04X}'.format(addr)
+            resolved[name] = (name, addr, bits, 1)
+
+    for register in (DEFAULT_SNAPSHOT_REGISTERS if registers is None else registers):
+        _add(register)
+    return list(resolved.values())
+
+
+def _read_requests(arm_cmd, requests):
+    """
+    Send the requests in a few writes and collect their responses, one request at a time if the port is not pipelined
+    :param requests: [(funcode, pdu_data, rx_len), ...]
+    :return: [ret, ...], ret is the same as the one of recv_modbus_response
+    """
+    send_batch = getattr(arm_cmd, 'send_batch', None)
+    rets = []
+    for i in range(0, len(requests), SNAPSHOT_CHUNK_SIZE):
+        chunk = requests[i:i + SNAPSHOT_CHUNK_SIZE]
+        trans_ids = send_batch([(funcode, pdu_data) for funcode, pdu_data, _ in chunk]) if send_batch is not None else None
+        if trans_ids is None:
+            for funcode, pdu_data, rx_len in chunk:
+                if funcode == XCONF.UxbusReg.SERVO_DBMSG:
+                    rets.append(arm_cmd.servo_get_dbmsg())
+                else:
+                    ret = (arm_cmd.servo_addr_r32 if funcode == XCONF.UxbusReg.SERVO_R32B else arm_cmd.servo_addr_r16)(
+                        pdu_data[0], convert.bytes_to_u16(pdu_data[1:3]))
+                    rets.append(ret)
+            continue
+        if trans_ids == -1:
+            rets.extend([[XCONF.UxbusState.ERR_NOTTCP] * (rx_len + 1)] * len(chunk))
+            continue
+        for (funcode, _, rx_len), ret in zip(chunk, arm_cmd.recv_batch(
+                [req[0] for req in chunk], trans_ids, [req[2] for req in chunk], arm_cmd._G_TOUT)):
+            if funcode != XCONF.UxbusReg.SERVO_DBMSG:
+                ret = [ret[0], convert.bytes_to_long_big(ret[1:5])]
+            rets.append(ret)
+    return rets
+
+
+def get_servo_snapshot(arm, servo_ids=None, registers=None, with_dbmsg=True):
+    """
+    Read the registers of the servos, all the reads are sent in a few writes instead of one round trip per read
+    :param arm: XArm instance
+    :param servo_ids: the servo ids, default is all the joints (1 ~ arm.axis)
+    :param registers: see resolve_registers
+    :param with_dbmsg: read the status and the error code of the servos (get_servo_debug_msg) too
+    :return: tuple((code, snapshot)), code is the first failed code of the reads
+        snapshot: {
+            'time': time.time() of the snapshot,
+            'elapsed': seconds used by the reads,
+            'servos': {servo_id: {'status': status, 'error_code': code, register_name: value, ...}, ...}
+        }
+        the value is None if the read is failed
+    """
+    servo_ids = list(range(1, arm.axis + 1)) if servo_ids is None else list(servo_ids)
+    regs = resolve_registers(registers)
+    requests = []
+    if with_dbmsg:
+        requests.append((XCONF.UxbusReg.SERVO_DBMSG, b'', 16))
+    for servo_id in servo_ids:
+        for _, addr, bits, _ in regs:
+            funcode = XCONF.UxbusReg.SERVO_R32B if bits == 32 else XCONF.UxbusReg.SERVO_R16B
+            requests.append((funcode, bytes([servo_id]) + convert.u16_to_bytes(addr), 4))
+    start = time.monotonic()
+    snapshot_time = time.time()
+    rets = _read_requests(arm.arm_cmd, requests)
+    elapsed = time.monotonic() - start
+
+    code = 0
+    servos = OrderedDict((servo_id, {}) for servo_id in servo_ids)
+    index = 0
+    if with_dbmsg:
+        ret = rets[0]
+        ret_code = arm._check_code(ret[0])
+        code = ret_code
+        for servo_id, info in servos.items():
+            valid = ret_code == 0 and 1 <= servo_id <= 8
+            info['status'] = ret[servo_id * 2 - 1] if valid else None
+            info['error_code'] = ret[servo_id * 2] if valid else None
+        index = 1
+    for servo_id, info in servos.items():
+        for name, _, _, scale in regs:
+            ret = rets[index]
+            index += 1
+            ret_code = arm._check_code(ret[0])
+            if ret_code != 0:
+                code = code or ret_code
+                info[name] = None
+            else:
+                info[name] = ret[1] / scale if scale != 1 else ret[1]
+    return code, {'time': snapshot_time, 'elapsed': elapsed, 'servos': servos}
+
+
+class ServoSnapshotMonitor(PeriodicThread):
+    """
+    Take the servo snapshots periodically in a background thread and keep them as a time series
+    :param arm: XArm instance
+    :param interval: seconds between the snapshots
+    :param servo_ids/registers/with_dbmsg: see get_servo_snapshot
+    :param history: max number of the snapshots kept
+    :param callback: called with every snapshot in the monitor thread, callback(snapshot)
+    """
+    def __init__(self, arm, interval=1.0, servo_ids=None, registers=None, with_dbmsg=True, history=3600, callback=None):
+        super(ServoSnapshotMonitor, self).__init__(interval)
+        self._arm = arm
+        self._servo_ids = servo_ids
+        self._registers = registers
+        self._with_dbmsg = with_dbmsg
+        self._callback = callback
+        self._snapshots = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._error_count = 0
+        self._last_code = 0
+
+    @property
+    def last_code(self):
+        return self._last_code
+
+    @property
+    def error_count(self):
+        return self._error_count
+
+    @property
+    def latest(self):
+        with self._lock:
+            return self._snapshots[-1] if self._snapshots else None
+
+    @property
+    def snapshots(self):
+        with self._lock:
+            return list(self._snapshots)
+
+    def series(self, register, servo_id):
+        """
+        Time series of one register of one servo
+        :param register: register name, 'status' or 'error_code'
+        :param servo_id: servo id
+        :return: tuple((times, values))
+        """
+        times, values = [], []
+        for snapshot in self.snapshots:
+            info = snapshot['servos'].get(servo_id)
+            if info is not None and register in info:
+                times.append(snapshot['time'])
+                values.append(info[register])
+        return times, values
+
+    def _tick(self):
+        arm = self._arm
+        if not arm.connected:
+            return
+        try:
+            code, snapshot = get_servo_snapshot(arm, servo_ids=self._servo_ids, registers=self._registers,
+                                                with_dbmsg=self._with_dbmsg)
+        except Exception as e:
+            logger.error('servo snapshot exception: {}'.format(e))
+            code, snapshot = APIState.API_EXCEPTION, None
+        self._last_code = code
+        if code != 0:
+            self._error_count += 1
+        if snapshot is not None:
+            with self._lock:
+                self._snapshots.append(snapshot)
+            if self._callback is not None:
+                try:
+                    self._callback(snapshot)
+                except Exception as e:
+                    logger.error('servo snapshot callback exception: {}'.format(e))
@@ -11,30 +11,37 @@ import warnings
 from ..core.utils.log import logger
 from .code import APIState
 
-try:
-    from requests import Session
-except:
-    import urllib.request
 
-    class Session(object):
-        class Request:
-            def __init__(self, url, data, **kwargs):
-                req = urllib.request.Request(url, data.encode('utf-8'))
-                self.r = urllib.request.urlopen(req)
-                self._data = self.r.read()
+class UrllibSession(object):
+    """Used instead of requests.Session if requests is not installed"""
+    class Request:
+        def __init__(self, url, data, **kwargs):
+            import urllib.request
+            req = urllib.request.Request(url, data.encode('utf-8'))
+            self.r = urllib.request.urlopen(req)
+            self._data = self.r.read()
 
-            @property
-            def status_code(self):
-                return self.r.code
+        @property
+        def status_code(self):
+            return self.r.code
 
-            def json(self):
-                return json.loads(self._data.decode('utf-8'))
+        def json(self):
+            return json.loads(self._data.decode('utf-8'))
 
-        def post(self, url, data=None, **kwargs):
-            return self.Request(url, data)
+    def post(self, url, data=None, **kwargs):
+        return self.Request(url, data)
 
-        def close(self):
-            pass
+    def close(self):
+        pass
+
+
+def create_session():
+    # requests is imported by the first call to the studio, not by the import of the sdk
+    try:
+        from requests import Session
+    except:
+        Session = UrllibSession
+    return Session()
 
 
 class Studio(object):
@@ -43,10 +50,11 @@ class Studio(object):
         if not ignore_warnning:
             warnings.warn("don't use it for now, just for debugging")
         self.__ip = ip
-        self.__session = Session()
+        self.__session = None
 
     def __del__(self):
-        self.__session.close()
+        if self.__session is not None:
+            self.__session.close()
 
     def run_blockly_app(self, name, **kwargs):
         try:
@@ -114,6 +122,8 @@ class Studio(object):
         show_fail_log = kwargs.pop('show_fail_log', True)
         path = kwargs.pop('path')
         if self.__ip and api_name:
+            if self.__session is None:
+                self.__session = create_session()
             r = self.__session.post('http://{}:18333/{}'.format(self.__ip, path), data=json.dumps({
                 'cmd': api_name, 'args': args, 'kwargs': kwargs
             }), timeout=(5, None))
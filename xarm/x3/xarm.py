@@ -26,18 +26,28 @@ from .record import Record
 from .robotiq import RobotIQ
 from .ft_sensor import FtSensor
 from .modbus_tcp import ModbusTcp
-from .parse import GcodeParser
+from .motion_batch import MotionBatch
 from .code import APIState
 from .decorator import xarm_is_connected, xarm_is_ready, xarm_wait_until_not_pause, xarm_wait_until_cmdnum_lt_max
 from .utils import to_radian
-try:
-    # from ..tools.blockly_tool import BlocklyTool
-    from ..tools.blockly import BlocklyTool
-except:
-    print('import BlocklyTool module failed')
-    BlocklyTool = None
+from ..core.utils.lazy import LazyModule
 
-gcode_p = GcodeParser()
+# loaded by the first gcode or blockly app, most scripts use neither
+parse = LazyModule('.parse', __package__)
+blockly = LazyModule('..tools.blockly', __package__)
+blockly_cache = LazyModule('..tools.blockly._blockly_cache', __package__)
+# needs numpy, loaded by the first get_kinematics_model
+kinematics = LazyModule('..core.utils.kinematics', __package__)
+path_validation = LazyModule('..core.utils.path_validation', __package__)
+
+_gcode_parser = None
+
+
+def get_gcode_parser():
+    global _gcode_parser
+    if _gcode_parser is None:
+        _gcode_parser = parse.GcodeParser()
+    return _gcode_parser
 
 
 class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, ModbusTcp):
@@ -46,6 +56,8 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
         super(XArm, self).__init__()
         kwargs['init'] = True
         self._api_instance = instance
+        self._dh_params = None
+        self._reduced_states = None
         Base.__init__(self, port, is_radian, do_not_open, **kwargs)
 
     def _is_out_of_tcp_range(self, value, i):
@@ -65,11 +77,23 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
                 return True
         return False
 
+    def _get_joint_limits(self):
+        device_type = int('{}1305'.format(self.axis)) if self.sn and int(self.sn[2:6]) >= 1305 and int(self.sn[2:6]) < 8500 else self.device_type
+        return XCONF.Robot.JOINT_LIMITS.get(self.axis, {}).get(device_type, [])
+
+    def _get_tcp_limits(self):
+        # only the rotation is limited, the same as _is_out_of_tcp_range
+        tcp_range = XCONF.Robot.TCP_LIMITS.get(self.axis, {}).get(self.device_type, [])
+        limits = [(0, 0)] * 6
+        for i in range(3, min(len(tcp_range), 6)):
+            offset = self._position_offset[i] + self._world_offset[i]
+            limits[i] = (tcp_range[i][0] + offset, tcp_range[i][1] + offset)
+        return limits
+
     def _is_out_of_joint_range(self, angle, i):
         if not self._check_joint_limit or self._stream_type != 'socket' or not self._enable_report or angle == math.inf:
             return False
-        device_type = int('{}1305'.format(self.axis)) if self.sn and int(self.sn[2:6]) >= 1305 and int(self.sn[2:6]) < 8500 else self.device_type
-        joint_limit = XCONF.Robot.JOINT_LIMITS.get(self.axis).get(device_type, [])
+        joint_limit = self._get_joint_limits()
         if i < len(joint_limit):
             angle_range = joint_limit[i]
             if angle < angle_range[0] - math.radians(0.1) or angle > angle_range[1] + math.radians(0.1):
@@ -675,6 +699,84 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
             self.wait_move()
             self._sync()
 
+    def __encode_batch_command(self, command, speed=None, mvacc=None, mvtime=None, is_radian=None):
+        """
+        Encode a command of submit_motion_batch
+        :return: (funcode, float_data, byte_data, rx_len), or the error code
+        """
+        if not isinstance(command, dict):
+            command = {'pose': command[:6], 'radius': command[6] if len(command) > 6 else None}
+        speed = command.get('speed', speed)
+        mvacc = command.get('mvacc', mvacc)
+        mvtime = command.get('mvtime', mvtime)
+        radius = command.get('radius', None)
+        relative = command.get('relative', False)
+        if 'angles' in command:
+            angles = command['angles']
+            spd, acc, mvt = self.__get_joint_motion_params(speed, mvacc, mvtime, is_radian=is_radian)
+            joints = [0] * 7 if relative else self._last_angles.copy()
+            for i in range(min(7, len(angles))):
+                if i >= self.axis or angles[i] is None:
+                    continue
+                joints[i] = to_radian(angles[i], is_radian)
+                if not relative and self._is_out_of_joint_range(joints[i], i):
+                    return APIState.OUT_OF_RANGE
+            if relative:
+                if not self.version_is_ge(1, 8, 100):
+                    return APIState.CMD_NOT_EXIST
+                return XCONF.UxbusReg.MOVE_RELATIVE, joints + [spd, acc, mvt, -1 if radius is None else radius], bytes([1, 0]), 0
+            self.__update_joint_motion_params(spd, acc, mvt, joints)
+            if self.version_is_ge(1, 5, 20) and radius is not None and radius >= 0:
+                return XCONF.UxbusReg.MOVE_JOINTB, joints + [spd, acc, radius], b'', 0
+            return XCONF.UxbusReg.MOVE_JOINT, joints + [spd, acc, mvt], b'', 0
+        pose = command['pose']
+        spd, acc, mvt = self.__get_tcp_motion_params(speed, mvacc, mvtime)
+        radius = -1 if radius is None else radius
+        if relative:
+            if not self.version_is_ge(1, 8, 100):
+                return APIState.CMD_NOT_EXIST
+            tcp_pos = [0 if pose[i] is None else (float(pose[i]) if i < 3 else to_radian(pose[i], is_radian)) for i in range(6)]
+            return XCONF.UxbusReg.MOVE_RELATIVE, tcp_pos + [0, spd, acc, mvt, radius], bytes([0, 0]), 0
+        default = [math.inf] * 6 if self.version_is_ge(2, 4, 101) else self._last_position
+        tcp_pos = [default[i] if pose[i] is None else (float(pose[i]) if i < 3 else to_radian(pose[i], is_radian)) for i in range(6)]
+        for i in range(3):
+            if self._is_out_of_tcp_range(tcp_pos[i + 3], i + 3):
+                return APIState.OUT_OF_RANGE
+        self.__update_tcp_motion_params(spd, acc, mvt, tcp_pos)
+        if self.version_is_ge(1, 11, 100):
+            return XCONF.UxbusReg.MOVE_LINE, tcp_pos + [spd, acc, mvt, radius], bytes([0, 0, 0]), 3
+        if radius >= 0:
+            return XCONF.UxbusReg.MOVE_LINEB, tcp_pos + [spd, acc, mvt, radius], b'', 0
+        return XCONF.UxbusReg.MOVE_LINE, tcp_pos + [spd, acc, mvt], b'', 0
+
+    @xarm_is_ready(_type='get', default=None)
+    def submit_motion_batch(self, commands, speed=None, mvacc=None, mvtime=None, is_radian=None,
+                            wait=False, timeout=None, chunk_size=256):
+        code = self.__wait_sync()
+        if code != 0:
+            return code, None
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        requests = []
+        for i, command in enumerate(commands):
+            request = self.__encode_batch_command(command, speed=speed, mvacc=mvacc, mvtime=mvtime, is_radian=is_radian)
+            if not isinstance(request, tuple):
+                logger.error('submit_motion_batch, invalid command, code={}, index={}'.format(request, i))
+                return request, None
+            requests.append(request)
+        self._has_motion_cmd = True
+        self._is_set_move = True
+        batch = MotionBatch(self, requests, chunk_size=chunk_size)
+        batch.start()
+        self.log_api_info('API -> submit_motion_batch -> count={}'.format(len(requests)), code=0)
+        if not wait:
+            return 0, batch
+        expired = time.monotonic() + timeout if timeout is not None else None
+        code = batch.wait(timeout)
+        if code == 0:
+            code = self.wait_move(max(expired - time.monotonic(), 0) if expired is not None else None)
+            self._sync()
+        return code, batch
+
     @xarm_is_connected(_type='set')
     def set_servo_attach(self, servo_id=None):
         # assert isinstance(servo_id, int) and 1 <= servo_id <= 8
@@ -714,6 +816,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
     def set_reduced_max_tcp_speed(self, speed):
         ret = self.arm_cmd.set_reduced_linespeed(speed)
         self.log_api_info('API -> set_reduced_linespeed -> code={}, speed={}'.format(ret[0], speed), code=ret[0])
+        self._reduced_states = None
         return ret[0]
 
     @xarm_is_connected(_type='set')
@@ -784,6 +887,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
                     return APIState.OUT_OF_RANGE
         ret = self.arm_cmd.set_reduced_jrange(limits)
         self.log_api_info('API -> set_reduced_joint_range -> code={}, boundary={}'.format(ret[0], limits), code=ret[0])
+        self._reduced_states = None
         return ret[0]
 
     @xarm_is_connected(_type='set')
@@ -1092,6 +1196,71 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
         else:
             return ret[0], None
 
+    def get_kinematics_model(self, refresh=False):
+        """
+        Local kinematics model of the arm, built from the dh parameters of the controller (read once and cached),
+        the current tcp offset, world offset, joint limits and tcp limits
+        :param refresh: read the dh parameters again
+        :return: tuple((code, model)), model is a KinematicsModel, None if failed
+        """
+        if refresh or self._dh_params is None:
+            code, dh_params = self.get_dh_params()
+            if code != 0:
+                return code, None
+            self._dh_params = dh_params
+        try:
+            model = kinematics.KinematicsModel(self._dh_params, dof=self.axis,
+                                               tcp_offset=self._position_offset, world_offset=self._world_offset,
+                                               joint_limits=self._get_joint_limits() or None, tcp_limits=self._get_tcp_limits())
+        except ImportError as e:
+            logger.error('get_kinematics_model: {}'.format(e))
+            return APIState.API_EXCEPTION, None
+        return 0, model
+
+    @xarm_is_connected(_type='get')
+    def validate_path(self, paths, speed=None, mvacc=None, is_radian=None, seed=None, step=10,
+                      link_radius=None, refresh=False, rot_speed=None, rot_acc=None):
+        is_radian = self._default_is_radian if is_radian is None else is_radian
+        assert len(paths) > 0, 'parameter paths error'
+        code, model = self.get_kinematics_model(refresh=refresh)
+        if code != 0:
+            return code, None
+        spd, acc, _ = self.__get_tcp_motion_params(speed, mvacc, None)
+        rot_spd = path_validation.ROT_SPEED if rot_speed is None else to_radian(rot_speed, is_radian)
+        rot_acc = path_validation.ROT_ACC if rot_acc is None else to_radian(rot_acc, is_radian)
+        joint_ranges = None
+        if self.is_reduced_mode:
+            if refresh or self._reduced_states is None:
+                code, states = self.get_reduced_states(is_radian=True)
+                if code != 0:
+                    return code, None
+                self._reduced_states = states
+            if self._reduced_states[2] > 0:
+                spd = min(spd, self._reduced_states[2])
+            if len(self._reduced_states) > 4:
+                joint_ranges = [self._reduced_states[4][i * 2:i * 2 + 2] for i in range(self.axis)]
+        # the boundary of the reduced mode is also the safety boundary of the fence mode
+        boundary = self.reduced_tcp_boundary if self.is_reduced_mode or self.is_fence_mode else None
+        if link_radius is None:
+            link_radius = path_validation.LINK_RADIUS if self.self_collision_params[0] else 0
+        poses = [[to_radian(path[i], is_radian or i <= 2) for i in range(6)] for path in paths]
+        radii = [path[6] if len(path) > 6 else -1 for path in paths]
+        seed = self._angles[:self.axis] if seed is None else [to_radian(angle, is_radian) for angle in seed[:self.axis]]
+        result = path_validation.validate_path(model, poses, seed, radii=radii, speed=spd, acc=acc,
+                                               rot_speed=rot_spd, rot_acc=rot_acc,
+                                               step=step, joint_ranges=joint_ranges, boundary=boundary, link_radius=link_radius)
+        waypoints = []
+        for i in range(len(poses)):
+            angles = result['angles'][i].tolist()
+            waypoint = {name: bool(result[name][i]) for name in path_validation.VERDICTS + ('ok', )}
+            waypoint['angles'] = angles if is_radian else [math.degrees(angle) for angle in angles]
+            waypoint['time'] = float(result['times'][i])
+            waypoints.append(waypoint)
+        ok = all(waypoint['ok'] for waypoint in waypoints)
+        self.log_api_info('API -> validate_path -> code=0, waypoints={}, ok={}, duration={:.3f}'.format(
+            len(waypoints), ok, result['duration']), code=0)
+        return 0, {'ok': ok, 'duration': result['duration'], 'waypoints': waypoints}
+
     def emergency_stop(self):
         logger.info('emergency_stop--begin')
         self.set_state(4)
@@ -1109,10 +1278,14 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
     def send_cmd_sync(self, command=None):
         if command is None:
             return 0
-        command = command.upper()
+        if not isinstance(command, parse.GcodeCommand):
+            # the line is scanned once, the params are looked up in the scanned values
+            command = parse.GcodeCommand(command)
         return self._handle_gcode(command)
 
     def _handle_gcode(self, command):
+        gcode_p = get_gcode_parser()
+
         def __handle_gcode_g(num):
             if num == 1:  # G1 move_line, ex: G1 X{} Y{} Z{} A{roll} B{pitch} C{yaw} F{speed} Q{acc} T{}
                 mvvelo = gcode_p.get_mvvelo(command)
@@ -1422,9 +1595,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
             abs_path = os.path.abspath(path)
             if not os.path.exists(abs_path):
                 raise FileNotFoundError
-            with open(abs_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            lines = [line.strip() for line in lines]
+            commands = get_gcode_parser().parse_file(abs_path)
             if init:
                 self.clean_error()
                 self.clean_warn()
@@ -1435,14 +1606,11 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
                 time.sleep(wait_seconds)
 
             for i in range(times):
-                for line in lines:
-                    line = line.strip()
-                    if not line:
-                        continue
+                for command in commands:
                     if not self.connected:
                         logger.error('xArm is disconnect')
                         return APIState.NOT_CONNECTED
-                    ret = self.send_cmd_sync(line)
+                    ret = self.send_cmd_sync(command)
                     if isinstance(ret, int) and ret < 0:
                         return ret
             return APIState.NORMAL
@@ -1455,6 +1623,8 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
         """
         Run the app generated by xArmStudio software
         :param path: app path
+        :param kwargs: the params of BlocklyTool.to_python and
+            cache: BlocklyCodeCache of the converted apps, default is the shared cache, False to convert every time
         """
         try:
             if not os.path.exists(path):
@@ -1464,8 +1634,17 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
                 path = os.path.join(path, 'app.xml')
             if not os.path.exists(path):
                 raise FileNotFoundError('{} is not found'.format(path))
-            blockly_tool = BlocklyTool(path)
-            succeed = blockly_tool.to_python(arm=self._api_instance, **kwargs)
+            cache = kwargs.pop('cache', True)
+            if cache is True:
+                cache = blockly_cache.default_cache
+            if cache:
+                # the converted and compiled app is reused while the xml and the conversion options are the same
+                program = cache.get(path, arm=self._api_instance, **kwargs)
+                succeed, codes = program.succeed, program.code
+            else:
+                blockly_tool = blockly.BlocklyTool(path)
+                succeed = blockly_tool.to_python(arm=self._api_instance, **kwargs)
+                codes = blockly_tool.codes
             if succeed:
                 times = kwargs.get('times', 1)
                 highlight_callback = kwargs.get('highlight_callback', None)
@@ -1479,7 +1658,7 @@ class XArm(Gripper, Servo, Record, RobotIQ, BaseBoard, LinearMotor, FtSensor, Mo
                 code = APIState.NORMAL
                 try:
                     for _ in range(times):
-                        exec(blockly_tool.codes, {'arm': self._api_instance, 'highlight_callback': highlight_callback,
+                        exec(codes, {'arm': self._api_instance, 'highlight_callback': highlight_callback,
                                                   'print': blockly_print, 'run_blockly': blockly_exec, 
                                                   'start_run_blockly': blockly_exec, 'start_run_gcode':blockly_run_gcode})
                 except Exception as e: